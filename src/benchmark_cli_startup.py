@@ -0,0 +1,140 @@
+"""
+Benchmark : temps de démarrage de la ligne de commande kayak
+Durée d'exécution (processus complet) de `kayak --help` et `kayak status` sur
+un registre de snapshots et de run, comparée à l'import des modules des
+étapes (pandas, aiohttp), avec vérification qu'aucun module lourd n'est chargé
+
+Usage :
+    python src/benchmark_cli_startup.py
+    python src/benchmark_cli_startup.py --repeat 20
+"""
+
+import argparse
+import os
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+
+import numpy as np
+
+
+# ═══════════════════════════════════════════════════════════════════════
+# CONFIGURATION
+# ═══════════════════════════════════════════════════════════════════════
+
+SRC_DIR = os.path.dirname(os.path.abspath(__file__))
+CLI = os.path.join(SRC_DIR, 'kayak_cli.py')
+
+# Modules qui ne doivent pas être importés par --help et status
+HEAVY_MODULES = ['pandas', 'numpy', 'aiohttp', 'pyarrow', 'dotenv']
+
+NUM_CITIES = 35
+
+
+# ═══════════════════════════════════════════════════════════════════════
+# PROJET DE TEST
+# ═══════════════════════════════════════════════════════════════════════
+
+def make_project():
+    """Dossier de projet avec un registre de snapshots et un run en cours."""
+    workdir = tempfile.mkdtemp(prefix='kayak_cli_')
+    sys.path.insert(0, SRC_DIR)
+    cwd = os.getcwd()
+    os.chdir(workdir)
+    try:
+        from pipeline_run import PipelineRun
+        from snapshot_registry import close_registry, save_snapshot
+        
+        cities = [f'Ville_{i:02d}' for i in range(NUM_CITIES)]
+        run = PipelineRun.create(cities, {'max_hotels_per_city': 15})
+        for i, city in enumerate(cities):
+            save_snapshot({'city': city, 'snapshot_id': f's_{i:06d}', 'status': 'ready', 'num_hotels': 15})
+            run.advance(city, 'persisted' if i % 3 else 'downloaded')
+        close_registry()
+    finally:
+        os.chdir(cwd)
+    return workdir
+
+
+# ═══════════════════════════════════════════════════════════════════════
+# MESURES
+# ═══════════════════════════════════════════════════════════════════════
+
+def wall_times(cmd, cwd, repeat):
+    """Durées (s) d'exécution complète de `cmd`."""
+    times = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        subprocess.run(cmd, cwd=cwd, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+        times.append(time.perf_counter() - start)
+    return np.array(times)
+
+
+def loaded_heavy_modules(args, cwd):
+    """Modules lourds présents dans sys.modules après `kayak <args>`."""
+    code = (
+        f"import sys; sys.path.insert(0, {SRC_DIR!r}); import kayak_cli\n"
+        f"try:\n    kayak_cli.main({args!r})\nexcept SystemExit:\n    pass\n"
+        f"print('modules:' + ','.join(m for m in {HEAVY_MODULES!r} if m in sys.modules))"
+    )
+    result = subprocess.run([sys.executable, '-c', code], cwd=cwd, capture_output=True, text=True)
+    line = [line for line in result.stdout.splitlines() if line.startswith('modules:')][-1]
+    return [m for m in line[len('modules:'):].split(',') if m]
+
+
+def run_benchmark(repeat):
+    """Lance le benchmark et renvoie les médianes (dict, s)."""
+    workdir = make_project()
+    commands = {
+        'python -c pass': [sys.executable, '-c', 'pass'],
+        'kayak --help': [sys.executable, CLI, '--help'],
+        'kayak status': [sys.executable, CLI, 'status'],
+        'import trigger_scraping': [sys.executable, '-c', f"import sys; sys.path.insert(0, {SRC_DIR!r}); "
+                                                          f"import trigger_scraping"],
+        'import fetch_results': [sys.executable, '-c', f"import sys; sys.path.insert(0, {SRC_DIR!r}); "
+                                                       f"import fetch_results"],
+    }
+    
+    try:
+        for args in (['--help'], ['status']):
+            heavy = loaded_heavy_modules(args, workdir)
+            if heavy:
+                raise AssertionError(f"kayak {' '.join(args)} importe {', '.join(heavy)}")
+        print(f"✅ --help et status n'importent aucun de : {', '.join(HEAVY_MODULES)}\n")
+        
+        results = {}
+        print(f"🚀 Démarrage (processus complet, médiane de {repeat})")
+        for label, cmd in commands.items():
+            times = wall_times(cmd, workdir, repeat)
+            results[label] = float(np.median(times))
+            print(f"   {label:<24s} {results[label] * 1000:8.1f} ms")
+    finally:
+        shutil.rmtree(workdir, ignore_errors=True)
+    
+    base = results['python -c pass']
+    print(f"\n   kayak status au-delà de l'interpréteur : {(results['kayak status'] - base) * 1000:.1f} ms "
+          f"(import de fetch_results : {(results['import fetch_results'] - base) * 1000:.1f} ms)")
+    return results
+
+
+# ═══════════════════════════════════════════════════════════════════════
+# POINT D'ENTRÉE
+# ═══════════════════════════════════════════════════════════════════════
+
+def main():
+    """Point d'entrée pour exécution standalone."""
+    parser = argparse.ArgumentParser(description=__doc__.split('\n')[1])
+    parser.add_argument('--repeat', type=int, default=10)
+    args = parser.parse_args()
+    
+    print(f"\n{'='*80}")
+    print(f"⏱️  BENCHMARK DÉMARRAGE CLI : imports différés par sous-commande")
+    print(f"{'='*80}\n")
+    
+    run_benchmark(args.repeat)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,213 @@
+"""
+Benchmark : identité des hôtels sur des centaines de runs de scraping
+Population synthétique d'hôtels revus run après run avec des URL variables
+(paramètres, langue), des slugs renommés, des noms réécrits et des doublons ;
+durée de résolution par run et exactitude des identifiants, comparées à une
+recherche de quasi-doublons par comparaison avec tous les hôtels connus
+
+Usage :
+    python src/benchmark_hotel_identity.py
+    python src/benchmark_hotel_identity.py --hotels 50000 --runs 200 --per-run 2000
+"""
+
+import argparse
+import time
+
+import numpy as np
+import pandas as pd
+
+from hotel_identity import (
+    MATCH_DISTANCE_KM, NAME_SIMILARITY, HotelRegistry, _distance_km, deduplicate_hotels,
+    name_similarity, normalize_name,
+)
+
+
+# ═══════════════════════════════════════════════════════════════════════
+# CONFIGURATION
+# ═══════════════════════════════════════════════════════════════════════
+
+NUM_CITIES = 35
+
+# Variations d'un run à l'autre (probabilités par ligne)
+P_QUERY_PARAMS = 0.7     # Paramètres de recherche dans l'URL
+P_LANG_SUFFIX = 0.3      # .fr.html, .en-gb.html
+P_NAME_VARIANT = 0.1     # Casse, accents, « Hôtel » en préfixe
+P_NO_LISTING = 0.05      # listing_id absent
+P_DUPLICATE = 0.02       # Même hôtel deux fois dans le run
+P_RENAMED = 0.01         # Slug renommé par Booking (définitivement)
+
+# Lignes mesurées par comparaison avec tous les hôtels connus
+BRUTE_SAMPLE = 200
+
+
+# ═══════════════════════════════════════════════════════════════════════
+# DONNÉES SYNTHÉTIQUES
+# ═══════════════════════════════════════════════════════════════════════
+
+def make_population(n, seed=0):
+    """Hôtels « réels » : nom, ville, coordonnées, slug et listing_id Booking."""
+    rng = np.random.default_rng(seed)
+    city_lat = rng.uniform(42.5, 51.0, NUM_CITIES)
+    city_lon = rng.uniform(-4.5, 8.0, NUM_CITIES)
+    city = rng.integers(0, NUM_CITIES, n)
+    words = np.array(['Bristol', 'Mer', 'Soleil', 'Port', 'Calanques', 'Golfe', 'Palmiers', 'Vieux Port',
+                      'Château', 'Plage', 'Jardin', 'Étoile', 'Marina', 'Collines', 'Remparts'], dtype=object)
+    first, second = rng.integers(0, len(words), n), rng.integers(0, len(words), n)
+    
+    return pd.DataFrame({
+        'entity': np.arange(n),
+        'city': [f'Ville_{c:02d}' for c in city],
+        'hotel_name': [f"{words[a]} {words[b]} {i}" for i, (a, b) in enumerate(zip(first, second))],
+        'slug': [f"{words[a].lower().replace(' ', '-')}-{i}" for i, a in enumerate(first)],
+        'listing_id': rng.choice(np.arange(10**6, 10**7), n, replace=False),
+        'latitude': city_lat[city] + rng.normal(0, 0.03, n),
+        'longitude': city_lon[city] + rng.normal(0, 0.04, n),
+    })
+
+
+def variant_name(name, rng):
+    choice = rng.integers(3)
+    if choice == 0:
+        return name.upper()
+    if choice == 1:
+        return f"Hôtel {name}"
+    return name.replace('É', 'E').replace('â', 'a')
+
+
+def make_run(population, renamed, num_rows, rng):
+    """Un run : échantillon de la population, URL et noms tels que scrapés."""
+    rows = population.iloc[rng.choice(len(population), num_rows, replace=False)]
+    duplicates = rows.iloc[np.flatnonzero(rng.random(len(rows)) < P_DUPLICATE)]
+    rows = pd.concat([rows, duplicates], ignore_index=True)
+    n = len(rows)
+    
+    for entity in rows['entity'].to_numpy()[rng.random(n) < P_RENAMED]:
+        renamed[entity] = renamed.get(entity, 0) + 1
+    
+    urls, names = [], []
+    for entity, slug, name, params, lang, variant in zip(
+            rows['entity'], rows['slug'], rows['hotel_name'],
+            rng.random(n) < P_QUERY_PARAMS, rng.random(n) < P_LANG_SUFFIX, rng.random(n) < P_NAME_VARIANT):
+        version = renamed.get(entity, 0)
+        slug = f"{slug}-v{version}" if version else slug
+        url = f"https://www.booking.com/hotel/fr/{slug}{'.fr' if lang else ''}.html"
+        urls.append(url + (f"?aid=304142&checkin=2025-07-{rng.integers(1, 28):02d}" if params else ''))
+        names.append(variant_name(name, rng) if variant else name)
+    
+    listing = rows['listing_id'].astype(object).where(rng.random(n) >= P_NO_LISTING, None)
+    jitter = rng.normal(0, 0.0001, (2, n))  # ~10 m
+    return rows.assign(url=urls, hotel_name=names, listing_id=listing,
+                       latitude=rows['latitude'] + jitter[0], longitude=rows['longitude'] + jitter[1])
+
+
+# ═══════════════════════════════════════════════════════════════════════
+# RÉFÉRENCE : COMPARAISON AVEC TOUS LES HÔTELS CONNUS
+# ═══════════════════════════════════════════════════════════════════════
+
+def brute_find_duplicate(registry, name, lat, lon):
+    """Quasi-doublon cherché parmi tous les hôtels du registre (sans blocs)."""
+    name_key = normalize_name(name)
+    best, best_similarity = None, NAME_SIMILARITY
+    for hotel_id, (other_name, other_lat, other_lon, _) in registry.hotels.items():
+        if _distance_km(lat, lon, other_lat, other_lon) > MATCH_DISTANCE_KM:
+            continue
+        similarity = name_similarity(name_key, other_name)
+        if similarity >= best_similarity:
+            best, best_similarity = hotel_id, similarity
+    return best
+
+
+# ═══════════════════════════════════════════════════════════════════════
+# MESURES
+# ═══════════════════════════════════════════════════════════════════════
+
+def check_identities(assignments):
+    """Identifiants scindés (un hôtel, plusieurs id) et fusionnés (un id, plusieurs hôtels)."""
+    pairs = assignments.drop_duplicates()
+    split = int((pairs.groupby('entity')['hotel_id'].nunique() > 1).sum())
+    merged = int((pairs.groupby('hotel_id')['entity'].nunique() > 1).sum())
+    return split, merged
+
+
+def run_benchmark(num_hotels, num_runs, per_run, db_path=None):
+    """Lance le benchmark et renvoie les résultats (dict)."""
+    rng = np.random.default_rng(1)
+    population = make_population(num_hotels)
+    renamed = {}
+    registry = HotelRegistry(db_path)
+    
+    times, assignments, matches = [], [], {}
+    for run in range(num_runs):
+        scraped = make_run(population, renamed, per_run, rng)
+        start = time.perf_counter()
+        resolved = registry.resolve(scraped, seen_at=f"run-{run:04d}")
+        times.append(time.perf_counter() - start)
+        
+        assignments.append(resolved[['entity', 'hotel_id']])
+        for kind, count in resolved['match'].value_counts().items():
+            matches[kind] = matches.get(kind, 0) + int(count)
+    
+    times = np.array(times)
+    split, merged = check_identities(pd.concat(assignments, ignore_index=True))
+    rows = sum(matches.values())
+    tenth = max(num_runs // 10, 1)
+    print(f"🪪 {num_runs} runs de {per_run:,d} hôtels ({rows:,d} lignes) : "
+          f"{len(registry):,d} hôtels dans le registre, {len(set(renamed))} slugs renommés")
+    print(f"   Correspondances : " + ', '.join(f"{kind} {count:,d}" for kind, count in sorted(matches.items())))
+    print(f"   Hôtels scindés   : {split}")
+    print(f"   Hôtels fusionnés : {merged}\n")
+    print(f"⏱️  Résolution d'un run")
+    print(f"   Premiers runs : {np.median(times[:tenth]) * 1000:8.1f} ms (médiane)")
+    print(f"   Derniers runs : {np.median(times[-tenth:]) * 1000:8.1f} ms (médiane, "
+          f"registre de {len(registry):,d} hôtels)\n")
+    
+    # Quasi-doublons : blocs GPS vs tous les hôtels connus
+    sample = make_run(population, {}, min(BRUTE_SAMPLE, num_hotels), rng)
+    queries = list(zip(sample['city'], sample['hotel_name'], sample['latitude'], sample['longitude']))
+    start = time.perf_counter()
+    blocked = [registry.find_duplicate(*query) for query in queries]
+    blocked_s = time.perf_counter() - start
+    start = time.perf_counter()
+    brute = [brute_find_duplicate(registry, name, lat, lon) for _, name, lat, lon in queries]
+    brute_s = time.perf_counter() - start
+    if blocked != brute:
+        raise AssertionError("Quasi-doublons : résultats différents de la comparaison avec tous les hôtels")
+    print(f"🔍 Quasi-doublons ({len(queries)} lignes, registre de {len(registry):,d} hôtels)")
+    print(f"   Tous les hôtels : {brute_s / len(queries) * 1000:8.3f} ms par ligne")
+    print(f"   Blocs GPS       : {blocked_s / len(queries) * 1000:8.3f} ms par ligne "
+          f"(x{brute_s / blocked_s:,.0f})\n")
+    
+    # Déduplication d'un run
+    unique = deduplicate_hotels(sample)
+    if unique['entity'].duplicated().any() or unique['entity'].nunique() != sample['entity'].nunique():
+        raise AssertionError("Déduplication : doublons restants ou hôtels perdus")
+    print(f"✅ Identifiants stables : {split} scindés, {merged} fusionnés ; "
+          f"déduplication {len(sample)} → {len(unique)} lignes")
+    
+    registry.close()
+    return {'run_s': times, 'split': split, 'merged': merged,
+            'blocked_s': blocked_s, 'brute_s': brute_s, 'matches': matches}
+
+
+# ═══════════════════════════════════════════════════════════════════════
+# POINT D'ENTRÉE
+# ═══════════════════════════════════════════════════════════════════════
+
+def main():
+    """Point d'entrée pour exécution standalone."""
+    parser = argparse.ArgumentParser(description=__doc__.split('\n')[1])
+    parser.add_argument('--hotels', type=int, default=20_000, help="Taille de la population d'hôtels")
+    parser.add_argument('--runs', type=int, default=100)
+    parser.add_argument('--per-run', type=int, default=1_000, help="Hôtels scrapés par run")
+    parser.add_argument('--db', default=None, help="Registre SQLite (défaut : en mémoire)")
+    args = parser.parse_args()
+    
+    print(f"\n{'='*80}")
+    print(f"⏱️  BENCHMARK IDENTITÉ DES HÔTELS : clés exactes et quasi-doublons par blocs")
+    print(f"{'='*80}\n")
+    
+    run_benchmark(args.hotels, args.runs, args.per_run, args.db)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,94 @@
+"""
+Micro-benchmark : parse_hotels_data sur des snapshots synthétiques
+Snapshots de 10k à 1M hôtels : débit, rejets par motif et mémoire du
+DataFrame typé, vérification que chaque enregistrement est gardé ou compté
+comme rejeté
+
+Usage :
+    python src/benchmark_parsing.py
+    python src/benchmark_parsing.py --sizes 10000 100000 --repeat 5
+"""
+
+import argparse
+import contextlib
+import io
+import time
+
+from fetch_results import CATEGORY_COLUMNS, NUMERIC_COLUMNS, parse_hotels_data
+from synthetic_hotels import make_synthetic_hotels
+
+
+# ═══════════════════════════════════════════════════════════════════════
+# MESURES
+# ═══════════════════════════════════════════════════════════════════════
+
+def time_parser(parser, hotels, city, repeat):
+    """Meilleur temps sur `repeat` exécutions (sorties console masquées)."""
+    best = float('inf')
+    df = None
+    for _ in range(repeat):
+        with contextlib.redirect_stdout(io.StringIO()):
+            start = time.perf_counter()
+            df = parser(hotels, city)
+            best = min(best, time.perf_counter() - start)
+    return best, df
+
+
+def check_parsed(df, num_records):
+    """Vérifie les types des colonnes et que chaque enregistrement est gardé ou rejeté."""
+    for col in NUMERIC_COLUMNS:
+        assert df[col].dtype == 'float64', f"Type inattendu : {col} ({df[col].dtype})"
+    for col in CATEGORY_COLUMNS:
+        assert df[col].dtype == 'category', f"Type inattendu : {col} ({df[col].dtype})"
+    
+    counted = len(df) + sum(df.attrs['rejected'].values())
+    assert counted == num_records, f"{num_records - counted} enregistrement(s) ni gardé(s) ni rejeté(s)"
+
+
+def run_benchmark(sizes, repeat=3, city='Marseille'):
+    """Lance le benchmark et renvoie les résultats (liste de dicts)."""
+    results = []
+    
+    for n in sizes:
+        hotels = make_synthetic_hotels(n, city=city)
+        
+        seconds, df = time_parser(parse_hotels_data, hotels, city, repeat)
+        check_parsed(df, n)
+        
+        results.append({
+            'hotels': n,
+            'parse_s': seconds,
+            'hotels_per_s': n / seconds,
+            'kept': len(df),
+            'rejected': dict(df.attrs['rejected']),
+            'memory_mb': df.memory_usage(deep=True).sum() / 1e6,
+        })
+        
+        r = results[-1]
+        rejected = ', '.join(f"{reason} {count}" for reason, count in r['rejected'].items()) or 'aucun'
+        print(f"{n:>9,d} hôtels | {r['parse_s']:7.3f}s | {r['hotels_per_s']:>9,.0f} hôtels/s | "
+              f"mémoire {r['memory_mb']:.0f} MB | rejets : {rejected}")
+    
+    return results
+
+
+# ═══════════════════════════════════════════════════════════════════════
+# POINT D'ENTRÉE
+# ═══════════════════════════════════════════════════════════════════════
+
+def main():
+    """Point d'entrée pour exécution standalone."""
+    parser = argparse.ArgumentParser(description=__doc__.split('\n')[1])
+    parser.add_argument('--sizes', type=int, nargs='+', default=[10_000, 100_000, 1_000_000])
+    parser.add_argument('--repeat', type=int, default=3)
+    args = parser.parse_args()
+    
+    print(f"\n{'='*80}")
+    print(f"⏱️  BENCHMARK PARSING : parse_hotels_data")
+    print(f"{'='*80}\n")
+    
+    run_benchmark(args.sizes, args.repeat)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,186 @@
+"""
+Benchmark de bout en bout : trigger_all_cities + fetch_all_results
+Le vrai pipeline tourne contre le serveur BrightData local
+(mock_brightdata.py), de 5 à 1000 villes ; mesure du temps total, des
+requêtes par snapshot et du pic de mémoire du processus pipeline
+
+Usage :
+    python src/benchmark_pipeline.py
+    python src/benchmark_pipeline.py --sizes 5 100 --running-time 5 --rate-429 0.02
+    python src/benchmark_pipeline.py --sizes 100 --parse-workers 0  # parsing dans la boucle asyncio
+"""
+
+import argparse
+import asyncio
+import contextlib
+import io
+import json
+import os
+import shutil
+import sys
+import tempfile
+import time
+
+from fetch_results import PARSE_WORKERS
+from mock_brightdata import MockBrightDataServer
+from synthetic_hotels import CITY_CENTERS
+
+
+# ═══════════════════════════════════════════════════════════════════════
+# PIPELINE (PROCESSUS ENFANT)
+# ═══════════════════════════════════════════════════════════════════════
+
+def bench_cities(n):
+    """Liste de `n` villes : les villes connues puis des villes numérotées."""
+    known = list(CITY_CENTERS)
+    return (known + [f"Ville {i:04d}" for i in range(1, n + 1)])[:n]
+
+
+async def run_pipeline_once(n_cities, max_hotels, batch_size, rate_limit, stream,
+                            parse_workers, parse_executor):
+    """Lance STEP 1 + STEP 2 dans le dossier courant (API : BRIGHTDATA_API_URL)."""
+    from fetch_results import fetch_all_results
+    from metrics import peak_memory_bytes
+    from trigger_scraping import trigger_all_cities
+    
+    cities = bench_cities(n_cities)
+    
+    start = time.perf_counter()
+    with contextlib.redirect_stdout(io.StringIO()):
+        await trigger_all_cities(cities, max_hotels_per_city=max_hotels, batch_size=batch_size,
+                                 rate_limit=rate_limit, metrics_format=None)
+        trigger_s = time.perf_counter() - start
+        results = await fetch_all_results(stream=stream, rate_limit=rate_limit, metrics_format=None,
+                                          parse_workers=parse_workers, parse_executor=parse_executor)
+    wall_s = time.perf_counter() - start
+    
+    return {
+        'cities': n_cities,
+        'cities_ok': len(results),
+        'hotels': int(sum(len(df) for df in results.values())),
+        'wall_s': wall_s,
+        'trigger_s': trigger_s,
+        'fetch_s': wall_s - trigger_s,
+        'peak_rss_mb': (peak_memory_bytes() or 0) / 1e6,
+    }
+
+
+def child_main(args):
+    """Processus enfant : pipeline isolé dans un dossier temporaire."""
+    workdir = tempfile.mkdtemp(prefix='kayak_bench_')
+    os.makedirs(os.path.join(workdir, 'config'))
+    with open(os.path.join(workdir, 'config', '.env'), 'w') as f:
+        f.write("BRIGHTDATA_API_KEY=mock-benchmark-key\n")
+    
+    os.chdir(workdir)
+    try:
+        result = asyncio.run(run_pipeline_once(
+            args.child, args.max_hotels, args.batch_size, args.rate_limit, args.stream,
+            args.parse_workers, args.parse_executor
+        ))
+    finally:
+        os.chdir('/')
+        shutil.rmtree(workdir, ignore_errors=True)
+    
+    print(json.dumps(result))
+
+
+# ═══════════════════════════════════════════════════════════════════════
+# ORCHESTRATION
+# ═══════════════════════════════════════════════════════════════════════
+
+async def run_size(n_cities, args):
+    """Démarre un serveur local, lance le pipeline dans un processus enfant."""
+    server = MockBrightDataServer(
+        latency=args.latency,
+        running_time=args.running_time,
+        error_rate=args.error_rate,
+        rate_429=args.rate_429,
+        hotels_per_city=args.max_hotels,
+    )
+    
+    async with server:
+        env = {**os.environ, 'BRIGHTDATA_API_URL': server.base_url}
+        cmd = [
+            sys.executable, os.path.abspath(__file__), '--child', str(n_cities),
+            '--max-hotels', str(args.max_hotels), '--batch-size', str(args.batch_size),
+            '--rate-limit', str(args.rate_limit),
+            '--parse-workers', str(args.parse_workers), '--parse-executor', args.parse_executor,
+        ] + (['--stream'] if args.stream else [])
+        
+        process = await asyncio.create_subprocess_exec(*cmd, env=env, stdout=asyncio.subprocess.PIPE)
+        stdout, _ = await process.communicate()
+    
+    if process.returncode != 0:
+        raise RuntimeError(f"Benchmark {n_cities} villes : le processus pipeline a échoué")
+    
+    result = json.loads(stdout.decode().strip().splitlines()[-1])
+    
+    snapshots = max(len(server.snapshots), 1)
+    status_requests = server.requests.get('progress', 0) + server.requests.get('snapshots', 0)
+    result.update({
+        'snapshots': len(server.snapshots),
+        'requests': sum(v for k, v in server.requests.items() if not k.isdigit()),
+        'requests_per_snapshot': sum(v for k, v in server.requests.items() if not k.isdigit()) / snapshots,
+        'status_requests_per_snapshot': status_requests / snapshots,
+        'http_429': server.requests.get('429', 0),
+        'http_500': server.requests.get('500', 0),
+    })
+    return result
+
+
+async def run_benchmark(args):
+    """Lance le benchmark pour chaque taille et renvoie les résultats."""
+    results = []
+    
+    for n in args.sizes:
+        r = await run_size(n, args)
+        results.append(r)
+        print(f"{n:>5d} villes | {r['wall_s']:8.1f}s (trigger {r['trigger_s']:6.1f}s) | "
+              f"{r['cities_ok']:>4d} OK | {r['hotels']:>7,d} hôtels | "
+              f"{r['requests_per_snapshot']:5.1f} req/snapshot ({r['status_requests_per_snapshot']:.1f} statut) | "
+              f"429: {r['http_429']} | pic RSS {r['peak_rss_mb']:.0f} MB")
+    
+    return results
+
+
+# ═══════════════════════════════════════════════════════════════════════
+# POINT D'ENTRÉE
+# ═══════════════════════════════════════════════════════════════════════
+
+def main():
+    """Point d'entrée pour exécution standalone."""
+    parser = argparse.ArgumentParser(description=__doc__.split('\n')[1])
+    parser.add_argument('--sizes', type=int, nargs='+', default=[5, 100, 1000])
+    parser.add_argument('--max-hotels', type=int, default=15)
+    parser.add_argument('--batch-size', type=int, default=1)
+    parser.add_argument('--rate-limit', type=float, default=5.0)
+    parser.add_argument('--stream', action='store_true')
+    parser.add_argument('--parse-workers', type=int, default=PARSE_WORKERS)
+    parser.add_argument('--parse-executor', choices=['process', 'thread'], default='process')
+    parser.add_argument('--latency', type=float, default=0.05)
+    parser.add_argument('--running-time', type=float, default=10.0)
+    parser.add_argument('--error-rate', type=float, default=0.0)
+    parser.add_argument('--rate-429', type=float, default=0.0)
+    parser.add_argument('--output', help="Fichier JSON des résultats")
+    parser.add_argument('--child', type=int, help=argparse.SUPPRESS)
+    args = parser.parse_args()
+    
+    if args.child:
+        child_main(args)
+        return
+    
+    print(f"\n{'='*80}")
+    print(f"⏱️  BENCHMARK PIPELINE : serveur BrightData local")
+    print(f"{'='*80}\n")
+    
+    results = asyncio.run(run_benchmark(args))
+    
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as f:
+            json.dump(results, f, indent=2)
+        print(f"\n💾 Résultats : {args.output}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,188 @@
+"""
+Benchmark : historique des prix sur une année de scrapings quotidiens
+Un scraping par jour (villes × hôtels × offres) ajouté à l'historique : durée
+d'ajout et taille du dataset jour après jour, puis tendance annuelle lue dans
+les agrégats journaliers comparée à un recalcul pandas sur l'historique brut
+(résultats identiques vérifiés)
+
+Usage :
+    python src/benchmark_price_history.py
+    python src/benchmark_price_history.py --days 730 --cities 10 --hotels 30
+"""
+
+import argparse
+import os
+import shutil
+import tempfile
+import time
+from datetime import date, datetime, timedelta
+
+import numpy as np
+import pandas as pd
+
+from price_history import append_offers, load_price_history, offer_rows, offers_frame, price_trend
+
+
+# ═══════════════════════════════════════════════════════════════════════
+# CONFIGURATION
+# ═══════════════════════════════════════════════════════════════════════
+
+ROOM_TYPES = ['Double Room', 'Twin Room', 'Studio', 'Superior Double Room', 'Family Suite', 'Apartment']
+POLICIES = ['Free cancellation before 18:00 on the day before check-in', 'Good breakfast included',
+            'Non-refundable', 'No prepayment needed']
+
+FIRST_DAY = date(2025, 1, 1)
+
+
+# ═══════════════════════════════════════════════════════════════════════
+# DONNÉES SYNTHÉTIQUES
+# ═══════════════════════════════════════════════════════════════════════
+
+def make_scrape(rng, day, num_cities, num_hotels, max_offers):
+    """Enregistrements bruts d'un scraping quotidien (format de l'API, plusieurs offres par hôtel)."""
+    season = 1 + 0.4 * np.sin(2 * np.pi * (day - FIRST_DAY).days / 365)
+    check_in = day + timedelta(days=30)
+    records = []
+    for c in range(num_cities):
+        city = f'Ville_{c:02d}'
+        for h in range(num_hotels):
+            base = 60 + 15 * ((c * num_hotels + h) % 20)
+            nights = int(rng.integers(1, 4))
+            rooms = []
+            for r in range(int(rng.integers(1, 4))):
+                offers = []
+                for _ in range(int(rng.integers(1, max_offers // 3 + 1))):
+                    price = round(base * season * nights * rng.uniform(0.8, 1.6), 2)
+                    offers.append({
+                        'occupancy': {'adults': int(rng.integers(1, 5)), 'children': 0},
+                        'price': {'initial_price': price, 'final_price': price, 'currency': 'EUR',
+                                  'nights': nights},
+                        'policies': list(rng.choice(POLICIES, int(rng.integers(0, 3)), replace=False)),
+                        'rooms_left': int(rng.integers(0, 6)),
+                    })
+                rooms.append({'room_type': ROOM_TYPES[r], 'offers': offers})
+            records.append((city, {
+                'url': f"https://www.booking.com/hotel/fr/{city.lower()}-{h}.html",
+                'timestamp': f"{day.isoformat()}T06:{h % 60:02d}:00.000Z",
+                'check_in': check_in.isoformat(),
+                'check_out': (check_in + timedelta(days=nights)).isoformat(),
+                'pricing': rooms,
+            }))
+    return records
+
+
+def directory_size(path):
+    return sum(os.path.getsize(os.path.join(d, f)) for d, _, files in os.walk(path) for f in files)
+
+
+# ═══════════════════════════════════════════════════════════════════════
+# RÉFÉRENCE : RECALCUL SUR L'HISTORIQUE BRUT
+# ═══════════════════════════════════════════════════════════════════════
+
+def recompute_city_trend(root, cities=None):
+    """Tendance par ville et par jour recalculée en relisant toutes les offres."""
+    offers = load_price_history(root, columns=['city', 'scrape_date', 'hotel_id', 'currency', 'price', 'nights'],
+                                cities=cities)
+    offers['price'] = offers['price'].astype('float64') / offers['nights'].clip(lower=1)
+    grouped = offers.groupby(['city', 'scrape_date', 'currency'])
+    trend = grouped['price'].agg(num_offers='size', min_price='min', median_price='median', max_price='max')
+    trend.insert(0, 'num_hotels', grouped['hotel_id'].nunique())
+    trend = trend.reset_index().rename(columns={'scrape_date': 'day'})
+    trend['day'] = pd.to_datetime(trend['day'])
+    return trend.sort_values(['city', 'day', 'currency'], ignore_index=True)
+
+
+# ═══════════════════════════════════════════════════════════════════════
+# MESURES
+# ═══════════════════════════════════════════════════════════════════════
+
+def run_benchmark(num_days, num_cities, num_hotels, max_offers, repeat=5):
+    """Lance le benchmark et renvoie les résultats (dict)."""
+    rng = np.random.default_rng(0)
+    workdir = tempfile.mkdtemp(prefix='price_history_')
+    root = os.path.join(workdir, 'price_history_parquet')
+    db_path = os.path.join(workdir, 'price_history.db')
+    
+    try:
+        ingest, sizes, total = [], [], 0
+        for d in range(num_days):
+            day = FIRST_DAY + timedelta(days=d)
+            records = make_scrape(rng, day, num_cities, num_hotels, max_offers)
+            start = time.perf_counter()
+            rows = [row for city, hotel in records for row in offer_rows(hotel, city)]
+            total += append_offers(offers_frame(rows, datetime.combine(day, datetime.min.time())),
+                                   f'scrape_{day.isoformat()}', root, db_path)
+            ingest.append(time.perf_counter() - start)
+            sizes.append(directory_size(root))
+        
+        # Lot rejoué (reprise après crash) : ignoré
+        if append_offers(offers_frame(rows), f'scrape_{day.isoformat()}', root, db_path):
+            raise AssertionError("Lot rejoué ajouté deux fois")
+        
+        ingest, sizes = np.array(ingest), np.array(sizes)
+        tenth = max(num_days // 10, 1)
+        per_day = np.diff(sizes, prepend=0)
+        print(f"📈 {num_days} jours × {num_cities} villes × {num_hotels} hôtels : {total:,d} offres")
+        print(f"⏱️  Ajout d'un scraping quotidien (~{total // num_days:,d} offres, agrégats compris)")
+        print(f"   Premiers jours : {np.median(ingest[:tenth]) * 1000:8.1f} ms (médiane)")
+        print(f"   Derniers jours : {np.median(ingest[-tenth:]) * 1000:8.1f} ms (médiane)\n")
+        print(f"💾 Stockage : {sizes[-1] / 1e6:.1f} Mo ({sizes[-1] / total:.1f} octets par offre)")
+        print(f"   Par jour, premiers jours : {np.median(per_day[:tenth]) / 1e3:8.1f} Ko")
+        print(f"   Par jour, derniers jours : {np.median(per_day[-tenth:]) / 1e3:8.1f} Ko\n")
+        
+        # Tendance annuelle : agrégats vs recalcul sur l'historique brut
+        timings = {}
+        for label, query in (('Agrégats SQLite', lambda: price_trend('city', db_path=db_path)),
+                             ('Recalcul brut', lambda: recompute_city_trend(root)),
+                             ('Agrégats, 1 ville', lambda: price_trend('city', cities=['Ville_00'],
+                                                                       db_path=db_path)),
+                             ('Recalcul brut, 1 ville', lambda: recompute_city_trend(root, ['Ville_00']))):
+            times = []
+            for _ in range(repeat):
+                start = time.perf_counter()
+                result = query()
+                times.append(time.perf_counter() - start)
+            timings[label] = (float(np.median(times)), result)
+        
+        rollup, raw = timings['Agrégats SQLite'][1], timings['Recalcul brut'][1]
+        keys, columns = ['city', 'day', 'currency'], ['num_hotels', 'num_offers', 'min_price', 'median_price',
+                                                      'max_price']
+        if (len(rollup) != len(raw) or not (rollup[keys].astype(str).values == raw[keys].astype(str).values).all()
+                or not np.allclose(rollup[columns].to_numpy(float), raw[columns].to_numpy(float))):
+            raise AssertionError("Tendance : agrégats différents du recalcul sur l'historique brut")
+        
+        print(f"🔍 Tendance quotidienne par ville ({len(rollup):,d} lignes)")
+        for label, (seconds, _) in timings.items():
+            print(f"   {label:<24s} {seconds * 1000:8.1f} ms")
+        speedup = timings['Recalcul brut'][0] / timings['Agrégats SQLite'][0]
+        print(f"\n✅ Agrégats identiques au recalcul brut (x{speedup:,.0f})")
+        
+        return {'ingest_s': ingest, 'sizes': sizes, 'offers': total,
+                'trend_s': {label: seconds for label, (seconds, _) in timings.items()}}
+    finally:
+        shutil.rmtree(workdir, ignore_errors=True)
+
+
+# ═══════════════════════════════════════════════════════════════════════
+# POINT D'ENTRÉE
+# ═══════════════════════════════════════════════════════════════════════
+
+def main():
+    """Point d'entrée pour exécution standalone."""
+    parser = argparse.ArgumentParser(description=__doc__.split('\n')[1])
+    parser.add_argument('--days', type=int, default=365, help="Scrapings quotidiens simulés")
+    parser.add_argument('--cities', type=int, default=5)
+    parser.add_argument('--hotels', type=int, default=15, help="Hôtels par ville")
+    parser.add_argument('--max-offers', type=int, default=24, help="Offres par hôtel (maximum)")
+    parser.add_argument('--repeat', type=int, default=5)
+    args = parser.parse_args()
+    
+    print(f"\n{'='*80}")
+    print(f"⏱️  BENCHMARK HISTORIQUE DES PRIX : ajout quotidien et agrégats journaliers")
+    print(f"{'='*80}\n")
+    
+    run_benchmark(args.days, args.cities, args.hotels, args.max_offers, args.repeat)
+
+
+if __name__ == "__main__":
+    main()
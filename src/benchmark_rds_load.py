@@ -0,0 +1,181 @@
+"""
+Benchmark : import RDS ligne par ligne (execute_values) vs COPY + fusion
+Historique de prix synthétique (1 000 hôtels, villes dédiées au benchmark)
+chargé dans une base PostgreSQL locale ; vérification que les deux méthodes
+produisent exactement les mêmes lignes, puis suppression des données de test
+
+Usage :
+    DATABASE_URL=postgresql://localhost/kayak python src/benchmark_rds_load.py
+    python src/benchmark_rds_load.py --sizes 100000 2000000 --reference-max 100000
+"""
+
+import argparse
+import time
+
+import numpy as np
+import pandas as pd
+from psycopg2.extras import execute_values
+
+from rds_loader import DEFAULT_BATCH_SIZE, RdsLoader
+
+
+# ═══════════════════════════════════════════════════════════════════════
+# CONFIGURATION
+# ═══════════════════════════════════════════════════════════════════════
+
+BENCH_CITIES = [f'Bench_{i}' for i in range(5)]
+
+NUM_HOTELS = 1_000
+
+_CHECKSUM_SQL = """
+    SELECT count(*), sum(p.price), count(DISTINCT p.hotel_key), min(p.check_in), max(p.check_in)
+    FROM price_history p
+    JOIN cities c ON c.city_id = p.city_id
+    WHERE c.city_name = ANY(%s)
+"""
+
+
+# ═══════════════════════════════════════════════════════════════════════
+# DONNÉES SYNTHÉTIQUES
+# ═══════════════════════════════════════════════════════════════════════
+
+def make_synthetic_prices(n, seed=0):
+    """Relevés de prix : hôtels × dates d'arrivée × nuits, un relevé par clé."""
+    rng = np.random.default_rng(seed)
+    index = np.arange(n)
+    hotel = index % NUM_HOTELS
+    
+    return pd.DataFrame({
+        'city': np.asarray(BENCH_CITIES, dtype=object)[hotel % len(BENCH_CITIES)],
+        'hotel_id': [f'bench{h:011d}' for h in hotel],
+        'check_in': pd.Timestamp('2026-01-01') + pd.to_timedelta(index // NUM_HOTELS % 365, unit='D'),
+        'nights': (index // (NUM_HOTELS * 365) % 7 + 1).astype('int8'),
+        'adults': (index // (NUM_HOTELS * 365 * 7) % 4 + 1).astype('int8'),
+        'price': rng.uniform(40, 600, n).round(2),
+        'currency': 'EUR',
+        'scraped_at': pd.Timestamp('2026-10-01 12:00:00'),
+    })
+
+
+# ═══════════════════════════════════════════════════════════════════════
+# RÉFÉRENCE : IMPORT LIGNE PAR LIGNE (NOTEBOOK 11)
+# ═══════════════════════════════════════════════════════════════════════
+
+def insert_rows(conn, df):
+    """Ancienne méthode du notebook 11 : tuples via iterrows, puis execute_values."""
+    with conn.cursor() as cursor:
+        cursor.execute("SELECT city_id, city_name FROM cities;")
+        city_mapping = {row[1]: row[0] for row in cursor.fetchall()}
+        
+        prices_data = []
+        for _, row in df.iterrows():
+            prices_data.append((
+                city_mapping[row['city']],
+                row['hotel_id'],
+                row['check_in'].date(),
+                int(row['nights']),
+                int(row['adults']),
+                float(row['price']) if pd.notna(row['price']) else None,
+                row['currency'],
+                row['scraped_at'].to_pydatetime(),
+            ))
+        
+        execute_values(cursor, """
+            INSERT INTO price_history (city_id, hotel_key, check_in, nights, adults,
+                                       price, currency, scraped_at)
+            VALUES %s
+            ON CONFLICT DO NOTHING;
+        """, prices_data)
+    conn.commit()
+
+
+# ═══════════════════════════════════════════════════════════════════════
+# MESURES
+# ═══════════════════════════════════════════════════════════════════════
+
+def clear_prices(loader):
+    with loader.connection() as conn, conn.cursor() as cursor:
+        cursor.execute("""
+            DELETE FROM price_history
+            WHERE city_id IN (SELECT city_id FROM cities WHERE city_name = ANY(%s))
+        """, (BENCH_CITIES,))
+
+
+def checksum(loader):
+    with loader.connection() as conn, conn.cursor() as cursor:
+        cursor.execute(_CHECKSUM_SQL, (BENCH_CITIES,))
+        return cursor.fetchone()
+
+
+def run_benchmark(loader, sizes, reference_max):
+    """Lance le benchmark et renvoie les résultats (liste de dicts)."""
+    loader.ensure_schema()
+    loader.load('cities', pd.DataFrame({'city': BENCH_CITIES}))
+    
+    results = []
+    try:
+        for n in sizes:
+            df = make_synthetic_prices(n)
+            result = {'rows': n, 'rows_s': None}
+            
+            if n <= reference_max:
+                clear_prices(loader)
+                start = time.perf_counter()
+                with loader.connection() as conn:
+                    insert_rows(conn, df)
+                result['rows_s'] = time.perf_counter() - start
+                expected = checksum(loader)
+            
+            clear_prices(loader)
+            start = time.perf_counter()
+            stats = loader.load('prices', df)
+            result['copy_s'] = time.perf_counter() - start
+            
+            if stats['inserted'] != n:
+                raise AssertionError(f"{n} lignes : {stats['inserted']} insérées par COPY + fusion")
+            if result['rows_s'] is not None and checksum(loader) != expected:
+                raise AssertionError(f"{n} lignes : contenu différent de l'import ligne par ligne")
+            
+            # Rechargement du même historique : aucune ligne ajoutée
+            start = time.perf_counter()
+            again = loader.load('prices', df)
+            result['reload_s'] = time.perf_counter() - start
+            if again['inserted']:
+                raise AssertionError(f"{n} lignes : {again['inserted']} doublons au rechargement")
+            
+            results.append(result)
+            
+            reference = f"{result['rows_s']:8.2f}s" if result['rows_s'] is not None else f"{'—':>9s}"
+            speedup = f"x{result['rows_s'] / result['copy_s']:5.0f}" if result['rows_s'] is not None else ''
+            print(f"{n:>10,d} lignes | execute_values {reference} | COPY + fusion {result['copy_s']:7.2f}s "
+                  f"({n / result['copy_s']:>9,.0f} lignes/s) {speedup} | rechargement {result['reload_s']:6.2f}s\n")
+    finally:
+        with loader.connection() as conn, conn.cursor() as cursor:
+            cursor.execute("DELETE FROM cities WHERE city_name = ANY(%s)", (BENCH_CITIES,))
+    
+    return results
+
+
+# ═══════════════════════════════════════════════════════════════════════
+# POINT D'ENTRÉE
+# ═══════════════════════════════════════════════════════════════════════
+
+def main():
+    """Point d'entrée pour exécution standalone."""
+    parser = argparse.ArgumentParser(description=__doc__.split('\n')[1])
+    parser.add_argument('--sizes', type=int, nargs='+', default=[10_000, 100_000, 1_000_000])
+    parser.add_argument('--reference-max', type=int, default=100_000,
+                        help="Taille maximale mesurée avec execute_values")
+    parser.add_argument('--batch-size', type=int, default=DEFAULT_BATCH_SIZE)
+    args = parser.parse_args()
+    
+    print(f"\n{'='*80}")
+    print(f"⏱️  BENCHMARK IMPORT RDS : execute_values vs COPY + fusion")
+    print(f"{'='*80}\n")
+    
+    with RdsLoader(batch_size=args.batch_size) as loader:
+        run_benchmark(loader, args.sizes, args.reference_max)
+
+
+if __name__ == "__main__":
+    main()
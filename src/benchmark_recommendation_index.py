@@ -0,0 +1,188 @@
+"""
+Benchmark : top-k des recommandations par recalcul complet vs index précalculé
+Hôtels synthétiques (35 villes, scores météo par ville, notes et prix réalistes)
+interrogés avec des pondérations, prix maximum, note minimum et villes
+aléatoires ; vérification que l'index renvoie exactement le même classement
+qu'un balayage complet
+
+Usage :
+    python src/benchmark_recommendation_index.py
+    python src/benchmark_recommendation_index.py --hotels 1000000 --queries 500 --k 20
+"""
+
+import argparse
+import time
+
+import numpy as np
+import pandas as pd
+
+from recommendation_index import COMPONENTS, RecommendationIndex, check_weights, final_scores, score_components
+from weather_scoring import top_k
+
+
+# ═══════════════════════════════════════════════════════════════════════
+# CONFIGURATION
+# ═══════════════════════════════════════════════════════════════════════
+
+NUM_CITIES = 35
+
+# Requêtes de référence (pandas) : au-delà, extrapolées
+REFERENCE_QUERIES = 20
+
+
+# ═══════════════════════════════════════════════════════════════════════
+# DONNÉES SYNTHÉTIQUES
+# ═══════════════════════════════════════════════════════════════════════
+
+def make_hotels(n, seed=0):
+    """Hôtels fusionnés avec la météo, comme `hotels_with_weather` (notebook 06)."""
+    rng = np.random.default_rng(seed)
+    cities = np.array([f'Ville_{i:02d}' for i in range(NUM_CITIES)], dtype=object)
+    city_weather = rng.uniform(40, 90, NUM_CITIES).round(2)
+    city = rng.zipf(1.6, n) % NUM_CITIES
+    
+    score = rng.normal(8.0, 0.9, n).clip(1, 10).round(1)
+    score[rng.random(n) < 0.03] = np.nan
+    price = np.exp(rng.normal(5.0, 0.6, n)).round()
+    price[rng.random(n) < 0.02] = np.nan
+    
+    return pd.DataFrame({
+        'city': cities[city],
+        'hotel_name': [f'Hôtel {i}' for i in range(n)],
+        'score': score,
+        'price': price,
+        'avg_weather_score': city_weather[city],
+    })
+
+
+def make_queries(n, seed=1):
+    """Requêtes variées : pondérations, filtres de prix, de note et de villes."""
+    rng = np.random.default_rng(seed)
+    queries = []
+    for _ in range(n):
+        raw = rng.dirichlet(np.ones(len(COMPONENTS))).round(2)
+        if rng.random() < 0.25:
+            raw[rng.integers(len(raw))] = 0.0  # composante ignorée
+        queries.append({
+            'weights': dict(zip(COMPONENTS, raw)),
+            'max_price': [None, 80, 150, 300][rng.integers(4)],
+            'min_score': [None, 7.0, 8.5, 9.5][rng.integers(4)],
+            'cities': [None, None, [f'Ville_{rng.integers(NUM_CITIES):02d}'],
+                       [f'Ville_{c:02d}' for c in rng.choice(NUM_CITIES, 3, replace=False)]][rng.integers(4)],
+        })
+    return queries
+
+
+# ═══════════════════════════════════════════════════════════════════════
+# RÉFÉRENCES
+# ═══════════════════════════════════════════════════════════════════════
+
+def pandas_top_k(hotels, components, query, k):
+    """Méthode du notebook 06 : score final sur tout le DataFrame, filtres, nlargest."""
+    df = hotels.assign(final_score=final_scores(components, query['weights']))
+    df = df.dropna(subset=['final_score', 'score', 'price'])
+    if query['max_price'] is not None:
+        df = df[df['price'] <= query['max_price']]
+    if query['min_score'] is not None:
+        df = df[df['score'] >= query['min_score']]
+    if query['cities'] is not None:
+        df = df[df['city'].isin(query['cities'])]
+    return df.nlargest(k, 'final_score')
+
+
+def scan_top_k(index, query, k):
+    """Balayage complet des tableaux de l'index : classement exact attendu."""
+    positions = np.arange(len(index), dtype='int32')
+    ok = index._candidates_ok(positions, query['max_price'], query['min_score'])
+    if query['cities'] is not None:
+        ok &= index.hotels['city'].isin(query['cities']).to_numpy()
+    positions = positions[ok]
+    scores = index.scores(positions, check_weights(query['weights']))
+    best = top_k(scores, k)
+    return positions[best], scores[best]
+
+
+# ═══════════════════════════════════════════════════════════════════════
+# MESURES
+# ═══════════════════════════════════════════════════════════════════════
+
+def latencies(func, queries):
+    """Durées (s) de chaque requête."""
+    times = []
+    for query in queries:
+        start = time.perf_counter()
+        func(query)
+        times.append(time.perf_counter() - start)
+    return np.array(times)
+
+
+def describe(label, times):
+    print(f"   {label:<22s} médiane {np.median(times) * 1000:8.3f} ms | "
+          f"p95 {np.percentile(times, 95) * 1000:8.3f} ms | max {times.max() * 1000:8.3f} ms")
+
+
+def run_benchmark(num_hotels, num_queries, k):
+    """Lance le benchmark et renvoie les durées (dict)."""
+    hotels = make_hotels(num_hotels)
+    queries = make_queries(num_queries)
+    results = {}
+    
+    start = time.perf_counter()
+    components = score_components(hotels)
+    results['components_s'] = time.perf_counter() - start
+    
+    start = time.perf_counter()
+    index = RecommendationIndex(hotels)
+    results['build_s'] = time.perf_counter() - start
+    print(f"🏗️  Index : {len(index):,d} hôtels complets sur {num_hotels:,d}, "
+          f"{index.cities.size} villes, construit en {results['build_s']:.2f}s\n")
+    
+    # Vérification : même classement que le balayage complet et que pandas
+    for query in queries:
+        expected_pos, expected_scores = scan_top_k(index, query, k)
+        positions, scores = index.query(k, **query)
+        if not (np.array_equal(expected_pos, positions) and np.array_equal(expected_scores, scores)):
+            raise AssertionError(f"Classement différent du balayage complet : {query}")
+    for query in queries[:REFERENCE_QUERIES]:
+        reference = pandas_top_k(hotels, components, query, k)['final_score'].to_numpy()
+        actual = index.query(k, **query)[1]
+        if len(reference) != len(actual) or not np.allclose(reference, actual, atol=1e-4):
+            raise AssertionError(f"Scores différents du notebook 06 : {query}")
+    print(f"✅ {num_queries} requêtes : classements identiques au balayage complet\n")
+    
+    reference = latencies(lambda q: pandas_top_k(hotels, components, q, k), queries[:REFERENCE_QUERIES])
+    scan = latencies(lambda q: scan_top_k(index, q, k), queries)
+    indexed = latencies(lambda q: index.query(k, **q), queries)
+    frames = latencies(lambda q: index.top_k(k, **q), queries)
+    results.update(pandas_s=reference, scan_s=scan, query_s=indexed, top_k_s=frames)
+    
+    print(f"🔎 Top-{k} ({num_queries} requêtes aléatoires)")
+    describe("Recalcul pandas", reference)
+    describe("Balayage NumPy", scan)
+    describe("Index (positions)", indexed)
+    describe("Index (DataFrame)", frames)
+    print(f"\n   Gain médian vs pandas : x{np.median(reference) / np.median(indexed):,.0f}")
+    return results
+
+
+# ═══════════════════════════════════════════════════════════════════════
+# POINT D'ENTRÉE
+# ═══════════════════════════════════════════════════════════════════════
+
+def main():
+    """Point d'entrée pour exécution standalone."""
+    parser = argparse.ArgumentParser(description=__doc__.split('\n')[1])
+    parser.add_argument('--hotels', type=int, default=1_000_000)
+    parser.add_argument('--queries', type=int, default=200)
+    parser.add_argument('--k', type=int, default=10)
+    args = parser.parse_args()
+    
+    print(f"\n{'='*80}")
+    print(f"⏱️  BENCHMARK RECOMMANDATIONS : recalcul complet vs index précalculé")
+    print(f"{'='*80}\n")
+    
+    run_benchmark(args.hotels, args.queries, args.k)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,192 @@
+"""
+Benchmark : construction incrémentale du rapport (cartes, dashboard, rapport HTML)
+Recommandations synthétiques (100 000 hôtels par défaut) : premier rendu
+séquentiel puis en parallèle, reconstruction sans changement, après la
+modification d'un hôtel hors du Top 20 et d'une colonne non affichée ;
+taille de la carte de tous les hôtels (clusters) comparée à un marqueur
+folium par hôtel (mesurée sur un échantillon, extrapolée)
+
+Usage :
+    python src/benchmark_report_build.py
+    python src/benchmark_report_build.py --hotels 20000 --workers 4
+"""
+
+import argparse
+import os
+import shutil
+import tempfile
+import time
+
+import numpy as np
+import pandas as pd
+
+from report_build import BUILD_WORKERS, build_report, get_color, map_center
+
+
+# ═══════════════════════════════════════════════════════════════════════
+# CONFIGURATION
+# ═══════════════════════════════════════════════════════════════════════
+
+NUM_CITIES = 35
+
+# Hôtels rendus avec un marqueur folium chacun (référence, extrapolée)
+LEGACY_SAMPLE = 2_000
+
+PROPERTY_TYPES = ['Hôtel', 'Appartement', "Chambre d'hôtes", 'Villa', 'Résidence', 'Auberge']
+
+
+# ═══════════════════════════════════════════════════════════════════════
+# DONNÉES SYNTHÉTIQUES
+# ═══════════════════════════════════════════════════════════════════════
+
+def make_recommendations(n, seed=0):
+    """Recommandations classées au format de final_recommendations.csv."""
+    rng = np.random.default_rng(seed)
+    city = rng.integers(0, NUM_CITIES, n)
+    city_lat = rng.uniform(43.0, 44.2, NUM_CITIES)
+    city_lon = rng.uniform(4.5, 7.5, NUM_CITIES)
+    weather = rng.uniform(4, 9, NUM_CITIES)
+    
+    df = pd.DataFrame({
+        'city': [f'Ville_{c:02d}' for c in city],
+        'hotel_name': [f"Hôtel {i}" for i in range(n)],
+        'url': [f"https://www.booking.com/hotel/fr/hotel-{i}.fr.html?aid=304142" for i in range(n)],
+        'property_type': rng.choice(PROPERTY_TYPES, n),
+        'score': rng.uniform(5, 10, n).round(1),
+        'number_of_reviews': rng.integers(1, 5000, n),
+        'price': rng.uniform(40, 600, n).round(0),
+        'currency': 'EUR',
+        'latitude': np.where(rng.random(n) < 0.98, city_lat[city] + rng.normal(0, 0.03, n), np.nan),
+        'longitude': city_lon[city] + rng.normal(0, 0.04, n),
+        'avg_weather_score': weather[city].round(2),
+        'temp_avg': rng.uniform(15, 30, NUM_CITIES)[city].round(1),
+        'final_score': rng.uniform(3, 9.5, n).round(3),
+        'facilities': 'WiFi, Parking',
+    })
+    df = df.sort_values('final_score', ascending=False, ignore_index=True)
+    df['rank'] = range(1, n + 1)
+    return df
+
+
+# ═══════════════════════════════════════════════════════════════════════
+# RÉFÉRENCE : UN MARQUEUR FOLIUM PAR HÔTEL
+# ═══════════════════════════════════════════════════════════════════════
+
+def legacy_map_all(hotels, output_path):
+    """Carte de tous les hôtels telle que construite jusqu'ici (marqueur et popup HTML par hôtel)."""
+    import folium
+    
+    map_all = folium.Map(location=map_center(hotels), zoom_start=10, tiles='OpenStreetMap')
+    for _, hotel in hotels.iterrows():
+        popup_html = f"""
+        <div style="width: 300px; font-family: Arial;">
+            <h4 style="margin-bottom: 10px; color: #2c3e50;">{hotel['hotel_name']}</h4>
+            <hr style="margin: 5px 0;">
+            <p><b>📍 Ville :</b> {hotel['city']}</p>
+            <p><b>⭐ Note :</b> {hotel['score']:.1f}/10 ({hotel['number_of_reviews']:.0f} avis)</p>
+            <p><b>💰 Prix :</b> {hotel['price']:.0f} {hotel['currency']}/nuit</p>
+            <p><b>🌤️ Score météo :</b> {hotel['avg_weather_score']:.2f}</p>
+            <p><b>🎯 Score final :</b> <span style="color: {get_color(hotel['final_score'])}; font-weight: bold;">{hotel['final_score']:.2f}/10</span></p>
+            <p><b>🏆 Rang :</b> #{hotel['rank']:.0f}</p>
+            <hr style="margin: 5px 0;">
+            <p style="font-size: 11px;"><a href="{hotel['url']}" target="_blank">🔗 Voir sur Booking.com</a></p>
+        </div>
+        """
+        folium.Marker(
+            location=[hotel['latitude'], hotel['longitude']],
+            popup=folium.Popup(popup_html, max_width=300),
+            tooltip=f"{hotel['hotel_name']} - Score: {hotel['final_score']:.2f}",
+            icon=folium.Icon(color=get_color(hotel['final_score']), icon='home', prefix='fa')
+        ).add_to(map_all)
+    map_all.save(output_path)
+
+
+# ═══════════════════════════════════════════════════════════════════════
+# MESURES
+# ═══════════════════════════════════════════════════════════════════════
+
+def timed_build(label, recommendations, output_dir, workers, expected=None, force=False):
+    """Construit le rapport, affiche la durée et vérifie les livrables rendus."""
+    start = time.perf_counter()
+    results = build_report(recommendations, output_dir, force=force, workers=workers)
+    seconds = time.perf_counter() - start
+    
+    rendered = sorted(name for name, status in results.items() if status == 'rendered')
+    if expected is not None and rendered != sorted(expected):
+        raise AssertionError(f"{label} : rendus {rendered}, attendus {sorted(expected)}")
+    print(f"   ⏱️  {label:<40s} {seconds:8.2f} s  ({', '.join(rendered) or 'aucun rendu'})\n")
+    return seconds
+
+
+def run_benchmark(num_hotels, workers):
+    """Lance le benchmark et renvoie les durées (dict, s)."""
+    recommendations = make_recommendations(num_hotels)
+    workdir = tempfile.mkdtemp(prefix='report_build_')
+    sequential_dir, parallel_dir = os.path.join(workdir, 'sequential'), os.path.join(workdir, 'parallel')
+    everything = ['carte_tous_hotels', 'carte_top20', 'dashboard_complet', 'rapport_final']
+    
+    try:
+        print(f"📄 {num_hotels:,d} hôtels, {NUM_CITIES} villes\n")
+        results = {
+            'sequential': timed_build("Premier rendu, séquentiel", recommendations, sequential_dir, 0, everything),
+            'parallel': timed_build(f"Premier rendu, {workers} processus", recommendations, parallel_dir, workers,
+                                    everything),
+            'unchanged': timed_build("Sans changement", recommendations, parallel_dir, workers, []),
+        }
+        
+        # Un hôtel hors du Top 20 change de prix : la carte Top 20 reste en cache
+        changed = recommendations.copy()
+        changed.loc[len(changed) - 1, 'price'] += 10
+        results['one_hotel'] = timed_build("Prix d'un hôtel hors Top 20", changed, parallel_dir, workers,
+                                           ['carte_tous_hotels', 'dashboard_complet', 'rapport_final'])
+        
+        # Colonne non affichée : rien à rendre
+        changed['facilities'] = 'WiFi, Parking, Piscine'
+        results['hidden_column'] = timed_build("Colonne non affichée (facilities)", changed, parallel_dir, workers,
+                                               [])
+        
+        # Taille de la carte de tous les hôtels
+        map_size = os.path.getsize(os.path.join(parallel_dir, 'carte_tous_hotels.html'))
+        hotels = changed[changed['latitude'].notna()]
+        sample = hotels.head(LEGACY_SAMPLE)
+        legacy_path = os.path.join(workdir, 'legacy_map.html')
+        start = time.perf_counter()
+        legacy_map_all(sample, legacy_path)
+        legacy_s = (time.perf_counter() - start) / len(sample) * len(hotels)
+        legacy_size = os.path.getsize(legacy_path) / len(sample) * len(hotels)
+        
+        print(f"🗺️  Carte de tous les hôtels ({len(hotels):,d} hôtels géolocalisés)")
+        print(f"   Un marqueur par hôtel : {legacy_size / 1e6:8.1f} Mo, ~{legacy_s:.0f} s "
+              f"(extrapolé depuis {len(sample):,d} hôtels)")
+        print(f"   Clusters, tableau     : {map_size / 1e6:8.1f} Mo ({map_size / len(hotels):.0f} octets par hôtel, "
+              f"x{legacy_size / map_size:.0f} plus petit)\n")
+        
+        print(f"✅ Reconstruction sans changement en {results['unchanged']:.2f} s ; premier rendu "
+              f"{results['sequential']:.1f} s en séquentiel, {results['parallel']:.1f} s avec {workers} processus "
+              f"({os.cpu_count()} cœur(s))")
+        results.update({'map_bytes': map_size, 'legacy_map_bytes': legacy_size, 'legacy_map_s': legacy_s})
+        return results
+    finally:
+        shutil.rmtree(workdir, ignore_errors=True)
+
+
+# ═══════════════════════════════════════════════════════════════════════
+# POINT D'ENTRÉE
+# ═══════════════════════════════════════════════════════════════════════
+
+def main():
+    """Point d'entrée pour exécution standalone."""
+    parser = argparse.ArgumentParser(description=__doc__.split('\n')[1])
+    parser.add_argument('--hotels', type=int, default=100_000)
+    parser.add_argument('--workers', type=int, default=max(BUILD_WORKERS, 2), help="Rendus simultanés")
+    args = parser.parse_args()
+    
+    print(f"\n{'='*80}")
+    print(f"⏱️  BENCHMARK RAPPORT : graphe de dépendances, rendus parallèles, carte en clusters")
+    print(f"{'='*80}\n")
+    
+    run_benchmark(args.hotels, args.workers)
+
+
+if __name__ == "__main__":
+    main()
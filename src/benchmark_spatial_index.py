@@ -0,0 +1,152 @@
+"""
+Benchmark : recherche spatiale par force brute (haversine) vs KD-tree
+Hôtels et points météo synthétiques répartis sur la France ; point météo le
+plus proche de chaque hôtel, hôtels dans un rayon et k plus proches voisins,
+avec vérification que les deux méthodes renvoient les mêmes résultats
+
+Usage :
+    python src/benchmark_spatial_index.py
+    python src/benchmark_spatial_index.py --hotels 500000 --grid 5000 --brute-max 20000
+"""
+
+import argparse
+import time
+
+import numpy as np
+
+from spatial_index import SpatialIndex, haversine_km
+
+
+# ═══════════════════════════════════════════════════════════════════════
+# CONFIGURATION
+# ═══════════════════════════════════════════════════════════════════════
+
+# Emprise de la France métropolitaine
+LAT_RANGE = (42.3, 51.1)
+LON_RANGE = (-4.8, 8.2)
+
+RADIUS_KM = 5
+K_NEAREST = 10
+NUM_CENTERS = 200
+
+
+# ═══════════════════════════════════════════════════════════════════════
+# DONNÉES SYNTHÉTIQUES
+# ═══════════════════════════════════════════════════════════════════════
+
+def make_points(n, seed):
+    """Points aléatoires, concentrés autour de quelques pôles comme les hôtels."""
+    rng = np.random.default_rng(seed)
+    poles_lat = rng.uniform(*LAT_RANGE, 35)
+    poles_lon = rng.uniform(*LON_RANGE, 35)
+    pole = rng.integers(0, 35, n)
+    
+    clustered = rng.random(n) < 0.8
+    lat = np.where(clustered, poles_lat[pole] + rng.normal(0, 0.08, n), rng.uniform(*LAT_RANGE, n))
+    lon = np.where(clustered, poles_lon[pole] + rng.normal(0, 0.12, n), rng.uniform(*LON_RANGE, n))
+    return lat, lon
+
+
+# ═══════════════════════════════════════════════════════════════════════
+# RÉFÉRENCE : FORCE BRUTE
+# ═══════════════════════════════════════════════════════════════════════
+
+def brute_nearest(lat, lon, grid_lat, grid_lon, k=1):
+    """Distances à tous les points de la grille, puis k plus petites."""
+    distances = haversine_km(lat[:, None], lon[:, None], grid_lat[None, :], grid_lon[None, :])
+    positions = np.argsort(distances, axis=1, kind='stable')[:, :k]
+    return np.take_along_axis(distances, positions, axis=1), positions
+
+
+def brute_within(lat, lon, point_lat, point_lon, radius_km):
+    return [np.flatnonzero(haversine_km(a, b, point_lat, point_lon) <= radius_km) for a, b in zip(lat, lon)]
+
+
+# ═══════════════════════════════════════════════════════════════════════
+# MESURES
+# ═══════════════════════════════════════════════════════════════════════
+
+def timed(func, *args, **kwargs):
+    start = time.perf_counter()
+    result = func(*args, **kwargs)
+    return result, time.perf_counter() - start
+
+
+def check_nearest(expected, actual, label):
+    """Mêmes distances (à 1 m près) ; les positions peuvent différer en cas d'égalité."""
+    if not np.allclose(expected[0], actual[0], atol=1e-3):
+        raise AssertionError(f"{label} : distances différentes de la force brute")
+
+
+def run_benchmark(num_hotels, num_grid, brute_max):
+    """Lance le benchmark et renvoie les résultats (dict de durées)."""
+    hotel_lat, hotel_lon = make_points(num_hotels, seed=0)
+    grid_lat, grid_lon = make_points(num_grid, seed=1)
+    center_lat, center_lon = make_points(NUM_CENTERS, seed=2)
+    sample = min(brute_max, num_hotels)
+    results = {}
+    
+    # Construction des index
+    grid_index, results['build_grid_s'] = timed(SpatialIndex, grid_lat, grid_lon)
+    hotel_index, results['build_hotels_s'] = timed(SpatialIndex, hotel_lat, hotel_lon)
+    print(f"🌲 Index : {num_grid:,d} points météo en {results['build_grid_s'] * 1000:.1f} ms, "
+          f"{num_hotels:,d} hôtels en {results['build_hotels_s'] * 1000:.1f} ms\n")
+    
+    # Point météo le plus proche de chaque hôtel
+    expected, brute_s = timed(brute_nearest, hotel_lat[:sample], hotel_lon[:sample], grid_lat, grid_lon)
+    actual, index_s = timed(grid_index.nearest, hotel_lat, hotel_lon)
+    check_nearest(expected, (actual[0][:sample], actual[1][:sample]), "Point météo le plus proche")
+    results['nearest_brute_s'] = brute_s * num_hotels / sample
+    results['nearest_index_s'] = index_s
+    print(f"🌦️  Point météo le plus proche ({num_hotels:,d} hôtels)")
+    print(f"   Force brute : {results['nearest_brute_s']:8.2f}s"
+          f"{' (extrapolé depuis ' + format(sample, ',d') + ')' if sample < num_hotels else ''}")
+    print(f"   KD-tree     : {index_s * 1000:8.1f} ms (x{results['nearest_brute_s'] / index_s:,.0f})\n")
+    
+    # Hôtels dans un rayon
+    expected, brute_s = timed(brute_within, center_lat, center_lon, hotel_lat, hotel_lon, RADIUS_KM)
+    actual, index_s = timed(hotel_index.within, center_lat, center_lon, RADIUS_KM)
+    for exp, act in zip(expected, actual):
+        if not np.array_equal(exp, np.sort(act)):
+            raise AssertionError("Hôtels dans un rayon : résultats différents de la force brute")
+    results['within_brute_s'], results['within_index_s'] = brute_s, index_s
+    found = sum(len(a) for a in actual)
+    print(f"📍 Hôtels à moins de {RADIUS_KM} km ({NUM_CENTERS} lieux, {found:,d} résultats)")
+    print(f"   Force brute : {brute_s * 1000:8.1f} ms")
+    print(f"   KD-tree     : {index_s * 1000:8.1f} ms (x{brute_s / index_s:,.0f})\n")
+    
+    # k plus proches hôtels
+    expected, brute_s = timed(brute_nearest, center_lat, center_lon, hotel_lat, hotel_lon, K_NEAREST)
+    actual, index_s = timed(hotel_index.nearest, center_lat, center_lon, K_NEAREST)
+    check_nearest(expected, actual, f"{K_NEAREST} plus proches hôtels")
+    results['knn_brute_s'], results['knn_index_s'] = brute_s, index_s
+    print(f"🏨 {K_NEAREST} hôtels les plus proches ({NUM_CENTERS} lieux)")
+    print(f"   Force brute : {brute_s * 1000:8.1f} ms")
+    print(f"   KD-tree     : {index_s * 1000:8.1f} ms (x{brute_s / index_s:,.0f})\n")
+    
+    print("✅ Résultats identiques à la force brute")
+    return results
+
+
+# ═══════════════════════════════════════════════════════════════════════
+# POINT D'ENTRÉE
+# ═══════════════════════════════════════════════════════════════════════
+
+def main():
+    """Point d'entrée pour exécution standalone."""
+    parser = argparse.ArgumentParser(description=__doc__.split('\n')[1])
+    parser.add_argument('--hotels', type=int, default=500_000)
+    parser.add_argument('--grid', type=int, default=5_000, help="Nombre de points météo")
+    parser.add_argument('--brute-max', type=int, default=20_000,
+                        help="Nombre d'hôtels mesurés par force brute (au-delà : extrapolé)")
+    args = parser.parse_args()
+    
+    print(f"\n{'='*80}")
+    print(f"⏱️  BENCHMARK INDEX SPATIAL : force brute vs KD-tree")
+    print(f"{'='*80}\n")
+    
+    run_benchmark(args.hotels, args.grid, args.brute_max)
+
+
+if __name__ == "__main__":
+    main()
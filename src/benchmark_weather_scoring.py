@@ -0,0 +1,204 @@
+"""
+Micro-benchmark : score météo ligne par ligne (DataFrame.apply) vs vectorisé
+Prévisions synthétiques de 210 (35 villes × 6 jours) à 1M de lignes, avec
+valeurs aux bornes des barèmes et valeurs manquantes ; vérification que les
+deux calculs donnent exactement les mêmes scores et le même top-k
+
+Usage :
+    python src/benchmark_weather_scoring.py
+    python src/benchmark_weather_scoring.py --sizes 210 100000 --repeat 5
+"""
+
+import argparse
+import time
+
+import numpy as np
+import pandas as pd
+
+from weather_scoring import WEATHER_CRITERIA, top_k, weather_scores
+
+
+# ═══════════════════════════════════════════════════════════════════════
+# RÉFÉRENCE : SCORE LIGNE PAR LIGNE (NOTEBOOK 03)
+# ═══════════════════════════════════════════════════════════════════════
+
+def calculate_weather_score(row):
+    """Ancien calcul du notebook 03 (une ligne à la fois)."""
+    score = 0
+    
+    temp = row['temp_avg']
+    if 20 <= temp <= 25:
+        score += 25
+    elif 18 <= temp < 20 or 25 < temp <= 28:
+        score += 20
+    elif 15 <= temp < 18 or 28 < temp <= 30:
+        score += 15
+    elif 12 <= temp < 15 or 30 < temp <= 32:
+        score += 10
+    elif temp < 12 or temp > 32:
+        score += 0
+    
+    pop = row['pop']
+    if pop < 10:
+        score += 25
+    elif 10 <= pop < 30:
+        score += 20
+    elif 30 <= pop < 50:
+        score += 10
+    elif 50 <= pop < 70:
+        score += 5
+    else:
+        score += 0
+    
+    rain = row['rain']
+    if rain == 0:
+        score += 20
+    elif rain < 2:
+        score += 15
+    elif 2 <= rain < 5:
+        score += 10
+    elif 5 <= rain < 10:
+        score += 5
+    else:
+        score += 0
+    
+    humidity = row['humidity']
+    if 40 <= humidity <= 60:
+        score += 10
+    elif 30 <= humidity < 40 or 60 < humidity <= 70:
+        score += 7
+    elif 20 <= humidity < 30 or 70 < humidity <= 80:
+        score += 5
+    else:
+        score += 0
+    
+    wind = row['wind_speed']
+    if wind < 3:
+        score += 10
+    elif 3 <= wind < 5:
+        score += 7
+    elif 5 <= wind < 8:
+        score += 5
+    elif 8 <= wind < 12:
+        score += 3
+    else:
+        score += 0
+    
+    clouds = row['clouds']
+    if clouds < 20:
+        score += 10
+    elif 20 <= clouds < 40:
+        score += 8
+    elif 40 <= clouds < 60:
+        score += 6
+    elif 60 <= clouds < 80:
+        score += 4
+    else:
+        score += 2
+    
+    return score
+
+
+# ═══════════════════════════════════════════════════════════════════════
+# DONNÉES SYNTHÉTIQUES
+# ═══════════════════════════════════════════════════════════════════════
+
+def make_synthetic_weather(n, seed=0, edge_rate=0.2, nan_rate=0.01):
+    """
+    Prévisions synthétiques : valeurs réalistes, une part prise exactement
+    sur les seuils des barèmes et quelques valeurs manquantes.
+    """
+    rng = np.random.default_rng(seed)
+    df = pd.DataFrame({
+        'temp_avg': rng.uniform(0, 40, n).round(2),
+        'pop': rng.uniform(0, 100, n).round(0),
+        'rain': np.where(rng.random(n) < 0.5, 0.0, rng.exponential(3, n).round(2)),
+        'humidity': rng.uniform(10, 100, n).round(0),
+        'wind_speed': rng.exponential(4, n).round(2),
+        'clouds': rng.uniform(0, 100, n).round(0),
+    })
+    
+    for column, criterion in WEATHER_CRITERIA.items():
+        edges = []
+        for _, threshold, _ in criterion['rules']:
+            edges += list(threshold) if isinstance(threshold, tuple) else [threshold]
+        
+        mask = rng.random(n) < edge_rate
+        df.loc[mask, column] = rng.choice(edges, mask.sum())
+        df.loc[rng.random(n) < nan_rate, column] = np.nan
+    
+    return df
+
+
+# ═══════════════════════════════════════════════════════════════════════
+# MESURES
+# ═══════════════════════════════════════════════════════════════════════
+
+def best_time(func, repeat):
+    """Meilleur temps sur `repeat` exécutions et dernier résultat."""
+    best = float('inf')
+    result = None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = func()
+        best = min(best, time.perf_counter() - start)
+    return best, result
+
+
+def run_benchmark(sizes, repeat=3, k=5):
+    """Lance le benchmark et renvoie les résultats (liste de dicts)."""
+    results = []
+    
+    for n in sizes:
+        df = make_synthetic_weather(n)
+        
+        t_rows, expected = best_time(lambda: df.apply(calculate_weather_score, axis=1), repeat)
+        t_vec, scores = best_time(lambda: weather_scores(df), repeat)
+        
+        if not np.array_equal(expected.to_numpy(), scores) or expected.dtype != scores.dtype:
+            raise AssertionError(f"{n} lignes : scores différents du calcul ligne par ligne")
+        
+        t_sort, by_sort = best_time(lambda: np.argsort(-scores, kind='stable')[:k], repeat)
+        t_top, by_top = best_time(lambda: top_k(scores, k), repeat)
+        
+        if not np.array_equal(by_sort, by_top):
+            raise AssertionError(f"{n} lignes : top-{k} différent du tri complet")
+        
+        results.append({
+            'rows': n,
+            'apply_s': t_rows,
+            'vectorized_s': t_vec,
+            'speedup': t_rows / t_vec,
+            'argsort_s': t_sort,
+            'top_k_s': t_top,
+        })
+        
+        r = results[-1]
+        print(f"{n:>9,d} lignes | apply {r['apply_s']:8.3f}s | vectorisé {r['vectorized_s']:7.4f}s | "
+              f"x{r['speedup']:6.0f} | top-{k} : tri {r['argsort_s'] * 1000:7.2f} ms → "
+              f"argpartition {r['top_k_s'] * 1000:6.2f} ms")
+    
+    return results
+
+
+# ═══════════════════════════════════════════════════════════════════════
+# POINT D'ENTRÉE
+# ═══════════════════════════════════════════════════════════════════════
+
+def main():
+    """Point d'entrée pour exécution standalone."""
+    parser = argparse.ArgumentParser(description=__doc__.split('\n')[1])
+    parser.add_argument('--sizes', type=int, nargs='+', default=[210, 10_000, 100_000, 1_000_000])
+    parser.add_argument('--repeat', type=int, default=3)
+    parser.add_argument('--k', type=int, default=5)
+    args = parser.parse_args()
+    
+    print(f"\n{'='*80}")
+    print(f"⏱️  BENCHMARK SCORE MÉTÉO : apply vs vectorisé")
+    print(f"{'='*80}\n")
+    
+    run_benchmark(args.sizes, args.repeat, args.k)
+
+
+if __name__ == "__main__":
+    main()
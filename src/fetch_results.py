@@ -5,92 +5,449 @@ Polling GET sur les snapshot_id pour récupérer les données
 
 import aiohttp
 import asyncio
+import codecs
 import json
+import multiprocessing
 import os
 import time
 import pandas as pd
+import pyarrow as pa
+import pyarrow.parquet as pq
 from datetime import datetime
-from dotenv import load_dotenv
-from pathlib import Path
+
+from hotel_identity import hotel_uid
+from hotels_storage import COMPRESSION, HOTELS_SCHEMA
+from http_client import BrightDataClient, api_base_url
+from poll_scheduler import PollScheduler
+from price_history import append_offers, append_price_history, offer_rows, offers_frame
+from incremental import merge_hotels
+from metrics import METRICS
+from pipeline_config import load_brightdata_config
+from pipeline_run import atomic_to_csv
+from snapshot_registry import (
+    export_registry_json,
+    load_snapshots,
+    update_snapshot_fields,
+    update_snapshot_status,
+)
 
 
 # ═══════════════════════════════════════════════════════════════════════
 # CONFIGURATION
 # ═══════════════════════════════════════════════════════════════════════
 
-SNAPSHOTS_REGISTRY = 'data/raw/snapshots/snapshots_registry.json'
+# Taille des chunks lus sur le réseau en mode streaming (octets)
+STREAM_CHUNK_SIZE = 64 * 1024
+
+# Enregistrements streamés entre deux écritures (lignes parsées, offres) :
+# la mémoire reste bornée par un paquet, quelle que soit la taille du snapshot
+STREAM_FLUSH_RECORDS = 5000
+
+# Workers du pool de parsing / écriture CSV (0 = dans la boucle asyncio) ;
+# un cœur reste à la boucle asyncio (téléchargements, décodage JSON)
+PARSE_WORKERS = max(0, min(4, (os.cpu_count() or 1) - 1))
 
 
 def load_config():
-    """Charge la configuration API."""
-    if 'notebooks' in str(Path.cwd()):
-        env_path = Path.cwd().parent / 'config' / '.env'
-    else:
-        env_path = Path('config/.env')
+    """Charge la clé API BrightData."""
+    return load_brightdata_config()[0]
+
+
+# ═══════════════════════════════════════════════════════════════════════
+# SAUVEGARDE JSON
+# ═══════════════════════════════════════════════════════════════════════
+
+@METRICS.timed('json_write')
+def save_json_response(city, hotels_data):
+    """Sauvegarde la réponse JSON brute de l'API."""
+    os.makedirs('data/raw/hotels_json', exist_ok=True)
     
-    if not env_path.exists():
-        raise FileNotFoundError(f"❌ Fichier .env introuvable : {env_path}")
+    filename = f"data/raw/hotels_json/{city.replace(' ', '_').lower()}_raw.json"
     
-    load_dotenv(env_path)
-    api_key = os.getenv('BRIGHTDATA_API_KEY')
+    with open(filename, 'w', encoding='utf-8') as f:
+        json.dump(hotels_data, f, indent=2, ensure_ascii=False)
+    
+    print(f"   💾 JSON brut : {filename}")
+
+
+# ═══════════════════════════════════════════════════════════════════════
+# SNAPSHOTS PAR LOT : DÉCOUPAGE PAR VILLE
+# ═══════════════════════════════════════════════════════════════════════
+
+def normalize_location(value):
+    """Clé de comparaison d'une localisation : 'Aix en Provence, France' → 'aix en provence'."""
+    return ' '.join(str(value).split(',')[0].lower().replace('-', ' ').split())
+
+
+def record_city(hotel, cities_by_key):
+    """
+    Retrouve la ville d'un hôtel d'un snapshot par lot.
     
-    if not api_key:
-        raise ValueError(f"❌ BRIGHTDATA_API_KEY non trouvée dans {env_path}")
+    Essaie le champ location de l'input de recherche, puis les champs
+    city et location de l'hôtel (location contient souvent la région).
+    """
+    candidates = []
+    for source in (hotel.get('input'), hotel.get('discovery_input')):
+        if isinstance(source, dict):
+            candidates.append(source.get('location'))
+    candidates += [hotel.get('city'), hotel.get('location')]
     
-    print(f"✅ API Key chargée : {api_key[:20]}...")
-    return api_key
+    for value in candidates:
+        if value:
+            city = cities_by_key.get(normalize_location(value))
+            if city:
+                return city
+    return None
 
 
-def load_snapshot_registry():
-    """Charge le registre des snapshots."""
-    if not os.path.exists(SNAPSHOTS_REGISTRY):
-        raise FileNotFoundError(f"❌ Fichier non trouvé : {SNAPSHOTS_REGISTRY}")
+def batch_label(snapshot_id):
+    """Libellé d'un snapshot par lot (affichage et nom de ses fichiers bruts)."""
+    return f"lot {snapshot_id}"
+
+
+def split_batch_result(hotels_data, cities):
+    """Découpe le résultat d'un snapshot par lot (liste brute ou DataFrame streamé) par ville."""
+    if isinstance(hotels_data, pd.DataFrame):
+        unmatched = hotels_data.attrs.get('rejected', {}).get('unmatched_city')
+        if unmatched:
+            print(f"   ⚠️  {unmatched} enregistrement(s) sans ville reconnue")
+        if hotels_data.empty:
+            return {city: hotels_data for city in cities}
+        return {
+            city: hotels_data[hotels_data['city'] == city].reset_index(drop=True)
+            for city in cities
+        }
     
-    with open(SNAPSHOTS_REGISTRY, 'r', encoding='utf-8') as f:
-        return json.load(f)
+    return split_records_by_city(hotels_data if isinstance(hotels_data, list) else [], cities)
 
 
-def update_snapshot_status(city, status, num_hotels=0):
-    """Met à jour le statut d'un snapshot dans le registre."""
-    registry = load_snapshot_registry()
+def split_records_by_city(hotels_data, cities):
+    """
+    Répartit les enregistrements d'un snapshot par lot entre ses villes.
     
-    if city in registry["snapshots"]:
-        registry["snapshots"][city]["status"] = status
-        registry["snapshots"][city]["num_hotels"] = num_hotels
-        
-        if status in ["ready", "error"]:
-            registry["snapshots"][city]["timestamp_complete"] = datetime.now().isoformat()
-        
-        with open(SNAPSHOTS_REGISTRY, 'w', encoding='utf-8') as f:
-            json.dump(registry, f, indent=2, ensure_ascii=False)
+    Returns:
+        dict: {ville: [enregistrements]} (toutes les villes présentes)
+    """
+    cities_by_key = {normalize_location(city): city for city in cities}
+    by_city = {city: [] for city in cities}
+    unmatched = 0
+    
+    for hotel in hotels_data:
+        city = record_city(hotel, cities_by_key) if isinstance(hotel, dict) else None
+        if city:
+            by_city[city].append(hotel)
+        else:
+            unmatched += 1
+    
+    if unmatched:
+        print(f"   ⚠️  {unmatched} enregistrement(s) sans ville reconnue")
+    
+    return by_city
 
 
 # ═══════════════════════════════════════════════════════════════════════
-# SAUVEGARDE JSON
+# STREAMING : LECTURE INCRÉMENTALE DES SNAPSHOTS
 # ═══════════════════════════════════════════════════════════════════════
 
-def save_json_response(city, hotels_data):
-    """Sauvegarde la réponse JSON brute de l'API."""
+async def iter_text_chunks(response, chunk_size=STREAM_CHUNK_SIZE):
+    """Lit le corps de la réponse par chunks et le décode en UTF-8 au fil de l'eau."""
+    decoder = codecs.getincrementaldecoder('utf-8')()
+    
+    async for chunk in response.content.iter_chunked(chunk_size):
+        text = decoder.decode(chunk)
+        if text:
+            yield text
+    
+    tail = decoder.decode(b'', final=True)
+    if tail:
+        yield tail
+
+
+async def iter_ndjson_records(chunks):
+    """Découpe un flux NDJSON en enregistrements : (ligne brute, objet)."""
+    pending = ''
+    
+    async for text in chunks:
+        pending += text
+        *lines, pending = pending.split('\n')
+        
+        for line in lines:
+            line = line.strip()
+            if line:
+                yield line, json.loads(line)
+    
+    if pending.strip():
+        line = pending.strip()
+        yield line, json.loads(line)
+
+
+async def iter_json_array_records(chunks):
+    """
+    Découpe un tableau JSON en enregistrements sans charger tout le corps.
+    
+    Si le corps est un objet (réponse de statut), il est renvoyé tel quel
+    comme unique enregistrement.
+    """
+    decoder = json.JSONDecoder()
+    buffer = ''
+    pos = 0
+    started = False
+    
+    async for text in chunks:
+        buffer = buffer[pos:] + text
+        pos = 0
+        
+        while True:
+            # Sauter les séparateurs entre deux enregistrements
+            while pos < len(buffer) and buffer[pos] in ' \t\r\n,':
+                pos += 1
+            
+            if pos >= len(buffer):
+                break
+            
+            if not started:
+                started = True
+                if buffer[pos] == '[':
+                    pos += 1
+                    continue
+            
+            if buffer[pos] == ']':
+                return
+            
+            try:
+                record, end = decoder.raw_decode(buffer, pos)
+            except json.JSONDecodeError:
+                # Enregistrement incomplet : attendre le chunk suivant
+                break
+            
+            yield buffer[pos:end], record
+            pos = end
+    
+    if buffer[pos:].strip():
+        raise json.JSONDecodeError("Snapshot JSON tronqué", buffer, pos)
+
+
+def is_status_payload(record):
+    """Indique si l'objet reçu est une réponse de statut et non un hôtel."""
+    return isinstance(record, dict) and 'status' in record and 'url' not in record
+
+
+def parsed_table(rows):
+    """Lignes parsées (dicts de parse_hotel_record) en table Arrow au schéma des hôtels."""
+    df = pd.DataFrame(rows, columns=HOTEL_COLUMNS)
+    for col in NUMERIC_COLUMNS:
+        df[col] = pd.to_numeric(df[col], errors='coerce')
+    try:
+        return pa.Table.from_pandas(df, schema=STREAM_SPOOL_SCHEMA, preserve_index=False)
+    except (pa.ArrowInvalid, pa.ArrowTypeError):
+        # Texte d'un type inattendu (ex. titre numérique) : converti en chaîne
+        for field in STREAM_SPOOL_SCHEMA:
+            if field.type == pa.string():
+                df[field.name] = df[field.name].map(str, na_action='ignore')
+        return pa.Table.from_pandas(df, schema=STREAM_SPOOL_SCHEMA, preserve_index=False)
+
+
+async def stream_snapshot_records(response, city, stream_format='ndjson', chunk_size=STREAM_CHUNK_SIZE,
+                                  cities=None, history_tag=None, flush_records=STREAM_FLUSH_RECORDS):
+    """
+    Lit un snapshot en streaming : écrit les enregistrements bruts sur disque
+    (NDJSON) et les parse au fur et à mesure.
+    
+    Tous les `flush_records` enregistrements, les lignes parsées sont écrites
+    dans un fichier Parquet temporaire (un row group par paquet) et, avec
+    `history_tag` (ID du snapshot), leurs offres sont ajoutées à l'historique
+    des prix (un lot par paquet : `<history_tag>-0000`, `-0001`...). Seul le
+    DataFrame final, relu en colonnes typées, est gardé en mémoire.
+    
+    Pour un snapshot par lot, `cities` liste les villes du lot : chaque
+    enregistrement est rattaché à sa ville via le champ location.
+    
+    Returns:
+        DataFrame des hôtels parsés (nombre d'enregistrements bruts dans
+        df.attrs['num_records'], rejets par motif dans df.attrs['rejected']),
+        ou dict si l'API renvoie un statut.
+    """
+    chunks = iter_text_chunks(response, chunk_size)
+    
+    if stream_format == 'ndjson':
+        records = iter_ndjson_records(chunks)
+    else:
+        records = iter_json_array_records(chunks)
+    
+    # Le premier enregistrement peut être une réponse de statut (snapshot pas prêt)
+    try:
+        first = await records.__anext__()
+    except StopAsyncIteration:
+        first = None
+    
+    if first is not None and is_status_payload(first[1]):
+        return first[1]
+    
     os.makedirs('data/raw/hotels_json', exist_ok=True)
+    prefix = f"data/raw/hotels_json/{city.replace(' ', '_').lower()}"
+    filename = f"{prefix}_raw.ndjson"
+    spool_path = f"{prefix}_parsed.parquet"
     
-    filename = f"data/raw/hotels_json/{city.replace(' ', '_').lower()}_raw.json"
+    rows = []
+    offers = []
+    rejected = {}
+    coords_found = 0
+    num_records = 0
+    num_offers = 0
+    batches = 0
+    spool = None
     
-    with open(filename, 'w', encoding='utf-8') as f:
-        json.dump(hotels_data, f, indent=2, ensure_ascii=False)
+    cities_by_key = {normalize_location(c): c for c in cities} if cities else None
+
+    def reject(reason):
+        rejected[reason] = rejected.get(reason, 0) + 1
+
+    def flush():
+        nonlocal spool, num_offers, batches
+        if rows:
+            if spool is None:
+                spool = pq.ParquetWriter(spool_path, STREAM_SPOOL_SCHEMA, compression=COMPRESSION)
+            spool.write_table(parsed_table(rows))
+            rows.clear()
+        
+        if offers:
+            num_offers += append_offers(offers_frame(offers), f"{history_tag}-{batches:04d}")
+            offers.clear()
+        batches += 1
+
+    def handle(raw, hotel):
+        nonlocal coords_found, num_records
+        if num_records and num_records % flush_records == 0:
+            flush()
+        num_records += 1
+        
+        if '\n' in raw:
+            raw = json.dumps(hotel, ensure_ascii=False)
+        f.write(raw + '\n')
+        
+        try:
+            hotel_city = record_city(hotel, cities_by_key) if cities_by_key else city
+            if hotel_city is None:
+                reject('unmatched_city')
+                return
+            info = parse_hotel_record(hotel, hotel_city)
+        except Exception:
+            reject(rejection_reason(hotel))
+            return
+        
+        if history_tag is not None:
+            offers.extend(offer_rows(hotel, hotel_city))
+        
+        if info['latitude'] is not None:
+            coords_found += 1
+        
+        if info['hotel_name'] and info['url']:
+            rows.append(info)
+        else:
+            reject('missing_name_or_url')
     
-    print(f"   💾 JSON brut : {filename}")
+    try:
+        with open(filename, 'w', encoding='utf-8') as f:
+            if first is not None:
+                handle(*first)
+            async for raw, hotel in records:
+                handle(raw, hotel)
+        flush()
+    finally:
+        if spool is not None:
+            spool.close()
+    
+    print(f"   💾 NDJSON brut : {filename}")
+    METRICS.count('records_decoded', num_records)
+    
+    if num_offers:
+        print(f"   📈 Historique des prix : {num_offers} offre(s)")
+    
+    if spool is not None:
+        df = typed_hotels(pq.read_table(spool_path).to_pandas())
+        os.remove(spool_path)
+    else:
+        df = pd.DataFrame(columns=HOTEL_COLUMNS)
+    df.attrs['num_records'] = num_records
+    df.attrs['rejected'] = rejected
+    
+    if not df.empty:
+        print(f"   ✅ {city:25s} → {len(df)} hôtels | {coords_found} GPS ({coords_found/len(df)*100:.0f}%)"
+              f" | {sum(rejected.values())} rejetés")
+    
+    return df
 
 
 # ═══════════════════════════════════════════════════════════════════════
 # FONCTION ASYNCHRONE : GET /snapshot
 # ═══════════════════════════════════════════════════════════════════════
 
-async def fetch_snapshot_results(session, city, snapshot_id, api_key, max_wait=600, check_interval=30):
-    """Récupère les résultats d'un snapshot (GET avec polling)."""
-    url = f"https://api.brightdata.com/datasets/v3/snapshot/{snapshot_id}"
+async def download_snapshot_url(session, city, snapshot_url, elapsed, stream=False, stream_format='ndjson',
+                                cities=None, history_tag=None, update_status=True):
+    """Télécharge un snapshot prêt depuis l'URL fournie par l'API."""
+    def set_status(status, num_hotels):
+        if update_status:
+            update_snapshot_status(city, status, num_hotels)
+    
+    async with session.get(snapshot_url) as data_response:
+        if data_response.status == 200 and stream:
+            try:
+                with METRICS.timer('stream_decode'):
+                    df = await stream_snapshot_records(data_response, city, stream_format, cities=cities,
+                                                       history_tag=history_tag)
+            except json.JSONDecodeError:
+                df = None
+            
+            if isinstance(df, pd.DataFrame):
+                num_hotels = df.attrs.get('num_records', len(df))
+                print(f"✅ {city:20s} → {num_hotels} hôtels ({elapsed}s)")
+                set_status("ready", num_hotels)
+                return df
+        
+        elif data_response.status == 200:
+            text = await data_response.text()
+            with METRICS.timer('json_decode'):
+                hotels_data = json.loads(text)
+            num_hotels = len(hotels_data) if isinstance(hotels_data, list) else 0
+            print(f"✅ {city:20s} → {num_hotels} hôtels ({elapsed}s)")
+            set_status("ready", num_hotels)
+            
+            # SAUVEGARDER LE JSON BRUT
+            save_json_response(city, hotels_data)
+            
+            return hotels_data
+    
+    print(f"❌ {city:20s} → Données non accessibles")
+    set_status("error", 0)
+    return None
+
+
+async def fetch_snapshot_results(session, city, snapshot_id, api_key, max_wait=600, check_interval=30,
+                                 stream=False, stream_format='ndjson', cities=None, price_history=False,
+                                 update_status=True):
+    """
+    Récupère les résultats d'un snapshot (GET avec polling).
+    
+    En mode stream, le snapshot est lu par chunks (format 'json' ou 'ndjson'),
+    écrit sur disque et parsé au fil de l'eau : la fonction renvoie alors
+    directement le DataFrame des hôtels au lieu de la liste brute (et, avec
+    `price_history`, ajoute ses offres à l'historique des prix).
+    
+    Pour un snapshot par lot, `city` est un libellé (batch_label) qui nomme
+    aussi les fichiers bruts, `cities` liste les villes du lot (rattachement
+    des hôtels en mode stream), et `update_status=False` laisse l'appelant
+    mettre à jour le statut de chaque ville après découpage.
+    """
+    url = f"{api_base_url()}/snapshot/{snapshot_id}"
     
     headers = {"Authorization": f"Bearer {api_key}"}
-    params = {"format": "json"}
+    params = {"format": stream_format if stream else "json"}
+    
+    history_tag = snapshot_id if price_history else None
+
+    def set_status(status, num_hotels):
+        if update_status:
+            update_snapshot_status(city, status, num_hotels)
     
     start_time = time.time()
     attempts = 0
@@ -98,23 +455,37 @@ async def fetch_snapshot_results(session, city, snapshot_id, api_key, max_wait=6
     while time.time() - start_time < max_wait:
         attempts += 1
         elapsed = int(time.time() - start_time)
+        snapshot_url = None
         
         try:
             async with session.get(url, headers=headers, params=params) as response:
-                response_text = await response.text()
                 
                 if response.status == 200:
                     try:
-                        result = json.loads(response_text)
+                        if stream:
+                            with METRICS.timer('stream_decode'):
+                                result = await stream_snapshot_records(response, city, stream_format, cities=cities,
+                                                                       history_tag=history_tag)
+                        else:
+                            text = await response.text()
+                            with METRICS.timer('json_decode'):
+                                result = json.loads(text)
                     except json.JSONDecodeError:
                         print(f"❌ {city:20s} → Erreur JSON")
                         return None
                     
+                    # CAS 0 : Snapshot lu en streaming (déjà écrit et parsé)
+                    if isinstance(result, pd.DataFrame):
+                        num_hotels = result.attrs.get('num_records', len(result))
+                        print(f"✅ {city:20s} → {num_hotels} hôtels ({elapsed}s)")
+                        set_status("ready", num_hotels)
+                        return result
+                    
                     # CAS 1 : Liste directe (données prêtes)
-                    if isinstance(result, list):
+                    elif isinstance(result, list):
                         num_hotels = len(result)
                         print(f"✅ {city:20s} → {num_hotels} hôtels ({elapsed}s)")
-                        update_snapshot_status(city, "ready", num_hotels)
+                        set_status("ready", num_hotels)
                         
                         # SAUVEGARDER LE JSON BRUT
                         save_json_response(city, result)
@@ -127,36 +498,22 @@ async def fetch_snapshot_results(session, city, snapshot_id, api_key, max_wait=6
                         
                         if status == 'ready':
                             snapshot_url = result.get('snapshot_url')
-                            if snapshot_url:
-                                async with session.get(snapshot_url) as data_response:
-                                    if data_response.status == 200:
-                                        hotels_data = await data_response.json()
-                                        num_hotels = len(hotels_data) if isinstance(hotels_data, list) else 0
-                                        print(f"✅ {city:20s} → {num_hotels} hôtels ({elapsed}s)")
-                                        update_snapshot_status(city, "ready", num_hotels)
-                                        
-                                        # SAUVEGARDER LE JSON BRUT
-                                        save_json_response(city, hotels_data)
-                                        
-                                        return hotels_data
-                            
-                            print(f"❌ {city:20s} → Données non accessibles")
-                            update_snapshot_status(city, "error", 0)
-                            return None
+                            if not snapshot_url:
+                                print(f"❌ {city:20s} → Données non accessibles")
+                                set_status("error", 0)
+                                return None
                         
                         elif status == 'running':
                             print(f"⏳ {city:20s} → running (t.{attempts:2d}, {elapsed:3d}s)")
-                            update_snapshot_status(city, "running", 0)
-                            await asyncio.sleep(check_interval)
+                            set_status("running", 0)
                         
                         elif status == 'error':
                             print(f"❌ {city:20s} → Erreur API")
-                            update_snapshot_status(city, "error", 0)
+                            set_status("error", 0)
                             return None
                         
                         else:
                             print(f"⏳ {city:20s} → statut: {status} (t.{attempts:2d}, {elapsed:3d}s)")
-                            await asyncio.sleep(check_interval)
                     
                     else:
                         print(f"❌ {city:20s} → Format inattendu: {type(result)}")
@@ -164,19 +521,27 @@ async def fetch_snapshot_results(session, city, snapshot_id, api_key, max_wait=6
                 
                 elif response.status == 202:
                     print(f"⏳ {city:20s} → En attente (t.{attempts:2d}, {elapsed:3d}s)")
-                    await asyncio.sleep(check_interval)
                 
                 else:
                     print(f"❌ {city:20s} → HTTP {response.status}")
-                    update_snapshot_status(city, "error", 0)
+                    set_status("error", 0)
                     return None
+            
+            # Téléchargement depuis snapshot_url, une fois la première réponse libérée
+            if snapshot_url:
+                return await download_snapshot_url(session, city, snapshot_url, elapsed,
+                                                   stream, stream_format, cities=cities, history_tag=history_tag,
+                                                   update_status=update_status)
+            
+            # Attendre hors du bloc : la connexion est rendue au pool
+            await asyncio.sleep(check_interval)
         
         except Exception as e:
             print(f"⚠️  {city:20s} → Erreur: {str(e)[:80]}")
             await asyncio.sleep(check_interval)
     
     print(f"⚠️  {city:20s} → Timeout {max_wait}s")
-    update_snapshot_status(city, "error", 0)
+    set_status("error", 0)
     return None
 
 
@@ -184,114 +549,427 @@ async def fetch_snapshot_results(session, city, snapshot_id, api_key, max_wait=6
 # PARSING DES RÉSULTATS (CORRIGÉ)
 # ═══════════════════════════════════════════════════════════════════════
 
+HOTEL_COLUMNS = [
+    'hotel_id', 'city', 'hotel_name', 'url', 'score', 'number_of_reviews', 'description',
+    'property_type', 'latitude', 'longitude', 'price', 'currency', 'facilities', 'image_url',
+]
+
+NUMERIC_COLUMNS = ['score', 'number_of_reviews', 'latitude', 'longitude', 'price']
+CATEGORY_COLUMNS = ['city', 'property_type', 'currency']
+
+# Paquets de lignes parsées d'un snapshot streamé (fichier temporaire)
+STREAM_SPOOL_SCHEMA = pa.schema([HOTELS_SCHEMA.field(name) for name in HOTEL_COLUMNS])
+
+# Valeur sentinelle : champ présent mais illisible (ligne rejetée)
+_INVALID = object()
+
+
+def _extract_coordinates(coordinates):
+    if coordinates and isinstance(coordinates, dict):
+        # Essayer "lat" puis "lan" (bug de l'API)
+        lat = coordinates.get('lat') or coordinates.get('lan') or coordinates.get('latitude')
+        lon = coordinates.get('lon') or coordinates.get('lng') or coordinates.get('longitude')
+        if lat is not None and lon is not None:
+            return lat, lon
+    return None, None
+
+
+def _extract_price(pricing):
+    try:
+        if pricing and len(pricing) > 0:
+            offers = pricing[0].get('offers', [])
+            if offers:
+                price_info = offers[0].get('price', {})
+                return price_info.get('final_price'), price_info.get('currency', 'EUR')
+        return None, None
+    except Exception:
+        return _INVALID, None
+
+
+def parse_hotel_record(hotel, city):
+    """Parse un hôtel brut de l'API en ligne (dict)."""
+    info = {
+        'hotel_id': hotel_uid(hotel['url']) if hotel.get('url') else None,
+        'city': city,
+        'hotel_name': hotel.get('title'),
+        'url': hotel.get('url'),
+        'score': hotel.get('review_score'),
+        'number_of_reviews': hotel.get('number_of_reviews'),
+        'description': (hotel.get('description', '') or '')[:500],
+        'property_type': hotel.get('property_type'),
+    }
+    
+    # ═══════════════════════════════════════════════════════════════
+    # PARSING GPS CORRIGÉ - GÈRE "lan" et "lat"
+    # ═══════════════════════════════════════════════════════════════
+    
+    coordinates = hotel.get('coordinates')
+    
+    if coordinates and isinstance(coordinates, dict):
+        # Essayer "lat" puis "lan" (bug de l'API)
+        lat = coordinates.get('lat') or coordinates.get('lan') or coordinates.get('latitude')
+        lon = coordinates.get('lon') or coordinates.get('lng') or coordinates.get('longitude')
+        
+        if lat is not None and lon is not None:
+            info['latitude'] = float(lat)
+            info['longitude'] = float(lon)
+        else:
+            info['latitude'] = None
+            info['longitude'] = None
+    else:
+        info['latitude'] = None
+        info['longitude'] = None
+    
+    # ═══════════════════════════════════════════════════════════════
+    # PRIX
+    # ═══════════════════════════════════════════════════════════════
+    
+    pricing = hotel.get('pricing', [])
+    if pricing and len(pricing) > 0:
+        offers = pricing[0].get('offers', [])
+        if offers:
+            price_info = offers[0].get('price', {})
+            info['price'] = price_info.get('final_price')
+            info['currency'] = price_info.get('currency', 'EUR')
+        else:
+            info['price'] = None
+            info['currency'] = None
+    else:
+        info['price'] = None
+        info['currency'] = None
+    
+    # ═══════════════════════════════════════════════════════════════
+    # ÉQUIPEMENTS
+    # ═══════════════════════════════════════════════════════════════
+    
+    facilities = hotel.get('most_popular_facilities', [])
+    info['facilities'] = ', '.join(facilities[:5]) if facilities else None
+    
+    # ═══════════════════════════════════════════════════════════════
+    # IMAGES
+    # ═══════════════════════════════════════════════════════════════
+    
+    images = hotel.get('images', [])
+    info['image_url'] = images[0] if images else None
+    
+    return info
+
+
+def rejection_reason(hotel):
+    """Motif de rejet d'un hôtel que parse_hotel_record n'a pas pu lire (motifs de df.attrs['rejected'])."""
+    if not isinstance(hotel, dict):
+        return 'not_a_record'
+    try:
+        lat, lon = _extract_coordinates(hotel.get('coordinates'))
+        if lat is not None:
+            float(lat), float(lon)
+    except (TypeError, ValueError):
+        return 'invalid_coordinates'
+    if _extract_price(hotel.get('pricing', []))[0] is _INVALID:
+        return 'invalid_pricing'
+    return 'invalid_fields'
+
+
+def typed_hotels(df):
+    """Types des colonnes d'hôtels parsés : float64 (numériques), category (city, property_type, currency)."""
+    for col in NUMERIC_COLUMNS:
+        df[col] = pd.to_numeric(df[col], errors='coerce').astype('float64')
+    for col in CATEGORY_COLUMNS:
+        df[col] = df[col].astype('category')
+    return df
+
+
+@METRICS.timed('parse_hotels_data')
 def parse_hotels_data(hotels_data, city):
-    """Parse les données JSON en DataFrame."""
+    """
+    Parse les données JSON en DataFrame.
+    
+    Les hôtels illisibles ou sans nom/URL sont comptés par motif dans
+    df.attrs['rejected'] ; colonnes typées par typed_hotels.
+    """
     if not hotels_data or not isinstance(hotels_data, list):
         return pd.DataFrame()
     
     parsed = []
     coords_found = 0
+    rejected = {}
     
-    for idx, hotel in enumerate(hotels_data, 1):
+    for hotel in hotels_data:
         try:
-            info = {
-                'hotel_id': f"{city}_{idx}",
-                'city': city,
-                'hotel_name': hotel.get('title'),
-                'url': hotel.get('url'),
-                'score': hotel.get('review_score'),
-                'number_of_reviews': hotel.get('number_of_reviews'),
-                'description': (hotel.get('description', '') or '')[:500],
-                'property_type': hotel.get('property_type'),
-            }
-            
-            # ═══════════════════════════════════════════════════════════════
-            # PARSING GPS CORRIGÉ - GÈRE "lan" et "lat"
-            # ═══════════════════════════════════════════════════════════════
-            
-            coordinates = hotel.get('coordinates')
-            
-            if coordinates and isinstance(coordinates, dict):
-                # Essayer "lat" puis "lan" (bug de l'API)
-                lat = coordinates.get('lat') or coordinates.get('lan') or coordinates.get('latitude')
-                lon = coordinates.get('lon') or coordinates.get('lng') or coordinates.get('longitude')
-                
-                if lat is not None and lon is not None:
-                    info['latitude'] = float(lat)
-                    info['longitude'] = float(lon)
-                    coords_found += 1
-                else:
-                    info['latitude'] = None
-                    info['longitude'] = None
-            else:
-                info['latitude'] = None
-                info['longitude'] = None
-            
-            # ═══════════════════════════════════════════════════════════════
-            # PRIX
-            # ═══════════════════════════════════════════════════════════════
-            
-            pricing = hotel.get('pricing', [])
-            if pricing and len(pricing) > 0:
-                offers = pricing[0].get('offers', [])
-                if offers:
-                    price_info = offers[0].get('price', {})
-                    info['price'] = price_info.get('final_price')
-                    info['currency'] = price_info.get('currency', 'EUR')
-                else:
-                    info['price'] = None
-                    info['currency'] = None
-            else:
-                info['price'] = None
-                info['currency'] = None
-            
-            # ═══════════════════════════════════════════════════════════════
-            # ÉQUIPEMENTS
-            # ═══════════════════════════════════════════════════════════════
-            
-            facilities = hotel.get('most_popular_facilities', [])
-            info['facilities'] = ', '.join(facilities[:5]) if facilities else None
-            
-            # ═══════════════════════════════════════════════════════════════
-            # IMAGES
-            # ═══════════════════════════════════════════════════════════════
-            
-            images = hotel.get('images', [])
-            info['image_url'] = images[0] if images else None
-            
-            if info['hotel_name'] and info['url']:
-                parsed.append(info)
-        
+            info = parse_hotel_record(hotel, city)
         except Exception as e:
+            reason = rejection_reason(hotel)
+            rejected[reason] = rejected.get(reason, 0) + 1
             continue
+        
+        if info['latitude'] is not None:
+            coords_found += 1
+        
+        if info['hotel_name'] and info['url']:
+            parsed.append(info)
+        else:
+            rejected['missing_name_or_url'] = rejected.get('missing_name_or_url', 0) + 1
+    
+    df = pd.DataFrame(parsed, columns=HOTEL_COLUMNS)
+    df = typed_hotels(df) if not df.empty else df
+    df.attrs['num_records'] = len(hotels_data)
+    df.attrs['rejected'] = rejected
+    
+    if not df.empty:
+        print(f"   ✅ {city:25s} → {len(df)} hôtels | {coords_found} GPS ({coords_found/len(df)*100:.0f}%)"
+              f" | {sum(rejected.values())} rejetés")
+    
+    return df
+
+
+# ═══════════════════════════════════════════════════════════════════════
+# FICHIERS PAR VILLE
+# ═══════════════════════════════════════════════════════════════════════
+
+def city_csv_path(city):
+    """Chemin du CSV des hôtels d'une ville."""
+    return f"data/raw/hotels/hotels_{city.replace(' ', '_').lower()}.csv"
+
+
+@METRICS.timed('csv_write')
+def write_delta_csv(changes, city):
+    """Écrit les seules lignes ajoutées ou modifiées d'un run incrémental."""
+    os.makedirs('data/raw/hotels_delta', exist_ok=True)
     
-    df = pd.DataFrame(parsed)
+    timestamp = datetime.now().strftime('%Y%m%d_%H%M%S')
+    filename = f"data/raw/hotels_delta/hotels_{city.replace(' ', '_').lower()}_{timestamp}.csv"
+    changes.to_csv(filename, index=False, encoding='utf-8')
+    print(f"   📝 Delta : {filename}")
+    return filename
+
+
+def persist_city(city, hotels_data, snapshot_id, run=None, stage=None, incremental=False, parquet=False,
+                 price_history=False):
+    """
+    Parse, checkpoint et écrit les hôtels d'une ville dès leur téléchargement.
+    
+    Fonction de module (picklable) : exécutée dans le pool de parsing.
+    
+    Args:
+        city (str): Ville
+        hotels_data (list | DataFrame): Hôtels bruts (ou déjà parsés en streaming)
+        snapshot_id (str): Snapshot d'origine (marqué comme intégré au registre)
+        run (PipelineRun): Run reprenable (checkpoints brut / parsé)
+        stage (str): Dernière étape terminée de la ville au début du run
+        incremental (bool): Fusion avec le CSV existant + CSV delta
+        parquet (bool): Écrire aussi les datasets Parquet
+        price_history (bool): Ajouter toutes les offres à l'historique des prix
+    
+    Returns:
+        DataFrame: Hôtels de la ville (None si rien à intégrer)
+    """
+    if hotels_data is None:
+        return None
+    
+    if run is not None and isinstance(hotels_data, list) and not run.stage_reached(stage, 'downloaded'):
+        run.save_raw(city, hotels_data)
+    
+    if not len(hotels_data):
+        if run is not None:
+            run.advance(city, 'persisted', num_hotels=0)
+        return None
+    
+    if isinstance(hotels_data, pd.DataFrame):
+        df = hotels_data
+    else:
+        df = parse_hotels_data(hotels_data, city)
+        # Avant le checkpoint 'parsed' : un run repris rejoue l'ajout (ignoré s'il a déjà eu lieu)
+        if price_history:
+            append_price_history(hotels_data, city, snapshot_id)
+    
+    if run is not None and not run.stage_reached(stage, 'parsed'):
+        run.save_parsed(city, df)
     
     if not df.empty:
-        print(f"   ✅ {city:25s} → {len(df)} hôtels | {coords_found} GPS ({coords_found/len(df)*100:.0f}%)")
+        filename = city_csv_path(city)
+        changes = df
+        
+        if incremental and os.path.exists(filename):
+            df, changes = merge_hotels(pd.read_csv(filename), df)
+            print(f"   🔀 {city} : {len(changes)} hôtel(s) ajouté(s) ou modifié(s)")
+        
+        if len(changes) or not os.path.exists(filename):
+            atomic_to_csv(df, filename)
+            print(f"   💾 CSV : {filename}")
+        
+        if incremental and len(changes):
+            write_delta_csv(changes, city)
+        
+        if parquet and len(changes):
+            from hotels_storage import write_hotels_parquet, write_raw_records_parquet
+            write_hotels_parquet(df)
+            if isinstance(hotels_data, list):
+                write_raw_records_parquet(hotels_data, city)
+        
+        update_snapshot_fields(city, persisted_snapshot_id=snapshot_id)
+    
+    if run is not None:
+        run.advance(city, 'persisted', num_hotels=len(df))
     
     return df
 
 
+def persist_city_in_process(*args):
+    """persist_city dans un processus du pool : renvoie aussi les métriques collectées."""
+    METRICS.reset()
+    df = persist_city(*args)
+    return df, METRICS.export_state()
+
+
+def make_parse_pool(parse_workers=PARSE_WORKERS, parse_executor='process'):
+    """
+    Pool qui parse et écrit les villes pendant que les téléchargements continuent.
+    
+    Args:
+        parse_workers (int): Nombre de workers (0 = pas de pool)
+        parse_executor (str): 'process' (parsing en parallèle, hors GIL) ou 'thread'
+    
+    Returns:
+        Executor: Pool (None si parse_workers vaut 0)
+    """
+    if not parse_workers:
+        return None
+    
+    if parse_executor == 'process':
+        from concurrent.futures import ProcessPoolExecutor
+        # spawn : pas de fork d'un processus qui fait tourner une boucle asyncio
+        return ProcessPoolExecutor(parse_workers, mp_context=multiprocessing.get_context('spawn'))
+    if parse_executor == 'thread':
+        from concurrent.futures import ThreadPoolExecutor
+        return ThreadPoolExecutor(parse_workers, thread_name_prefix='parse')
+    
+    raise ValueError(f"Pool de parsing inconnu : {parse_executor}")
+
+
 # ═══════════════════════════════════════════════════════════════════════
 # FONCTION PRINCIPALE
 # ═══════════════════════════════════════════════════════════════════════
 
-async def fetch_all_results():
-    """Récupère les résultats pour tous les snapshots."""
+async def fetch_all_results(stream=False, stream_format='ndjson', max_wait=3600,
+                            download_workers=4, max_status_requests=None, max_concurrency=10,
+                            rate_limit=5.0, parquet=False, incremental=False, run=None,
+                            metrics_format='jsonl', parse_workers=PARSE_WORKERS,
+                            parse_executor='process', price_history=True):
+    """
+    Récupère les résultats pour tous les snapshots.
+    
+    Un ordonnanceur unique (PollScheduler) suit tous les snapshots en attente
+    et transmet chaque snapshot prêt à une file de téléchargement ; chaque
+    ville est confiée au pool de parsing dès la fin de son téléchargement,
+    et le worker repart aussitôt télécharger le snapshot suivant.
+    
+    Args:
+        stream (bool): Lecture des snapshots par chunks (mémoire constante par ville)
+        stream_format (str): Format demandé à l'API en streaming ('ndjson' ou 'json')
+        max_wait (int): Abandon d'un snapshot au-delà de cette durée (s)
+        download_workers (int): Nombre de téléchargements simultanés
+        max_status_requests (int): Budget global de requêtes de statut (None = illimité)
+        max_concurrency (int): Requêtes HTTP simultanées maximum
+        rate_limit (float): Requêtes par seconde vers l'API
+        parquet (bool): Écrire aussi les datasets Parquet partitionnés (ville, date)
+        incremental (bool): Ignorer les snapshots déjà intégrés et fusionner les
+            nouveaux résultats par URL avec les CSV existants (seules les lignes
+            modifiées sont réécrites dans les deltas / le Parquet)
+        run (PipelineRun): Run reprenable : chaque ville reprend à sa dernière
+            étape terminée (téléchargée, parsée, sauvegardée)
+        metrics_format (str): Format du fichier de métriques ('jsonl',
+            'prometheus', None = pas de fichier)
+        parse_workers (int): Workers du pool de parsing / écriture CSV
+            (0 = parsing dans la boucle asyncio)
+        parse_executor (str): 'process' ou 'thread'
+        price_history (bool): Ajouter toutes les offres (chambres, conditions,
+            séjour) à l'historique des prix et à ses agrégats journaliers
+    """
     print(f"\n{'='*80}")
     print(f"📥 STEP 2 : RÉCUPÉRATION DES RÉSULTATS (GET)")
     print(f"{'='*80}")
     print(f"⏱️  Démarrage : {datetime.now().strftime('%H:%M:%S')}\n")
     
-    # Charger le registre
-    registry = load_snapshot_registry()
-    snapshots = registry.get("snapshots", {})
+    # Charger le registre (ou les snapshots du run repris)
+    if run is not None:
+        stages = run.cities()
+        snapshots = {city: info['snapshot'] for city, info in stages.items() if 'snapshot' in info}
+    else:
+        stages = {}
+        snapshots = load_snapshots()
     
     if not snapshots:
         print("❌ Aucun snapshot trouvé")
         return {}
     
+    all_results = {}
+    total_cities = len(snapshots)
+    
+    os.makedirs('data/raw/hotels', exist_ok=True)
+    
+    loop = asyncio.get_running_loop()
+    pool = make_parse_pool(parse_workers, parse_executor)
+    pending = []
+
+    async def persist(city, args):
+        """Parse et écrit une ville dans le pool, sans bloquer les téléchargements."""
+        try:
+            with METRICS.timer('persist_city'):
+                if pool is None:
+                    df = persist_city(*args)
+                elif parse_executor == 'process':
+                    df, state = await loop.run_in_executor(pool, persist_city_in_process, *args)
+                    METRICS.merge_state(state)
+                else:
+                    df = await loop.run_in_executor(pool, persist_city, *args)
+        except Exception as e:
+            print(f"   ❌ {city} : échec du parsing / de l'écriture ({type(e).__name__}: {e})")
+            update_snapshot_status(city, "error", 0)
+            return
+        
+        if df is not None and not df.empty:
+            all_results[city] = df
+
+    def persist_later(city, hotels_data):
+        args = (city, hotels_data, snapshots[city]['snapshot_id'], run,
+                stages.get(city, {}).get('stage'), incremental, parquet, price_history)
+        pending.append(asyncio.create_task(persist(city, args)))
+
+    def stage_reached(city, stage):
+        return run is not None and run.stage_reached(stages.get(city, {}).get('stage'), stage)
+    
+    # Run repris : chaque ville repart de sa dernière étape terminée
+    if run is not None:
+        for city in list(snapshots):
+            if stage_reached(city, 'persisted'):
+                if os.path.exists(city_csv_path(city)):
+                    all_results[city] = pd.read_csv(city_csv_path(city))
+            elif stage_reached(city, 'parsed'):
+                persist_later(city, run.load_parsed(city))
+            elif stage_reached(city, 'downloaded'):
+                persist_later(city, run.load_raw(city))
+            else:
+                continue
+            del snapshots[city]
+        
+        resumed = total_cities - len(snapshots)
+        if resumed:
+            print(f"🔁 {resumed} ville(s) reprise(s) depuis le run {run.run_id}\n")
+    
+    # Snapshots déjà intégrés lors d'un run précédent : rien à retélécharger
+    if incremental:
+        persisted = [
+            city for city, info in snapshots.items()
+            if info.get('persisted_snapshot_id') == info['snapshot_id']
+            and os.path.exists(city_csv_path(city))
+        ]
+        for city in persisted:
+            all_results[city] = pd.read_csv(city_csv_path(city))
+            del snapshots[city]
+        
+        if persisted:
+            print(f"♻️  {len(persisted)} snapshot(s) déjà intégré(s) : {', '.join(persisted)}\n")
+    
     print(f"📊 {len(snapshots)} snapshot(s) à récupérer :")
     for city, info in snapshots.items():
         print(f"   • {city:25s} → {info['snapshot_id']}")
@@ -300,43 +978,84 @@ async def fetch_all_results():
     # Charger la config
     api_key = load_config()
     
-    all_results = {}
     timeout = aiohttp.ClientTimeout(total=None, connect=60, sock_read=60)
+    client = BrightDataClient(max_concurrency=max_concurrency, rate=rate_limit, timeout=timeout)
     
-    async with aiohttp.ClientSession(timeout=timeout) as session:
+    async with client as session:
         
-        # Créer les tâches
-        tasks = []
+        # Ordonnanceur de polling : tous les snapshots en attente
+        scheduler = PollScheduler(session, api_key, max_wait=max_wait, max_requests=max_status_requests)
         for city, info in snapshots.items():
-            snapshot_id = info['snapshot_id']
-            task = fetch_snapshot_results(session, city, snapshot_id, api_key, 600, 30)
-            tasks.append((city, task))
+            scheduler.add(city, info['snapshot_id'], info.get('dataset_id'), info.get('timestamp'))
+        
+        # Téléchargement dès qu'un snapshot est prêt, sauvegarde dès la fin du téléchargement
+        download_queue = asyncio.Queue()
+
+        async def download_worker():
+            while True:
+                item = await download_queue.get()
+                if item is None:
+                    return
+                cities, snapshot_id = item
+                
+                if run is not None:
+                    for city in cities:
+                        run.advance(city, 'ready')
+                
+                if len(cities) == 1:
+                    persist_later(cities[0], await fetch_snapshot_results(
+                        session, cities[0], snapshot_id, api_key, max_wait=60, check_interval=5,
+                        stream=stream, stream_format=stream_format, price_history=price_history
+                    ))
+                    continue
+                
+                # Snapshot par lot : découpage par ville
+                hotels_data = await fetch_snapshot_results(
+                    session, batch_label(snapshot_id), snapshot_id, api_key, max_wait=60, check_interval=5,
+                    stream=stream, stream_format=stream_format, cities=cities, price_history=price_history,
+                    update_status=False
+                )
+                
+                if hotels_data is None:
+                    for city in cities:
+                        update_snapshot_status(city, "error", 0)
+                    continue
+                
+                for city, city_data in split_batch_result(hotels_data, cities).items():
+                    update_snapshot_status(city, "ready", len(city_data))
+                    persist_later(city, city_data)
+        
+        workers = [asyncio.create_task(download_worker()) for _ in range(download_workers)]
         
-        # Exécuter en parallèle
         print(f"⏳ Récupération en cours...\n")
-        results = await asyncio.gather(*[task for _, task in tasks])
+        polls = await scheduler.run(download_queue)
         
-        # Parser et sauvegarder
-        print(f"\n{'─'*80}")
-        print("📊 Parsing et sauvegarde...")
-        print(f"{'─'*80}\n")
+        for _ in workers:
+            download_queue.put_nowait(None)
+        await asyncio.gather(*workers)
         
-        os.makedirs('data/raw/hotels', exist_ok=True)
+        # Dernières villes encore dans le pool de parsing
+        with METRICS.timer('parse_tail'):
+            await asyncio.gather(*pending)
+        if pool is not None:
+            pool.shutdown()
         
-        for (city, _), hotels_data in zip(tasks, results):
-            if hotels_data:
-                df = parse_hotels_data(hotels_data, city)
-                
-                if not df.empty:
-                    filename = f"data/raw/hotels/hotels_{city.replace(' ', '_').lower()}.csv"
-                    df.to_csv(filename, index=False, encoding='utf-8')
-                    print(f"   💾 CSV : {filename}")
-                    all_results[city] = df
+        print(f"\n📡 Requêtes de statut : {scheduler.requests_sent} "
+              f"({scheduler.requests_sent / max(len(polls), 1):.1f} par snapshot)")
+        
+        for snapshot_id, count in polls.items():
+            METRICS.gauge('snapshot_polls', count, snapshot_id=snapshot_id)
+        METRICS.count('status_requests', scheduler.requests_sent)
+    
+    client.print_report()
+    
+    # Exporter le registre (statuts finaux) au format JSON
+    export_registry_json()
     
     # Combiner
     if all_results:
         all_hotels = pd.concat(list(all_results.values()), ignore_index=True)
-        all_hotels.to_csv('data/raw/hotels_top5_all.csv', index=False)
+        atomic_to_csv(all_hotels, 'data/raw/hotels_top5_all.csv')
         
         # Stats GPS
         total_hotels = len(all_hotels)
@@ -346,10 +1065,15 @@ async def fetch_all_results():
         print(f"✅ hotels_top5_all.csv ({total_hotels} hôtels)")
         print(f"📍 Coordonnées GPS : {with_gps}/{total_hotels} ({with_gps/total_hotels*100:.1f}%)")
     
+    # Métriques de l'étape (latences, octets, polls, mémoire)
+    METRICS.print_report()
+    if metrics_format:
+        METRICS.write('fetch', run.run_id if run is not None else None, metrics_format)
+    
     print(f"\n{'='*80}")
     print(f"✅ STEP 2 TERMINÉ")
     print(f"{'='*80}")
-    print(f"📊 Villes : {len(all_results)}/{len(snapshots)}\n")
+    print(f"📊 Villes : {len(all_results)}/{total_cities}\n")
     
     return all_results
 
@@ -0,0 +1,362 @@
+"""
+Identité stable des hôtels entre les runs de scraping
+Identifiant dérivé de l'URL Booking canonique, registre SQLite des hôtels
+connus avec index par clé (URL, identifiant de propriété Booking) et
+rapprochement des quasi-doublons par blocs (cellule GPS, nom normalisé)
+"""
+
+import hashlib
+import math
+import os
+import re
+import sqlite3
+import unicodedata
+from datetime import datetime
+from difflib import SequenceMatcher
+
+# pandas est importé à la demande : le parsing ligne par ligne n'a besoin
+# que de hotel_uid
+
+
+# ═══════════════════════════════════════════════════════════════════════
+# CONFIGURATION
+# ═══════════════════════════════════════════════════════════════════════
+
+HOTELS_REGISTRY_DB = 'data/processed/hotels_registry.db'
+
+# URL de fiche Booking : pays, identifiant texte (slug), suffixe de langue optionnel
+_BOOKING_URL = re.compile(
+    r'^(?:https?://)?(?:[a-z0-9-]+\.)*booking\.com/hotel/([a-z]{2})/([^/?#]+?)'
+    r'(?:\.[a-z]{2}(?:-[a-z]{2,4})?)?\.html',
+    re.IGNORECASE,
+)
+
+# Mots ignorés dans les noms (type d'établissement, articles)
+NAME_STOPWORDS = {
+    'hotel', 'hostel', 'the', 'le', 'la', 'les', 'l', 'de', 'du', 'des', 'd', 'et', 'and', 'au', 'aux',
+}
+
+# Quasi-doublons : même bloc GPS, à moins de MATCH_DISTANCE_KM, noms similaires
+GRID_CELL_DEG = 0.005  # ~550 m en latitude
+MATCH_DISTANCE_KM = 0.15
+NAME_SIMILARITY = 0.85
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS hotels (
+    hotel_id      TEXT PRIMARY KEY,
+    canonical_url TEXT,
+    property_id   TEXT,
+    city          TEXT,
+    hotel_name    TEXT,
+    latitude      REAL,
+    longitude     REAL,
+    first_seen    TEXT NOT NULL,
+    last_seen     TEXT NOT NULL,
+    times_seen    INTEGER NOT NULL DEFAULT 1
+);
+CREATE TABLE IF NOT EXISTS hotel_aliases (
+    alias    TEXT PRIMARY KEY,
+    hotel_id TEXT NOT NULL
+);
+"""
+
+
+# ═══════════════════════════════════════════════════════════════════════
+# CLÉS
+# ═══════════════════════════════════════════════════════════════════════
+
+def canonical_url(url):
+    """
+    URL canonique d'un hôtel.
+    
+    Fiche Booking : https://www.booking.com/hotel/<pays>/<slug>.html, sans
+    paramètres de recherche ni suffixe de langue (.fr.html, .en-gb.html),
+    quel que soit le sous-domaine. Autres URL : sans paramètres, en minuscules.
+    """
+    url = str(url).strip()
+    match = _BOOKING_URL.match(url)
+    if match:
+        return f"https://www.booking.com/hotel/{match[1].lower()}/{match[2].lower()}.html"
+    return url.split('#', 1)[0].split('?', 1)[0].rstrip('/').lower()
+
+
+def hotel_uid(url):
+    """Identifiant stable d'un hôtel : empreinte de son URL canonique."""
+    return 'bk' + hashlib.sha1(canonical_url(url).encode('utf-8')).hexdigest()[:16]
+
+
+def hotel_uids(urls):
+    """hotel_uid sur une Series d'URL (valeurs manquantes conservées)."""
+    return urls.map(hotel_uid, na_action='ignore')
+
+
+def property_alias(property_id):
+    """Clé de l'identifiant de propriété Booking (listing_id), None si absent."""
+    if property_id is None or (isinstance(property_id, float) and math.isnan(property_id)):
+        return None
+    property_id = str(property_id).strip()
+    if property_id.endswith('.0'):  # Relu depuis un CSV en float
+        property_id = property_id[:-2]
+    return f"p{property_id}" if property_id else None
+
+
+def normalize_name(name):
+    """Nom sans accents, ponctuation ni mots génériques (hôtel, articles)."""
+    text = unicodedata.normalize('NFKD', str(name or '')).encode('ascii', 'ignore').decode('ascii')
+    tokens = re.findall(r'[a-z0-9]+', text.lower())
+    return ' '.join(t for t in tokens if t not in NAME_STOPWORDS)
+
+
+def name_similarity(a, b):
+    """
+    Similarité (0-1) de deux noms normalisés.
+    
+    Les nombres doivent être identiques : « Appartement T2 » et
+    « Appartement T3 » au même endroit sont deux logements.
+    """
+    if re.findall(r'\d+', a) != re.findall(r'\d+', b):
+        return 0.0
+    return SequenceMatcher(None, a, b).ratio()
+
+
+def _distance_km(lat1, lon1, lat2, lon2):
+    lat1, lon1, lat2, lon2 = map(math.radians, (lat1, lon1, lat2, lon2))
+    a = math.sin((lat2 - lat1) / 2) ** 2 + math.cos(lat1) * math.cos(lat2) * math.sin((lon2 - lon1) / 2) ** 2
+    return 2 * 6371.0088 * math.asin(math.sqrt(min(a, 1.0)))
+
+
+def _grid_cell(lat, lon):
+    return (math.floor(lat / GRID_CELL_DEG), math.floor(lon / GRID_CELL_DEG))
+
+
+def _keys(series):
+    """Valeurs d'une Series de clés (texte), None si manquantes."""
+    return [value if isinstance(value, str) else None for value in series]
+
+
+def _is_number(value):
+    return value is not None and not (isinstance(value, float) and math.isnan(value))
+
+
+# ═══════════════════════════════════════════════════════════════════════
+# REGISTRE
+# ═══════════════════════════════════════════════════════════════════════
+
+class HotelRegistry:
+    """
+    Registre des hôtels connus, chargé en mémoire à l'ouverture.
+    
+    Résolution d'une ligne (hôtel scrapé) vers un hôtel connu, dans l'ordre :
+    
+    1. Clé exacte : identifiant de l'URL canonique, puis identifiant de
+       propriété Booking (dictionnaire, O(1) par ligne)
+    2. Quasi-doublon : hôtels de la même cellule GPS et des 8 voisines (ou,
+       sans coordonnées, même ville et même nom normalisé), à moins de
+       MATCH_DISTANCE_KM et de nom similaire. Deux hôtels avec des
+       identifiants de propriété différents ne sont jamais rapprochés.
+    3. Sinon, nouvel hôtel (identifiant = hotel_uid de son URL)
+    
+    Chaque ligne n'est comparée qu'aux quelques hôtels de son bloc : le coût
+    d'un run est linéaire en nombre de lignes, quel que soit le nombre de
+    runs déjà intégrés.
+    
+    Usage:
+        with HotelRegistry() as registry:
+            hotels = registry.resolve(hotels)  # hotel_id stable + colonne match
+    """
+
+    def __init__(self, db_path=HOTELS_REGISTRY_DB):
+        """db_path=None : registre en mémoire uniquement (déduplication d'un DataFrame)."""
+        self.conn = None
+        if db_path is not None:
+            os.makedirs(os.path.dirname(db_path) or '.', exist_ok=True)
+            self.conn = sqlite3.connect(db_path, timeout=30, isolation_level=None)
+            self.conn.execute("PRAGMA journal_mode=WAL")
+            self.conn.execute("PRAGMA synchronous=NORMAL")
+            self.conn.executescript(_SCHEMA)
+        
+        self.aliases = {}      # clé (hotel_uid / p<listing_id>) → hotel_id
+        self.hotels = {}       # hotel_id → (nom normalisé, lat, lon, property_id)
+        self.grid = {}         # cellule GPS → [hotel_id]
+        self.names = {}        # (ville, nom normalisé) → [hotel_id]
+        self._load()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def __len__(self):
+        return len(self.hotels)
+
+    def close(self):
+        if self.conn is not None:
+            self.conn.close()
+            self.conn = None
+
+    def _load(self):
+        if self.conn is None:
+            return
+        rows = self.conn.execute(
+            "SELECT hotel_id, property_id, city, hotel_name, latitude, longitude FROM hotels"
+        ).fetchall()
+        for hotel_id, property_id, city, name, lat, lon in rows:
+            self._index(hotel_id, property_id, city, normalize_name(name), lat, lon)
+        self.aliases.update(self.conn.execute("SELECT alias, hotel_id FROM hotel_aliases").fetchall())
+
+    def _index(self, hotel_id, property_id, city, name_key, lat, lon):
+        self.hotels[hotel_id] = (name_key, lat, lon, property_id)
+        if _is_number(lat) and _is_number(lon):
+            self.grid.setdefault(_grid_cell(lat, lon), []).append(hotel_id)
+        else:
+            self.names.setdefault((normalize_name(city), name_key), []).append(hotel_id)
+    
+    # ───────────────────────────────────────────────────────────────────
+    # Rapprochement
+    # ───────────────────────────────────────────────────────────────────
+
+    def _candidates(self, city, name_key, lat, lon):
+        if _is_number(lat) and _is_number(lon):
+            row, col = _grid_cell(lat, lon)
+            for d_row in (-1, 0, 1):
+                for d_col in (-1, 0, 1):
+                    yield from self.grid.get((row + d_row, col + d_col), ())
+        else:
+            yield from self.names.get((normalize_name(city), name_key), ())
+
+    def find_duplicate(self, city, name, lat, lon, property_id=None):
+        """Hôtel connu le plus similaire (quasi-doublon), None si aucun."""
+        name_key = normalize_name(name)
+        if not name_key:
+            return None
+        
+        best, best_similarity = None, NAME_SIMILARITY
+        for hotel_id in self._candidates(city, name_key, lat, lon):
+            other_name, other_lat, other_lon, other_property = self.hotels[hotel_id]
+            if property_id and other_property and property_id != other_property:
+                continue
+            if _is_number(lat) and _distance_km(lat, lon, other_lat, other_lon) > MATCH_DISTANCE_KM:
+                continue
+            
+            similarity = name_similarity(name_key, other_name)
+            if similarity >= best_similarity:
+                best, best_similarity = hotel_id, similarity
+        return best
+    
+    # ───────────────────────────────────────────────────────────────────
+    # Résolution d'un run
+    # ───────────────────────────────────────────────────────────────────
+
+    def resolve(self, hotels, seen_at=None):
+        """
+        Attribue à chaque ligne l'identifiant stable de son hôtel.
+        
+        Les nouveaux hôtels et les nouvelles clés (URL, propriété) sont
+        enregistrés, les hôtels revus mis à jour (last_seen, times_seen), en
+        une transaction.
+        
+        Args:
+            hotels (DataFrame): url, hotel_name, city, latitude, longitude
+                (+ listing_id optionnel)
+            seen_at (str): Date du run (défaut : maintenant)
+        
+        Returns:
+            DataFrame: Copie avec hotel_id et match ('url', 'property',
+                       'fuzzy', 'new' ; None sans URL)
+        """
+        seen_at = seen_at or datetime.now().isoformat(timespec='seconds')
+        result = hotels.copy()
+        
+        uids = hotel_uids(result['url'])
+        properties = (result['listing_id'].map(property_alias) if 'listing_id' in result
+                      else uids.map(lambda _: None))
+        
+        # 1. Clés exactes (dictionnaire)
+        hotel_ids = uids.map(self.aliases).astype(object)
+        match = hotel_ids.notna().map({True: 'url', False: None}).astype(object)
+        by_property = hotel_ids.isna() & properties.notna()
+        hotel_ids[by_property] = properties[by_property].map(self.aliases)
+        match[by_property & hotel_ids.notna()] = 'property'
+        
+        hotel_ids, uids, properties = _keys(hotel_ids), _keys(uids), _keys(properties)
+        match = match.tolist()
+        
+        # 2-3. Lignes restantes : quasi-doublons, puis nouveaux hôtels (dans
+        # l'ordre, pour rapprocher aussi les doublons du run lui-même)
+        new_hotels = []
+        new_aliases = {}
+        columns = [result[col].tolist() for col in ['url', 'city', 'hotel_name', 'latitude', 'longitude']]
+        for i, (url, city, name, lat, lon) in enumerate(zip(*columns)):
+            uid, property_id = uids[i], properties[i]
+            if hotel_ids[i] is not None or uid is None:
+                continue
+            
+            hotel_id, kind = self.aliases.get(uid), 'url'
+            if hotel_id is None and property_id:
+                hotel_id, kind = self.aliases.get(property_id), 'property'
+            if hotel_id is None:
+                hotel_id, kind = self.find_duplicate(city, name, lat, lon, property_id), 'fuzzy'
+            if hotel_id is None:
+                hotel_id, kind = uid, 'new'
+                lat = float(lat) if _is_number(lat) else None
+                lon = float(lon) if _is_number(lon) else None
+                self._index(hotel_id, property_id, city, normalize_name(name), lat, lon)
+                new_hotels.append((hotel_id, canonical_url(url), property_id, city, name, lat, lon,
+                                   seen_at, seen_at))
+            
+            hotel_ids[i], match[i] = hotel_id, kind
+            for alias in (uid, property_id):
+                if alias and alias not in self.aliases:
+                    self.aliases[alias] = new_aliases[alias] = hotel_id
+        
+        # Clés d'hôtels déjà connus vues pour la première fois (ex. propriété)
+        for alias, hotel_id in zip(properties, hotel_ids):
+            if alias and hotel_id and alias not in self.aliases:
+                self.aliases[alias] = new_aliases[alias] = hotel_id
+        
+        result['hotel_id'] = hotel_ids
+        result['match'] = match
+        seen_ids = {h for h in hotel_ids if h is not None} - {h[0] for h in new_hotels}
+        self._save(new_hotels, new_aliases, seen_ids, seen_at)
+        return result
+
+    def _save(self, new_hotels, new_aliases, seen_ids, seen_at):
+        if self.conn is None:
+            return
+        
+        self.conn.execute("BEGIN IMMEDIATE")
+        try:
+            self.conn.executemany(
+                "INSERT OR IGNORE INTO hotels (hotel_id, canonical_url, property_id, city, hotel_name, "
+                "latitude, longitude, first_seen, last_seen) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                new_hotels,
+            )
+            self.conn.executemany(
+                "INSERT OR IGNORE INTO hotel_aliases (alias, hotel_id) VALUES (?, ?)",
+                new_aliases.items(),
+            )
+            self.conn.executemany(
+                "UPDATE hotels SET last_seen = ?, times_seen = times_seen + 1 WHERE hotel_id = ?",
+                ((seen_at, hotel_id) for hotel_id in seen_ids),
+            )
+            self.conn.execute("COMMIT")
+        except Exception:
+            self.conn.execute("ROLLBACK")
+            raise
+
+
+def deduplicate_hotels(hotels, registry=None):
+    """
+    Supprime les doublons d'un DataFrame d'hôtels (même URL canonique, même
+    propriété Booking ou quasi-doublon), en gardant la dernière occurrence.
+    Les lignes sans URL sont conservées (sans hotel_id).
+    
+    Returns:
+        DataFrame: Hôtels uniques avec hotel_id stable
+    """
+    if registry is None:
+        registry = HotelRegistry(db_path=None)
+    resolved = registry.resolve(hotels).drop(columns='match')
+    unique = ~resolved.duplicated('hotel_id', keep='last') | resolved['hotel_id'].isna()
+    return resolved[unique]
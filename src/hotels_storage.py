@@ -0,0 +1,331 @@
+"""
+Stockage Parquet des données hôtels (brutes et traitées)
+Datasets partitionnés par ville et date de scraping, compressés, avec schéma
+explicite ; chargement avec sélection de colonnes et filtres poussés au
+niveau des fichiers (seules les partitions utiles sont lues)
+"""
+
+import json
+import os
+from datetime import date, datetime
+from glob import glob
+
+import pandas as pd
+import pyarrow as pa
+import pyarrow.dataset as ds
+
+
+# ═══════════════════════════════════════════════════════════════════════
+# CONFIGURATION
+# ═══════════════════════════════════════════════════════════════════════
+
+HOTELS_DATASET = 'data/raw/hotels_parquet'
+RAW_RECORDS_DATASET = 'data/raw/hotels_json_parquet'
+
+COMPRESSION = 'zstd'
+
+# Colonnes de partitionnement (répertoires city=.../scrape_date=...)
+PARTITIONING = ds.partitioning(
+    pa.schema([('city', pa.string()), ('scrape_date', pa.date32())]),
+    flavor='hive',
+)
+
+HOTELS_SCHEMA = pa.schema([
+    ('hotel_id', pa.string()),
+    ('city', pa.string()),
+    ('hotel_name', pa.string()),
+    ('url', pa.string()),
+    ('score', pa.float64()),
+    ('number_of_reviews', pa.float64()),
+    ('description', pa.string()),
+    ('property_type', pa.string()),
+    ('latitude', pa.float64()),
+    ('longitude', pa.float64()),
+    ('price', pa.float64()),
+    ('currency', pa.string()),
+    ('facilities', pa.string()),
+    ('image_url', pa.string()),
+    ('scrape_date', pa.date32()),
+    ('scraped_at', pa.timestamp('s')),
+])
+
+# Table longue des prix (balayage dates × voyageurs), partitionnée par ville
+PRICES_DATASET = 'data/raw/prices_parquet'
+
+PRICES_PARTITIONING = ds.partitioning(pa.schema([('city', pa.string())]), flavor='hive')
+
+PRICES_SCHEMA = pa.schema([
+    ('city', pa.string()),
+    ('hotel_id', pa.string()),
+    ('check_in', pa.date32()),
+    ('nights', pa.int8()),
+    ('adults', pa.int8()),
+    ('price', pa.float32()),
+    ('currency', pa.string()),
+    ('scraped_at', pa.timestamp('s')),
+])
+
+# Clé d'un prix : un relevé par hôtel et par recherche
+PRICE_KEY = ['city', 'hotel_id', 'check_in', 'nights', 'adults']
+
+RAW_RECORDS_SCHEMA = pa.schema([
+    ('city', pa.string()),
+    ('url', pa.string()),
+    ('record', pa.string()),
+    ('scrape_date', pa.date32()),
+    ('scraped_at', pa.timestamp('s')),
+])
+
+
+# ═══════════════════════════════════════════════════════════════════════
+# ÉCRITURE
+# ═══════════════════════════════════════════════════════════════════════
+
+def _to_date(value):
+    if value is None:
+        return date.today()
+    if isinstance(value, datetime):
+        return value.date()
+    if isinstance(value, date):
+        return value
+    return date.fromisoformat(str(value)[:10])
+
+
+def write_partitioned(table, root, compression=COMPRESSION):
+    """
+    Écrit une table Arrow dans un dataset partitionné (ville, date).
+    
+    Les partitions (ville, date) réécrites remplacent les précédentes :
+    relancer un scraping le même jour n'ajoute pas de doublons.
+    """
+    os.makedirs(root, exist_ok=True)
+    
+    ds.write_dataset(
+        table,
+        root,
+        format='parquet',
+        partitioning=PARTITIONING,
+        existing_data_behavior='delete_matching',
+        basename_template='part-{i}.parquet',
+        file_options=ds.ParquetFileFormat().make_write_options(compression=compression),
+    )
+
+
+def write_hotels_parquet(df, root=HOTELS_DATASET, scrape_date=None, scraped_at=None):
+    """
+    Écrit des hôtels parsés (DataFrame de parse_hotels_data) en Parquet.
+    
+    Args:
+        df (DataFrame): Hôtels parsés (une ou plusieurs villes)
+        root (str): Racine du dataset
+        scrape_date (date|str): Date de scraping (défaut : aujourd'hui)
+        scraped_at (datetime): Horodatage du scraping (défaut : maintenant)
+    
+    Returns:
+        int: Nombre de lignes écrites
+    """
+    if df is None or df.empty:
+        return 0
+    
+    df = df.copy()
+    for col in df.select_dtypes('category').columns:
+        df[col] = df[col].astype(object)
+    
+    df['scrape_date'] = _to_date(scrape_date)
+    df['scraped_at'] = pd.Timestamp(scraped_at or datetime.now()).floor('s')
+    
+    for field in HOTELS_SCHEMA:
+        if field.name not in df.columns:
+            df[field.name] = None
+    
+    table = pa.Table.from_pandas(df[HOTELS_SCHEMA.names], schema=HOTELS_SCHEMA, preserve_index=False)
+    write_partitioned(table, root)
+    
+    print(f"   💾 Parquet : {root} ({len(df)} lignes)")
+    return len(df)
+
+
+def write_raw_records_parquet(hotels_data, city, root=RAW_RECORDS_DATASET, scrape_date=None, scraped_at=None):
+    """
+    Écrit les enregistrements bruts de l'API (un JSON compact par ligne) en
+    Parquet compressé, à la place du JSON indenté.
+    """
+    if not hotels_data:
+        return 0
+    
+    table = pa.table({
+        'city': [city] * len(hotels_data),
+        'url': [h.get('url') if isinstance(h, dict) else None for h in hotels_data],
+        'record': [json.dumps(h, ensure_ascii=False) for h in hotels_data],
+        'scrape_date': [_to_date(scrape_date)] * len(hotels_data),
+        'scraped_at': [pd.Timestamp(scraped_at or datetime.now()).floor('s').to_pydatetime()] * len(hotels_data),
+    }, schema=RAW_RECORDS_SCHEMA)
+    
+    write_partitioned(table, root)
+    return len(hotels_data)
+
+
+def write_prices_parquet(df, tag, root=PRICES_DATASET, scraped_at=None, compression=COMPRESSION):
+    """
+    Ajoute des relevés de prix (colonnes de PRICES_SCHEMA) à la table longue.
+    
+    Chaque lot est écrit dans ses propres fichiers (`tag`, ex. l'ID du
+    snapshot) : les lots ne s'écrasent pas entre eux, et réécrire un même
+    lot remplace ses fichiers.
+    
+    Returns:
+        int: Nombre de lignes écrites
+    """
+    if df is None or df.empty:
+        return 0
+    
+    df = df.copy()
+    for col in df.select_dtypes('category').columns:
+        df[col] = df[col].astype(object)
+    df['check_in'] = pd.to_datetime(df['check_in']).dt.date
+    if 'scraped_at' not in df.columns:
+        df['scraped_at'] = pd.Timestamp(scraped_at or datetime.now()).floor('s')
+    
+    table = pa.Table.from_pandas(df[PRICES_SCHEMA.names], schema=PRICES_SCHEMA, preserve_index=False)
+    
+    os.makedirs(root, exist_ok=True)
+    ds.write_dataset(
+        table,
+        root,
+        format='parquet',
+        partitioning=PRICES_PARTITIONING,
+        existing_data_behavior='overwrite_or_ignore',
+        basename_template=f'{tag}-{{i}}.parquet',
+        file_options=ds.ParquetFileFormat().make_write_options(compression=compression),
+    )
+    return len(df)
+
+
+def import_hotels_csv(pattern='data/raw/hotels/hotels_*.csv', root=HOTELS_DATASET):
+    """
+    Importe des CSV existants dans le dataset Parquet (migration).
+    
+    La date de scraping de chaque fichier est sa date de modification.
+    """
+    total = 0
+    for path in sorted(glob(pattern)):
+        scraped_at = datetime.fromtimestamp(os.path.getmtime(path))
+        total += write_hotels_parquet(pd.read_csv(path), root, scraped_at.date(), scraped_at)
+    return total
+
+
+# ═══════════════════════════════════════════════════════════════════════
+# LECTURE
+# ═══════════════════════════════════════════════════════════════════════
+
+def open_dataset(root=HOTELS_DATASET):
+    """Ouvre un dataset partitionné (lecture paresseuse, aucun fichier lu)."""
+    return ds.dataset(root, format='parquet', partitioning=PARTITIONING)
+
+
+def build_filter(cities=None, date_from=None, date_to=None, min_score=None, max_price=None):
+    """Construit une expression de filtre Arrow (None si aucun critère)."""
+    conditions = []
+    
+    if cities:
+        conditions.append(ds.field('city').isin(list(cities)))
+    if date_from:
+        conditions.append(ds.field('scrape_date') >= pa.scalar(_to_date(date_from), pa.date32()))
+    if date_to:
+        conditions.append(ds.field('scrape_date') <= pa.scalar(_to_date(date_to), pa.date32()))
+    if min_score is not None:
+        conditions.append(ds.field('score') >= min_score)
+    if max_price is not None:
+        conditions.append(ds.field('price') <= max_price)
+    
+    expr = None
+    for condition in conditions:
+        expr = condition if expr is None else expr & condition
+    return expr
+
+
+def load_hotels(root=HOTELS_DATASET, columns=None, cities=None, date_from=None, date_to=None,
+                min_score=None, max_price=None, filter=None):
+    """
+    Charge les hôtels depuis le dataset Parquet.
+    
+    Les filtres sur city / scrape_date éliminent des partitions entières ;
+    les filtres sur score / price s'appuient sur les statistiques des
+    row groups. Seules les colonnes demandées sont décodées.
+    
+    Args:
+        root (str): Racine du dataset
+        columns (list): Colonnes à charger (None = toutes)
+        cities (list): Villes à garder
+        date_from, date_to (date|str): Bornes de la date de scraping (incluses)
+        min_score (float): Note minimale
+        max_price (float): Prix maximal
+        filter (pyarrow.dataset.Expression): Filtre supplémentaire
+    
+    Returns:
+        DataFrame
+    """
+    if not os.path.exists(root):
+        return pd.DataFrame(columns=columns or HOTELS_SCHEMA.names)
+    
+    expr = build_filter(cities, date_from, date_to, min_score, max_price)
+    if filter is not None:
+        expr = filter if expr is None else expr & filter
+    
+    table = open_dataset(root).to_table(columns=columns, filter=expr)
+    return table.to_pandas()
+
+
+def load_latest_hotels(root=HOTELS_DATASET, columns=None, cities=None):
+    """Charge uniquement la dernière date de scraping disponible par ville."""
+    dates = load_hotels(root, columns=['city', 'scrape_date'], cities=cities)
+    if dates.empty:
+        return dates
+    
+    latest = dates.groupby('city')['scrape_date'].max()
+    
+    frames = [
+        load_hotels(root, columns=columns, cities=[city], date_from=day, date_to=day)
+        for city, day in latest.items()
+    ]
+    return pd.concat(frames, ignore_index=True)
+
+
+def load_prices(root=PRICES_DATASET, cities=None, check_in_from=None, check_in_to=None, latest=True):
+    """
+    Charge la table longue des prix.
+    
+    Args:
+        root (str): Racine du dataset
+        cities (list): Villes à garder (partitions)
+        check_in_from, check_in_to (date|str): Bornes des dates d'arrivée (incluses)
+        latest (bool): Ne garder que le dernier relevé de chaque clé PRICE_KEY
+    
+    Returns:
+        DataFrame: city, hotel_id, check_in, nights, adults, price, currency, scraped_at
+    """
+    if not os.path.exists(root):
+        return pd.DataFrame(columns=PRICES_SCHEMA.names)
+    
+    conditions = []
+    if cities:
+        conditions.append(ds.field('city').isin(list(cities)))
+    if check_in_from:
+        conditions.append(ds.field('check_in') >= pa.scalar(_to_date(check_in_from), pa.date32()))
+    if check_in_to:
+        conditions.append(ds.field('check_in') <= pa.scalar(_to_date(check_in_to), pa.date32()))
+    
+    expr = None
+    for condition in conditions:
+        expr = condition if expr is None else expr & condition
+    
+    dataset = ds.dataset(root, format='parquet', partitioning=PRICES_PARTITIONING)
+    df = dataset.to_table(filter=expr).to_pandas()
+    
+    if latest and not df.empty:
+        df = df.sort_values('scraped_at').drop_duplicates(PRICE_KEY, keep='last')
+    
+    for col in ['city', 'hotel_id', 'currency']:
+        df[col] = df[col].astype('category')
+    return df[PRICES_SCHEMA.names].reset_index(drop=True)
+
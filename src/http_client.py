@@ -0,0 +1,278 @@
+"""
+Client HTTP partagé (API BrightData, OpenWeatherMap)
+Concurrence bornée, limitation de débit (token bucket), retries avec backoff
+respectant Retry-After, pool de connexions réutilisé, mesures par requête
+"""
+
+import aiohttp
+import asyncio
+import os
+import random
+import time
+from contextlib import asynccontextmanager
+from email.utils import parsedate_to_datetime
+from urllib.parse import urlsplit
+
+from metrics import METRICS
+
+
+# ═══════════════════════════════════════════════════════════════════════
+# CONFIGURATION
+# ═══════════════════════════════════════════════════════════════════════
+
+DEFAULT_API_BASE_URL = "https://api.brightdata.com/datasets/v3"
+
+# Statuts HTTP pour lesquels la requête est rejouée
+RETRY_STATUSES = {429, 500, 502, 503, 504}
+
+
+def api_base_url():
+    """URL de base de l'API (surchargeable par BRIGHTDATA_API_URL, ex. serveur local)."""
+    return os.getenv("BRIGHTDATA_API_URL", DEFAULT_API_BASE_URL).rstrip('/')
+
+
+def http_stage(path):
+    """Étape instrumentée d'une requête : déclenchement, statut ou téléchargement."""
+    if path.endswith('/trigger'):
+        return 'http_trigger'
+    if '/progress/' in path or path.endswith('/snapshots'):
+        return 'http_status'
+    return 'http_download'
+
+
+# ═══════════════════════════════════════════════════════════════════════
+# LIMITATION DE DÉBIT
+# ═══════════════════════════════════════════════════════════════════════
+
+class TokenBucket:
+    """Token bucket : `rate` requêtes par seconde, rafales jusqu'à `capacity`."""
+
+    def __init__(self, rate, capacity=None):
+        self.rate = rate
+        self.capacity = capacity or max(1.0, rate)
+        self.tokens = self.capacity
+        self.updated = time.monotonic()
+        self.paused_until = 0.0
+        self._lock = asyncio.Lock()
+
+    def pause(self, seconds):
+        """Suspend toutes les requêtes (ex. après un 429 avec Retry-After)."""
+        self.paused_until = max(self.paused_until, time.monotonic() + seconds)
+
+    async def acquire(self):
+        """Attend qu'un jeton soit disponible et le consomme."""
+        async with self._lock:
+            while True:
+                now = time.monotonic()
+                
+                if now < self.paused_until:
+                    await asyncio.sleep(self.paused_until - now)
+                    continue
+                
+                self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+                self.updated = now
+                
+                if self.tokens >= 1:
+                    self.tokens -= 1
+                    return
+                
+                await asyncio.sleep((1 - self.tokens) / self.rate)
+
+
+def parse_retry_after(value):
+    """Convertit un en-tête Retry-After (secondes ou date HTTP) en secondes."""
+    if not value:
+        return None
+    
+    try:
+        return max(0.0, float(value))
+    except ValueError:
+        pass
+    
+    try:
+        retry_at = parsedate_to_datetime(value)
+    except (TypeError, ValueError):
+        return None
+    
+    return max(0.0, retry_at.timestamp() - time.time())
+
+
+# ═══════════════════════════════════════════════════════════════════════
+# CLIENT
+# ═══════════════════════════════════════════════════════════════════════
+
+class RateLimitedClient:
+    """
+    Session aiohttp partagée par les étapes trigger et fetch (et la collecte
+    météo).
+    
+    S'utilise comme une session aiohttp (`client.get`, `client.post` en
+    `async with`) ; chaque appel passe par le sémaphore de concurrence et le
+    token bucket, et est rejoué sur erreur réseau ou statut 429/5xx.
+    
+    Usage:
+        async with RateLimitedClient(max_concurrency=10, rate=5) as client:
+            async with client.post(url, json=data) as response:
+                ...
+        client.print_report()
+    """
+
+    def __init__(self, max_concurrency=10, rate=5.0, burst=None,
+                 max_retries=4, backoff_base=1.0, backoff_max=60.0,
+                 timeout=None, connector_limit=100, keepalive_timeout=30, stage=None):
+        """
+        Args:
+            max_concurrency (int): Requêtes simultanées maximum
+            rate (float): Requêtes par seconde (token bucket)
+            burst (int): Taille maximale d'une rafale (défaut : rate)
+            max_retries (int): Nombre de nouvelles tentatives par requête
+            backoff_base (float): Délai de base du backoff exponentiel (s)
+            backoff_max (float): Délai maximal entre deux tentatives (s)
+            timeout (aiohttp.ClientTimeout): Timeouts de la session
+            connector_limit (int): Taille du pool de connexions
+            keepalive_timeout (float): Durée de conservation des connexions (s)
+            stage (str): Étape des mesures (défaut : déduite du chemin BrightData, voir http_stage)
+        """
+        self.max_retries = max_retries
+        self.backoff_base = backoff_base
+        self.backoff_max = backoff_max
+        self.timeout = timeout or aiohttp.ClientTimeout(total=None, connect=60, sock_read=60)
+        self.connector_limit = connector_limit
+        self.keepalive_timeout = keepalive_timeout
+        self.stage = stage
+        
+        self.semaphore = asyncio.Semaphore(max_concurrency)
+        self.bucket = TokenBucket(rate, burst)
+        self.session = None
+        self.stats = []
+
+    async def __aenter__(self):
+        connector = aiohttp.TCPConnector(
+            limit=self.connector_limit,
+            ttl_dns_cache=300,
+            keepalive_timeout=self.keepalive_timeout,
+        )
+        self.session = aiohttp.ClientSession(connector=connector, timeout=self.timeout)
+        return self
+
+    async def __aexit__(self, *exc):
+        await self.session.close()
+        self.session = None
+    
+    # ───────────────────────────────────────────────────────────────────
+    # Requêtes
+    # ───────────────────────────────────────────────────────────────────
+
+    def _backoff(self, attempt, retry_after=None):
+        if retry_after is not None:
+            return min(retry_after, self.backoff_max)
+        delay = min(self.backoff_base * 2 ** attempt, self.backoff_max)
+        return delay * random.uniform(0.5, 1.0)
+
+    @asynccontextmanager
+    async def request(self, method, url, **kwargs):
+        """
+        Envoie une requête avec retries et renvoie la réponse (context manager).
+        
+        La réponse finale est renvoyée quel que soit son statut, une fois les
+        tentatives épuisées ; les erreurs réseau sont relancées.
+        """
+        retries = 0
+        start = time.monotonic()
+        
+        async with self.semaphore:
+            while True:
+                await self.bucket.acquire()
+                
+                try:
+                    response = await self.session.request(method, url, **kwargs)
+                except (aiohttp.ClientError, asyncio.TimeoutError) as e:
+                    if retries >= self.max_retries:
+                        self._record(method, url, None, start, retries, 0, error=type(e).__name__)
+                        raise
+                    await asyncio.sleep(self._backoff(retries))
+                    retries += 1
+                    continue
+                
+                if response.status in RETRY_STATUSES and retries < self.max_retries:
+                    retry_after = parse_retry_after(response.headers.get("Retry-After"))
+                    delay = self._backoff(retries, retry_after)
+                    if response.status == 429:
+                        self.bucket.pause(delay)
+                    response.release()
+                    await asyncio.sleep(delay)
+                    retries += 1
+                    continue
+                
+                break
+            
+            try:
+                yield response
+            finally:
+                received = getattr(response.content, 'total_bytes', 0)
+                response.release()
+                self._record(method, url, response.status, start, retries, received)
+
+    def get(self, url, **kwargs):
+        return self.request("GET", url, **kwargs)
+
+    def post(self, url, **kwargs):
+        return self.request("POST", url, **kwargs)
+    
+    # ───────────────────────────────────────────────────────────────────
+    # Mesures
+    # ───────────────────────────────────────────────────────────────────
+
+    def _record(self, method, url, status, start, retries, received=0, error=None):
+        path = urlsplit(url).path
+        latency = time.monotonic() - start
+        self.stats.append({
+            "method": method,
+            "endpoint": path.rsplit('/', 1)[0] if path.count('/') > 3 else path,
+            "status": status,
+            "latency": latency,
+            "retries": retries,
+            "bytes": received,
+            "error": error,
+        })
+        
+        stage = self.stage or http_stage(path)
+        METRICS.observe(stage, latency)
+        METRICS.count('http_requests', stage=stage, status=status or error)
+        METRICS.count('http_bytes', received, stage=stage)
+        if retries:
+            METRICS.count('http_retries', retries, stage=stage)
+
+    def summary(self):
+        """Résumé par endpoint : nombre, latences (moyenne, p50, p95, max), retries, erreurs."""
+        by_endpoint = {}
+        for stat in self.stats:
+            by_endpoint.setdefault(f"{stat['method']} {stat['endpoint']}", []).append(stat)
+        
+        summary = {}
+        for endpoint, stats in by_endpoint.items():
+            latencies = sorted(s["latency"] for s in stats)
+            n = len(latencies)
+            summary[endpoint] = {
+                "requests": n,
+                "latency_mean": sum(latencies) / n,
+                "latency_p50": latencies[n // 2],
+                "latency_p95": latencies[min(n - 1, int(n * 0.95))],
+                "latency_max": latencies[-1],
+                "retries": sum(s["retries"] for s in stats),
+                "bytes": sum(s["bytes"] for s in stats),
+                "errors": sum(1 for s in stats if s["error"] or (s["status"] or 0) >= 400),
+            }
+        return summary
+
+    def print_report(self):
+        """Affiche le résumé des requêtes HTTP."""
+        print(f"\n🌐 Requêtes HTTP :")
+        for endpoint, s in self.summary().items():
+            print(f"   • {endpoint:40s} {s['requests']:5d} req | "
+                  f"p50 {s['latency_p50']*1000:6.0f} ms | p95 {s['latency_p95']*1000:6.0f} ms | "
+                  f"{s['bytes'] / 1e6:7.2f} MB | {s['retries']} retries | {s['errors']} erreurs")
+
+
+# Nom historique (étapes trigger et fetch)
+BrightDataClient = RateLimitedClient
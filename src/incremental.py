@@ -0,0 +1,122 @@
+"""
+Scraping incrémental
+Empreinte des requêtes de scraping (ville, dates, voyageurs, limite), réutilisation
+des snapshots encore frais, fusion des nouveaux résultats par hôtel (URL canonique) et
+extraction des seules lignes modifiées
+"""
+
+import hashlib
+import json
+from datetime import datetime, timedelta
+
+# pandas est importé à la demande : le déclenchement (empreintes, fraîcheur)
+# n'en a pas besoin
+
+
+# ═══════════════════════════════════════════════════════════════════════
+# CONFIGURATION
+# ═══════════════════════════════════════════════════════════════════════
+
+# Durée de validité par défaut d'un snapshot
+DEFAULT_TTL_HOURS = 24
+
+# Champs de l'input de recherche qui définissent une requête
+FINGERPRINT_FIELDS = ['location', 'check_in', 'check_out', 'adults', 'rooms']
+
+# Statuts d'un snapshot encore exploitable (en cours ou terminé)
+REUSABLE_STATUSES = {'triggered', 'running', 'ready'}
+
+
+# ═══════════════════════════════════════════════════════════════════════
+# EMPREINTE ET FRAÎCHEUR
+# ═══════════════════════════════════════════════════════════════════════
+
+def request_fingerprint(search_input, max_hotels):
+    """Empreinte stable d'une requête : ville, dates, adultes, chambres, limite."""
+    key = {field: search_input.get(field) for field in FINGERPRINT_FIELDS}
+    key['limit'] = int(max_hotels)
+    payload = json.dumps(key, sort_keys=True, ensure_ascii=False)
+    return hashlib.sha1(payload.encode('utf-8')).hexdigest()[:16]
+
+
+def is_fresh(entry, fingerprint, ttl_hours=DEFAULT_TTL_HOURS, now=None):
+    """Indique si l'entrée du registre couvre la même requête et a moins de `ttl_hours`."""
+    if not entry or entry.get('fingerprint') != fingerprint:
+        return False
+    if entry.get('status') not in REUSABLE_STATUSES:
+        return False
+    
+    try:
+        triggered_at = datetime.fromisoformat(entry['timestamp'])
+    except (KeyError, TypeError, ValueError):
+        return False
+    
+    return (now or datetime.now()) - triggered_at < timedelta(hours=ttl_hours)
+
+
+# ═══════════════════════════════════════════════════════════════════════
+# FUSION PAR URL
+# ═══════════════════════════════════════════════════════════════════════
+
+def _comparable(df):
+    """Version normalisée des colonnes pour comparer un CSV relu et un DataFrame neuf."""
+    import pandas as pd
+    
+    out = pd.DataFrame(index=df.index)
+    for col in df.columns:
+        values = df[col].astype(object)
+        numeric = pd.to_numeric(values, errors='coerce')
+        if numeric.notna().sum() == values.notna().sum():
+            out[col] = numeric.round(6).astype(str)
+        else:
+            out[col] = values.where(values.notna(), '').astype(str)
+    return out
+
+
+def merge_hotels(existing, new):
+    """
+    Fusionne les nouveaux hôtels d'une ville dans les données existantes.
+    
+    Les hôtels sont identifiés par leur URL canonique (hotel_id stable, voir
+    hotel_identity) : un hôtel déjà connu est mis à jour, un nouvel hôtel
+    est ajouté, un hôtel absent du nouveau scraping est conservé. Les
+    anciens identifiants (ville_rang) sont remplacés par l'identifiant stable.
+    
+    Returns:
+        tuple: (DataFrame fusionné, DataFrame des lignes ajoutées ou modifiées)
+    """
+    import pandas as pd
+    from hotel_identity import hotel_uids
+    
+    if existing is None or existing.empty:
+        return new.reset_index(drop=True), new.reset_index(drop=True)
+    if new is None or new.empty:
+        return existing.reset_index(drop=True), existing.iloc[0:0]
+    
+    existing = existing.assign(hotel_id=hotel_uids(existing['url'])).drop_duplicates('hotel_id', keep='last')
+    new = new.assign(hotel_id=hotel_uids(new['url'])).drop_duplicates('hotel_id', keep='last')
+    existing = existing.set_index('hotel_id', drop=False)
+    new = new.set_index('hotel_id', drop=False)
+    
+    columns = [c for c in new.columns if c in existing.columns and c != 'hotel_id']
+    common = new.index.intersection(existing.index)
+    added = new.index.difference(existing.index)
+    
+    # Lignes connues dont au moins une valeur a changé
+    same = (_comparable(existing.loc[common, columns]) == _comparable(new.loc[common, columns])).all(axis=1)
+    changed_keys = common[~same.to_numpy()]
+    
+    updated = new.loc[changed_keys].copy()
+    added_rows = new.loc[added].copy()
+    
+    column_order = list(existing.columns) + [c for c in new.columns if c not in existing.columns]
+    
+    merged = existing.reindex(columns=column_order).astype(object)
+    if len(changed_keys):
+        merged.loc[changed_keys, column_order] = updated.reindex(columns=column_order).astype(object)
+    merged = pd.concat([merged, added_rows.reindex(columns=column_order).astype(object)])
+    merged = merged.reset_index(drop=True).infer_objects()
+    
+    changes = pd.concat([updated, added_rows]).reindex(columns=column_order).reset_index(drop=True)
+    
+    return merged, changes
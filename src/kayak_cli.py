@@ -0,0 +1,241 @@
+"""
+Ligne de commande du pipeline de scraping (kayak)
+Sous-commandes trigger, status, fetch, run, resume et report ; les modules
+lourds (pandas, aiohttp) ne sont importés que par la sous-commande qui en a besoin :
+`kayak status` et `kayak --help` démarrent en quelques millisecondes
+
+Usage :
+    kayak status                                # snapshots et dernier run
+    kayak trigger --cities Marseille Cassis --max-hotels 30
+    kayak fetch --stream --incremental
+    kayak run                                   # nouveau run reprenable (Top 5)
+    kayak resume [RUN_ID]
+    kayak report                                # cartes, dashboard, rapport (modifiés seulement)
+    kayak -C /srv/kayak status                  # depuis un autre dossier (cron)
+    python src/kayak_cli.py status              # sans installation
+"""
+
+import argparse
+import csv
+import os
+import sys
+
+
+# ═══════════════════════════════════════════════════════════════════════
+# CONFIGURATION
+# ═══════════════════════════════════════════════════════════════════════
+
+TOP5_DESTINATIONS = 'data/processed/top5_destinations.csv'
+
+
+# ═══════════════════════════════════════════════════════════════════════
+# OPTIONS
+# ═══════════════════════════════════════════════════════════════════════
+
+def load_cities(args):
+    """Villes de --cities, sinon colonne city du fichier --cities-file (sans pandas)."""
+    if args.cities:
+        return args.cities
+    
+    with open(args.cities_file, newline='', encoding='utf-8') as f:
+        return [row['city'] for row in csv.DictReader(f) if row.get('city')]
+
+
+def add_cities_options(parser):
+    parser.add_argument('--cities', nargs='+', metavar='VILLE', help="Villes (défaut : --cities-file)")
+    parser.add_argument('--cities-file', default=TOP5_DESTINATIONS,
+                        help=f"CSV avec une colonne city (défaut : {TOP5_DESTINATIONS})")
+    parser.add_argument('--max-hotels', type=int, default=15, help="Hôtels par ville")
+
+
+def add_http_options(parser):
+    parser.add_argument('--concurrency', type=int, default=10, help="Requêtes HTTP simultanées maximum")
+    parser.add_argument('--rate-limit', type=float, default=5.0, help="Requêtes par seconde vers l'API")
+
+
+def add_fetch_options(parser):
+    parser.add_argument('--stream', action='store_true', help="Lecture des snapshots par chunks")
+    parser.add_argument('--stream-format', choices=['ndjson', 'json'], default='ndjson')
+    parser.add_argument('--max-wait', type=int, default=3600, help="Abandon d'un snapshot après (s)")
+    parser.add_argument('--download-workers', type=int, default=4)
+    parser.add_argument('--parse-workers', type=int, default=None,
+                        help="Workers de parsing (0 = dans la boucle asyncio)")
+    parser.add_argument('--parse-executor', choices=['process', 'thread'], default='process')
+    parser.add_argument('--parquet', action='store_true', help="Écrire aussi les datasets Parquet")
+    parser.add_argument('--incremental', action='store_true',
+                        help="Ignorer les snapshots déjà intégrés, fusionner avec les CSV existants")
+    parser.add_argument('--no-price-history', dest='price_history', action='store_false',
+                        help="Ne pas ajouter les offres à l'historique des prix")
+    add_http_options(parser)
+
+
+def fetch_options(args):
+    """Arguments de fetch_all_results à partir des options de la ligne de commande."""
+    options = {
+        'stream': args.stream,
+        'stream_format': args.stream_format,
+        'max_wait': args.max_wait,
+        'download_workers': args.download_workers,
+        'max_concurrency': args.concurrency,
+        'rate_limit': args.rate_limit,
+        'parquet': args.parquet,
+        'incremental': args.incremental,
+        'parse_executor': args.parse_executor,
+        'price_history': args.price_history,
+        'metrics_format': args.metrics_format,
+    }
+    if args.parse_workers is not None:
+        options['parse_workers'] = args.parse_workers
+    return options
+
+
+# ═══════════════════════════════════════════════════════════════════════
+# SOUS-COMMANDES
+# ═══════════════════════════════════════════════════════════════════════
+
+def cmd_trigger(args):
+    """STEP 1 : déclenchement des scrapings."""
+    import asyncio
+    from trigger_scraping import trigger_all_cities
+    
+    asyncio.run(trigger_all_cities(
+        load_cities(args), max_hotels_per_city=args.max_hotels, max_concurrency=args.concurrency,
+        rate_limit=args.rate_limit, batch_size=args.batch_size, incremental=args.incremental,
+        ttl_hours=args.ttl_hours, metrics_format=args.metrics_format,
+    ))
+
+
+def cmd_fetch(args):
+    """STEP 2 : récupération des résultats."""
+    import asyncio
+    from fetch_results import fetch_all_results
+    
+    asyncio.run(fetch_all_results(**fetch_options(args)))
+
+
+def cmd_run(args):
+    """STEP 1 + STEP 2 dans un nouveau run reprenable."""
+    import asyncio
+    from pipeline_run import run_pipeline
+    
+    asyncio.run(run_pipeline(load_cities(args), run_id=args.run_id, max_hotels_per_city=args.max_hotels,
+                             **fetch_options(args)))
+
+
+def cmd_resume(args):
+    """Reprise d'un run à la dernière étape terminée de chaque ville."""
+    import asyncio
+    from pipeline_run import run_pipeline
+    
+    asyncio.run(run_pipeline(run_id=args.run_id, resume=True, **fetch_options(args)))
+
+
+def cmd_report(args):
+    """Cartes, dashboard et rapport HTML (livrables dont les entrées ont changé)."""
+    from report_build import build_report
+    
+    options = {'workers': args.workers} if args.workers is not None else {}
+    build_report(output_dir=args.output_dir, force=args.force, only=args.only,
+                 recommendations_path=args.recommendations, **options)
+
+
+def cmd_status(args):
+    """État des snapshots et d'un run (registre SQLite uniquement)."""
+    from pipeline_run import PipelineRun
+    from snapshot_registry import SNAPSHOTS_DB, SNAPSHOTS_REGISTRY, load_snapshots
+    
+    if not (os.path.exists(SNAPSHOTS_DB) or os.path.exists(SNAPSHOTS_REGISTRY)):
+        print(f"📭 Aucun registre de snapshots ({SNAPSHOTS_DB})")
+        return 0
+    
+    snapshots = load_snapshots()
+    print(f"📸 Snapshots : {len(snapshots)}")
+    for city, info in snapshots.items():
+        hotels = f"{info['num_hotels']} hôtels" if info.get('num_hotels') is not None else ''
+        print(f"   • {city:25s} → {info.get('status', '?'):12s} {info.get('snapshot_id', ''):28s} {hotels}")
+    
+    run = PipelineRun(args.run_id) if args.run_id else PipelineRun.latest()
+    if run is None:
+        print("\n🧭 Aucun run enregistré")
+        return 0
+    
+    cities = run.cities()
+    if not cities:
+        print(f"\n❌ Run inconnu : {run.run_id}")
+        return 1
+    run.print_status()
+    
+    # Code de sortie exploitable par cron : 0 si toutes les villes sont terminées
+    return 0 if all(info['stage'] == 'persisted' for info in cities.values()) else 3
+
+
+# ═══════════════════════════════════════════════════════════════════════
+# POINT D'ENTRÉE
+# ═══════════════════════════════════════════════════════════════════════
+
+def build_parser():
+    parser = argparse.ArgumentParser(prog='kayak', description=__doc__.split('\n')[1])
+    parser.add_argument('-C', '--directory', metavar='DOSSIER',
+                        help="Dossier du projet (data/, config/) ; défaut : dossier courant")
+    parser.add_argument('--metrics-format', choices=['jsonl', 'prometheus', 'none'], default='jsonl',
+                        help="Format du fichier de métriques de chaque étape")
+    commands = parser.add_subparsers(dest='command', metavar='COMMANDE', required=True)
+    
+    trigger = commands.add_parser('trigger', help="STEP 1 : déclencher les scrapings (POST)")
+    add_cities_options(trigger)
+    add_http_options(trigger)
+    trigger.add_argument('--batch-size', type=int, default=1, help="Villes par requête POST")
+    trigger.add_argument('--incremental', action='store_true', help="Réutiliser les snapshots encore frais")
+    trigger.add_argument('--ttl-hours', type=float, default=24, help="Validité d'un snapshot (h)")
+    trigger.set_defaults(handler=cmd_trigger)
+    
+    status = commands.add_parser('status', help="État des snapshots et du dernier run")
+    status.add_argument('--run-id', help="Run affiché (défaut : le dernier)")
+    status.set_defaults(handler=cmd_status)
+    
+    fetch = commands.add_parser('fetch', help="STEP 2 : récupérer et parser les résultats (GET)")
+    add_fetch_options(fetch)
+    fetch.set_defaults(handler=cmd_fetch)
+    
+    run = commands.add_parser('run', help="STEP 1 + STEP 2 dans un nouveau run reprenable")
+    add_cities_options(run)
+    run.add_argument('--run-id', help="Identifiant du run (défaut : date et heure)")
+    add_fetch_options(run)
+    run.set_defaults(handler=cmd_run)
+    
+    resume = commands.add_parser('resume', help="Reprendre un run interrompu")
+    resume.add_argument('run_id', nargs='?', metavar='RUN_ID', help="Run à reprendre (défaut : le dernier)")
+    add_fetch_options(resume)
+    resume.set_defaults(handler=cmd_resume)
+    
+    report = commands.add_parser('report', help="Cartes, dashboard et rapport HTML (rendu incrémental)")
+    report.add_argument('--recommendations', default='data/processed/final_recommendations.csv')
+    report.add_argument('--output-dir', default='data/processed')
+    report.add_argument('--force', action='store_true', help="Tout rendre, même sans changement")
+    report.add_argument('--only', nargs='+', metavar='LIVRABLE', help="Livrables à construire (et leurs dépendances)")
+    report.add_argument('--workers', type=int, help="Rendus simultanés (0 = séquentiel ; défaut : selon les cœurs)")
+    report.set_defaults(handler=cmd_report)
+    
+    return parser
+
+
+def main(argv=None):
+    """Point d'entrée de la commande `kayak`."""
+    args = build_parser().parse_args(argv)
+    if args.metrics_format == 'none':
+        args.metrics_format = None
+    if args.directory:
+        os.chdir(args.directory)
+    
+    try:
+        return args.handler(args) or 0
+    except (FileNotFoundError, ValueError) as e:
+        print(e, file=sys.stderr)
+        return 2
+    except KeyboardInterrupt:
+        print("\n⏹️  Interrompu : reprendre avec `kayak resume`", file=sys.stderr)
+        return 130
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,279 @@
+"""
+Instrumentation du pipeline de scraping
+Chronomètres (histogrammes de latence par étape), compteurs et jauges
+collectés en mémoire, puis exportés en fin d'étape dans un fichier lisible
+par machine (JSON lines ou format texte Prometheus)
+"""
+
+import functools
+import json
+import os
+import sys
+import time
+from contextlib import contextmanager
+from datetime import datetime
+
+
+# ═══════════════════════════════════════════════════════════════════════
+# CONFIGURATION
+# ═══════════════════════════════════════════════════════════════════════
+
+METRICS_DIR = 'data/raw/metrics'
+
+# Bornes supérieures des buckets de latence (s)
+LATENCY_BUCKETS = (0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60, 120, 300)
+
+# Préfixe des métriques au format Prometheus
+PROMETHEUS_PREFIX = 'kayak_'
+
+
+# ═══════════════════════════════════════════════════════════════════════
+# HISTOGRAMME
+# ═══════════════════════════════════════════════════════════════════════
+
+class Histogram:
+    """Histogramme cumulatif (à la Prometheus) : buckets, somme, nombre, max."""
+
+    def __init__(self, buckets=LATENCY_BUCKETS):
+        self.buckets = buckets
+        self.counts = [0] * len(buckets)
+        self.sum = 0.0
+        self.count = 0
+        self.max = 0.0
+
+    def observe(self, value):
+        self.sum += value
+        self.count += 1
+        self.max = max(self.max, value)
+        for i, bound in enumerate(self.buckets):
+            if value <= bound:
+                self.counts[i] += 1
+
+    def quantile(self, q):
+        """Quantile approché : borne du premier bucket qui couvre q."""
+        target = q * self.count
+        for bound, n in zip(self.buckets, self.counts):
+            if n >= target:
+                return min(bound, self.max)
+        return self.max
+
+
+# ═══════════════════════════════════════════════════════════════════════
+# COLLECTEUR
+# ═══════════════════════════════════════════════════════════════════════
+
+def _key(name, labels):
+    return name, tuple(sorted((k, str(v)) for k, v in labels.items()))
+
+
+def peak_memory_bytes():
+    """Pic de mémoire résidente du processus (None si indisponible)."""
+    try:
+        import resource
+    except ImportError:
+        return None
+    
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Linux : kilo-octets, macOS : octets
+    return peak if sys.platform == 'darwin' else peak * 1024
+
+
+class Metrics:
+    """
+    Collecteur de métriques d'une étape du pipeline.
+    
+    Usage:
+        with METRICS.timer('parse', city='Marseille'):
+            df = parse_hotels_data(hotels, 'Marseille')
+        METRICS.count('http_bytes', 1024, stage='http_download')
+        METRICS.write('fetch', run_id='20250101_120000')
+    """
+
+    def __init__(self):
+        self.reset()
+
+    def reset(self):
+        """Vide toutes les métriques collectées."""
+        self.histograms = {}
+        self.counters = {}
+        self.gauges = {}
+        self.started = time.time()
+    
+    # ───────────────────────────────────────────────────────────────────
+    # Collecte
+    # ───────────────────────────────────────────────────────────────────
+
+    def observe(self, stage, seconds, **labels):
+        """Ajoute une durée à l'histogramme de latence d'une étape."""
+        key = _key('stage_seconds', {'stage': stage, **labels})
+        self.histograms.setdefault(key, Histogram()).observe(seconds)
+
+    @contextmanager
+    def timer(self, stage, **labels):
+        """Chronomètre un bloc (synchrone ou contenant des await)."""
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(stage, time.perf_counter() - start, **labels)
+
+    def timed(self, stage):
+        """Décorateur : chronomètre chaque appel d'une fonction synchrone."""
+        def decorator(func):
+            @functools.wraps(func)
+            def wrapper(*args, **kwargs):
+                with self.timer(stage):
+                    return func(*args, **kwargs)
+            return wrapper
+        return decorator
+
+    def count(self, name, value=1, **labels):
+        """Incrémente un compteur."""
+        key = _key(name, labels)
+        self.counters[key] = self.counters.get(key, 0) + value
+
+    def gauge(self, name, value, **labels):
+        """Fixe la valeur d'une jauge."""
+        self.gauges[_key(name, labels)] = value
+
+    def export_state(self):
+        """État brut (picklable) du collecteur, pour un autre processus."""
+        return {'histograms': self.histograms, 'counters': self.counters, 'gauges': self.gauges}
+
+    def merge_state(self, state):
+        """Ajoute les métriques collectées dans un processus worker."""
+        for key, other in state['histograms'].items():
+            h = self.histograms.setdefault(key, Histogram(other.buckets))
+            h.counts = [a + b for a, b in zip(h.counts, other.counts)]
+            h.sum += other.sum
+            h.count += other.count
+            h.max = max(h.max, other.max)
+        for key, value in state['counters'].items():
+            self.counters[key] = self.counters.get(key, 0) + value
+        self.gauges.update(state['gauges'])
+    
+    # ───────────────────────────────────────────────────────────────────
+    # Export
+    # ───────────────────────────────────────────────────────────────────
+
+    def records(self):
+        """Toutes les métriques sous forme de dicts (une ligne JSON chacune)."""
+        self.gauge('peak_memory_bytes', peak_memory_bytes())
+        self.gauge('wall_seconds', time.time() - self.started)
+        
+        records = []
+        for (name, labels), h in self.histograms.items():
+            records.append({
+                'type': 'histogram',
+                'name': name,
+                'labels': dict(labels),
+                'count': h.count,
+                'sum': h.sum,
+                'max': h.max,
+                'p50': h.quantile(0.5),
+                'p95': h.quantile(0.95),
+                'buckets': {**{str(b): n for b, n in zip(h.buckets, h.counts)}, '+Inf': h.count},
+            })
+        for (name, labels), value in self.counters.items():
+            records.append({'type': 'counter', 'name': name, 'labels': dict(labels), 'value': value})
+        for (name, labels), value in self.gauges.items():
+            records.append({'type': 'gauge', 'name': name, 'labels': dict(labels), 'value': value})
+        return records
+
+    def to_prometheus(self, common_labels=None):
+        """Métriques au format texte Prometheus."""
+        common = dict(common_labels or {})
+
+        def fmt_labels(labels, **extra):
+            items = {**common, **dict(labels), **extra}
+            if not items:
+                return ''
+            return '{' + ','.join(f'{k}="{v}"' for k, v in items.items()) + '}'
+        
+        lines = []
+        typed = set()
+
+        def declare(name, kind):
+            if name not in typed:
+                typed.add(name)
+                lines.append(f"# TYPE {name} {kind}")
+        
+        for record in self.records():
+            name = PROMETHEUS_PREFIX + record['name']
+            labels = record['labels']
+            
+            if record['type'] == 'histogram':
+                declare(name, 'histogram')
+                for bound, n in record['buckets'].items():
+                    lines.append(f"{name}_bucket{fmt_labels(labels, le=bound)} {n}")
+                lines.append(f"{name}_sum{fmt_labels(labels)} {record['sum']}")
+                lines.append(f"{name}_count{fmt_labels(labels)} {record['count']}")
+            elif record['type'] == 'counter':
+                declare(f"{name}_total", 'counter')
+                lines.append(f"{name}_total{fmt_labels(labels)} {record['value']}")
+            elif record['value'] is not None:
+                declare(name, 'gauge')
+                lines.append(f"{name}{fmt_labels(labels)} {record['value']}")
+        
+        return '\n'.join(lines) + '\n'
+
+    def write(self, step, run_id=None, fmt='jsonl', directory=METRICS_DIR, reset=True):
+        """
+        Écrit les métriques de l'étape dans un fichier puis les réinitialise.
+        
+        Args:
+            step (str): Étape du pipeline ('trigger', 'fetch', ...)
+            run_id (str): Identifiant du run (défaut : horodatage)
+            fmt (str): 'jsonl' (une métrique par ligne) ou 'prometheus'
+            directory (str): Dossier de sortie
+            reset (bool): Vider le collecteur après l'écriture
+        
+        Returns:
+            str: Chemin du fichier écrit
+        """
+        run_id = run_id or datetime.now().strftime('%Y%m%d_%H%M%S')
+        os.makedirs(directory, exist_ok=True)
+        
+        if fmt == 'prometheus':
+            path = os.path.join(directory, f"{run_id}_{step}.prom")
+            content = self.to_prometheus({'run_id': run_id, 'step': step})
+        elif fmt == 'jsonl':
+            path = os.path.join(directory, f"{run_id}_{step}.jsonl")
+            timestamp = datetime.now().isoformat()
+            content = ''.join(
+                json.dumps({'timestamp': timestamp, 'run_id': run_id, 'step': step, **record}) + '\n'
+                for record in self.records()
+            )
+        else:
+            raise ValueError(f"Format de métriques inconnu : {fmt}")
+        
+        tmp_path = f"{path}.tmp"
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            f.write(content)
+        os.replace(tmp_path, path)
+        
+        print(f"📈 Métriques : {path}")
+        
+        if reset:
+            self.reset()
+        return path
+
+    def print_report(self, top=10):
+        """Affiche les étapes qui consomment le plus de temps."""
+        stages = {}
+        for (name, labels), h in self.histograms.items():
+            stage = dict(labels).get('stage', name)
+            total, count = stages.get(stage, (0.0, 0))
+            stages[stage] = (total + h.sum, count + h.count)
+        
+        print(f"\n⏱️  Temps par étape :")
+        for stage, (total, count) in sorted(stages.items(), key=lambda x: -x[1][0])[:top]:
+            print(f"   • {stage:30s} {total:9.3f}s | {count:6d} appels | {total / count * 1000:8.1f} ms/appel")
+        
+        peak = peak_memory_bytes()
+        if peak:
+            print(f"   🧠 Pic mémoire : {peak / 1e6:.0f} MB")
+
+
+# Collecteur partagé par les modules du pipeline
+METRICS = Metrics()
@@ -0,0 +1,245 @@
+"""
+Serveur BrightData local (aiohttp) pour les benchmarks et les tests
+Implémente /trigger, /progress/{id}, /snapshots et /snapshot/{id} avec
+latence configurable, phase "running" (202), erreurs 5xx, 429 avec
+Retry-After, et hôtels synthétiques de taille quelconque
+
+Usage :
+    python src/mock_brightdata.py --port 8080 --running-time 10 --rate-429 0.05
+    BRIGHTDATA_API_URL=http://127.0.0.1:8080/datasets/v3 python src/trigger_scraping.py
+"""
+
+import argparse
+import asyncio
+import json
+import random
+import time
+import uuid
+from datetime import datetime
+
+from aiohttp import web
+
+from synthetic_hotels import make_synthetic_hotels
+
+
+# ═══════════════════════════════════════════════════════════════════════
+# CONFIGURATION
+# ═══════════════════════════════════════════════════════════════════════
+
+API_PREFIX = '/datasets/v3'
+
+
+# ═══════════════════════════════════════════════════════════════════════
+# SERVEUR
+# ═══════════════════════════════════════════════════════════════════════
+
+class MockBrightDataServer:
+    """
+    Faux serveur BrightData en mémoire.
+    
+    Usage:
+        async with MockBrightDataServer(running_time=2) as server:
+            os.environ['BRIGHTDATA_API_URL'] = server.base_url
+            ...
+        print(server.requests)
+    """
+
+    def __init__(self, latency=0.05, running_time=10.0, error_rate=0.0, rate_429=0.0,
+                 retry_after=1, hotels_per_city=None, failed_rate=0.0, hotel_error_rate=0.01,
+                 seed=0):
+        """
+        Args:
+            latency (float): Latence moyenne ajoutée à chaque réponse (s)
+            running_time (float): Durée de la phase "running" d'un snapshot (s)
+            error_rate (float): Part des requêtes en erreur 500
+            rate_429 (float): Part des requêtes refusées en 429
+            retry_after (int): Valeur de l'en-tête Retry-After des 429 (s)
+            hotels_per_city (int): Hôtels par ville (défaut : limit_per_input)
+            failed_rate (float): Part des snapshots qui finissent en "failed"
+            hotel_error_rate (float): Part d'hôtels synthétiques mal formés
+            seed (int): Graine aléatoire
+        """
+        self.latency = latency
+        self.running_time = running_time
+        self.error_rate = error_rate
+        self.rate_429 = rate_429
+        self.retry_after = retry_after
+        self.hotels_per_city = hotels_per_city
+        self.failed_rate = failed_rate
+        self.hotel_error_rate = hotel_error_rate
+        self.rng = random.Random(seed)
+        
+        self.snapshots = {}
+        self.requests = {}
+        self.base_url = None
+        self._runner = None
+
+    async def __aenter__(self):
+        await self.start()
+        return self
+
+    async def __aexit__(self, *exc):
+        await self.stop()
+
+    def make_app(self):
+        """Application aiohttp exposant les endpoints de l'API."""
+        app = web.Application(middlewares=[self._faults])
+        app.router.add_post(f'{API_PREFIX}/trigger', self.trigger)
+        app.router.add_get(f'{API_PREFIX}/progress/{{snapshot_id}}', self.progress)
+        app.router.add_get(f'{API_PREFIX}/snapshots', self.list_snapshots)
+        app.router.add_get(f'{API_PREFIX}/snapshot/{{snapshot_id}}', self.snapshot)
+        return app
+
+    async def start(self, host='127.0.0.1', port=0):
+        """Démarre le serveur (port libre si 0) et renvoie son URL de base."""
+        self._runner = web.AppRunner(self.make_app(), access_log=None)
+        await self._runner.setup()
+        site = web.TCPSite(self._runner, host, port)
+        await site.start()
+        
+        port = self._runner.addresses[0][1]
+        self.base_url = f"http://{host}:{port}{API_PREFIX}"
+        return self.base_url
+
+    async def stop(self):
+        if self._runner is not None:
+            await self._runner.cleanup()
+            self._runner = None
+    
+    # ───────────────────────────────────────────────────────────────────
+    # Latence et erreurs injectées
+    # ───────────────────────────────────────────────────────────────────
+
+    @web.middleware
+    async def _faults(self, request, handler):
+        endpoint = request.path[len(API_PREFIX):].strip('/').split('/')[0]
+        self.requests[endpoint] = self.requests.get(endpoint, 0) + 1
+        
+        if self.latency:
+            await asyncio.sleep(self.rng.uniform(0.5, 1.5) * self.latency)
+        
+        if self.rng.random() < self.rate_429:
+            self.requests['429'] = self.requests.get('429', 0) + 1
+            return web.json_response({'error': 'Too many requests'}, status=429,
+                                     headers={'Retry-After': str(self.retry_after)})
+        
+        if self.rng.random() < self.error_rate:
+            self.requests['500'] = self.requests.get('500', 0) + 1
+            return web.json_response({'error': 'Internal error'}, status=500)
+        
+        return await handler(request)
+    
+    # ───────────────────────────────────────────────────────────────────
+    # Endpoints
+    # ───────────────────────────────────────────────────────────────────
+
+    def _status(self, snapshot):
+        if time.monotonic() < snapshot['ready_at']:
+            return 'running'
+        return 'failed' if snapshot['failed'] else 'ready'
+
+    async def trigger(self, request):
+        """POST /trigger : un snapshot pour la liste d'inputs reçue."""
+        inputs = await request.json()
+        if isinstance(inputs, dict):
+            inputs = [inputs]
+        
+        snapshot_id = f"s_mock_{uuid.uuid4().hex[:12]}"
+        self.snapshots[snapshot_id] = {
+            'inputs': inputs,
+            'limit': int(request.query.get('limit_per_input', 15)),
+            'dataset_id': request.query.get('dataset_id'),
+            'created': datetime.now().isoformat(),
+            'ready_at': time.monotonic() + self.running_time,
+            'failed': self.rng.random() < self.failed_rate,
+        }
+        return web.json_response({'snapshot_id': snapshot_id})
+
+    async def progress(self, request):
+        """GET /progress/{id} : statut d'un snapshot."""
+        snapshot = self.snapshots.get(request.match_info['snapshot_id'])
+        if snapshot is None:
+            return web.json_response({'error': 'Snapshot not found'}, status=404)
+        return web.json_response({'snapshot_id': request.match_info['snapshot_id'],
+                                  'status': self._status(snapshot)})
+
+    async def list_snapshots(self, request):
+        """GET /snapshots : statuts des snapshots d'un dataset."""
+        dataset_id = request.query.get('dataset_id')
+        return web.json_response([
+            {'id': snapshot_id, 'status': self._status(s), 'created': s['created']}
+            for snapshot_id, s in self.snapshots.items()
+            if dataset_id is None or s['dataset_id'] == dataset_id
+        ])
+
+    def _records(self, snapshot):
+        n = self.hotels_per_city or snapshot['limit']
+        records = []
+        for i, search_input in enumerate(snapshot['inputs']):
+            city = search_input.get('location', '').split(',')[0].strip()
+            records.extend(make_synthetic_hotels(n, city=city, seed=i, error_rate=self.hotel_error_rate,
+                                                search_input=search_input))
+        return records
+
+    async def snapshot(self, request):
+        """GET /snapshot/{id} : 202 tant que le snapshot tourne, puis les hôtels."""
+        snapshot_id = request.match_info['snapshot_id']
+        snapshot = self.snapshots.get(snapshot_id)
+        if snapshot is None:
+            return web.json_response({'error': 'Snapshot not found'}, status=404)
+        
+        status = self._status(snapshot)
+        if status == 'running':
+            return web.json_response({'status': 'running', 'message': 'Snapshot is not ready yet'}, status=202)
+        if status == 'failed':
+            return web.json_response({'status': 'error', 'message': 'Snapshot failed'})
+        
+        records = self._records(snapshot)
+        
+        if request.query.get('format') == 'ndjson':
+            body = ''.join(json.dumps(r, ensure_ascii=False) + '\n' for r in records)
+            return web.Response(text=body, content_type='application/x-ndjson')
+        return web.Response(text=json.dumps(records, ensure_ascii=False), content_type='application/json')
+
+
+# ═══════════════════════════════════════════════════════════════════════
+# POINT D'ENTRÉE
+# ═══════════════════════════════════════════════════════════════════════
+
+def main():
+    """Point d'entrée pour exécution standalone."""
+    parser = argparse.ArgumentParser(description=__doc__.split('\n')[1])
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=8080)
+    parser.add_argument('--latency', type=float, default=0.05)
+    parser.add_argument('--running-time', type=float, default=10.0)
+    parser.add_argument('--error-rate', type=float, default=0.0)
+    parser.add_argument('--rate-429', type=float, default=0.0)
+    parser.add_argument('--hotels-per-city', type=int, default=None)
+    args = parser.parse_args()
+    
+    server = MockBrightDataServer(
+        latency=args.latency,
+        running_time=args.running_time,
+        error_rate=args.error_rate,
+        rate_429=args.rate_429,
+        hotels_per_city=args.hotels_per_city,
+    )
+
+    async def serve():
+        base_url = await server.start(args.host, args.port)
+        print(f"🧪 Mock BrightData : {base_url}")
+        print(f"   export BRIGHTDATA_API_URL={base_url}")
+        try:
+            await asyncio.Event().wait()
+        finally:
+            await server.stop()
+    
+    try:
+        asyncio.run(serve())
+    except KeyboardInterrupt:
+        print(f"\n📊 Requêtes reçues : {server.requests}")
+
+
+if __name__ == "__main__":
+    main()
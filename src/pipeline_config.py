@@ -0,0 +1,89 @@
+"""
+Configuration partagée du pipeline
+Recherche unique du fichier config/.env (variable KAYAK_ENV_FILE, dossier
+courant, dossier parent depuis notebooks/, racine du projet) et lecture des
+clés API ; les variables déjà présentes dans l'environnement (cron,
+conteneurs) suffisent, sans fichier
+"""
+
+import os
+from pathlib import Path
+
+
+# ═══════════════════════════════════════════════════════════════════════
+# CONFIGURATION
+# ═══════════════════════════════════════════════════════════════════════
+
+# Chemin explicite du fichier .env (prioritaire)
+ENV_FILE_VAR = 'KAYAK_ENV_FILE'
+
+PROJECT_ROOT = Path(__file__).resolve().parent.parent
+
+# Dataset BrightData « Booking.com - hotel listings »
+DEFAULT_DATASET_ID = 'gd_mdy9ld3p1e0oqlj9g4'
+
+
+# ═══════════════════════════════════════════════════════════════════════
+# FICHIER .env
+# ═══════════════════════════════════════════════════════════════════════
+
+def env_file_candidates():
+    """Emplacements possibles du fichier .env, dans l'ordre de recherche."""
+    candidates = [Path('config/.env'), Path('../config/.env'), PROJECT_ROOT / 'config' / '.env']
+    if os.getenv(ENV_FILE_VAR):
+        candidates.insert(0, Path(os.getenv(ENV_FILE_VAR)))
+    return candidates
+
+
+def find_env_file():
+    """Premier fichier .env existant (None si aucun)."""
+    for path in env_file_candidates():
+        if path.is_file():
+            return path
+    return None
+
+
+def load_env():
+    """
+    Charge le fichier .env s'il existe, sans écraser les variables déjà
+    définies dans l'environnement.
+    
+    Returns:
+        Path: Fichier chargé (None si aucun)
+    """
+    env_path = find_env_file()
+    if env_path is not None:
+        from dotenv import load_dotenv
+        load_dotenv(env_path)
+    return env_path
+
+
+def require_env(name, env_path):
+    """Valeur d'une variable obligatoire (ValueError si absente)."""
+    value = os.getenv(name)
+    if not value:
+        source = env_path.absolute() if env_path is not None else "l'environnement (aucun fichier .env trouvé)"
+        raise ValueError(f"❌ {name} non trouvée dans {source}")
+    return value
+
+
+# ═══════════════════════════════════════════════════════════════════════
+# CLÉS API
+# ═══════════════════════════════════════════════════════════════════════
+
+def load_brightdata_config():
+    """
+    Clé API et dataset BrightData.
+    
+    Returns:
+        tuple: (api_key, dataset_id)
+    """
+    env_path = load_env()
+    if env_path is not None:
+        print(f"🔍 Chargement depuis : {env_path.absolute()}")
+    
+    api_key = require_env('BRIGHTDATA_API_KEY', env_path)
+    dataset_id = os.getenv('BRIGHTDATA_DATASET_ID', DEFAULT_DATASET_ID)
+    
+    print(f"✅ API Key chargée : {api_key[:20]}...")
+    return api_key, dataset_id
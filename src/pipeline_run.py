@@ -0,0 +1,327 @@
+"""
+Exécution reprenable du pipeline (STEP 1 + STEP 2)
+Chaque run a un identifiant ; chaque ville passe par les étapes
+triggered → ready → downloaded → parsed → persisted, enregistrées dans le
+registre SQLite dès qu'elles sont atteintes (fichiers intermédiaires écrits
+de façon atomique). Une relance reprend chaque ville à sa dernière étape
+terminée, sans retélécharger ce qui l'a déjà été
+
+Usage :
+    python src/pipeline_run.py                  # nouveau run (Top 5)
+    python src/pipeline_run.py --resume         # reprend le dernier run
+    python src/pipeline_run.py --resume 20250101_120000
+"""
+
+import argparse
+import json
+import os
+from datetime import datetime
+
+from metrics import METRICS
+from snapshot_registry import SNAPSHOTS_DB, connect_registry
+
+
+# ═══════════════════════════════════════════════════════════════════════
+# CONFIGURATION
+# ═══════════════════════════════════════════════════════════════════════
+
+# Étapes d'une ville, dans l'ordre
+STAGES = ['triggered', 'ready', 'downloaded', 'parsed', 'persisted']
+
+# Fichiers intermédiaires : data/raw/runs/<run_id>/<ville>.raw.ndjson, .parsed.csv
+RUNS_DIR = 'data/raw/runs'
+
+_RUNS_SCHEMA = """
+CREATE TABLE IF NOT EXISTS runs (
+    run_id     TEXT PRIMARY KEY,
+    created_at TEXT NOT NULL,
+    params     TEXT NOT NULL
+);
+CREATE TABLE IF NOT EXISTS run_cities (
+    run_id     TEXT NOT NULL,
+    city       TEXT NOT NULL,
+    stage      TEXT,
+    updated_at TEXT NOT NULL,
+    data       TEXT NOT NULL,
+    PRIMARY KEY (run_id, city)
+);
+"""
+
+
+# ═══════════════════════════════════════════════════════════════════════
+# ÉCRITURES ATOMIQUES
+# ═══════════════════════════════════════════════════════════════════════
+
+def atomic_write(path, write, mode='w'):
+    """
+    Écrit un fichier via un fichier temporaire renommé à la fin.
+    
+    Un crash pendant l'écriture laisse l'ancienne version intacte, jamais
+    un fichier tronqué.
+    
+    Args:
+        path (str): Fichier cible
+        write (callable): Fonction recevant le fichier temporaire ouvert
+        mode (str): Mode d'ouverture ('w' ou 'wb')
+    """
+    os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+    tmp_path = f"{path}.tmp"
+    
+    with open(tmp_path, mode, **({} if 'b' in mode else {'encoding': 'utf-8'})) as f:
+        write(f)
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(tmp_path, path)
+
+
+@METRICS.timed('csv_write')
+def atomic_to_csv(df, path):
+    """Écrit un DataFrame en CSV de façon atomique."""
+    atomic_write(path, lambda f: df.to_csv(f, index=False))
+
+
+# ═══════════════════════════════════════════════════════════════════════
+# RUN
+# ═══════════════════════════════════════════════════════════════════════
+
+class PipelineRun:
+    """
+    État d'un run : étape atteinte par ville et fichiers intermédiaires.
+    
+    Usage:
+        run = PipelineRun.create(cities, {'max_hotels_per_city': 15})
+        run.advance('Marseille', 'triggered', snapshot=entry)
+        ...
+        run = PipelineRun.latest()        # après un crash
+    """
+
+    def __init__(self, run_id, db_path=SNAPSHOTS_DB, runs_dir=RUNS_DIR):
+        self.run_id = run_id
+        self.db_path = db_path
+        self.directory = os.path.join(runs_dir, run_id)
+
+    def _connect(self):
+        return connect_registry(self.db_path, schema=_RUNS_SCHEMA)
+
+    @classmethod
+    def create(cls, cities, params=None, run_id=None, db_path=SNAPSHOTS_DB):
+        """Crée un nouveau run (toutes les villes à l'étape initiale)."""
+        run = cls(run_id or datetime.now().strftime('%Y%m%d_%H%M%S'), db_path)
+        now = datetime.now().isoformat()
+        
+        conn = run._connect()
+        try:
+            conn.execute("BEGIN IMMEDIATE")
+            conn.execute(
+                "INSERT INTO runs (run_id, created_at, params) VALUES (?, ?, ?)",
+                (run.run_id, now, json.dumps(params or {}, ensure_ascii=False)),
+            )
+            conn.executemany(
+                "INSERT INTO run_cities (run_id, city, stage, updated_at, data) VALUES (?, ?, NULL, ?, '{}')",
+                [(run.run_id, city, now) for city in cities],
+            )
+            conn.execute("COMMIT")
+        except Exception:
+            if conn.in_transaction:
+                conn.execute("ROLLBACK")
+            raise
+        
+        return run
+
+    @classmethod
+    def latest(cls, db_path=SNAPSHOTS_DB):
+        """Renvoie le dernier run créé (None s'il n'y en a aucun)."""
+        conn = connect_registry(db_path, schema=_RUNS_SCHEMA)
+        row = conn.execute("SELECT run_id FROM runs ORDER BY created_at DESC LIMIT 1").fetchone()
+        
+        return cls(row[0], db_path) if row else None
+
+    @property
+    def params(self):
+        """Paramètres du run (ceux passés à la création)."""
+        conn = self._connect()
+        row = conn.execute("SELECT params FROM runs WHERE run_id = ?", (self.run_id,)).fetchone()
+        
+        if row is None:
+            raise KeyError(f"Run inconnu : {self.run_id}")
+        return json.loads(row[0])
+    
+    # ───────────────────────────────────────────────────────────────────
+    # Étapes
+    # ───────────────────────────────────────────────────────────────────
+
+    def cities(self):
+        """Renvoie l'état des villes du run : {ville: {'stage': ..., ...}}."""
+        conn = self._connect()
+        rows = conn.execute(
+            "SELECT city, stage, data FROM run_cities WHERE run_id = ? ORDER BY rowid",
+            (self.run_id,),
+        ).fetchall()
+        
+        return {city: {**json.loads(data), 'stage': stage} for city, stage, data in rows}
+
+    @staticmethod
+    def stage_reached(current, stage):
+        """Indique si l'étape `current` est au moins `stage`."""
+        return current is not None and STAGES.index(current) >= STAGES.index(stage)
+
+    @METRICS.timed('registry_write')
+    def advance(self, city, stage, **data):
+        """
+        Enregistre qu'une ville a atteint une étape (transaction).
+        
+        Une ville ne recule jamais : une étape déjà dépassée est ignorée,
+        seules les données sont complétées.
+        """
+        conn = self._connect()
+        try:
+            conn.execute("BEGIN IMMEDIATE")
+            row = conn.execute(
+                "SELECT stage, data FROM run_cities WHERE run_id = ? AND city = ?",
+                (self.run_id, city),
+            ).fetchone()
+            
+            current, info = (row[0], json.loads(row[1])) if row else (None, {})
+            if not self.stage_reached(current, stage):
+                current = stage
+                info[f"{stage}_at"] = datetime.now().isoformat()
+            info.update(data)
+            
+            conn.execute(
+                """
+                INSERT INTO run_cities (run_id, city, stage, updated_at, data)
+                VALUES (?, ?, ?, ?, ?)
+                ON CONFLICT(run_id, city) DO UPDATE SET
+                    stage      = excluded.stage,
+                    updated_at = excluded.updated_at,
+                    data       = excluded.data
+                """,
+                (self.run_id, city, current, datetime.now().isoformat(), json.dumps(info, ensure_ascii=False)),
+            )
+            conn.execute("COMMIT")
+        except Exception:
+            if conn.in_transaction:
+                conn.execute("ROLLBACK")
+            raise
+    
+    # ───────────────────────────────────────────────────────────────────
+    # Fichiers intermédiaires
+    # ───────────────────────────────────────────────────────────────────
+
+    def artifact_path(self, city, kind):
+        """Chemin d'un fichier intermédiaire ('raw.ndjson' ou 'parsed.csv')."""
+        return os.path.join(self.directory, f"{city.replace(' ', '_').lower()}.{kind}")
+
+    @METRICS.timed('checkpoint_write')
+    def save_raw(self, city, hotels_data):
+        """Écrit les enregistrements bruts d'une ville puis passe à 'downloaded'."""
+        def write(f):
+            for hotel in hotels_data:
+                f.write(json.dumps(hotel, ensure_ascii=False))
+                f.write('\n')
+        
+        atomic_write(self.artifact_path(city, 'raw.ndjson'), write)
+        self.advance(city, 'downloaded', num_records=len(hotels_data))
+
+    def load_raw(self, city):
+        """Relit les enregistrements bruts d'une ville."""
+        with open(self.artifact_path(city, 'raw.ndjson'), 'r', encoding='utf-8') as f:
+            return [json.loads(line) for line in f if line.strip()]
+
+    def save_parsed(self, city, df):
+        """Écrit les hôtels parsés d'une ville puis passe à 'parsed'."""
+        atomic_to_csv(df, self.artifact_path(city, 'parsed.csv'))
+        self.advance(city, 'parsed', num_hotels=len(df))
+
+    def load_parsed(self, city):
+        """Relit les hôtels parsés d'une ville."""
+        import pandas as pd
+        return pd.read_csv(self.artifact_path(city, 'parsed.csv'))
+    
+    # ───────────────────────────────────────────────────────────────────
+    # Affichage
+    # ───────────────────────────────────────────────────────────────────
+
+    def print_status(self):
+        """Affiche l'étape atteinte par chaque ville."""
+        cities = self.cities()
+        
+        print(f"\n🧭 Run {self.run_id} :")
+        for city, info in cities.items():
+            stage = info['stage'] or 'en attente'
+            print(f"   • {city:25s} → {stage}")
+        
+        done = sum(1 for info in cities.values() if info['stage'] == 'persisted')
+        print(f"   ✅ {done}/{len(cities)} ville(s) terminée(s)")
+
+
+# ═══════════════════════════════════════════════════════════════════════
+# FONCTION PRINCIPALE
+# ═══════════════════════════════════════════════════════════════════════
+
+async def run_pipeline(cities_list=None, run_id=None, resume=False, max_hotels_per_city=15,
+                       metrics_format='jsonl', **fetch_options):
+    """
+    Enchaîne STEP 1 et STEP 2 dans un run reprenable.
+    
+    Args:
+        cities_list (list): Villes d'un nouveau run (ignoré en reprise)
+        run_id (str): Identifiant du run (nouveau ou à reprendre)
+        resume (bool): Reprendre `run_id` (ou le dernier run si None)
+        max_hotels_per_city (int): Nombre d'hôtels par ville
+        metrics_format (str): Format des fichiers de métriques de chaque étape
+        **fetch_options: Options passées à fetch_all_results
+    
+    Returns:
+        dict: Résultats par ville (DataFrames)
+    """
+    from fetch_results import fetch_all_results
+    from trigger_scraping import trigger_all_cities
+    
+    if resume:
+        run = PipelineRun(run_id) if run_id else PipelineRun.latest()
+        if run is None:
+            raise ValueError("❌ Aucun run à reprendre")
+        max_hotels_per_city = run.params.get('max_hotels_per_city', max_hotels_per_city)
+        print(f"🔁 Reprise du run {run.run_id}")
+    else:
+        run = PipelineRun.create(cities_list, {'max_hotels_per_city': max_hotels_per_city}, run_id)
+        print(f"🆕 Run {run.run_id} ({len(cities_list)} villes)")
+    
+    cities = list(run.cities())
+    
+    # STEP 1 : seules les villes pas encore déclenchées dans ce run
+    await trigger_all_cities(cities, max_hotels_per_city=max_hotels_per_city, run=run,
+                             metrics_format=metrics_format)
+    
+    # STEP 2 : chaque ville reprend à sa dernière étape terminée
+    results = await fetch_all_results(run=run, metrics_format=metrics_format, **fetch_options)
+    
+    run.print_status()
+    return results
+
+
+# ═══════════════════════════════════════════════════════════════════════
+# POINT D'ENTRÉE
+# ═══════════════════════════════════════════════════════════════════════
+
+def main():
+    """Point d'entrée pour exécution standalone."""
+    import asyncio
+    
+    parser = argparse.ArgumentParser(description=__doc__.split('\n')[1])
+    parser.add_argument('--resume', nargs='?', const='', default=None, metavar='RUN_ID',
+                        help="Reprendre un run (le dernier si aucun identifiant)")
+    args = parser.parse_args()
+    
+    if args.resume is not None:
+        asyncio.run(run_pipeline(run_id=args.resume or None, resume=True))
+        return
+    
+    import pandas as pd
+    cities = pd.read_csv('data/processed/top5_destinations.csv')['city'].tolist()
+    asyncio.run(run_pipeline(cities))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,310 @@
+"""
+Ordonnanceur de polling des snapshots BrightData
+Un seul ordonnanceur suit tous les snapshot_id en attente : backoff exponentiel
+avec jitter, vérifications groupées via /snapshots, budget global de requêtes,
+et envoi immédiat des snapshots prêts vers la file de téléchargement
+"""
+
+import asyncio
+import heapq
+import random
+import time
+from datetime import datetime
+
+from http_client import api_base_url
+from snapshot_registry import update_snapshot_status
+
+
+# ═══════════════════════════════════════════════════════════════════════
+# CONFIGURATION
+# ═══════════════════════════════════════════════════════════════════════
+
+# Statuts BrightData considérés comme terminés
+READY_STATUSES = {"ready"}
+FAILED_STATUSES = {"failed", "error"}
+
+
+# ═══════════════════════════════════════════════════════════════════════
+# ORDONNANCEUR
+# ═══════════════════════════════════════════════════════════════════════
+
+class PollScheduler:
+    """
+    Suit l'avancement de tous les snapshots en attente.
+    
+    Chaque snapshot a sa propre échéance de vérification ; le délai double
+    (facteur `backoff`) à chaque vérification infructueuse, borné par
+    `max_delay`, avec ±`jitter` d'aléa pour étaler les requêtes.
+    Quand plusieurs snapshots d'un même dataset arrivent à échéance
+    ensemble, un seul appel à la liste des snapshots remplace les appels
+    individuels à /progress.
+    """
+
+    def __init__(self, session, api_key, initial_delay=5, max_delay=120, backoff=2.0,
+                 jitter=0.2, max_wait=3600, max_requests=None, min_request_interval=0.2,
+                 coalesce_window=1.0, base_url=None):
+        """
+        Args:
+            session: Session aiohttp
+            api_key (str): Clé API BrightData
+            initial_delay (float): Délai entre le déclenchement et la première vérification (s)
+            max_delay (float): Délai maximal entre deux vérifications (s)
+            backoff (float): Facteur multiplicatif du délai
+            jitter (float): Part aléatoire du délai (0.2 = ±20%)
+            max_wait (float): Abandon d'un snapshot au-delà de cette durée (s)
+            max_requests (int): Budget total de requêtes de statut (None = illimité)
+            min_request_interval (float): Espacement minimal entre deux requêtes (s)
+            coalesce_window (float): Vérifications avancées d'au plus cette durée
+                pour être groupées avec une échéance atteinte (s)
+            base_url (str): URL de base de l'API (défaut : api_base_url())
+        """
+        self.session = session
+        self.headers = {"Authorization": f"Bearer {api_key}"}
+        self.initial_delay = initial_delay
+        self.max_delay = max_delay
+        self.backoff = backoff
+        self.jitter = jitter
+        self.max_wait = max_wait
+        self.max_requests = max_requests
+        self.min_request_interval = min_request_interval
+        self.coalesce_window = coalesce_window
+        self.base_url = base_url or api_base_url()
+        
+        self.pending = {}        # snapshot_id -> infos de suivi
+        self._heap = []          # (échéance, snapshot_id)
+        self._last_request = 0.0
+        self.requests_sent = 0
+        self.batch_supported = True
+    
+    # ───────────────────────────────────────────────────────────────────
+    # Enregistrement
+    # ───────────────────────────────────────────────────────────────────
+
+    def add(self, city, snapshot_id, dataset_id=None, triggered_at=None):
+        """
+        Ajoute un snapshot à suivre.
+        
+        Un snapshot déclenché par lot est partagé par plusieurs villes : il
+        n'est suivi qu'une fois, pour toutes ses villes.
+        
+        Args:
+            city (str): Ville du snapshot
+            snapshot_id (str): ID du snapshot
+            dataset_id (str): ID du dataset (active les vérifications groupées)
+            triggered_at (str): Date ISO du déclenchement (filtre de la liste)
+        """
+        if snapshot_id in self.pending:
+            self.pending[snapshot_id]["cities"].append(city)
+            return
+        
+        now = time.monotonic()
+        self.pending[snapshot_id] = {
+            "cities": [city],
+            "dataset_id": dataset_id,
+            "triggered_at": triggered_at,
+            "added": now,
+            "polls": 0,
+            "delay": min(self.initial_delay * self.backoff, self.max_delay),
+            "status": "triggered",
+        }
+        
+        # Première vérification `initial_delay` après le déclenchement (tout de
+        # suite pour un snapshot repris, déclenché depuis plus longtemps)
+        first_delay = self.initial_delay * random.uniform(1 - self.jitter, 1 + self.jitter)
+        heapq.heappush(self._heap, (now + max(0.0, first_delay - self._age(triggered_at)), snapshot_id))
+    
+    @staticmethod
+    def _age(triggered_at):
+        """Ancienneté d'un déclenchement (s), 0 si la date est absente ou illisible."""
+        try:
+            return max(0.0, (datetime.now() - datetime.fromisoformat(triggered_at)).total_seconds())
+        except (TypeError, ValueError):
+            return 0.0
+
+    def _reschedule(self, snapshot_id):
+        """Replanifie la prochaine vérification (backoff exponentiel + jitter)."""
+        entry = self.pending[snapshot_id]
+        delay = entry["delay"] * random.uniform(1 - self.jitter, 1 + self.jitter)
+        entry["delay"] = min(entry["delay"] * self.backoff, self.max_delay)
+        heapq.heappush(self._heap, (time.monotonic() + delay, snapshot_id))
+    
+    # ───────────────────────────────────────────────────────────────────
+    # Requêtes de statut
+    # ───────────────────────────────────────────────────────────────────
+
+    def _budget_exhausted(self):
+        return self.max_requests is not None and self.requests_sent >= self.max_requests
+
+    async def _get_json(self, url, params=None):
+        """GET sur l'API en respectant l'espacement minimal entre requêtes."""
+        wait = self._last_request + self.min_request_interval - time.monotonic()
+        if wait > 0:
+            await asyncio.sleep(wait)
+        
+        self._last_request = time.monotonic()
+        self.requests_sent += 1
+        
+        async with self.session.get(url, headers=self.headers, params=params) as response:
+            if response.status not in (200, 202):
+                return response.status, None
+            return response.status, await response.json(content_type=None)
+
+    async def _check_one(self, snapshot_id):
+        """Statut d'un snapshot via /progress/{snapshot_id}."""
+        status_code, payload = await self._get_json(f"{self.base_url}/progress/{snapshot_id}")
+        
+        if status_code in (200, 202) and isinstance(payload, dict):
+            return {snapshot_id: payload.get("status")}
+        if status_code == 404:
+            # Snapshot inconnu ou expiré : inutile d'attendre max_wait
+            return {snapshot_id: "failed"}
+        return {}
+
+    async def _check_batch(self, dataset_id, snapshot_ids):
+        """Statuts de plusieurs snapshots en une requête (liste du dataset)."""
+        params = {"dataset_id": dataset_id}
+        
+        triggered = [self.pending[s]["triggered_at"] for s in snapshot_ids]
+        if all(triggered):
+            params["from_date"] = min(triggered)[:10]
+        
+        status_code, payload = await self._get_json(f"{self.base_url}/snapshots", params)
+        
+        if status_code != 200 or not isinstance(payload, list):
+            # Endpoint indisponible : repli sur /progress pour la suite
+            self.batch_supported = False
+            return {}
+        
+        wanted = set(snapshot_ids)
+        return {
+            item.get("id"): item.get("status")
+            for item in payload
+            if isinstance(item, dict) and item.get("id") in wanted
+        }
+    
+    # ───────────────────────────────────────────────────────────────────
+    # Boucle principale
+    # ───────────────────────────────────────────────────────────────────
+
+    def _pop_due(self):
+        """
+        Retire du tas tous les snapshots arrivés à échéance, et ceux dont
+        l'échéance tombe dans les `coalesce_window` secondes suivantes (une
+        seule vérification groupée plutôt que plusieurs appels rapprochés).
+        """
+        now = time.monotonic()
+        if not self._heap or self._heap[0][0] > now:
+            return []
+        
+        due = []
+        while self._heap and self._heap[0][0] <= now + self.coalesce_window:
+            _, snapshot_id = heapq.heappop(self._heap)
+            if snapshot_id in self.pending:
+                due.append(snapshot_id)
+        return due
+
+    def _finish(self, snapshot_id):
+        return self.pending.pop(snapshot_id)
+    
+    def _set_status(self, entry, status):
+        for city in entry["cities"]:
+            update_snapshot_status(city, status, 0)
+    
+    @staticmethod
+    def _label(entry, snapshot_id):
+        return entry["cities"][0] if len(entry["cities"]) == 1 else snapshot_id
+
+    async def _poll(self, due):
+        """Vérifie les snapshots arrivés à échéance et renvoie leurs statuts."""
+        statuses = {}
+        
+        # Regrouper par dataset pour les vérifications groupées
+        by_dataset = {}
+        for snapshot_id in due:
+            by_dataset.setdefault(self.pending[snapshot_id]["dataset_id"], []).append(snapshot_id)
+        
+        for dataset_id, snapshot_ids in by_dataset.items():
+            if self._budget_exhausted():
+                break
+            
+            if self.batch_supported and dataset_id and len(snapshot_ids) > 1:
+                try:
+                    statuses.update(await self._check_batch(dataset_id, snapshot_ids))
+                except Exception as e:
+                    print(f"⚠️  Liste des snapshots indisponible : {str(e)[:80]}")
+                    self.batch_supported = False
+            
+            # Snapshots absents de la liste (ou liste indisponible) : /progress
+            for snapshot_id in snapshot_ids:
+                if snapshot_id in statuses or self._budget_exhausted():
+                    continue
+                try:
+                    statuses.update(await self._check_one(snapshot_id))
+                except Exception as e:
+                    label = self._label(self.pending[snapshot_id], snapshot_id)
+                    print(f"⚠️  {label:20s} → Erreur: {str(e)[:80]}")
+        
+        return statuses
+
+    async def run(self, download_queue):
+        """
+        Suit les snapshots jusqu'à ce qu'ils soient tous prêts, en échec ou
+        abandonnés. Chaque snapshot prêt est placé immédiatement dans
+        `download_queue` sous la forme (villes, snapshot_id).
+        
+        Returns:
+            dict: Nombre de vérifications par snapshot_id
+        """
+        polls = {}
+        
+        while self.pending:
+            if self._budget_exhausted():
+                print(f"⚠️  Budget de {self.max_requests} requêtes atteint")
+                for snapshot_id in list(self.pending):
+                    entry = self._finish(snapshot_id)
+                    polls[snapshot_id] = entry["polls"]
+                    self._set_status(entry, "error")
+                break
+            
+            due = self._pop_due()
+            
+            if not due:
+                next_check = self._heap[0][0] if self._heap else time.monotonic()
+                await asyncio.sleep(max(0.0, next_check - time.monotonic()))
+                continue
+            
+            statuses = await self._poll(due)
+            
+            for snapshot_id in due:
+                entry = self.pending[snapshot_id]
+                entry["polls"] += 1
+                status = statuses.get(snapshot_id)
+                label = self._label(entry, snapshot_id)
+                elapsed = int(time.monotonic() - entry["added"])
+                
+                if status in READY_STATUSES:
+                    print(f"📦 {label:20s} → prêt (t.{entry['polls']:2d}, {elapsed:3d}s)")
+                    self._finish(snapshot_id)
+                    polls[snapshot_id] = entry["polls"]
+                    await download_queue.put((entry["cities"], snapshot_id))
+                
+                elif status in FAILED_STATUSES:
+                    print(f"❌ {label:20s} → Erreur API")
+                    self._finish(snapshot_id)
+                    polls[snapshot_id] = entry["polls"]
+                    self._set_status(entry, "error")
+                
+                elif time.monotonic() - entry["added"] >= self.max_wait:
+                    print(f"⚠️  {label:20s} → Timeout {self.max_wait}s")
+                    self._finish(snapshot_id)
+                    polls[snapshot_id] = entry["polls"]
+                    self._set_status(entry, "error")
+                
+                else:
+                    if status and status != entry["status"]:
+                        print(f"⏳ {label:20s} → {status} (t.{entry['polls']:2d}, {elapsed:3d}s)")
+                        entry["status"] = status
+                        self._set_status(entry, "running")
+                    self._reschedule(snapshot_id)
+        
+        return polls
@@ -0,0 +1,438 @@
+"""
+Historique des prix des hôtels (série temporelle)
+Toutes les offres de chaque scraping (type de chambre, occupation, durée,
+prix, conditions) ajoutées sans jamais être réécrites à un dataset Parquet
+partitionné par ville et date de scraping, et agrégats journaliers (prix
+par nuit min / médian / max par hôtel et par ville) tenus à jour dans SQLite :
+les tendances se lisent dans les agrégats, sans relire l'historique brut
+"""
+
+import math
+import os
+import re
+import sqlite3
+from datetime import date, datetime
+from urllib.parse import quote
+
+import pandas as pd
+import pyarrow as pa
+import pyarrow.dataset as ds
+
+from hotel_identity import hotel_uid
+from hotels_storage import COMPRESSION, PARTITIONING, _to_date
+from metrics import METRICS
+
+
+# ═══════════════════════════════════════════════════════════════════════
+# CONFIGURATION
+# ═══════════════════════════════════════════════════════════════════════
+
+PRICE_HISTORY_DATASET = 'data/raw/price_history_parquet'
+PRICE_HISTORY_DB = 'data/processed/price_history.db'
+
+# Une ligne par offre (chambre × conditions) d'un hôtel, à un instant donné
+PRICE_HISTORY_SCHEMA = pa.schema([
+    ('scraped_at', pa.timestamp('s')),
+    ('city', pa.string()),
+    ('hotel_id', pa.string()),
+    ('check_in', pa.date32()),
+    ('nights', pa.int16()),
+    ('adults', pa.int8()),
+    ('room_type', pa.string()),
+    ('offer_rank', pa.int16()),
+    ('price', pa.float32()),
+    ('initial_price', pa.float32()),
+    ('currency', pa.string()),
+    ('rooms_left', pa.int16()),
+    ('free_cancellation', pa.bool_()),
+    ('breakfast_included', pa.bool_()),
+    ('scrape_date', pa.date32()),
+])
+
+OFFER_COLUMNS = [name for name in PRICE_HISTORY_SCHEMA.names if name != 'scrape_date']
+
+# Agrégats journaliers (prix par nuit) ; price_batches : lots déjà intégrés
+# (un lot = un snapshot pour une ville), pour qu'un lot rejoué ne compte pas double
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS price_batches (
+    tag         TEXT NOT NULL,
+    city        TEXT NOT NULL,
+    num_offers  INTEGER NOT NULL,
+    ingested_at TEXT NOT NULL,
+    PRIMARY KEY (tag, city)
+);
+CREATE TABLE IF NOT EXISTS price_daily_hotel (
+    city         TEXT NOT NULL,
+    day          TEXT NOT NULL,
+    hotel_id     TEXT NOT NULL,
+    currency     TEXT NOT NULL,
+    num_offers   INTEGER NOT NULL,
+    min_price    REAL,
+    median_price REAL,
+    max_price    REAL,
+    PRIMARY KEY (city, day, hotel_id, currency)
+) WITHOUT ROWID;
+CREATE INDEX IF NOT EXISTS idx_daily_hotel ON price_daily_hotel(hotel_id, day);
+CREATE TABLE IF NOT EXISTS price_daily_city (
+    city         TEXT NOT NULL,
+    day          TEXT NOT NULL,
+    currency     TEXT NOT NULL,
+    num_hotels   INTEGER NOT NULL,
+    num_offers   INTEGER NOT NULL,
+    min_price    REAL,
+    median_price REAL,
+    max_price    REAL,
+    PRIMARY KEY (city, day, currency)
+) WITHOUT ROWID;
+"""
+
+_STATS = ['num_offers', 'min_price', 'median_price', 'max_price']
+
+
+def connect_price_history(db_path=PRICE_HISTORY_DB):
+    """Ouvre la base des agrégats (créée si besoin, en mode WAL)."""
+    os.makedirs(os.path.dirname(db_path) or '.', exist_ok=True)
+    
+    conn = sqlite3.connect(db_path, timeout=30, isolation_level=None)
+    conn.execute("PRAGMA journal_mode=WAL")
+    conn.execute("PRAGMA synchronous=NORMAL")
+    conn.executescript(_SCHEMA)
+    return conn
+
+
+# ═══════════════════════════════════════════════════════════════════════
+# EXTRACTION DES OFFRES
+# ═══════════════════════════════════════════════════════════════════════
+
+def _timestamp(value):
+    """Horodatage ISO de l'API (ex. 2025-11-11T18:34:48.315Z) → datetime (None si illisible)."""
+    try:
+        return datetime.fromisoformat(str(value)[:19])
+    except (TypeError, ValueError):
+        return None
+
+
+def _day(value):
+    try:
+        return date.fromisoformat(str(value)[:10])
+    except (TypeError, ValueError):
+        return None
+
+
+def _number(value):
+    if isinstance(value, bool) or not isinstance(value, (int, float)):
+        return None
+    return None if math.isnan(value) else value
+
+
+def offer_rows(hotel, city, scraped_at=None):
+    """
+    Toutes les offres d'un enregistrement brut de l'API (pricing[*].offers[*]).
+    
+    L'horodatage est celui de l'enregistrement (champ timestamp), à défaut
+    `scraped_at` ; le séjour vient de check_in / check_out (ou de l'input de
+    recherche). Les offres sans prix final sont ignorées.
+    
+    Returns:
+        list: Tuples dans l'ordre de OFFER_COLUMNS
+    """
+    if not isinstance(hotel, dict) or not hotel.get('url') or not hotel.get('pricing'):
+        return []
+    
+    search = hotel.get('input') if isinstance(hotel.get('input'), dict) else {}
+    check_in = _day(hotel.get('check_in') or search.get('check_in'))
+    check_out = _day(hotel.get('check_out') or search.get('check_out'))
+    stay = (check_out - check_in).days if check_in and check_out else None
+    scraped = _timestamp(hotel.get('timestamp')) or scraped_at
+    hotel_id = hotel_uid(hotel['url'])
+    
+    rows = []
+    try:
+        for room in hotel['pricing']:
+            room_type = room.get('room_type')
+            for offer in room.get('offers') or []:
+                price = offer.get('price') or {}
+                final_price = _number(price.get('final_price'))
+                if final_price is None:
+                    continue
+                
+                occupancy = offer.get('occupancy') or {}
+                policies = ' '.join(p for p in offer.get('policies') or [] if isinstance(p, str)).lower()
+                rows.append((
+                    scraped, city, hotel_id, check_in,
+                    _number(price.get('nights')) or stay,
+                    _number(occupancy.get('adults')) or _number(search.get('adults')),
+                    room_type, len(rows), final_price,
+                    _number(price.get('initial_price')),
+                    price.get('currency'),
+                    _number(offer.get('rooms_left')),
+                    'free cancellation' in policies,
+                    'breakfast included' in policies,
+                ))
+    except (AttributeError, TypeError):
+        pass  # Structure inattendue : offres lues jusque-là
+    
+    return rows
+
+
+def offers_frame(rows, scraped_at=None):
+    """DataFrame des offres (tuples de offer_rows) ; horodatage manquant : `scraped_at`."""
+    df = pd.DataFrame(rows, columns=OFFER_COLUMNS)
+    df['scraped_at'] = pd.to_datetime(df['scraped_at']).fillna(pd.Timestamp(scraped_at or datetime.now())).dt.floor('s')
+    return df
+
+
+# ═══════════════════════════════════════════════════════════════════════
+# AGRÉGATS JOURNALIERS
+# ═══════════════════════════════════════════════════════════════════════
+
+def partition_dir(root, city, day):
+    """Dossier d'une partition (ville, date) : valeurs encodées comme par pyarrow."""
+    return os.path.join(root, f"city={quote(city, safe='')}", f"scrape_date={day.isoformat()}")
+
+
+def daily_rollups(offers):
+    """
+    Prix par nuit min / médian / max d'une journée.
+    
+    Args:
+        offers (DataFrame): Offres d'une ville et d'une date (hotel_id,
+            currency, price, nights)
+    
+    Returns:
+        tuple: (agrégats par hôtel et devise, agrégats de la ville par devise)
+    """
+    offers = offers[offers['price'].notna()]
+    per_night = offers['price'].astype('float64') / offers['nights'].fillna(1).clip(lower=1)
+    offers = offers.assign(price=per_night, currency=offers['currency'].fillna(''))
+    
+    stats = {'num_offers': 'size', 'min_price': 'min', 'median_price': 'median', 'max_price': 'max'}
+    by_hotel = offers.groupby(['hotel_id', 'currency'])['price'].agg(**stats).reset_index()
+    by_city = offers.groupby('currency')['price'].agg(**stats)
+    by_city.insert(0, 'num_hotels', offers.groupby('currency')['hotel_id'].nunique())
+    return by_hotel, by_city.reset_index()
+
+
+def _refresh_day(conn, root, city, day):
+    """Recalcule les agrégats d'une ville et d'une date à partir de sa seule partition."""
+    directory = partition_dir(root, city, day)
+    columns = ['hotel_id', 'currency', 'price', 'nights']
+    offers = ds.dataset(directory, format='parquet').to_table(columns=columns).to_pandas()
+    by_hotel, by_city = daily_rollups(offers)
+    
+    key = (city, day.isoformat())
+    conn.execute("DELETE FROM price_daily_hotel WHERE city = ? AND day = ?", key)
+    conn.execute("DELETE FROM price_daily_city WHERE city = ? AND day = ?", key)
+    conn.executemany(
+        "INSERT INTO price_daily_hotel (city, day, hotel_id, currency, num_offers, min_price, median_price, "
+        "max_price) VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+        [key + row for row in by_hotel[['hotel_id', 'currency'] + _STATS].itertuples(index=False, name=None)],
+    )
+    conn.executemany(
+        "INSERT INTO price_daily_city (city, day, currency, num_hotels, num_offers, min_price, median_price, "
+        "max_price) VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+        [key + row for row in by_city[['currency', 'num_hotels'] + _STATS].itertuples(index=False, name=None)],
+    )
+
+
+# ═══════════════════════════════════════════════════════════════════════
+# AJOUT À L'HISTORIQUE
+# ═══════════════════════════════════════════════════════════════════════
+
+@METRICS.timed('price_history_append')
+def append_offers(offers, tag, root=PRICE_HISTORY_DATASET, db_path=PRICE_HISTORY_DB, compression=COMPRESSION):
+    """
+    Ajoute un lot d'offres à l'historique et met à jour ses agrégats.
+    
+    Chaque lot est écrit dans ses propres fichiers (`tag`, ex. l'ID du
+    snapshot) des partitions (ville, date) qu'il touche ; seules ces
+    partitions sont relues pour recalculer les agrégats, dans la même
+    transaction que l'enregistrement du lot. Un lot déjà intégré pour une
+    ville est ignoré.
+    
+    Args:
+        offers (DataFrame): Offres (colonnes OFFER_COLUMNS, voir offers_frame)
+        tag (str): Identifiant du lot
+        root (str): Racine du dataset Parquet
+        db_path (str): Base des agrégats
+    
+    Returns:
+        int: Nombre d'offres ajoutées
+    """
+    if offers is None or offers.empty:
+        return 0
+    
+    tag = re.sub(r'[^A-Za-z0-9_.-]', '_', str(tag))
+    conn = connect_price_history(db_path)
+    try:
+        done = {city for (city,) in conn.execute("SELECT city FROM price_batches WHERE tag = ?", (tag,))}
+        offers = offers[~offers['city'].isin(done)]
+        if offers.empty:
+            return 0
+        
+        offers = offers.assign(scrape_date=offers['scraped_at'].dt.date)
+        table = pa.Table.from_pandas(offers[PRICE_HISTORY_SCHEMA.names], schema=PRICE_HISTORY_SCHEMA,
+                                     preserve_index=False)
+        
+        # Fichiers d'abord (un lot rejoué après un crash réécrit les mêmes fichiers)
+        os.makedirs(root, exist_ok=True)
+        ds.write_dataset(
+            table,
+            root,
+            format='parquet',
+            partitioning=PARTITIONING,
+            existing_data_behavior='overwrite_or_ignore',
+            basename_template=f'{tag}-{{i}}.parquet',
+            file_options=ds.ParquetFileFormat().make_write_options(compression=compression),
+        )
+        
+        now = datetime.now().isoformat(timespec='seconds')
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            for city, day in offers[['city', 'scrape_date']].drop_duplicates().itertuples(index=False):
+                _refresh_day(conn, root, city, day)
+            conn.executemany(
+                "INSERT INTO price_batches (tag, city, num_offers, ingested_at) VALUES (?, ?, ?, ?)",
+                [(tag, city, int(count), now) for city, count in offers['city'].value_counts().items()],
+            )
+            conn.execute("COMMIT")
+        except Exception:
+            conn.execute("ROLLBACK")
+            raise
+    finally:
+        conn.close()
+    
+    METRICS.count('price_offers', len(offers))
+    return len(offers)
+
+
+def append_price_history(hotels_data, city, tag, scraped_at=None, root=PRICE_HISTORY_DATASET,
+                         db_path=PRICE_HISTORY_DB):
+    """
+    Ajoute toutes les offres d'enregistrements bruts d'une ville à l'historique.
+    
+    Returns:
+        int: Nombre d'offres ajoutées
+    """
+    rows = [row for hotel in hotels_data for row in offer_rows(hotel, city)]
+    if not rows:
+        return 0
+    
+    added = append_offers(offers_frame(rows, scraped_at), tag, root, db_path)
+    if added:
+        print(f"   📈 Historique des prix : {added} offre(s) ({city})")
+    return added
+
+
+def rebuild_rollups(root=PRICE_HISTORY_DATASET, db_path=PRICE_HISTORY_DB):
+    """
+    Recalcule tous les agrégats depuis l'historique brut (réparation, migration).
+    
+    Returns:
+        int: Nombre de partitions (ville, date) agrégées
+    """
+    if not os.path.exists(root):
+        return 0
+    
+    dataset = ds.dataset(root, format='parquet', partitioning=PARTITIONING)
+    keys = dataset.to_table(columns=['city', 'scrape_date']).to_pandas().drop_duplicates()
+    
+    conn = connect_price_history(db_path)
+    try:
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            conn.execute("DELETE FROM price_daily_hotel")
+            conn.execute("DELETE FROM price_daily_city")
+            for city, day in keys.itertuples(index=False):
+                _refresh_day(conn, root, city, _to_date(day))
+            conn.execute("COMMIT")
+        except Exception:
+            conn.execute("ROLLBACK")
+            raise
+    finally:
+        conn.close()
+    
+    return len(keys)
+
+
+# ═══════════════════════════════════════════════════════════════════════
+# LECTURE
+# ═══════════════════════════════════════════════════════════════════════
+
+def price_trend(level='city', cities=None, hotel_ids=None, date_from=None, date_to=None, currency=None,
+                db_path=PRICE_HISTORY_DB):
+    """
+    Tendance des prix par nuit, jour par jour, depuis les agrégats.
+    
+    Args:
+        level (str): 'city' (une ligne par ville et jour) ou 'hotel'
+        cities (list): Villes à garder
+        hotel_ids (list): Hôtels à garder (niveau 'hotel')
+        date_from, date_to (date|str): Bornes des dates de scraping (incluses)
+        currency (str): Devise à garder
+    
+    Returns:
+        DataFrame: city, day, [hotel_id,] currency, [num_hotels,] num_offers,
+                   min_price, median_price, max_price
+    """
+    if level not in ('city', 'hotel'):
+        raise ValueError(f"Niveau inconnu : {level} ('city' ou 'hotel')")
+    
+    conditions, params = [], []
+    if cities:
+        conditions.append(f"city IN ({', '.join('?' * len(cities))})")
+        params += list(cities)
+    if hotel_ids and level == 'hotel':
+        conditions.append(f"hotel_id IN ({', '.join('?' * len(hotel_ids))})")
+        params += list(hotel_ids)
+    if date_from:
+        conditions.append("day >= ?")
+        params.append(_to_date(date_from).isoformat())
+    if date_to:
+        conditions.append("day <= ?")
+        params.append(_to_date(date_to).isoformat())
+    if currency:
+        conditions.append("currency = ?")
+        params.append(currency)
+    
+    where = f"WHERE {' AND '.join(conditions)}" if conditions else ''
+    order = 'city, day, hotel_id, currency' if level == 'hotel' else 'city, day, currency'
+    query = f"SELECT * FROM price_daily_{level} {where} ORDER BY {order}"
+    
+    conn = connect_price_history(db_path)
+    try:
+        df = pd.read_sql_query(query, conn, params=params)
+    finally:
+        conn.close()
+    
+    df['day'] = pd.to_datetime(df['day'])
+    return df
+
+
+def load_price_history(root=PRICE_HISTORY_DATASET, columns=None, cities=None, date_from=None, date_to=None,
+                       hotel_ids=None):
+    """
+    Offres brutes de l'historique (seules les partitions utiles sont lues).
+    
+    Returns:
+        DataFrame: Colonnes de PRICE_HISTORY_SCHEMA (ou `columns`)
+    """
+    if not os.path.exists(root):
+        return pd.DataFrame(columns=columns or PRICE_HISTORY_SCHEMA.names)
+    
+    conditions = []
+    if cities:
+        conditions.append(ds.field('city').isin(list(cities)))
+    if date_from:
+        conditions.append(ds.field('scrape_date') >= pa.scalar(_to_date(date_from), pa.date32()))
+    if date_to:
+        conditions.append(ds.field('scrape_date') <= pa.scalar(_to_date(date_to), pa.date32()))
+    if hotel_ids:
+        conditions.append(ds.field('hotel_id').isin(list(hotel_ids)))
+    
+    expr = None
+    for condition in conditions:
+        expr = condition if expr is None else expr & condition
+    
+    dataset = ds.dataset(root, format='parquet', partitioning=PARTITIONING)
+    return dataset.to_table(columns=columns, filter=expr).to_pandas()
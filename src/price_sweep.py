@@ -0,0 +1,502 @@
+"""
+Balayage de prix : plages de dates × nombre de voyageurs
+Génère la grille des recherches (ville, arrivée, nuits, adultes), écarte les
+requêtes déjà couvertes, les déclenche par lots sous un budget d'appels API,
+puis range les prix récupérés dans une table longue compacte (Parquet) de
+clé (ville, hôtel, arrivée, nuits, adultes)
+
+Usage :
+    python src/price_sweep.py --from 2025-07-01 --to 2025-08-31 --nights 1 2 7 --adults 1 2 4
+    python src/price_sweep.py --fetch
+"""
+
+import aiohttp
+import argparse
+import asyncio
+import itertools
+from datetime import date, datetime, timedelta
+
+from http_client import BrightDataClient
+from incremental import DEFAULT_TTL_HOURS, REUSABLE_STATUSES, request_fingerprint
+from metrics import METRICS
+from snapshot_registry import SNAPSHOTS_DB, connect_registry
+from trigger_scraping import build_search_input, load_config, post_trigger
+
+# pandas (et les modules de STEP 2) sont importés à la demande : la
+# planification et le déclenchement n'en ont pas besoin
+
+
+# ═══════════════════════════════════════════════════════════════════════
+# CONFIGURATION
+# ═══════════════════════════════════════════════════════════════════════
+
+DEFAULT_NIGHTS = (1, 2, 3, 7)
+DEFAULT_ADULTS = (1, 2, 4)
+
+# Inputs de recherche par requête POST (un snapshot par lot)
+SWEEP_BATCH_SIZE = 50
+
+# Requêtes du balayage (dans la base du registre des snapshots) ;
+# statuts : pending → triggered → stored (ou error)
+_SWEEP_SCHEMA = """
+CREATE TABLE IF NOT EXISTS sweep_queries (
+    fingerprint TEXT PRIMARY KEY,
+    city        TEXT NOT NULL,
+    check_in    TEXT NOT NULL,
+    nights      INTEGER NOT NULL,
+    adults      INTEGER NOT NULL,
+    max_hotels  INTEGER NOT NULL,
+    status      TEXT NOT NULL,
+    snapshot_id TEXT,
+    dataset_id  TEXT,
+    num_prices  INTEGER,
+    updated_at  TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_sweep_status ON sweep_queries(status);
+CREATE INDEX IF NOT EXISTS idx_sweep_snapshot ON sweep_queries(snapshot_id);
+"""
+
+# Relevés encore valides (en cours ou déjà stockés) : pas de nouvelle requête
+COVERED_STATUSES = REUSABLE_STATUSES | {'stored'}
+
+
+def connect_sweep(db_path=SNAPSHOTS_DB):
+    """Ouvre la base du registre avec la table des requêtes du balayage."""
+    return connect_registry(db_path, schema=_SWEEP_SCHEMA)
+
+
+# ═══════════════════════════════════════════════════════════════════════
+# GRILLE DES RECHERCHES
+# ═══════════════════════════════════════════════════════════════════════
+
+def _as_date(value):
+    return value if isinstance(value, date) else date.fromisoformat(str(value)[:10])
+
+
+def sweep_grid(cities, check_in_from, check_in_to, nights=DEFAULT_NIGHTS, adults=DEFAULT_ADULTS,
+               step_days=1):
+    """
+    Produit cartésien villes × dates d'arrivée × nuits × adultes.
+    
+    Args:
+        cities (list): Villes
+        check_in_from, check_in_to (date|str): Première et dernière arrivée (incluses)
+        nights (list): Durées de séjour
+        adults (list): Nombres d'adultes (une chambre)
+        step_days (int): Pas entre deux dates d'arrivée
+    
+    Yields:
+        dict: Recherche {city, check_in, nights, adults}
+    """
+    start, end = _as_date(check_in_from), _as_date(check_in_to)
+    days = [start + timedelta(days=i) for i in range(0, (end - start).days + 1, step_days)]
+    
+    for city, check_in, n, a in itertools.product(cities, days, nights, adults):
+        yield {'city': city, 'check_in': check_in.isoformat(), 'nights': int(n), 'adults': int(a)}
+
+
+def query_input(query):
+    """Input de recherche Booking d'une requête du balayage."""
+    check_in = _as_date(query['check_in'])
+    return build_search_input(query['city'], check_in, check_in + timedelta(days=query['nights']),
+                              adults=query['adults'])
+
+
+def plan_sweep(queries, max_hotels=15, ttl_hours=DEFAULT_TTL_HOURS, db_path=SNAPSHOTS_DB):
+    """
+    Enregistre les requêtes à déclencher (statut 'pending').
+    
+    Les doublons de la grille et les requêtes déjà couvertes (même
+    empreinte, en cours ou stockée depuis moins de `ttl_hours`) sont
+    écartés ; les requêtes en erreur ou périmées sont replanifiées.
+    
+    Returns:
+        dict: Compteurs grid, duplicates, covered, pending
+    """
+    unique = {}
+    grid = 0
+    for query in queries:
+        grid += 1
+        unique.setdefault(request_fingerprint(query_input(query), max_hotels), query)
+    
+    now = datetime.now()
+    conn = connect_sweep(db_path)
+    try:
+        existing = {
+            fingerprint: (status, updated_at)
+            for fingerprint, status, updated_at in conn.execute(
+                "SELECT fingerprint, status, updated_at FROM sweep_queries"
+            )
+        }
+        
+        covered = 0
+        rows = []
+        for fingerprint, query in unique.items():
+            status, updated_at = existing.get(fingerprint, (None, None))
+            if status in COVERED_STATUSES and now - datetime.fromisoformat(updated_at) < timedelta(hours=ttl_hours):
+                covered += 1
+            elif status != 'pending':
+                rows.append((fingerprint, query['city'], query['check_in'], query['nights'],
+                             query['adults'], int(max_hotels), now.isoformat()))
+        
+        conn.execute("BEGIN IMMEDIATE")
+        conn.executemany(
+            """
+            INSERT INTO sweep_queries (fingerprint, city, check_in, nights, adults, max_hotels, status, updated_at)
+            VALUES (?, ?, ?, ?, ?, ?, 'pending', ?)
+            ON CONFLICT(fingerprint) DO UPDATE SET
+                status      = 'pending',
+                snapshot_id = NULL,
+                num_prices  = NULL,
+                updated_at  = excluded.updated_at
+            """,
+            rows,
+        )
+        conn.execute("COMMIT")
+        
+        pending = conn.execute("SELECT COUNT(*) FROM sweep_queries WHERE status = 'pending'").fetchone()[0]
+    except Exception:
+        if conn.in_transaction:
+            conn.execute("ROLLBACK")
+        raise
+    
+    return {'grid': grid, 'duplicates': grid - len(unique), 'covered': covered, 'pending': pending}
+
+
+def _set_status(db_path, fingerprints, status, **fields):
+    """Met à jour le statut (et des colonnes) d'un ensemble de requêtes."""
+    columns = ''.join(f", {name} = ?" for name in fields)
+    conn = connect_sweep(db_path)
+    try:
+        conn.execute("BEGIN IMMEDIATE")
+        conn.executemany(
+            f"UPDATE sweep_queries SET status = ?, updated_at = ?{columns} WHERE fingerprint = ?",
+            [(status, datetime.now().isoformat(), *fields.values(), fingerprint) for fingerprint in fingerprints],
+        )
+        conn.execute("COMMIT")
+    except Exception:
+        if conn.in_transaction:
+            conn.execute("ROLLBACK")
+        raise
+
+
+def _mark_stored(db_path, num_prices):
+    """Marque des requêtes comme stockées, avec leur nombre de prix ({empreinte: n})."""
+    conn = connect_sweep(db_path)
+    try:
+        conn.execute("BEGIN IMMEDIATE")
+        conn.executemany(
+            "UPDATE sweep_queries SET status = 'stored', updated_at = ?, num_prices = ? WHERE fingerprint = ?",
+            [(datetime.now().isoformat(), n, fingerprint) for fingerprint, n in num_prices.items()],
+        )
+        conn.execute("COMMIT")
+    except Exception:
+        if conn.in_transaction:
+            conn.execute("ROLLBACK")
+        raise
+
+
+# ═══════════════════════════════════════════════════════════════════════
+# DÉCLENCHEMENT PAR LOTS (BUDGET D'APPELS)
+# ═══════════════════════════════════════════════════════════════════════
+
+async def trigger_sweep(batch_size=SWEEP_BATCH_SIZE, max_requests=None, max_concurrency=10, rate_limit=5.0,
+                        max_retries=4, db_path=SNAPSHOTS_DB):
+    """
+    Déclenche les requêtes planifiées, `batch_size` inputs par POST.
+    
+    Les arrivées les plus proches partent en premier ; au-delà de
+    `max_requests` requêtes POST, le reste reste planifié pour l'appel
+    suivant.
+    
+    Returns:
+        dict: Compteurs requests, triggered, failed, remaining
+    """
+    print(f"\n{'='*80}")
+    print(f"📤 BALAYAGE DE PRIX : DÉCLENCHEMENT (POST)")
+    print(f"{'='*80}")
+    
+    conn = connect_sweep(db_path)
+    rows = conn.execute(
+        """
+        SELECT fingerprint, city, check_in, nights, adults, max_hotels FROM sweep_queries
+        WHERE status = 'pending' ORDER BY max_hotels, check_in, city, nights, adults
+        """
+    ).fetchall()
+    
+    # Lots de requêtes de même limite d'hôtels
+    batches = []
+    for max_hotels, group in itertools.groupby(rows, key=lambda row: row[5]):
+        group = list(group)
+        batches += [(max_hotels, group[i:i + batch_size]) for i in range(0, len(group), batch_size)]
+    
+    if max_requests is not None:
+        batches = batches[:max_requests]
+    
+    print(f"🔎 Requêtes planifiées : {len(rows)}")
+    print(f"📦 Lots à envoyer : {len(batches)} ({batch_size} inputs par POST)\n")
+    
+    if not batches:
+        return {'requests': 0, 'triggered': 0, 'failed': 0, 'remaining': len(rows)}
+    
+    api_key, dataset_id = load_config()
+
+    async def send(max_hotels, batch):
+        search_inputs = [
+            query_input({'city': city, 'check_in': check_in, 'nights': nights, 'adults': adults})
+            for _, city, check_in, nights, adults, _ in batch
+        ]
+        label = f"Lot de {len(batch)} recherches"
+        return batch, await post_trigger(client, search_inputs, max_hotels, api_key, dataset_id, label)
+    
+    timeout = aiohttp.ClientTimeout(total=60)
+    client = BrightDataClient(max_concurrency=max_concurrency, rate=rate_limit,
+                              max_retries=max_retries, timeout=timeout)
+    
+    triggered = failed = 0
+    async with client:
+        for next_result in asyncio.as_completed([send(*batch) for batch in batches]):
+            batch, snapshot_id = await next_result
+            fingerprints = [row[0] for row in batch]
+            if snapshot_id:
+                _set_status(db_path, fingerprints, 'triggered', snapshot_id=snapshot_id, dataset_id=dataset_id)
+                triggered += len(batch)
+            else:
+                failed += len(batch)
+    
+    client.print_report()
+    METRICS.count('sweep_queries_triggered', triggered)
+    
+    remaining = len(rows) - triggered
+    print(f"\n✅ Recherches déclenchées : {triggered} ({len(batches)} requêtes POST)")
+    if failed:
+        print(f"⚠️  Recherches non déclenchées (replanifiées) : {failed}")
+    if remaining:
+        print(f"⏸️  Recherches en attente du prochain budget : {remaining}")
+    
+    return {'requests': len(batches), 'triggered': triggered, 'failed': failed, 'remaining': remaining}
+
+
+# ═══════════════════════════════════════════════════════════════════════
+# RÉCUPÉRATION : TABLE LONGUE DES PRIX
+# ═══════════════════════════════════════════════════════════════════════
+
+def _query_key(location, check_in, check_out_or_nights, adults):
+    """Clé de rapprochement (ville, arrivée, nuits, adultes) d'une recherche."""
+    from fetch_results import normalize_location
+    
+    check_in = _as_date(check_in)
+    if isinstance(check_out_or_nights, int):
+        nights = check_out_or_nights
+    else:
+        nights = (_as_date(check_out_or_nights) - check_in).days
+    return normalize_location(location), check_in, nights, int(adults)
+
+
+def price_rows(hotels_data, queries, offers=None):
+    """
+    Relevés de prix d'un snapshot du balayage : une ligne par (hôtel, recherche).
+    
+    Chaque enregistrement est rattaché à sa recherche par l'input renvoyé
+    par l'API (ville, dates, adultes).
+    
+    Args:
+        hotels_data (list): Enregistrements bruts du snapshot
+        queries (list): Requêtes du snapshot {city, check_in, nights, adults}
+        offers (list): Si fourni, reçoit toutes les offres des enregistrements
+            rattachés (tuples de price_history.offer_rows)
+    
+    Returns:
+        DataFrame: Colonnes de PRICES_SCHEMA (sans scraped_at)
+    """
+    import pandas as pd
+    from fetch_results import _INVALID, _extract_price
+    from hotel_identity import hotel_uids
+    from price_history import offer_rows
+    
+    by_key = {_query_key(q['city'], q['check_in'], q['nights'], q['adults']): q for q in queries}
+    default = queries[0] if len(queries) == 1 else None
+    
+    rows = []
+    unmatched = 0
+    for hotel in hotels_data:
+        if not isinstance(hotel, dict) or not hotel.get('url'):
+            continue
+        
+        query = default
+        search_input = hotel.get('input') or hotel.get('discovery_input')
+        if isinstance(search_input, dict):
+            try:
+                key = _query_key(search_input['location'], search_input['check_in'],
+                                 search_input['check_out'], search_input.get('adults', 2))
+                query = by_key.get(key, default)
+            except (KeyError, TypeError, ValueError):
+                pass
+        
+        if query is None:
+            unmatched += 1
+            continue
+        
+        if offers is not None:
+            offers.extend(offer_rows(hotel, query['city']))
+        
+        price, currency = _extract_price(hotel.get('pricing', []))
+        rows.append((query['city'], hotel['url'], query['check_in'], query['nights'], query['adults'],
+                     None if price is _INVALID else price, currency))
+    
+    if unmatched:
+        print(f"   ⚠️  {unmatched} enregistrement(s) sans recherche reconnue")
+    
+    df = pd.DataFrame(rows, columns=['city', 'url', 'check_in', 'nights', 'adults', 'price', 'currency'])
+    df.insert(1, 'hotel_id', hotel_uids(df.pop('url')))
+    df['price'] = pd.to_numeric(df['price'], errors='coerce').astype('float32')
+    return df
+
+
+async def fetch_sweep_results(max_wait=3600, download_workers=4, max_concurrency=10, rate_limit=5.0,
+                              db_path=SNAPSHOTS_DB, price_history=True):
+    """
+    Récupère les snapshots du balayage et ajoute leurs prix à la table longue
+    (et, avec `price_history`, toutes leurs offres à l'historique des prix).
+    
+    Returns:
+        dict: Compteurs snapshots, stored, failed, prices
+    """
+    from fetch_results import batch_label, fetch_snapshot_results
+    from hotels_storage import PRICES_DATASET, write_prices_parquet
+    from poll_scheduler import PollScheduler
+    from price_history import append_offers, offers_frame
+    
+    print(f"\n{'='*80}")
+    print(f"📥 BALAYAGE DE PRIX : RÉCUPÉRATION (GET)")
+    print(f"{'='*80}")
+    
+    conn = connect_sweep(db_path)
+    rows = conn.execute(
+        """
+        SELECT fingerprint, city, check_in, nights, adults, snapshot_id, dataset_id, updated_at
+        FROM sweep_queries WHERE status = 'triggered' AND snapshot_id IS NOT NULL
+        """
+    ).fetchall()
+    
+    by_snapshot = {}
+    for fingerprint, city, check_in, nights, adults, snapshot_id, dataset_id, updated_at in rows:
+        by_snapshot.setdefault(snapshot_id, {'dataset_id': dataset_id, 'triggered_at': updated_at, 'queries': []})
+        by_snapshot[snapshot_id]['queries'].append({
+            'fingerprint': fingerprint, 'city': city, 'check_in': check_in, 'nights': nights, 'adults': adults,
+        })
+    
+    print(f"📊 {len(by_snapshot)} snapshot(s), {len(rows)} recherche(s)\n")
+    
+    stats = {'snapshots': len(by_snapshot), 'stored': 0, 'failed': 0, 'prices': 0}
+    if not by_snapshot:
+        return stats
+    
+    api_key, _ = load_config()
+    
+    timeout = aiohttp.ClientTimeout(total=None, connect=60, sock_read=60)
+    client = BrightDataClient(max_concurrency=max_concurrency, rate=rate_limit, timeout=timeout)
+    
+    async with client as session:
+        scheduler = PollScheduler(session, api_key, max_wait=max_wait)
+        for snapshot_id, info in by_snapshot.items():
+            scheduler.add(snapshot_id, snapshot_id, info['dataset_id'], info['triggered_at'])
+        
+        download_queue = asyncio.Queue()
+
+        async def download_worker():
+            while True:
+                item = await download_queue.get()
+                if item is None:
+                    return
+                _, snapshot_id = item
+                queries = by_snapshot.pop(snapshot_id)['queries']
+                fingerprints = [q['fingerprint'] for q in queries]
+                
+                hotels_data = await fetch_snapshot_results(session, batch_label(snapshot_id), snapshot_id, api_key,
+                                                           max_wait=60, check_interval=5, update_status=False)
+                if not isinstance(hotels_data, list):
+                    _set_status(db_path, fingerprints, 'error')
+                    stats['failed'] += len(queries)
+                    continue
+                
+                offers = [] if price_history else None
+                df = price_rows(hotels_data, queries, offers)
+                write_prices_parquet(df, snapshot_id)
+                if offers:
+                    append_offers(offers_frame(offers), snapshot_id)
+                
+                counts = df.groupby(['city', 'check_in', 'nights', 'adults']).size()
+                _mark_stored(db_path, {
+                    q['fingerprint']: int(counts.get((q['city'], q['check_in'], q['nights'], q['adults']), 0))
+                    for q in queries
+                })
+                stats['stored'] += len(queries)
+                stats['prices'] += len(df)
+        
+        workers = [asyncio.create_task(download_worker()) for _ in range(download_workers)]
+        await scheduler.run(download_queue)
+        for _ in workers:
+            download_queue.put_nowait(None)
+        await asyncio.gather(*workers)
+    
+    # Snapshots en échec ou abandonnés par l'ordonnanceur
+    for info in by_snapshot.values():
+        _set_status(db_path, [q['fingerprint'] for q in info['queries']], 'error')
+        stats['failed'] += len(info['queries'])
+    
+    client.print_report()
+    
+    print(f"\n✅ Recherches stockées : {stats['stored']} ({stats['prices']} prix) → {PRICES_DATASET}")
+    if stats['failed']:
+        print(f"⚠️  Recherches en erreur (replanifiées au prochain balayage) : {stats['failed']}")
+    
+    return stats
+
+
+# ═══════════════════════════════════════════════════════════════════════
+# POINT D'ENTRÉE
+# ═══════════════════════════════════════════════════════════════════════
+
+def main():
+    """Point d'entrée pour exécution standalone."""
+    parser = argparse.ArgumentParser(description=__doc__.split('\n')[1])
+    parser.add_argument('--cities', nargs='+', help="Villes (défaut : Top 5 des destinations)")
+    parser.add_argument('--from', dest='check_in_from', help="Première arrivée (défaut : J+30)")
+    parser.add_argument('--to', dest='check_in_to', help="Dernière arrivée (défaut : J+60)")
+    parser.add_argument('--step-days', type=int, default=1)
+    parser.add_argument('--nights', type=int, nargs='+', default=list(DEFAULT_NIGHTS))
+    parser.add_argument('--adults', type=int, nargs='+', default=list(DEFAULT_ADULTS))
+    parser.add_argument('--max-hotels', type=int, default=15)
+    parser.add_argument('--ttl-hours', type=float, default=DEFAULT_TTL_HOURS)
+    parser.add_argument('--batch-size', type=int, default=SWEEP_BATCH_SIZE)
+    parser.add_argument('--max-requests', type=int, help="Budget de requêtes POST de cet appel")
+    parser.add_argument('--rate-limit', type=float, default=5.0)
+    parser.add_argument('--fetch', action='store_true', help="Récupérer les snapshots déclenchés")
+    args = parser.parse_args()
+    
+    if args.fetch:
+        asyncio.run(fetch_sweep_results(rate_limit=args.rate_limit))
+        return
+    
+    cities = args.cities
+    if not cities:
+        import pandas as pd
+        cities = pd.read_csv('data/processed/top5_destinations.csv')['city'].tolist()
+    
+    today = date.today()
+    stats = plan_sweep(
+        sweep_grid(cities, args.check_in_from or today + timedelta(days=30),
+                   args.check_in_to or today + timedelta(days=60),
+                   args.nights, args.adults, args.step_days),
+        max_hotels=args.max_hotels, ttl_hours=args.ttl_hours,
+    )
+    print(f"🧮 Grille : {stats['grid']} recherches | doublons : {stats['duplicates']} | "
+          f"déjà couvertes : {stats['covered']} | à déclencher : {stats['pending']}")
+    
+    asyncio.run(trigger_sweep(batch_size=args.batch_size, max_requests=args.max_requests,
+                              rate_limit=args.rate_limit))
+
+
+if __name__ == "__main__":
+    main()
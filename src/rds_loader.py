@@ -0,0 +1,566 @@
+"""
+Chargement en masse des données dans PostgreSQL (RDS)
+Les DataFrames ou fichiers (CSV, Parquet) sont envoyés en flux par
+COPY FROM STDIN dans des tables de staging UNLOGGED, puis fusionnés en une
+seule requête ensembliste par table (upsert) ; connexions réutilisées via un
+pool, taille des lots configurable
+
+Usage :
+    python src/rds_loader.py                          # villes, hôtels, recommandations
+    python src/rds_loader.py --prices data/raw/prices_parquet
+    DATABASE_URL=postgresql://localhost/kayak python src/rds_loader.py --batch-size 200000
+"""
+
+import argparse
+import os
+import time
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+
+import pandas as pd
+import psycopg2
+import pyarrow as pa
+import pyarrow.csv as pacsv
+import pyarrow.dataset as ds
+from psycopg2.pool import ThreadedConnectionPool
+
+from metrics import METRICS
+from pipeline_config import load_env
+
+
+# ═══════════════════════════════════════════════════════════════════════
+# CONFIGURATION
+# ═══════════════════════════════════════════════════════════════════════
+
+# Lignes lues / converties en CSV à la fois (mémoire bornée pendant le COPY)
+DEFAULT_BATCH_SIZE = 100_000
+
+# Taille des blocs envoyés au serveur par COPY
+COPY_BUFFER_SIZE = 1 << 20
+
+# Mémoire de tri / hachage de la requête de fusion (SET LOCAL, transaction seulement)
+MERGE_WORK_MEM = '256MB'
+
+DEFAULT_SOURCES = {
+    'cities': 'data/processed/top5_destinations.csv',
+    'hotels': 'data/processed/final_recommendations.csv',
+    'recommendations': 'data/processed/final_recommendations.csv',
+}
+
+# Tables de staging : colonnes lues dans la source (même nom), dans l'ordre du COPY
+STAGING_COLUMNS = {
+    'cities': [
+        ('city', 'TEXT'),
+        ('latitude', 'DOUBLE PRECISION'),
+        ('longitude', 'DOUBLE PRECISION'),
+        ('avg_weather_score', 'DOUBLE PRECISION'),
+        ('temp_avg', 'DOUBLE PRECISION'),
+        ('rain', 'DOUBLE PRECISION'),
+        ('humidity', 'DOUBLE PRECISION'),
+        ('wind_speed', 'DOUBLE PRECISION'),
+        ('clouds', 'DOUBLE PRECISION'),
+    ],
+    'hotels': [
+        ('city', 'TEXT'),
+        ('hotel_name', 'TEXT'),
+        ('url', 'TEXT'),
+        ('property_type', 'TEXT'),
+        ('score', 'DOUBLE PRECISION'),
+        ('number_of_reviews', 'DOUBLE PRECISION'),
+        ('price', 'DOUBLE PRECISION'),
+        ('currency', 'TEXT'),
+        ('latitude', 'DOUBLE PRECISION'),
+        ('longitude', 'DOUBLE PRECISION'),
+        ('facilities', 'TEXT'),
+        ('image_url', 'TEXT'),
+    ],
+    'recommendations': [
+        ('city', 'TEXT'),
+        ('hotel_name', 'TEXT'),
+        ('rank', 'DOUBLE PRECISION'),
+        ('weather_score_norm', 'DOUBLE PRECISION'),
+        ('hotel_score_norm', 'DOUBLE PRECISION'),
+        ('price_score_norm', 'DOUBLE PRECISION'),
+        ('final_score', 'DOUBLE PRECISION'),
+    ],
+    'prices': [
+        ('city', 'TEXT'),
+        ('hotel_id', 'TEXT'),
+        ('check_in', 'DATE'),
+        ('nights', 'SMALLINT'),
+        ('adults', 'SMALLINT'),
+        ('price', 'DOUBLE PRECISION'),
+        ('currency', 'TEXT'),
+        ('scraped_at', 'TIMESTAMP'),
+    ],
+}
+
+# Tables dédupliquées sur leur clé : la dernière ligne de la source l'emporte (ordre `seq`)
+_ORDERED_STAGING = {'cities', 'hotels'}
+
+# Objets ajoutés au schéma du notebook 10 (idempotent)
+_LOADER_SCHEMA = """
+CREATE TABLE IF NOT EXISTS price_history (
+    city_id    INTEGER NOT NULL REFERENCES cities(city_id) ON DELETE CASCADE,
+    hotel_key  VARCHAR(64) NOT NULL,
+    check_in   DATE NOT NULL,
+    nights     SMALLINT NOT NULL,
+    adults     SMALLINT NOT NULL,
+    price      DECIMAL(10,2),
+    currency   VARCHAR(10),
+    scraped_at TIMESTAMP NOT NULL,
+    PRIMARY KEY (city_id, hotel_key, check_in, nights, adults, scraped_at)
+);
+CREATE INDEX IF NOT EXISTS idx_hotels_city_name ON hotels(city_id, hotel_name);
+"""
+
+# Fusions : une requête par table, qui renvoie (insérées, mises à jour, ignorées)
+_MERGE_SQL = {
+    'cities': """
+        WITH src AS (
+            SELECT DISTINCT ON (city) *
+            FROM stage_cities
+            WHERE city IS NOT NULL
+            ORDER BY city, seq DESC
+        ),
+        merged AS (
+            INSERT INTO cities (city_name, latitude, longitude, avg_weather_score,
+                                temp_avg, rain, humidity, wind_speed, clouds)
+            SELECT city, latitude, longitude, avg_weather_score,
+                   temp_avg, rain, humidity, wind_speed, clouds
+            FROM src
+            ON CONFLICT (city_name) DO UPDATE SET
+                latitude = EXCLUDED.latitude,
+                longitude = EXCLUDED.longitude,
+                avg_weather_score = EXCLUDED.avg_weather_score,
+                temp_avg = EXCLUDED.temp_avg,
+                rain = EXCLUDED.rain,
+                humidity = EXCLUDED.humidity,
+                wind_speed = EXCLUDED.wind_speed,
+                clouds = EXCLUDED.clouds
+            RETURNING (xmax = 0) AS inserted
+        )
+        SELECT count(*) FILTER (WHERE inserted),
+               count(*) FILTER (WHERE NOT inserted),
+               (SELECT count(*) FROM stage_cities WHERE city IS NULL)
+        FROM merged
+    """,
+    # Clé naturelle d'un hôtel : (ville, nom), comme le rapprochement des recommandations
+    'hotels': """
+        WITH src AS (
+            SELECT DISTINCT ON (c.city_id, s.hotel_name) c.city_id, s.*
+            FROM stage_hotels s
+            JOIN cities c ON c.city_name = s.city
+            WHERE s.hotel_name IS NOT NULL
+            ORDER BY c.city_id, s.hotel_name, s.seq DESC
+        ),
+        updated AS (
+            UPDATE hotels h SET
+                url = src.url,
+                property_type = src.property_type,
+                score = src.score,
+                number_of_reviews = src.number_of_reviews::INTEGER,
+                price = src.price,
+                currency = COALESCE(src.currency, 'EUR'),
+                latitude = src.latitude,
+                longitude = src.longitude,
+                facilities = src.facilities,
+                image_url = src.image_url
+            FROM src
+            WHERE h.city_id = src.city_id AND h.hotel_name = src.hotel_name
+            RETURNING h.city_id, h.hotel_name
+        ),
+        inserted AS (
+            INSERT INTO hotels (city_id, hotel_name, url, property_type, score,
+                                number_of_reviews, price, currency, latitude, longitude,
+                                facilities, image_url)
+            SELECT city_id, hotel_name, url, property_type, score,
+                   number_of_reviews::INTEGER, price, COALESCE(currency, 'EUR'), latitude, longitude,
+                   facilities, image_url
+            FROM src
+            WHERE NOT EXISTS (
+                SELECT 1 FROM updated u
+                WHERE u.city_id = src.city_id AND u.hotel_name = src.hotel_name
+            )
+            RETURNING 1
+        )
+        SELECT (SELECT count(*) FROM inserted),
+               (SELECT count(DISTINCT (city_id, hotel_name)) FROM updated),
+               (SELECT count(*) FROM stage_hotels s
+                WHERE s.hotel_name IS NULL
+                   OR NOT EXISTS (SELECT 1 FROM cities c WHERE c.city_name = s.city))
+    """,
+    # Classement complet : meilleur rang par hôtel, les hôtels absents sont retirés
+    'recommendations': """
+        WITH src AS (
+            SELECT DISTINCT ON (h.hotel_id) h.hotel_id, r.*
+            FROM stage_recommendations r
+            JOIN cities c ON c.city_name = r.city
+            JOIN hotels h ON h.city_id = c.city_id AND h.hotel_name = r.hotel_name
+            WHERE r.rank IS NOT NULL
+            ORDER BY h.hotel_id, r.rank
+        ),
+        removed AS (
+            DELETE FROM recommendations
+            WHERE hotel_id NOT IN (SELECT hotel_id FROM src)
+        ),
+        merged AS (
+            INSERT INTO recommendations (hotel_id, rank, weather_score_norm, hotel_score_norm,
+                                         price_score_norm, final_score)
+            SELECT hotel_id, rank::INTEGER, weather_score_norm, hotel_score_norm,
+                   price_score_norm, final_score
+            FROM src
+            ON CONFLICT (hotel_id) DO UPDATE SET
+                rank = EXCLUDED.rank,
+                weather_score_norm = EXCLUDED.weather_score_norm,
+                hotel_score_norm = EXCLUDED.hotel_score_norm,
+                price_score_norm = EXCLUDED.price_score_norm,
+                final_score = EXCLUDED.final_score
+            RETURNING (xmax = 0) AS inserted
+        )
+        SELECT count(*) FILTER (WHERE inserted),
+               count(*) FILTER (WHERE NOT inserted),
+               (SELECT count(*) FROM stage_recommendations) - count(*)
+        FROM merged
+    """,
+    # Historique : un relevé (clé + scraped_at) déjà présent n'est pas réécrit ;
+    # insertion dans l'ordre de la clé primaire (index alimenté séquentiellement)
+    'prices': """
+        WITH merged AS (
+            INSERT INTO price_history (city_id, hotel_key, check_in, nights, adults,
+                                       price, currency, scraped_at)
+            SELECT c.city_id, s.hotel_id, s.check_in, s.nights, s.adults,
+                   s.price, s.currency, COALESCE(s.scraped_at, now()::TIMESTAMP)
+            FROM stage_prices s
+            JOIN cities c ON c.city_name = s.city
+            WHERE s.hotel_id IS NOT NULL AND s.check_in IS NOT NULL
+            ORDER BY 1, 2, 3, 4, 5, 8
+            ON CONFLICT DO NOTHING
+            RETURNING 1
+        )
+        SELECT count(*),
+               0,
+               (SELECT count(*) FROM stage_prices s
+                WHERE s.hotel_id IS NULL OR s.check_in IS NULL
+                   OR NOT EXISTS (SELECT 1 FROM cities c WHERE c.city_name = s.city))
+        FROM merged
+    """,
+}
+
+
+def db_config():
+    """
+    Paramètres de connexion PostgreSQL.
+    
+    DATABASE_URL (ex. base locale de test) a priorité sur les variables
+    DB_HOST, DB_PORT, DB_NAME, DB_USER, DB_PASSWORD de config/.env.
+    
+    Returns:
+        str|dict: DSN ou paramètres de psycopg2.connect
+    """
+    env_path = load_env()
+    
+    if os.getenv('DATABASE_URL'):
+        return os.getenv('DATABASE_URL')
+    
+    if not os.getenv('DB_HOST'):
+        source = env_path or "l'environnement (aucun fichier .env trouvé)"
+        raise ValueError(f"❌ DATABASE_URL ou DB_HOST non trouvée dans {source}")
+    
+    return {
+        'host': os.getenv('DB_HOST'),
+        'port': int(os.getenv('DB_PORT', 5432)),
+        'database': os.getenv('DB_NAME', 'kayak'),
+        'user': os.getenv('DB_USER', 'postgres'),
+        'password': os.getenv('DB_PASSWORD'),
+    }
+
+
+# ═══════════════════════════════════════════════════════════════════════
+# LECTURE DES SOURCES
+# ═══════════════════════════════════════════════════════════════════════
+
+def iter_batches(source, batch_size=DEFAULT_BATCH_SIZE, columns=None):
+    """
+    Découpe une source en lots d'au plus `batch_size` lignes.
+    
+    Args:
+        source (DataFrame|str): DataFrame, fichier CSV, fichier ou dataset Parquet
+        batch_size (int): Lignes par lot
+        columns (list): Colonnes utiles (lecture Parquet limitée à celles-ci)
+    
+    Yields:
+        DataFrame ou RecordBatch Arrow (sources Parquet, sans passer par pandas)
+    """
+    if isinstance(source, pd.DataFrame):
+        for start in range(0, len(source), batch_size):
+            yield source.iloc[start:start + batch_size]
+        return
+    
+    path = str(source)
+    if path.endswith('.parquet') or os.path.isdir(path):
+        dataset = ds.dataset(path, format='parquet', partitioning='hive')
+        if columns:
+            columns = [name for name in columns if name in dataset.schema.names]
+        yield from dataset.to_batches(columns=columns, batch_size=batch_size)
+        return
+    
+    yield from pd.read_csv(path, chunksize=batch_size)
+
+
+def to_csv_bytes(batch, columns):
+    """
+    Encode un lot en CSV (sans en-tête) pour COPY, via l'écrivain CSV d'Arrow.
+    
+    Les colonnes absentes du lot sont envoyées à NULL (champ vide) ; les
+    colonnes catégorielles sont écrites par leurs valeurs.
+    """
+    if isinstance(batch, pd.DataFrame):
+        table = pa.Table.from_pandas(batch.reindex(columns=columns), preserve_index=False)
+    else:
+        table = pa.Table.from_batches([batch])
+    
+    arrays = []
+    for name in columns:
+        if name not in table.column_names:
+            arrays.append(pa.nulls(len(table)))
+            continue
+        column = table[name]
+        if pa.types.is_dictionary(column.type):
+            column = column.cast(column.type.value_type)
+        arrays.append(column)
+    
+    sink = pa.BufferOutputStream()
+    pacsv.write_csv(pa.table(arrays, names=columns), sink, pacsv.WriteOptions(include_header=False))
+    return sink.getvalue().to_pybytes()
+
+
+class CopyStream:
+    """
+    Fichier en lecture produisant le CSV des lots au fur et à mesure.
+    
+    COPY lit ce flux bloc par bloc : un seul lot est encodé en mémoire à
+    la fois.
+    """
+
+    def __init__(self, batches, columns):
+        self.columns = columns
+        self.rows = 0
+        self._batches = iter(batches)
+        self._chunk = b''
+        self._pos = 0
+
+    def _next_chunk(self):
+        for batch in self._batches:
+            if len(batch):
+                self.rows += len(batch)
+                return to_csv_bytes(batch, self.columns)
+        return None
+
+    def read(self, size=-1):
+        while self._pos >= len(self._chunk):
+            chunk = self._next_chunk()
+            if chunk is None:
+                return b''
+            self._chunk, self._pos = chunk, 0
+        
+        end = len(self._chunk) if size is None or size < 0 else self._pos + size
+        data = self._chunk[self._pos:end]
+        self._pos += len(data)
+        return data
+
+
+# ═══════════════════════════════════════════════════════════════════════
+# CHARGEUR
+# ═══════════════════════════════════════════════════════════════════════
+
+class RdsLoader:
+    """
+    Chargement COPY + fusion ensembliste, connexions partagées par un pool.
+    
+    Chaque chargement s'exécute dans une transaction : vidage de la table de
+    staging, COPY de la source, fusion dans la table cible, vidage. Une
+    erreur annule la transaction entière (la table cible est inchangée).
+    
+    Usage:
+        with RdsLoader(batch_size=200_000) as loader:
+            loader.ensure_schema()
+            loader.load('cities', cities_df)
+            loader.load('prices', 'data/raw/prices_parquet')
+    """
+
+    def __init__(self, dsn=None, batch_size=DEFAULT_BATCH_SIZE, minconn=1, maxconn=4):
+        """
+        Args:
+            dsn (str|dict): DSN ou paramètres de connexion (défaut : db_config())
+            batch_size (int): Lignes converties à la fois pendant le COPY
+            minconn, maxconn (int): Taille du pool de connexions
+        """
+        dsn = dsn or db_config()
+        self.batch_size = batch_size
+        self.maxconn = maxconn
+        
+        if isinstance(dsn, dict):
+            self.pool = ThreadedConnectionPool(minconn, maxconn, **dsn)
+        else:
+            self.pool = ThreadedConnectionPool(minconn, maxconn, dsn)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def close(self):
+        self.pool.closeall()
+
+    @contextmanager
+    def connection(self):
+        """Connexion du pool, validée en sortie (annulée sur erreur)."""
+        conn = self.pool.getconn()
+        try:
+            yield conn
+            conn.commit()
+        except Exception:
+            conn.rollback()
+            raise
+        finally:
+            self.pool.putconn(conn)
+
+    def ensure_schema(self):
+        """Crée la table price_history, l'index de fusion des hôtels et les tables de staging."""
+        statements = [_LOADER_SCHEMA]
+        for target, columns in STAGING_COLUMNS.items():
+            definition = [f"{name} {sql_type}" for name, sql_type in columns]
+            if target in _ORDERED_STAGING:
+                definition.append("seq BIGSERIAL")
+            statements.append(f"CREATE UNLOGGED TABLE IF NOT EXISTS stage_{target} ({', '.join(definition)});")
+        
+        with self.connection() as conn, conn.cursor() as cursor:
+            cursor.execute('\n'.join(statements))
+    
+    # ───────────────────────────────────────────────────────────────────
+    # Chargement
+    # ───────────────────────────────────────────────────────────────────
+
+    def copy(self, cursor, table, source, columns):
+        """COPY FROM STDIN d'une source dans une table ; renvoie le nombre de lignes."""
+        stream = CopyStream(iter_batches(source, self.batch_size, columns), columns)
+        cursor.copy_expert(
+            f"COPY {table} ({', '.join(columns)}) FROM STDIN WITH (FORMAT csv)",
+            stream,
+            size=COPY_BUFFER_SIZE,
+        )
+        return stream.rows
+
+    def load(self, target, source):
+        """
+        Charge une source dans une table cible (cities, hotels, recommendations, prices).
+        
+        Args:
+            target (str): Clé de STAGING_COLUMNS
+            source (DataFrame|str): DataFrame ou chemin (CSV, Parquet)
+        
+        Returns:
+            dict: staged, inserted, updated, skipped, copy_seconds, merge_seconds
+        """
+        staging = f"stage_{target}"
+        columns = [name for name, _ in STAGING_COLUMNS[target]]
+        
+        with self.connection() as conn, conn.cursor() as cursor:
+            cursor.execute(f"TRUNCATE {staging} RESTART IDENTITY")
+            
+            start = time.perf_counter()
+            with METRICS.timer('rds_copy', table=target):
+                staged = self.copy(cursor, staging, source, columns)
+            copy_seconds = time.perf_counter() - start
+            
+            start = time.perf_counter()
+            with METRICS.timer('rds_merge', table=target):
+                cursor.execute(f"SET LOCAL work_mem = '{MERGE_WORK_MEM}'")
+                cursor.execute(f"ANALYZE {staging}")
+                cursor.execute(_MERGE_SQL[target])
+                inserted, updated, skipped = cursor.fetchone()
+                cursor.execute(f"TRUNCATE {staging}")
+            merge_seconds = time.perf_counter() - start
+        
+        METRICS.count('rds_rows', staged, table=target)
+        
+        stats = {
+            'staged': staged,
+            'inserted': inserted,
+            'updated': updated,
+            'skipped': skipped,
+            'copy_seconds': copy_seconds,
+            'merge_seconds': merge_seconds,
+        }
+        print(f"   • {target:16s} {staged:>10,} lignes | +{inserted:,} insérées | "
+              f"{updated:,} mises à jour | {skipped:,} ignorées | "
+              f"COPY {copy_seconds:.2f}s | fusion {merge_seconds:.2f}s")
+        return stats
+
+    def load_all(self, cities=None, hotels=None, recommendations=None, prices=None):
+        """
+        Charge les sources fournies dans l'ordre des clés étrangères.
+        
+        Villes d'abord ; hôtels et prix ensuite, en parallèle sur deux
+        connexions du pool ; recommandations en dernier.
+        
+        Returns:
+            dict: Statistiques de chaque table chargée
+        """
+        stats = {}
+        if cities is not None:
+            stats['cities'] = self.load('cities', cities)
+        
+        parallel = {target: source for target, source in [('hotels', hotels), ('prices', prices)]
+                    if source is not None}
+        with ThreadPoolExecutor(max_workers=max(1, min(len(parallel), self.maxconn))) as executor:
+            futures = {target: executor.submit(self.load, target, source) for target, source in parallel.items()}
+            stats.update({target: future.result() for target, future in futures.items()})
+        
+        if recommendations is not None:
+            stats['recommendations'] = self.load('recommendations', recommendations)
+        
+        return stats
+
+
+# ═══════════════════════════════════════════════════════════════════════
+# POINT D'ENTRÉE
+# ═══════════════════════════════════════════════════════════════════════
+
+def main():
+    """Point d'entrée pour exécution standalone."""
+    parser = argparse.ArgumentParser(description=__doc__.split('\n')[1])
+    parser.add_argument('--cities', default=DEFAULT_SOURCES['cities'])
+    parser.add_argument('--hotels', default=DEFAULT_SOURCES['hotels'])
+    parser.add_argument('--recommendations', default=DEFAULT_SOURCES['recommendations'])
+    parser.add_argument('--prices', help="Historique des prix (ex. data/raw/prices_parquet)")
+    parser.add_argument('--batch-size', type=int, default=DEFAULT_BATCH_SIZE)
+    parser.add_argument('--max-connections', type=int, default=4)
+    args = parser.parse_args()
+    
+    print(f"\n{'='*80}")
+    print(f"🗄️  IMPORT RDS (COPY + fusion)")
+    print(f"{'='*80}\n")
+    
+    start = time.perf_counter()
+    try:
+        with RdsLoader(batch_size=args.batch_size, maxconn=args.max_connections) as loader:
+            loader.ensure_schema()
+            stats = loader.load_all(
+                cities=args.cities,
+                hotels=args.hotels,
+                recommendations=args.recommendations,
+                prices=args.prices,
+            )
+    except psycopg2.Error as e:
+        print(f"❌ Erreur lors de l'import : {e}")
+        raise SystemExit(1)
+    
+    total = sum(s['staged'] for s in stats.values())
+    print(f"\n✅ {total:,} lignes chargées en {time.perf_counter() - start:.1f}s")
+
+
+if __name__ == "__main__":
+    main()
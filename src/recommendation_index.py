@@ -0,0 +1,309 @@
+"""
+Index de recommandations d'hôtels (top-k à la demande)
+Composantes du score final du notebook 06 (météo, qualité, prix) précalculées
+dans des tableaux compacts et triées par ville : top-k avec pondérations
+personnalisées, prix maximum, note minimum et filtre de villes, sans
+recalculer ni retrier tout le DataFrame
+"""
+
+import numpy as np
+import pandas as pd
+
+from weather_scoring import top_k
+
+
+# ═══════════════════════════════════════════════════════════════════════
+# CONFIGURATION
+# ═══════════════════════════════════════════════════════════════════════
+
+# Score final : 40% météo, 40% qualité, 20% prix (notebook 06)
+DEFAULT_WEIGHTS = {'weather': 0.40, 'quality': 0.40, 'price': 0.20}
+
+# Composante → (colonne source, plus grand = meilleur, colonne normalisée)
+COMPONENTS = {
+    'weather': ('avg_weather_score', True, 'weather_score_norm'),
+    'quality': ('score', True, 'hotel_score_norm'),
+    'price': ('price', False, 'price_score_norm'),
+}
+
+# Profondeur de l'index : nombre maximum de recommandations servies
+# depuis les candidats précalculés (au-delà : évaluation de toute la ville)
+DEFAULT_DEPTH = 100
+
+# Taille des blocs de la construction des candidats
+SKYBAND_CHUNK = 2048
+
+
+# ═══════════════════════════════════════════════════════════════════════
+# SCORE FINAL
+# ═══════════════════════════════════════════════════════════════════════
+
+def normalize_score(series, higher_is_better=True):
+    """Normalise une série sur 0-10 (5 partout si elle est constante)."""
+    if series.isna().all():
+        return series
+    
+    min_val = series.min()
+    max_val = series.max()
+    
+    if min_val == max_val:
+        return pd.Series([5.0] * len(series), index=series.index)
+    
+    if higher_is_better:
+        return 10 * (series - min_val) / (max_val - min_val)
+    else:
+        return 10 * (max_val - series) / (max_val - min_val)
+
+
+def score_components(hotels):
+    """Composantes normalisées (0-10) du score final, colonnes du notebook 06."""
+    return pd.DataFrame({
+        norm_col: normalize_score(hotels[col], higher_is_better=higher)
+        for col, higher, norm_col in COMPONENTS.values()
+    }, index=hotels.index)
+
+
+def check_weights(weights):
+    """Pondérations complètes (composantes absentes : 0) ; négatives refusées."""
+    weights = dict(DEFAULT_WEIGHTS if weights is None else weights)
+    unknown = set(weights) - set(COMPONENTS)
+    if unknown:
+        raise ValueError(f"Composantes inconnues : {sorted(unknown)} (attendues : {list(COMPONENTS)})")
+    if any(w < 0 for w in weights.values()):
+        raise ValueError("Les pondérations doivent être positives ou nulles")
+    return {name: float(weights.get(name, 0.0)) for name in COMPONENTS}
+
+
+def final_scores(components, weights=None):
+    """Score final pondéré à partir de `score_components`."""
+    weights = check_weights(weights)
+    return sum(weights[name] * components[norm_col] for name, (_, _, norm_col) in COMPONENTS.items())
+
+
+def skyband(values, depth, chunk=SKYBAND_CHUNK):
+    """
+    Lignes de `values` dominées par moins de `depth` autres lignes.
+    
+    Une ligne en domine une autre si elle est au moins aussi bonne sur les
+    trois composantes (plus grand = meilleur), les ex-aequo complets étant
+    départagés par position. Avec des pondérations positives, un hôtel
+    dominant a un score au moins égal : les k meilleurs (k <= depth) de
+    toute requête sont dans cette bande. Un hôtel qui en domine un autre est
+    aussi moins cher et mieux noté : la propriété tient avec les filtres de
+    prix maximum et de note minimum.
+    
+    Parcours par météo décroissante puis note décroissante : les lignes
+    dominantes sont toujours vues avant. Dans un groupe de même météo, les
+    dominantes sont les lignes précédentes de 3e composante supérieure ou
+    égale (comptées par blocs) ; dans les groupes précédents, il suffit de
+    compter les lignes déjà retenues.
+    
+    Args:
+        values (ndarray): Composantes (n, 3), plus grand = meilleur
+        depth (int): Nombre maximum de lignes dominantes
+        chunk (int): Taille des blocs
+    
+    Returns:
+        ndarray: Positions (triées) des lignes de la bande
+    """
+    n = len(values)
+    order = np.lexsort((np.arange(n), -values[:, 2], -values[:, 1], -values[:, 0]))
+    first, second, third = values[order].T
+    
+    starts = np.flatnonzero(np.r_[True, first[1:] != first[:-1]])
+    ends = np.r_[starts[1:], n]
+    
+    kept = [np.array([], dtype='int64')]
+    kept_second = kept_third = np.array([], dtype=values.dtype)
+    for start, end in zip(starts, ends):
+        group_second, group_third = second[start:end], third[start:end]
+        top = np.array([], dtype=values.dtype)  # `depth` plus grandes valeurs déjà vues (croissantes)
+        group_kept = []
+        
+        for lo in range(0, end - start, chunk):
+            block = group_third[lo:lo + chunk]
+            
+            # Blocs précédents du groupe
+            counts = len(top) - np.searchsorted(top, block, side='left')
+            rows = np.flatnonzero(counts < depth)
+            
+            # Lignes précédentes du bloc
+            earlier = np.arange(len(block))[None, :] < rows[:, None]
+            counts = counts[rows] + (earlier & (block[None, :] >= block[rows, None])).sum(axis=1)
+            rows, counts = rows[counts < depth], counts[counts < depth]
+            
+            # Groupes précédents (météo meilleure) : lignes retenues uniquement
+            if len(rows) and len(kept_second):
+                counts += ((kept_second[None, :] >= group_second[lo + rows, None])
+                           & (kept_third[None, :] >= block[rows, None])).sum(axis=1)
+                rows = rows[counts < depth]
+            
+            group_kept.append(start + lo + rows)
+            top = np.sort(np.concatenate([top, block]))[-depth:]
+        
+        group_kept = np.concatenate(group_kept)
+        kept.append(group_kept)
+        kept_second = np.concatenate([kept_second, second[group_kept]])
+        kept_third = np.concatenate([kept_third, third[group_kept]])
+    
+    return np.sort(order[np.concatenate(kept)])
+
+
+# ═══════════════════════════════════════════════════════════════════════
+# INDEX
+# ═══════════════════════════════════════════════════════════════════════
+
+class RecommendationIndex:
+    """
+    Index de recommandations en mémoire.
+    
+    Construction (une fois) : composantes normalisées en float32, prix et
+    notes en float32, positions des hôtels par ville, et pour chaque ville
+    (et toutes villes confondues) les seuls hôtels qui peuvent entrer dans
+    un top-`depth` (voir `skyband`) : quelques milliers au plus.
+    
+    Requête : filtres et score final sur ces candidats uniquement, puis
+    sélection des k meilleurs (argpartition). Au-delà de `depth`
+    recommandations, tous les hôtels des villes demandées sont évalués.
+    
+    Une pondération nulle rend la composante indifférente : un hôtel qui
+    n'est meilleur que sur elle est ex-aequo et ne doit pas en écarter un
+    autre mieux placé. Les candidats sont donc calculés pour l'ensemble des
+    composantes de pondération positive de la requête (à la première
+    requête qui l'utilise, puis gardés en cache). Un filtre de prix ou de
+    note sur une composante de pondération nulle n'est plus garanti par ces
+    candidats : les hôtels des villes demandées sont alors tous évalués.
+    
+    Les hôtels sans score météo, note ou prix ne sont pas indexés (comme
+    `complete_data` dans le notebook 06).
+    
+    Usage:
+        index = RecommendationIndex(hotels_with_weather)
+        index.top_k(10, weights={'weather': 0.6, 'price': 0.4}, max_price=200, cities=['Cassis'])
+    """
+
+    def __init__(self, hotels, city_col='city', depth=DEFAULT_DEPTH):
+        components = score_components(hotels)
+        complete = components.notna().all(axis=1).to_numpy()
+        
+        self.hotels = hotels.iloc[np.flatnonzero(complete)].reset_index(drop=True)
+        self.components = {
+            name: components[norm_col].to_numpy(dtype='float32')[complete]
+            for name, (_, _, norm_col) in COMPONENTS.items()
+        }
+        self.price = self.hotels[COMPONENTS['price'][0]].to_numpy(dtype='float32')
+        self.review = self.hotels[COMPONENTS['quality'][0]].to_numpy(dtype='float32')
+        
+        codes, self.cities = pd.factorize(self.hotels[city_col], sort=True)
+        self.city_codes = codes.astype('int16' if len(self.cities) < 2**15 else 'int32')
+        self.city_lookup = {city: code for code, city in enumerate(self.cities)}
+        
+        self.depth = depth
+        self.positions = self._city_positions()
+        self._candidates = {}
+        self.candidates = self.candidates_for(tuple(COMPONENTS))
+
+    def __len__(self):
+        return len(self.hotels)
+
+    def _city_positions(self):
+        """Positions des hôtels par ville (clé None : toutes les villes)."""
+        # Tri stable : positions croissantes ; code -1 : sans ville
+        order = np.argsort(self.city_codes, kind='stable').astype('int32')
+        codes, starts = np.unique(self.city_codes[order], return_index=True)
+        positions = {code: chunk for code, chunk in zip(codes.tolist(), np.split(order, starts[1:]))}
+        positions[None] = np.arange(len(self.hotels), dtype='int32')
+        return positions
+
+    def candidates_for(self, support):
+        """
+        Candidats par ville (clé None : toutes les villes) pour les requêtes
+        dont les composantes de pondération positive sont `support`.
+        
+        Les autres composantes sont remplacées par une constante : la
+        dominance ne porte que sur `support`, les ex-aequo étant départagés
+        par position.
+        """
+        if support not in self._candidates:
+            zeros = np.zeros(len(self.hotels), dtype='float32')
+            values = np.column_stack([self.components[name] if name in support else zeros
+                                      for name in COMPONENTS])
+            candidates = {code: pos[skyband(values[pos], self.depth)]
+                          for code, pos in self.positions.items() if code is not None}
+            
+            # Toutes villes : le top-k global est dans l'union des candidats par ville
+            union = np.sort(np.concatenate([np.array([], dtype='int32')] + list(candidates.values())))
+            candidates[None] = union[skyband(values[union], self.depth)]
+            self._candidates[support] = candidates
+        return self._candidates[support]
+    
+    # ───────────────────────────────────────────────────────────────────
+    # Requêtes
+    # ───────────────────────────────────────────────────────────────────
+
+    def scores(self, positions, weights):
+        """Scores finaux des hôtels `positions` (pondérations déjà vérifiées)."""
+        total = np.zeros(len(positions), dtype='float32')
+        for name, weight in weights.items():
+            if weight:
+                total += np.float32(weight) * self.components[name][positions]
+        return total
+
+    def _candidates_ok(self, positions, max_price, min_score):
+        ok = np.ones(len(positions), dtype=bool)
+        if max_price is not None:
+            ok &= self.price[positions] <= max_price
+        if min_score is not None:
+            ok &= self.review[positions] >= min_score
+        return ok
+
+    def query(self, k=10, weights=None, max_price=None, min_score=None, cities=None):
+        """
+        Top-k brut : positions (dans `self.hotels`) et scores finaux.
+        
+        Les ex-aequo sont départagés par position, comme un tri stable de
+        tous les hôtels (pondérations nulles comprises).
+        
+        Args:
+            k (int): Nombre de recommandations
+            weights (dict): Pondérations {'weather', 'quality', 'price'} (défaut : 40/40/20)
+            max_price (float): Prix maximum
+            min_score (float): Note minimum de l'hôtel
+            cities (list): Villes retenues (défaut : toutes)
+        
+        Returns:
+            tuple: (positions, scores) du meilleur au moins bon
+        """
+        weights = check_weights(weights)
+        support = tuple(name for name, weight in weights.items() if weight > 0)
+        
+        # Filtre sur une composante ignorée : candidats non valables, balayage
+        filtered = {'price': max_price is not None, 'quality': min_score is not None}
+        if k <= self.depth and not any(filtered.get(name) for name in set(COMPONENTS) - set(support)):
+            source = self.candidates_for(support)
+        else:
+            source = self.positions
+        
+        if cities is None:
+            positions = source[None]
+        else:
+            codes = sorted({self.city_lookup[city] for city in cities if city in self.city_lookup})
+            positions = np.sort(np.concatenate([np.array([], dtype='int32')] + [source[code] for code in codes]))
+        
+        positions = positions[self._candidates_ok(positions, max_price, min_score)]
+        scores = self.scores(positions, weights)
+        best = top_k(scores, k)
+        return positions[best], scores[best]
+
+    def top_k(self, k=10, weights=None, max_price=None, min_score=None, cities=None):
+        """
+        Top-k des recommandations (voir `query`).
+        
+        Returns:
+            DataFrame: Hôtels recommandés avec final_score et rank
+        """
+        positions, scores = self.query(k, weights, max_price, min_score, cities)
+        result = self.hotels.iloc[positions].copy()
+        result['final_score'] = scores.astype('float64')
+        result['rank'] = range(1, len(result) + 1)
+        return result.reset_index(drop=True)
@@ -0,0 +1,893 @@
+"""
+Construction incrémentale des livrables du rapport (cartes, dashboard, rapport HTML)
+Graphe de dépendances des livrables : chaque livrable n'est rendu à nouveau
+que si l'empreinte de ses entrées (lignes et colonnes des recommandations
+qu'il affiche, code de rendu, livrables dont il dépend) a changé ; les
+livrables indépendants sont rendus en parallèle, et la carte de tous les
+hôtels regroupe les points dans le navigateur (clusters) à partir d'un
+tableau compact au lieu d'un marqueur HTML par hôtel
+
+Usage :
+    python src/report_build.py
+    python src/report_build.py --force
+    python src/report_build.py --only carte_top20 --workers 0
+"""
+
+import argparse
+import hashlib
+import json
+import multiprocessing
+import os
+import time
+from concurrent.futures import FIRST_COMPLETED, wait
+from datetime import datetime
+
+import numpy as np
+import pandas as pd
+
+from metrics import METRICS
+from pipeline_run import atomic_write
+
+
+# ═══════════════════════════════════════════════════════════════════════
+# CONFIGURATION
+# ═══════════════════════════════════════════════════════════════════════
+
+RECOMMENDATIONS = 'data/processed/final_recommendations.csv'
+OUTPUT_DIR = 'data/processed'
+REPORT_MANIFEST = 'report_manifest.json'  # Dans OUTPUT_DIR
+
+# Rendus simultanés (processus) : cartes et dashboard sont indépendants ;
+# sur un seul cœur, le pool n'ajouterait que le démarrage des processus
+BUILD_WORKERS = min(3, os.cpu_count() or 1) if (os.cpu_count() or 1) > 1 else 0
+
+# Couleur des marqueurs selon le score final (seuil minimal, couleur)
+SCORE_COLORS = [(8, 'darkgreen'), (7, 'green'), (6, 'lightgreen'), (5, 'orange'), (-np.inf, 'red')]
+
+BOOKING_PREFIX = 'https://www.booking.com/hotel/'
+
+# Nuages de points du dashboard : au-delà, échantillon fixe (même image pour
+# les mêmes données, et un tracé qui ne croît plus avec le nombre d'hôtels)
+SCATTER_MAX_POINTS = 20_000
+
+# Colonnes affichées par livrable (empreintes calculées sur ces seules colonnes)
+MAP_COLUMNS = ['latitude', 'longitude', 'hotel_name', 'city', 'score', 'number_of_reviews', 'price',
+               'currency', 'avg_weather_score', 'final_score', 'rank', 'url']
+TOP20_COLUMNS = MAP_COLUMNS + ['temp_avg']
+DASHBOARD_COLUMNS = ['city', 'final_score', 'score', 'price', 'avg_weather_score', 'number_of_reviews',
+                     'property_type']
+TOP5_COLUMNS = ['rank', 'hotel_name', 'city', 'score', 'number_of_reviews', 'price', 'currency',
+                'avg_weather_score', 'final_score', 'url']
+
+
+def get_color(score):
+    """Couleur de marqueur selon le score final."""
+    for threshold, color in SCORE_COLORS:
+        if score >= threshold:
+            return color
+    return SCORE_COLORS[-1][1]
+
+
+def with_gps(recommendations):
+    return recommendations[recommendations['latitude'].notna() & recommendations['longitude'].notna()]
+
+
+def map_center(hotels):
+    """Centre des cartes (arrondi à ~100 m : un hôtel ajouté ne déplace pas la carte)."""
+    return [round(float(hotels['latitude'].mean()), 3), round(float(hotels['longitude'].mean()), 3)]
+
+
+# ═══════════════════════════════════════════════════════════════════════
+# CARTES
+# ═══════════════════════════════════════════════════════════════════════
+
+LEGEND_HTML = '''
+<div style="position: fixed;
+     bottom: 50px; right: 50px; width: 200px; height: 180px;
+     background-color: white; z-index:9999; font-size:14px;
+     border:2px solid grey; border-radius: 5px; padding: 10px">
+     <p style="margin-top:0; font-weight:bold;">Score Final</p>
+     <p><i class="fa fa-map-marker" style="color:darkgreen"></i> ≥ 8.0 : Excellent</p>
+     <p><i class="fa fa-map-marker" style="color:green"></i> 7.0-7.9 : Très bien</p>
+     <p><i class="fa fa-map-marker" style="color:lightgreen"></i> 6.0-6.9 : Bien</p>
+     <p><i class="fa fa-map-marker" style="color:orange"></i> 5.0-5.9 : Moyen</p>
+     <p><i class="fa fa-map-marker" style="color:red"></i> < 5.0 : Faible</p>
+</div>
+'''
+
+# Marqueur et popup construits dans le navigateur à partir d'une ligne du tableau
+# [lat, lon, couleur, nom, ville, note, avis, prix, devise, météo, score, rang, url] ;
+# le popup n'est généré qu'à l'ouverture
+CLUSTER_CALLBACK = """function (row) {
+    var colors = %(colors)s;
+    var esc = function (s) {
+        return String(s === null ? '' : s).replace(/[&<>"']/g, function (c) {
+            return {'&': '&amp;', '<': '&lt;', '>': '&gt;', '"': '&quot;', "'": '&#39;'}[c];
+        });
+    };
+    var fmt = function (v, d) { return v === null ? '–' : v.toFixed(d); };
+    var url = row[12] === null ? '' : (row[12].indexOf('http') === 0 ? row[12] : '%(prefix)s' + row[12]);
+    var color = colors[row[2]];
+    var marker = L.marker(new L.LatLng(row[0], row[1]), {
+        icon: L.AwesomeMarkers.icon({icon: 'home', prefix: 'fa', markerColor: color})
+    });
+    marker.bindTooltip(esc(row[3]) + ' - Score: ' + fmt(row[10], 2));
+    marker.bindPopup(function () {
+        return '<div style="width: 300px; font-family: Arial;">' +
+            '<h4 style="margin-bottom: 10px; color: #2c3e50;">' + esc(row[3]) + '</h4>' +
+            '<hr style="margin: 5px 0;">' +
+            '<p><b>📍 Ville :</b> ' + esc(row[4]) + '</p>' +
+            '<p><b>⭐ Note :</b> ' + fmt(row[5], 1) + '/10 (' + fmt(row[6], 0) + ' avis)</p>' +
+            '<p><b>💰 Prix :</b> ' + fmt(row[7], 0) + ' ' + esc(row[8]) + '/nuit</p>' +
+            '<p><b>🌤️ Score météo :</b> ' + fmt(row[9], 2) + '</p>' +
+            '<p><b>🎯 Score final :</b> <span style="color: ' + color + '; font-weight: bold;">' +
+            fmt(row[10], 2) + '/10</span></p>' +
+            '<p><b>🏆 Rang :</b> #' + fmt(row[11], 0) + '</p>' +
+            '<hr style="margin: 5px 0;">' +
+            '<p style="font-size: 11px;"><a href="' + esc(url) + '" target="_blank">🔗 Voir sur Booking.com</a></p>' +
+            '</div>';
+    }, {maxWidth: 300});
+    return marker;
+}"""
+
+
+def cluster_rows(hotels):
+    """
+    Tableau compact des hôtels pour la couche en clusters.
+    
+    Coordonnées arrondies à 5 décimales (~1 m), couleur par indice dans
+    SCORE_COLORS, URL Booking sans préfixe ni paramètres de recherche.
+    
+    Returns:
+        list: Une liste par hôtel (voir CLUSTER_CALLBACK)
+    """
+    colors = [color for _, color in SCORE_COLORS]
+    final = hotels['final_score'].to_numpy(dtype=float)
+    color_idx = [colors.index(get_color(score)) if not np.isnan(score) else len(colors) - 1 for score in final]
+    
+    urls = hotels['url'].astype('string').str.split('?').str[0]
+    urls = urls.where(~urls.str.startswith(BOOKING_PREFIX, na=False), urls.str[len(BOOKING_PREFIX):])
+    
+    columns = {
+        'lat': hotels['latitude'].astype(float).round(5),
+        'lon': hotels['longitude'].astype(float).round(5),
+        'color': color_idx,
+        'name': hotels['hotel_name'],
+        'city': hotels['city'],
+        'score': hotels['score'].astype(float).round(1),
+        'reviews': hotels['number_of_reviews'].astype(float).round(0).astype('Int64'),
+        'price': hotels['price'].astype(float).round(0).astype('Int64'),
+        'currency': hotels['currency'],
+        'weather': hotels['avg_weather_score'].astype(float).round(2),
+        'final': hotels['final_score'].astype(float).round(2),
+        'rank': hotels['rank'].astype(float).round(0).astype('Int64'),
+        'url': urls,
+    }
+    table = pd.DataFrame(columns).astype(object)
+    return table.where(table.notna(), None).values.tolist()
+
+
+def render_map_all(hotels, output_path):
+    """Carte de tous les hôtels : clusters calculés dans le navigateur."""
+    import folium
+    from folium.plugins import FastMarkerCluster
+    
+    map_all = folium.Map(location=map_center(hotels), zoom_start=10, tiles='OpenStreetMap')
+    
+    callback = CLUSTER_CALLBACK % {'colors': json.dumps([color for _, color in SCORE_COLORS]),
+                                   'prefix': BOOKING_PREFIX}
+    FastMarkerCluster(cluster_rows(hotels), callback=callback, name='Hôtels',
+                      options={'chunkedLoading': True}).add_to(map_all)
+    
+    map_all.get_root().html.add_child(folium.Element(LEGEND_HTML))
+    map_all.save(output_path)
+
+
+def render_map_top20(top20, output_path, center=None):
+    """Carte des 20 meilleurs hôtels, marqueurs numérotés."""
+    import folium
+    
+    map_top20 = folium.Map(location=center or map_center(top20), zoom_start=10, tiles='CartoDB positron')
+    
+    for _, hotel in top20.iterrows():
+        popup_html = f"""
+        <div style="width: 300px; font-family: Arial;">
+            <h3 style="color: #e74c3c; margin-bottom: 5px;">🏆 Rang #{hotel['rank']:.0f}</h3>
+            <h4 style="margin: 5px 0; color: #2c3e50;">{hotel['hotel_name']}</h4>
+            <hr style="margin: 5px 0;">
+            <p><b>📍</b> {hotel['city']}</p>
+            <p><b>⭐</b> {hotel['score']:.1f}/10 ({hotel['number_of_reviews']:.0f} avis)</p>
+            <p><b>💰</b> {hotel['price']:.0f} {hotel['currency']}</p>
+            <p><b>🌤️</b> Score météo: {hotel['avg_weather_score']:.2f}</p>
+            <p><b>🌡️</b> {hotel['temp_avg']:.1f}°C</p>
+            <p><b>🎯</b> <span style="font-size: 16px; color: #27ae60; font-weight: bold;">Score: {hotel['final_score']:.2f}/10</span></p>
+            <hr style="margin: 5px 0;">
+            <p style="font-size: 11px;"><a href="{hotel['url']}" target="_blank">🔗 Réserver sur Booking.com</a></p>
+        </div>
+        """
+        
+        folium.Marker(
+            location=[hotel['latitude'], hotel['longitude']],
+            popup=folium.Popup(popup_html, max_width=320),
+            tooltip=f"#{hotel['rank']:.0f} - {hotel['hotel_name']}",
+            icon=folium.DivIcon(html=f"""
+                <div style="
+                    background-color: #e74c3c;
+                    color: white;
+                    border-radius: 50%;
+                    width: 30px;
+                    height: 30px;
+                    display: flex;
+                    align-items: center;
+                    justify-content: center;
+                    font-weight: bold;
+                    font-size: 14px;
+                    border: 2px solid white;
+                    box-shadow: 0 2px 5px rgba(0,0,0,0.3);
+                ">{int(hotel['rank'])}</div>
+            """)
+        ).add_to(map_top20)
+    
+    map_top20.save(output_path)
+
+
+# ═══════════════════════════════════════════════════════════════════════
+# DASHBOARD
+# ═══════════════════════════════════════════════════════════════════════
+
+def render_dashboard(recommendations, output_path, dpi=300):
+    """
+    Dashboard de 8 graphiques.
+    
+    Figure matplotlib sans pyplot (aucune fenêtre ni état global : rendu
+    possible dans un processus du pool) ; les nuages de points sont tracés
+    sur SCATTER_MAX_POINTS hôtels au plus.
+    """
+    import matplotlib
+    import seaborn as sns
+    from matplotlib.figure import Figure
+    
+    with matplotlib.style.context('seaborn-v0_8-darkgrid'):
+        fig = Figure(figsize=(20, 12))
+        gs = fig.add_gridspec(3, 3, hspace=0.3, wspace=0.3)
+        
+        # 1. Distribution des scores finaux par ville
+        ax1 = fig.add_subplot(gs[0, :2])
+        cities = sorted(recommendations['city'].dropna().unique())
+        ax1.boxplot([recommendations.loc[recommendations['city'] == city, 'final_score'].dropna()
+                     for city in cities])
+        ax1.set_xticks(range(1, len(cities) + 1))
+        ax1.set_xticklabels(cities, rotation=45, ha='right')
+        ax1.set_title('Distribution des Scores Finaux par Ville', fontsize=16, fontweight='bold')
+        ax1.set_xlabel('Ville', fontsize=12)
+        ax1.set_ylabel('Score Final', fontsize=12)
+        
+        # 2. Top 10 hôtels
+        ax2 = fig.add_subplot(gs[0, 2])
+        top10 = recommendations.head(10)
+        colors = matplotlib.colormaps['RdYlGn'](np.linspace(0.4, 0.9, len(top10)))
+        ax2.barh(range(len(top10)), top10['final_score'], color=colors)
+        ax2.set_yticks(range(len(top10)))
+        ax2.set_yticklabels([f"#{i+1}" for i in range(len(top10))])
+        ax2.set_xlabel('Score Final', fontsize=11)
+        ax2.set_title('Top 10 Hôtels', fontsize=14, fontweight='bold')
+        ax2.invert_yaxis()
+        ax2.grid(True, alpha=0.3, axis='x')
+        
+        points = recommendations
+        if len(points) > SCATTER_MAX_POINTS:
+            points = points.sample(SCATTER_MAX_POINTS, random_state=0)
+        
+        # 3. Relation Score vs Prix
+        ax3 = fig.add_subplot(gs[1, 0])
+        scatter = ax3.scatter(points['score'], points['price'],
+                              c=points['final_score'], cmap='RdYlGn',
+                              s=100, alpha=0.6, edgecolors='black', linewidth=0.5)
+        ax3.set_xlabel('Note Hôtel (/10)', fontsize=12)
+        ax3.set_ylabel('Prix (€)', fontsize=12)
+        ax3.set_title('Qualité vs Prix', fontsize=14, fontweight='bold')
+        fig.colorbar(scatter, ax=ax3, label='Score Final')
+        ax3.grid(True, alpha=0.3)
+        
+        # 4. Distribution des prix par ville
+        ax4 = fig.add_subplot(gs[1, 1])
+        city_prices = recommendations.groupby('city')['price'].mean().sort_values()
+        ax4.barh(city_prices.index, city_prices.values, color='coral')
+        ax4.set_xlabel('Prix Moyen (€)', fontsize=12)
+        ax4.set_title('Prix Moyen par Ville', fontsize=14, fontweight='bold')
+        ax4.grid(True, alpha=0.3, axis='x')
+        
+        # 5. Météo vs Score Final
+        ax5 = fig.add_subplot(gs[1, 2])
+        city_data = recommendations.groupby('city').agg({
+            'avg_weather_score': 'first',
+            'final_score': 'mean'
+        }).reset_index()
+        ax5.scatter(city_data['avg_weather_score'], city_data['final_score'],
+                    s=300, alpha=0.6, c=range(len(city_data)), cmap='viridis')
+        for _, row in city_data.iterrows():
+            ax5.annotate(row['city'], (row['avg_weather_score'], row['final_score']),
+                         fontsize=9, ha='center')
+        ax5.set_xlabel('Score Météo', fontsize=12)
+        ax5.set_ylabel('Score Final Moyen', fontsize=12)
+        ax5.set_title('Impact de la Météo', fontsize=14, fontweight='bold')
+        ax5.grid(True, alpha=0.3)
+        
+        # 6. Nombre d'avis vs Note
+        ax6 = fig.add_subplot(gs[2, 0])
+        ax6.scatter(points['number_of_reviews'], points['score'],
+                    alpha=0.5, c=points['price'], cmap='coolwarm', s=50)
+        ax6.set_xlabel('Nombre d\'Avis', fontsize=12)
+        ax6.set_ylabel('Note (/10)', fontsize=12)
+        ax6.set_title('Fiabilité des Notes', fontsize=14, fontweight='bold')
+        ax6.set_xscale('log')
+        ax6.grid(True, alpha=0.3)
+        
+        # 7. Répartition par type de propriété
+        ax7 = fig.add_subplot(gs[2, 1])
+        property_counts = recommendations['property_type'].value_counts().head(8)
+        ax7.pie(property_counts.values, labels=property_counts.index, autopct='%1.1f%%',
+                startangle=90, colors=matplotlib.colormaps['Set3'].colors)
+        ax7.set_title('Types de Propriétés', fontsize=14, fontweight='bold')
+        
+        # 8. Heatmap des corrélations
+        ax8 = fig.add_subplot(gs[2, 2])
+        corr_data = recommendations[['score', 'price', 'avg_weather_score',
+                                     'final_score', 'number_of_reviews']].corr()
+        sns.heatmap(corr_data, annot=True, fmt='.2f', cmap='coolwarm',
+                    center=0, square=True, ax=ax8, cbar_kws={'shrink': 0.8})
+        ax8.set_title('Corrélations', fontsize=14, fontweight='bold')
+        
+        fig.savefig(output_path, dpi=dpi, bbox_inches='tight')
+
+
+# ═══════════════════════════════════════════════════════════════════════
+# RAPPORT HTML
+# ═══════════════════════════════════════════════════════════════════════
+
+REPORT_CSS = """
+        * {
+            margin: 0;
+            padding: 0;
+            box-sizing: border-box;
+        }
+        
+        body {
+            font-family: 'Segoe UI', Tahoma, Geneva, Verdana, sans-serif;
+            line-height: 1.6;
+            color: #333;
+            background: linear-gradient(135deg, #667eea 0%, #764ba2 100%);
+            padding: 20px;
+        }
+        
+        .container {
+            max-width: 1200px;
+            margin: 0 auto;
+            background: white;
+            border-radius: 20px;
+            box-shadow: 0 20px 60px rgba(0,0,0,0.3);
+            overflow: hidden;
+        }
+        
+        header {
+            background: linear-gradient(135deg, #667eea 0%, #764ba2 100%);
+            color: white;
+            padding: 40px;
+            text-align: center;
+        }
+        
+        header h1 {
+            font-size: 2.5em;
+            margin-bottom: 10px;
+        }
+        
+        header p {
+            font-size: 1.2em;
+            opacity: 0.9;
+        }
+        
+        .stats {
+            display: grid;
+            grid-template-columns: repeat(auto-fit, minmax(200px, 1fr));
+            gap: 20px;
+            padding: 40px;
+            background: #f8f9fa;
+        }
+        
+        .stat-card {
+            background: white;
+            padding: 25px;
+            border-radius: 15px;
+            text-align: center;
+            box-shadow: 0 4px 6px rgba(0,0,0,0.1);
+            transition: transform 0.3s;
+        }
+        
+        .stat-card:hover {
+            transform: translateY(-5px);
+            box-shadow: 0 8px 12px rgba(0,0,0,0.15);
+        }
+        
+        .stat-card .number {
+            font-size: 2.5em;
+            font-weight: bold;
+            color: #667eea;
+            margin: 10px 0;
+        }
+        
+        .stat-card .label {
+            color: #666;
+            font-size: 0.9em;
+            text-transform: uppercase;
+            letter-spacing: 1px;
+        }
+        
+        .section {
+            padding: 40px;
+        }
+        
+        .section h2 {
+            font-size: 2em;
+            margin-bottom: 30px;
+            color: #667eea;
+            border-bottom: 3px solid #667eea;
+            padding-bottom: 10px;
+        }
+        
+        .hotel-card {
+            background: #f8f9fa;
+            border-radius: 15px;
+            padding: 25px;
+            margin-bottom: 20px;
+            box-shadow: 0 4px 6px rgba(0,0,0,0.1);
+            transition: all 0.3s;
+            border-left: 5px solid #667eea;
+        }
+        
+        .hotel-card:hover {
+            box-shadow: 0 8px 16px rgba(0,0,0,0.2);
+            transform: translateX(5px);
+        }
+        
+        .hotel-card h3 {
+            color: #333;
+            margin-bottom: 15px;
+            font-size: 1.4em;
+        }
+        
+        .hotel-info {
+            display: grid;
+            grid-template-columns: repeat(auto-fit, minmax(150px, 1fr));
+            gap: 15px;
+            margin-top: 15px;
+        }
+        
+        .info-item {
+            display: flex;
+            align-items: center;
+            gap: 8px;
+        }
+        
+        .badge {
+            display: inline-block;
+            padding: 5px 12px;
+            border-radius: 20px;
+            font-size: 0.85em;
+            font-weight: bold;
+        }
+        
+        .badge-rank {
+            background: #e74c3c;
+            color: white;
+        }
+        
+        .badge-score {
+            background: #27ae60;
+            color: white;
+        }
+        
+        .badge-price {
+            background: #f39c12;
+            color: white;
+        }
+        
+        .maps {
+            display: grid;
+            grid-template-columns: 1fr 1fr;
+            gap: 20px;
+            margin-top: 20px;
+        }
+        
+        .map-container {
+            border-radius: 15px;
+            overflow: hidden;
+            box-shadow: 0 4px 6px rgba(0,0,0,0.1);
+        }
+        
+        iframe {
+            width: 100%;
+            height: 500px;
+            border: none;
+        }
+        
+        footer {
+            background: #2c3e50;
+            color: white;
+            text-align: center;
+            padding: 30px;
+        }
+
+        @media (max-width: 768px) {
+            .maps {
+                grid-template-columns: 1fr;
+            }
+            
+            header h1 {
+                font-size: 1.8em;
+            }
+        }
+"""
+
+
+def report_stats(recommendations):
+    """Statistiques affichées en tête du rapport."""
+    return {
+        'total_hotels': int(len(recommendations)),
+        'cities': int(recommendations['city'].nunique()),
+        'avg_score': float(recommendations['final_score'].mean()),
+        'avg_price': float(recommendations['price'].mean()),
+        'best_city_weather': str(recommendations.groupby('city')['avg_weather_score'].first().idxmax()),
+        'num_with_gps': int(len(with_gps(recommendations))),
+    }
+
+
+def render_report(inputs, output_path, versions=None):
+    """
+    Rapport HTML final.
+    
+    Args:
+        inputs (dict): stats (report_stats) et top5 (DataFrame)
+        versions (dict): Empreintes des cartes et du dashboard, ajoutées aux
+            liens (?v=) pour qu'un navigateur ou S3 ne serve pas une version en cache
+    """
+    stats, top5 = inputs['stats'], inputs['top5']
+    versions = versions or {}
+
+    def asset(name, filename):
+        return f"{filename}?v={versions[name][:12]}" if name in versions else filename
+    
+    html_content = f"""
+<!DOCTYPE html>
+<html lang="fr">
+<head>
+    <meta charset="UTF-8">
+    <meta name="viewport" content="width=device-width, initial-scale=1.0">
+    <title>Rapport Kayak - Destinations PACA</title>
+    <style>{REPORT_CSS}    </style>
+</head>
+<body>
+    <div class="container">
+        <header>
+            <h1>🏖️ Rapport Kayak - Destinations PACA</h1>
+            <p>Analyse complète des meilleures destinations et hébergements</p>
+        </header>
+        
+        <div class="stats">
+            <div class="stat-card">
+                <div class="label">🏨 Hôtels Analysés</div>
+                <div class="number">{stats['total_hotels']}</div>
+            </div>
+            <div class="stat-card">
+                <div class="label">🌍 Villes</div>
+                <div class="number">{stats['cities']}</div>
+            </div>
+            <div class="stat-card">
+                <div class="label">⭐ Score Moyen</div>
+                <div class="number">{stats['avg_score']:.2f}/10</div>
+            </div>
+            <div class="stat-card">
+                <div class="label">💰 Prix Moyen</div>
+                <div class="number">{stats['avg_price']:.0f}€</div>
+            </div>
+            <div class="stat-card">
+                <div class="label">☀️ Meilleure Météo</div>
+                <div class="number">{stats['best_city_weather']}</div>
+            </div>
+        </div>
+        
+        <div class="section">
+            <h2>🏆 Top 5 Recommandations</h2>
+"""
+
+    for _, hotel in top5.iterrows():
+        html_content += f"""
+            <div class="hotel-card">
+                <span class="badge badge-rank">#{int(hotel['rank'])}</span>
+                <h3>{hotel['hotel_name']}</h3>
+                <div class="hotel-info">
+                    <div class="info-item">
+                        <span>📍</span>
+                        <span><strong>{hotel['city']}</strong></span>
+                    </div>
+                    <div class="info-item">
+                        <span>⭐</span>
+                        <span>{hotel['score']:.1f}/10 ({int(hotel['number_of_reviews'])} avis)</span>
+                    </div>
+                    <div class="info-item">
+                        <span>💰</span>
+                        <span>{hotel['price']:.0f} {hotel['currency']}/nuit</span>
+                    </div>
+                    <div class="info-item">
+                        <span>🌤️</span>
+                        <span>Météo: {hotel['avg_weather_score']:.2f}</span>
+                    </div>
+                    <div class="info-item">
+                        <span>🎯</span>
+                        <span class="badge badge-score">Score: {hotel['final_score']:.2f}/10</span>
+                    </div>
+                </div>
+                <p style="margin-top: 15px;">
+                    <a href="{hotel['url']}" target="_blank" style="color: #667eea; text-decoration: none; font-weight: bold;">
+                        🔗 Voir sur Booking.com →
+                    </a>
+                </p>
+            </div>
+"""
+
+    html_content += f"""
+        </div>
+        
+        <div class="section">
+            <h2>🗺️ Cartes Interactives</h2>
+            <div class="maps">
+                <div class="map-container">
+                    <h3 style="text-align: center; padding: 15px; background: #f8f9fa;">
+                        Tous les Hôtels ({stats['num_with_gps']})
+                    </h3>
+                    <iframe src="{asset('carte_tous_hotels', 'carte_tous_hotels.html')}"></iframe>
+                </div>
+                <div class="map-container">
+                    <h3 style="text-align: center; padding: 15px; background: #f8f9fa;">
+                        Top 20 Recommandations
+                    </h3>
+                    <iframe src="{asset('carte_top20', 'carte_top20.html')}"></iframe>
+                </div>
+            </div>
+        </div>
+        
+        <div class="section">
+            <h2>📊 Analyse Visuelle</h2>
+            <img src="{asset('dashboard_complet', 'dashboard_complet.png')}" alt="Dashboard" style="width: 100%; border-radius: 15px; box-shadow: 0 4px 6px rgba(0,0,0,0.1);">
+        </div>
+        
+        <footer>
+            <p>Rapport généré le {pd.Timestamp.now().strftime('%d/%m/%Y à %H:%M')}</p>
+            <p>Projet Kayak - Analyse Data Science</p>
+        </footer>
+    </div>
+</body>
+</html>
+"""
+
+    with open(output_path, 'w', encoding='utf-8') as f:
+        f.write(html_content)
+
+
+# ═══════════════════════════════════════════════════════════════════════
+# GRAPHE DE DÉPENDANCES
+# ═══════════════════════════════════════════════════════════════════════
+
+def artifact_inputs(recommendations):
+    """
+    Entrées de chaque livrable : uniquement les lignes et colonnes qu'il affiche.
+    
+    Returns:
+        dict: {livrable: (fonction de rendu, fichier, entrées, options, livrables amont)}
+    """
+    hotels = with_gps(recommendations)
+    center = map_center(hotels)
+    top20 = with_gps(recommendations.head(20))
+    
+    return {
+        'carte_tous_hotels': (render_map_all, 'carte_tous_hotels.html', hotels[MAP_COLUMNS], {}, []),
+        'carte_top20': (render_map_top20, 'carte_top20.html', top20[TOP20_COLUMNS], {'center': center}, []),
+        'dashboard_complet': (render_dashboard, 'dashboard_complet.png', recommendations[DASHBOARD_COLUMNS], {},
+                              []),
+        'rapport_final': (render_report, 'rapport_final.html',
+                          {'stats': report_stats(recommendations), 'top5': recommendations.head(5)[TOP5_COLUMNS]},
+                          {}, ['carte_tous_hotels', 'carte_top20', 'dashboard_complet']),
+    }
+
+
+def _update_digest(digest, value):
+    if isinstance(value, pd.DataFrame):
+        digest.update(json.dumps([list(value.columns), [str(t) for t in value.dtypes]]).encode())
+        digest.update(pd.util.hash_pandas_object(value, index=False).to_numpy().tobytes())
+    elif isinstance(value, dict):
+        for key in sorted(value):
+            digest.update(str(key).encode())
+            _update_digest(digest, value[key])
+    else:
+        digest.update(json.dumps(value, sort_keys=True, default=str).encode())
+
+
+def code_digest():
+    """Empreinte du code de rendu (ce module) : toute modification invalide les livrables."""
+    with open(os.path.abspath(__file__), 'rb') as f:
+        return hashlib.sha256(f.read()).hexdigest()
+
+
+def input_digest(data, options, upstream, code):
+    """Empreinte des entrées d'un livrable (données, options, livrables amont, code)."""
+    digest = hashlib.sha256(code.encode())
+    _update_digest(digest, {'data': data, 'options': options, 'upstream': upstream})
+    return digest.hexdigest()
+
+
+def file_sha256(path, chunk_size=1024 * 1024):
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(chunk_size), b''):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def load_manifest(path):
+    """Manifeste des rendus : {livrable: {inputs, sha256, rendered_at, seconds}}."""
+    if not os.path.exists(path):
+        return {}
+    with open(path, encoding='utf-8') as f:
+        return json.load(f)
+
+
+def render_artifact(render, data, output_path, options):
+    """Rend un livrable (dans un processus du pool) via un fichier temporaire, et renvoie sa durée."""
+    start = time.perf_counter()
+    tmp_path = f"{output_path}.tmp{os.path.splitext(output_path)[1]}"
+    try:
+        render(data, tmp_path, **options)
+        os.replace(tmp_path, output_path)
+    finally:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+    return time.perf_counter() - start
+
+
+def make_render_pool(workers=BUILD_WORKERS):
+    """Pool de processus (spawn) pour les rendus indépendants (None si workers vaut 0)."""
+    if not workers:
+        return None
+    from concurrent.futures import ProcessPoolExecutor
+    return ProcessPoolExecutor(workers, mp_context=multiprocessing.get_context('spawn'))
+
+
+# ═══════════════════════════════════════════════════════════════════════
+# CONSTRUCTION
+# ═══════════════════════════════════════════════════════════════════════
+
+@METRICS.timed('report_build')
+def build_report(recommendations=None, output_dir=OUTPUT_DIR, force=False, only=None, workers=BUILD_WORKERS,
+                 recommendations_path=RECOMMENDATIONS):
+    """
+    Construit les livrables dont les entrées ont changé depuis le dernier rendu.
+    
+    Les livrables sont parcourus dans l'ordre du graphe : un livrable dont
+    toutes les dépendances sont prêtes est confié au pool dès que possible
+    (cartes et dashboard en parallèle, puis le rapport). L'empreinte des
+    entrées et celle du fichier produit sont enregistrées dans le manifeste
+    après chaque rendu réussi.
+    
+    Args:
+        recommendations (DataFrame): Recommandations classées (défaut : lues
+            dans `recommendations_path`)
+        output_dir (str): Dossier des livrables et du manifeste
+        force (bool): Rendre même sans changement (les livrables de `only`
+            seulement ; leurs dépendances restent en cache si elles sont à jour)
+        only (list): Livrables à construire (avec leurs dépendances)
+        workers (int): Rendus simultanés (0 = dans le processus courant)
+    
+    Returns:
+        dict: {livrable: 'rendered' | 'cached'}
+    """
+    if recommendations is None:
+        recommendations = pd.read_csv(recommendations_path)
+    
+    graph = artifact_inputs(recommendations)
+    forced = set(only or graph) if force else set()
+    if only:
+        unknown = set(only) - set(graph)
+        if unknown:
+            raise ValueError(f"Livrable(s) inconnu(s) : {', '.join(sorted(unknown))} ({', '.join(graph)})")
+        wanted, stack = set(), list(only)
+        while stack:
+            name = stack.pop()
+            if name not in wanted:
+                wanted.add(name)
+                stack.extend(graph[name][4])
+        graph = {name: node for name, node in graph.items() if name in wanted}
+    
+    os.makedirs(output_dir, exist_ok=True)
+    manifest_path = os.path.join(output_dir, REPORT_MANIFEST)
+    manifest = load_manifest(manifest_path)
+    code = code_digest()
+
+    def save():
+        atomic_write(manifest_path, lambda f: json.dump(manifest, f, indent=2, ensure_ascii=False, sort_keys=True))
+
+    def finish(name, key, output_path, seconds):
+        manifest[name] = {'inputs': key, 'sha256': file_sha256(output_path),
+                          'rendered_at': datetime.now().isoformat(timespec='seconds'), 'seconds': round(seconds, 3)}
+        save()
+        results[name] = 'rendered'
+        METRICS.observe('report_render', seconds, artifact=name)
+        print(f"   🎨 {name:20s} → {output_path} ({seconds:.1f}s)")
+    
+    results, pending, running = {}, dict(graph), {}
+    pool = make_render_pool(workers)
+    try:
+        while pending or running:
+            # Livrables dont toutes les dépendances sont prêtes : en cache, ou à rendre
+            ready = [name for name, node in pending.items() if all(dep in results for dep in node[4])]
+            for name in ready:
+                render, filename, data, options, upstream = pending.pop(name)
+                versions = {dep: manifest[dep]['sha256'] for dep in upstream if dep in manifest}
+                if upstream:
+                    options = {**options, 'versions': versions}
+                
+                output_path = os.path.join(output_dir, filename)
+                key = input_digest(data, options, versions, code)
+                if name not in forced and manifest.get(name, {}).get('inputs') == key and os.path.exists(output_path):
+                    results[name] = 'cached'
+                    continue
+                
+                args = (render, data, output_path, options)
+                if pool is None:
+                    finish(name, key, output_path, render_artifact(*args))
+                else:
+                    running[pool.submit(render_artifact, *args)] = (name, key, output_path)
+            
+            if running:
+                done, _ = wait(running, return_when=FIRST_COMPLETED)
+                for future in done:
+                    finish(*running.pop(future), future.result())
+            elif not ready:
+                raise ValueError(f"Dépendances circulaires : {', '.join(pending)}")
+    finally:
+        if pool is not None:
+            for future in running:
+                future.cancel()
+            pool.shutdown()
+    
+    cached = [name for name, status in results.items() if status == 'cached']
+    if cached:
+        print(f"   ♻️  Inchangé(s) : {', '.join(cached)}")
+    return results
+
+
+# ═══════════════════════════════════════════════════════════════════════
+# POINT D'ENTRÉE
+# ═══════════════════════════════════════════════════════════════════════
+
+def main():
+    """Point d'entrée pour exécution standalone."""
+    parser = argparse.ArgumentParser(description=__doc__.split('\n')[1])
+    parser.add_argument('--recommendations', default=RECOMMENDATIONS)
+    parser.add_argument('--output-dir', default=OUTPUT_DIR)
+    parser.add_argument('--force', action='store_true', help="Tout rendre, même sans changement")
+    parser.add_argument('--only', nargs='+', metavar='LIVRABLE', help="Livrables à construire (et leurs dépendances)")
+    parser.add_argument('--workers', type=int, default=BUILD_WORKERS, help="Rendus simultanés (0 = séquentiel)")
+    args = parser.parse_args()
+    
+    print(f"\n{'='*80}")
+    print(f"📄 CONSTRUCTION DU RAPPORT")
+    print(f"{'='*80}\n")
+    
+    start = time.perf_counter()
+    results = build_report(output_dir=args.output_dir, force=args.force, only=args.only, workers=args.workers,
+                           recommendations_path=args.recommendations)
+    rendered = sum(status == 'rendered' for status in results.values())
+    print(f"\n✅ {rendered}/{len(results)} livrable(s) rendu(s) en {time.perf_counter() - start:.1f}s")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,328 @@
+"""
+Déploiement des livrables sur S3 (rapport, cartes, images, CSV)
+Envois en parallèle (pool de threads + multipart via TransferConfig),
+manifeste des empreintes SHA-256 pour ne renvoyer que les fichiers modifiés,
+HTML / CSV / JSON compressés en gzip (Content-Encoding), listing complet du
+bucket par pagination
+
+Usage :
+    python src/s3_deploy.py
+    python src/s3_deploy.py --force --max-workers 16
+    AWS_ENDPOINT_URL=http://127.0.0.1:5000 python src/s3_deploy.py   # S3 local (moto)
+"""
+
+import argparse
+import gzip
+import hashlib
+import json
+import mimetypes
+import os
+import shutil
+import tempfile
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+
+import boto3
+from boto3.s3.transfer import TransferConfig
+from botocore.config import Config
+from botocore.exceptions import BotoCoreError, ClientError
+
+from metrics import METRICS
+from pipeline_config import load_env, require_env
+from pipeline_run import atomic_write
+
+
+# ═══════════════════════════════════════════════════════════════════════
+# CONFIGURATION
+# ═══════════════════════════════════════════════════════════════════════
+
+# (fichier local, clé S3)
+DEPLOY_FILES = [
+    # Données CSV
+    ('data/processed/final_recommendations.csv', 'data/final_recommendations.csv'),
+    ('data/processed/top20_recommendations.csv', 'data/top20_recommendations.csv'),
+    ('data/processed/city_weather_scores.csv', 'data/city_weather_scores.csv'),
+    ('data/processed/top5_destinations.csv', 'data/top5_destinations.csv'),
+    ('data/raw/hotels_top5_all.csv', 'data/raw/hotels_top5_all.csv'),
+    
+    # Visualisations
+    ('data/processed/rapport_final.html', 'rapport_final.html'),
+    ('data/processed/carte_tous_hotels.html', 'cartes/carte_tous_hotels.html'),
+    ('data/processed/carte_top20.html', 'cartes/carte_top20.html'),
+    ('data/processed/dashboard_complet.png', 'images/dashboard_complet.png'),
+    ('data/processed/analysis_fusion.png', 'images/analysis_fusion.png'),
+]
+
+DEPLOY_MANIFEST = 'data/processed/s3_manifest.json'
+
+CONTENT_TYPES = {
+    '.html': 'text/html; charset=utf-8',
+    '.png': 'image/png',
+    '.jpg': 'image/jpeg',
+    '.jpeg': 'image/jpeg',
+    '.csv': 'text/csv; charset=utf-8',
+    '.json': 'application/json',
+    '.txt': 'text/plain; charset=utf-8',
+}
+
+# Formats texte servis compressés (les images sont déjà compressées)
+GZIP_EXTENSIONS = {'.html', '.csv', '.json', '.txt'}
+
+CACHE_CONTROL = 'max-age=3600'
+
+# Multipart au-delà de 8 Mo, parties de 8 Mo envoyées par 4 threads par fichier
+TRANSFER_CONFIG = TransferConfig(
+    multipart_threshold=8 * 1024 * 1024,
+    multipart_chunksize=8 * 1024 * 1024,
+    max_concurrency=4,
+    use_threads=True,
+)
+
+# Fichiers compressés gardés en mémoire jusqu'à cette taille, sur disque au-delà
+GZIP_SPOOL_SIZE = 32 * 1024 * 1024
+
+
+def s3_settings():
+    """
+    Bucket, région et client S3 depuis config/.env.
+    
+    AWS_ENDPOINT_URL (ex. serveur moto local) remplace le point d'accès AWS.
+    
+    Returns:
+        tuple: (client boto3, bucket, région)
+    """
+    bucket = require_env('AWS_S3_BUCKET', load_env())
+    
+    region = os.getenv('AWS_REGION')
+    return make_client(region), bucket, region
+
+
+def make_client(region=None, max_pool_connections=32):
+    """Client S3 partagé par les threads (pool de connexions dimensionné pour eux)."""
+    return boto3.client(
+        's3',
+        region_name=region,
+        endpoint_url=os.getenv('AWS_ENDPOINT_URL') or None,
+        aws_access_key_id=os.getenv('AWS_ACCESS_KEY_ID'),
+        aws_secret_access_key=os.getenv('AWS_SECRET_ACCESS_KEY'),
+        config=Config(max_pool_connections=max_pool_connections, retries={'max_attempts': 5, 'mode': 'standard'}),
+    )
+
+
+def public_url(bucket, region, key):
+    return f"https://{bucket}.s3.{region}.amazonaws.com/{key}"
+
+
+# ═══════════════════════════════════════════════════════════════════════
+# LISTING ET MANIFESTE
+# ═══════════════════════════════════════════════════════════════════════
+
+def list_objects(client, bucket, prefix=''):
+    """Tous les objets du bucket (pages de 1 000 clés enchaînées)."""
+    paginator = client.get_paginator('list_objects_v2')
+    for page in paginator.paginate(Bucket=bucket, Prefix=prefix):
+        yield from page.get('Contents', [])
+
+
+def bucket_summary(client, bucket, prefix=''):
+    """
+    Résumé du contenu du bucket.
+    
+    Returns:
+        dict: files, size (octets), folders {dossier: nombre de fichiers}, keys {clé: taille}
+    """
+    keys = {obj['Key']: obj['Size'] for obj in list_objects(client, bucket, prefix)}
+    
+    folders = {}
+    for key in keys:
+        folder = key.split('/')[0] if '/' in key else 'racine'
+        folders[folder] = folders.get(folder, 0) + 1
+    
+    return {'files': len(keys), 'size': sum(keys.values()), 'folders': folders, 'keys': keys}
+
+
+def load_manifest(path=DEPLOY_MANIFEST):
+    """Manifeste des envois : {bucket: {clé: {sha256, size, gzip, ...}}}."""
+    if not os.path.exists(path):
+        return {}
+    with open(path, encoding='utf-8') as f:
+        return json.load(f)
+
+
+def save_manifest(manifest, path=DEPLOY_MANIFEST):
+    atomic_write(path, lambda f: json.dump(manifest, f, indent=2, ensure_ascii=False, sort_keys=True))
+
+
+def file_sha256(path, chunk_size=1024 * 1024):
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(chunk_size), b''):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+# ═══════════════════════════════════════════════════════════════════════
+# ENVOI
+# ═══════════════════════════════════════════════════════════════════════
+
+def upload_args(key, compress):
+    """En-têtes de l'objet : type, cache, encodage."""
+    ext = os.path.splitext(key)[1].lower()
+    extra_args = {
+        'ContentType': CONTENT_TYPES.get(ext) or mimetypes.guess_type(key)[0] or 'application/octet-stream',
+        'CacheControl': CACHE_CONTROL,
+    }
+    if compress:
+        extra_args['ContentEncoding'] = 'gzip'
+    return extra_args
+
+
+def upload_one(client, bucket, local_path, key, sha256, compress, transfer_config=TRANSFER_CONFIG):
+    """
+    Envoie un fichier (compressé si demandé) ; multipart au-delà du seuil.
+    
+    Returns:
+        int: Octets envoyés
+    """
+    extra_args = upload_args(key, compress)
+    extra_args['Metadata'] = {'sha256': sha256}
+    
+    with METRICS.timer('s3_upload'):
+        if not compress:
+            client.upload_file(local_path, bucket, key, ExtraArgs=extra_args, Config=transfer_config)
+            return os.path.getsize(local_path)
+        
+        # mtime=0 : même contenu → mêmes octets compressés
+        with tempfile.SpooledTemporaryFile(max_size=GZIP_SPOOL_SIZE) as buffer:
+            with open(local_path, 'rb') as source, gzip.GzipFile(fileobj=buffer, mode='wb', mtime=0) as target:
+                shutil.copyfileobj(source, target, 1024 * 1024)
+            sent = buffer.tell()
+            buffer.seek(0)
+            client.upload_fileobj(buffer, bucket, key, ExtraArgs=extra_args, Config=transfer_config)
+            return sent
+
+
+def deploy(files=DEPLOY_FILES, client=None, bucket=None, region=None, manifest_path=DEPLOY_MANIFEST,
+           max_workers=8, force=False, use_gzip=True, transfer_config=TRANSFER_CONFIG):
+    """
+    Envoie les fichiers modifiés depuis le dernier déploiement.
+    
+    Un fichier est ignoré si son empreinte et son encodage sont ceux du
+    manifeste et que la clé existe encore dans le bucket (listing complet).
+    Le manifeste est réécrit après les envois, succès uniquement.
+    
+    Args:
+        files (list): (fichier local, clé S3)
+        client: Client boto3 (défaut : s3_settings())
+        bucket, region (str): Bucket cible et région (URLs publiques)
+        manifest_path (str): Manifeste des envois (None = tout envoyer, sans manifeste)
+        max_workers (int): Fichiers envoyés simultanément
+        force (bool): Renvoyer même les fichiers inchangés
+        use_gzip (bool): Compresser les formats de GZIP_EXTENSIONS
+    
+    Returns:
+        list: Un dict par fichier (key, status, size, sent, url, error) ;
+              status parmi uploaded, unchanged, missing, failed
+    """
+    if client is None:
+        client, bucket, region = s3_settings()
+    
+    manifest = load_manifest(manifest_path) if manifest_path else {}
+    known = manifest.setdefault(bucket, {})
+    remote = {} if force else bucket_summary(client, bucket)['keys']
+    
+    results = []
+    to_upload = []
+    for local_path, key in files:
+        result = {'key': key, 'local_path': local_path, 'url': public_url(bucket, region, key),
+                  'size': 0, 'sent': 0, 'error': None}
+        results.append(result)
+        
+        if not os.path.exists(local_path):
+            result['status'] = 'missing'
+            continue
+        
+        result['size'] = os.path.getsize(local_path)
+        result['sha256'] = file_sha256(local_path)
+        result['gzip'] = use_gzip and os.path.splitext(key)[1].lower() in GZIP_EXTENSIONS
+        
+        entry = known.get(key, {})
+        if (not force and key in remote and entry.get('sha256') == result['sha256']
+                and entry.get('gzip') == result['gzip']):
+            result['status'] = 'unchanged'
+            continue
+        
+        to_upload.append(result)
+
+    def send(result):
+        try:
+            result['sent'] = upload_one(client, bucket, result['local_path'], result['key'],
+                                        result['sha256'], result['gzip'], transfer_config)
+            result['status'] = 'uploaded'
+        except (BotoCoreError, ClientError, OSError) as e:
+            result['status'] = 'failed'
+            result['error'] = str(e)
+        return result
+    
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=max_workers) as executor:
+        for result in executor.map(send, to_upload):
+            if result['status'] == 'uploaded':
+                print(f"✅ {result['key']:50s} ({result['size'] / 1024:8.1f} KB → {result['sent'] / 1024:8.1f} KB envoyés)")
+                known[result['key']] = {
+                    'sha256': result['sha256'],
+                    'size': result['size'],
+                    'gzip': result['gzip'],
+                    'uploaded_at': datetime.now().isoformat(timespec='seconds'),
+                }
+            else:
+                print(f"❌ {result['key']:50s}")
+                print(f"   Erreur : {result['error']}")
+    elapsed = time.perf_counter() - start
+    
+    if manifest_path:
+        save_manifest(manifest, manifest_path)
+    
+    counts = {status: sum(r['status'] == status for r in results)
+              for status in ['uploaded', 'unchanged', 'missing', 'failed']}
+    sent = sum(r['sent'] for r in results)
+    METRICS.count('s3_files', counts['uploaded'], status='uploaded')
+    METRICS.count('s3_bytes', sent)
+    
+    print(f"\n📤 Envoyés : {counts['uploaded']} | inchangés : {counts['unchanged']} | "
+          f"manquants : {counts['missing']} | échecs : {counts['failed']} | "
+          f"{sent / (1024 * 1024):.2f} MB en {elapsed:.1f}s")
+    
+    return results
+
+
+# ═══════════════════════════════════════════════════════════════════════
+# POINT D'ENTRÉE
+# ═══════════════════════════════════════════════════════════════════════
+
+def main():
+    """Point d'entrée pour exécution standalone."""
+    parser = argparse.ArgumentParser(description=__doc__.split('\n')[1])
+    parser.add_argument('--max-workers', type=int, default=8)
+    parser.add_argument('--force', action='store_true', help="Renvoyer aussi les fichiers inchangés")
+    parser.add_argument('--no-gzip', action='store_true')
+    args = parser.parse_args()
+    
+    client, bucket, region = s3_settings()
+    
+    print(f"📤 DÉPLOIEMENT S3 : {bucket} ({region})\n")
+    print("="*60)
+    
+    results = deploy(client=client, bucket=bucket, region=region, max_workers=args.max_workers,
+                     force=args.force, use_gzip=not args.no_gzip)
+    
+    summary = bucket_summary(client, bucket)
+    print(f"\n📦 Contenu du bucket : {summary['files']} fichiers, {summary['size'] / (1024 * 1024):.2f} MB")
+    
+    if any(r['status'] == 'failed' for r in results):
+        raise SystemExit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,247 @@
+"""
+Registre des snapshots BrightData (partagé entre STEP 1 et STEP 2)
+Stockage SQLite en mode WAL : mises à jour atomiques snapshot par snapshot,
+le fichier JSON historique n'est plus qu'un format d'export
+"""
+
+import json
+import os
+import sqlite3
+import threading
+from datetime import datetime
+
+from metrics import METRICS
+
+
+# ═══════════════════════════════════════════════════════════════════════
+# CONFIGURATION
+# ═══════════════════════════════════════════════════════════════════════
+
+SNAPSHOTS_REGISTRY = 'data/raw/snapshots/snapshots_registry.json'
+SNAPSHOTS_DB = 'data/raw/snapshots/snapshots_registry.db'
+
+# Colonnes indexées ; le reste des champs est conservé dans `data` (JSON)
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS snapshots (
+    city        TEXT PRIMARY KEY,
+    snapshot_id TEXT,
+    status      TEXT,
+    updated_at  TEXT NOT NULL,
+    data        TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_snapshots_status ON snapshots(status);
+"""
+
+
+# ═══════════════════════════════════════════════════════════════════════
+# CONNEXION
+# ═══════════════════════════════════════════════════════════════════════
+
+# Connexions ouvertes (une par base et par thread) et préparations déjà
+# faites dans ce processus : (base, None) pour le registre, (base, schéma)
+_connections = threading.local()
+_prepared = set()
+_prepared_lock = threading.Lock()
+
+
+def registry_json_path(db_path):
+    """Registre JSON historique associé à une base (même nom, extension .json)."""
+    return f"{os.path.splitext(db_path)[0]}.json"
+
+
+def connect_registry(db_path=SNAPSHOTS_DB, json_path=None, schema=None):
+    """
+    Connexion au registre SQLite, ouverte une fois par base et par thread
+    puis réutilisée (ne pas la fermer).
+    
+    La préparation de la base n'a lieu qu'une fois par processus : création
+    en mode WAL, schéma du registre (et `schema`, tables d'un autre module)
+    et, si la base est vide, import du registre JSON `json_path` (défaut :
+    registry_json_path(db_path)).
+    """
+    path = os.path.abspath(db_path)
+    opened = getattr(_connections, 'by_path', None)
+    if opened is None or _connections.pid != os.getpid():
+        # Nouveau thread, ou processus issu d'un fork (connexions non partageables)
+        opened = _connections.by_path = {}
+        _connections.pid = os.getpid()
+    
+    conn = opened.get(path)
+    if conn is None:
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        conn = sqlite3.connect(path, timeout=30, isolation_level=None)
+        conn.execute("PRAGMA synchronous=NORMAL")
+        opened[path] = conn
+    
+    with _prepared_lock:
+        if (path, None) not in _prepared:
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.executescript(_SCHEMA)
+            
+            json_path = json_path or registry_json_path(db_path)
+            empty = conn.execute("SELECT COUNT(*) FROM snapshots").fetchone()[0] == 0
+            if empty and os.path.exists(json_path):
+                import_registry_json(conn, json_path)
+            _prepared.add((path, None))
+        
+        if schema is not None and (path, schema) not in _prepared:
+            conn.executescript(schema)
+            _prepared.add((path, schema))
+    
+    return conn
+
+
+def close_registry():
+    """Ferme les connexions du thread courant (la base est re-préparée au besoin)."""
+    opened = getattr(_connections, 'by_path', {})
+    with _prepared_lock:
+        for path, conn in opened.items():
+            conn.close()
+            _prepared.difference_update({key for key in _prepared if key[0] == path})
+        opened.clear()
+
+
+def import_registry_json(conn, json_path=SNAPSHOTS_REGISTRY):
+    """Importe un registre JSON (ancien format) dans la base."""
+    with open(json_path, 'r', encoding='utf-8') as f:
+        registry = json.load(f)
+    
+    snapshots = registry.get("snapshots", {})
+    
+    conn.execute("BEGIN IMMEDIATE")
+    try:
+        for info in snapshots.values():
+            _upsert(conn, info)
+        conn.execute("COMMIT")
+    except Exception:
+        conn.execute("ROLLBACK")
+        raise
+    
+    return len(snapshots)
+
+
+# ═══════════════════════════════════════════════════════════════════════
+# ÉCRITURES (ATOMIQUES PAR SNAPSHOT)
+# ═══════════════════════════════════════════════════════════════════════
+
+def _upsert(conn, info):
+    conn.execute(
+        """
+        INSERT INTO snapshots (city, snapshot_id, status, updated_at, data)
+        VALUES (?, ?, ?, ?, ?)
+        ON CONFLICT(city) DO UPDATE SET
+            snapshot_id = excluded.snapshot_id,
+            status      = excluded.status,
+            updated_at  = excluded.updated_at,
+            data        = excluded.data
+        """,
+        (
+            info["city"],
+            info.get("snapshot_id"),
+            info.get("status"),
+            datetime.now().isoformat(),
+            json.dumps(info, ensure_ascii=False),
+        ),
+    )
+
+
+@METRICS.timed('registry_write')
+def save_snapshot(info, db_path=SNAPSHOTS_DB):
+    """Enregistre (ou remplace) le snapshot d'une ville."""
+    _upsert(connect_registry(db_path), info)
+
+
+@METRICS.timed('registry_write')
+def update_snapshot_status(city, status, num_hotels=0, db_path=SNAPSHOTS_DB):
+    """
+    Met à jour le statut d'un snapshot dans le registre.
+    
+    Seule la ligne de la ville est relue et réécrite, dans une transaction ;
+    rien n'est écrit si le statut et le nombre d'hôtels n'ont pas changé.
+    """
+    conn = connect_registry(db_path)
+    try:
+        conn.execute("BEGIN IMMEDIATE")
+        row = conn.execute("SELECT data FROM snapshots WHERE city = ?", (city,)).fetchone()
+        
+        if row is None:
+            conn.execute("ROLLBACK")
+            return False
+        
+        info = json.loads(row[0])
+        
+        if info.get("status") == status and info.get("num_hotels") == num_hotels:
+            conn.execute("ROLLBACK")
+            return False
+        
+        info["status"] = status
+        info["num_hotels"] = num_hotels
+        
+        if status in ["ready", "error"]:
+            info["timestamp_complete"] = datetime.now().isoformat()
+        
+        _upsert(conn, info)
+        conn.execute("COMMIT")
+        return True
+    
+    except Exception:
+        if conn.in_transaction:
+            conn.execute("ROLLBACK")
+        raise
+
+
+@METRICS.timed('registry_write')
+def update_snapshot_fields(city, db_path=SNAPSHOTS_DB, **fields):
+    """Met à jour des champs quelconques du snapshot d'une ville (transaction)."""
+    conn = connect_registry(db_path)
+    try:
+        conn.execute("BEGIN IMMEDIATE")
+        row = conn.execute("SELECT data FROM snapshots WHERE city = ?", (city,)).fetchone()
+        
+        if row is None:
+            conn.execute("ROLLBACK")
+            return False
+        
+        info = json.loads(row[0])
+        info.update(fields)
+        
+        _upsert(conn, info)
+        conn.execute("COMMIT")
+        return True
+    
+    except Exception:
+        if conn.in_transaction:
+            conn.execute("ROLLBACK")
+        raise
+
+
+# ═══════════════════════════════════════════════════════════════════════
+# LECTURE / EXPORT
+# ═══════════════════════════════════════════════════════════════════════
+
+def load_snapshots(db_path=SNAPSHOTS_DB):
+    """Renvoie les snapshots enregistrés : {ville: infos}."""
+    rows = connect_registry(db_path).execute("SELECT city, data FROM snapshots ORDER BY rowid").fetchall()
+    
+    return {city: json.loads(data) for city, data in rows}
+
+
+def load_snapshot_registry(db_path=SNAPSHOTS_DB):
+    """Charge le registre au format historique {"timestamp", "snapshots"}."""
+    return {"timestamp": datetime.now().isoformat(), "snapshots": load_snapshots(db_path)}
+
+
+@METRICS.timed('registry_export')
+def export_registry_json(json_path=SNAPSHOTS_REGISTRY, db_path=SNAPSHOTS_DB):
+    """Exporte le registre en JSON (écriture atomique via fichier temporaire)."""
+    registry = load_snapshot_registry(db_path)
+    
+    os.makedirs(os.path.dirname(json_path) or '.', exist_ok=True)
+    tmp_path = f"{json_path}.tmp"
+    
+    with open(tmp_path, 'w', encoding='utf-8') as f:
+        json.dump(registry, f, indent=2, ensure_ascii=False)
+    os.replace(tmp_path, json_path)
+    
+    print(f"💾 Registre exporté : {json_path}")
+    return registry
@@ -0,0 +1,217 @@
+"""
+Index spatial des hôtels et des points météo
+KD-tree (SciPy) sur les coordonnées projetées sur la sphère unité : distances
+orthodromiques exactes (haversine), requêtes en lot pour le point météo le
+plus proche de chaque hôtel, les hôtels dans un rayon et les k plus proches
+"""
+
+import numpy as np
+import pandas as pd
+from scipy.spatial import cKDTree
+
+
+# ═══════════════════════════════════════════════════════════════════════
+# CONFIGURATION
+# ═══════════════════════════════════════════════════════════════════════
+
+# Rayon terrestre moyen (km)
+EARTH_RADIUS_KM = 6371.0088
+
+# Requêtes réparties sur tous les cœurs
+QUERY_WORKERS = -1
+
+
+# ═══════════════════════════════════════════════════════════════════════
+# GÉOMÉTRIE
+# ═══════════════════════════════════════════════════════════════════════
+
+def to_unit_vectors(latitude, longitude):
+    """Coordonnées (degrés) → points (x, y, z) de la sphère unité."""
+    lat = np.radians(np.asarray(latitude, dtype='float64'))
+    lon = np.radians(np.asarray(longitude, dtype='float64'))
+    cos_lat = np.cos(lat)
+    return np.column_stack([cos_lat * np.cos(lon), cos_lat * np.sin(lon), np.sin(lat)])
+
+
+def chord_to_km(chord):
+    """
+    Corde entre deux points de la sphère unité → distance orthodromique (km).
+    
+    La corde est croissante avec l'arc : le plus proche voisin euclidien en
+    3D est aussi le plus proche sur la sphère.
+    """
+    return 2 * EARTH_RADIUS_KM * np.arcsin(np.clip(np.asarray(chord) / 2, 0, 1))
+
+
+def km_to_chord(km):
+    """Distance orthodromique (km) → corde sur la sphère unité."""
+    return 2 * np.sin(np.minimum(np.asarray(km, dtype='float64') / (2 * EARTH_RADIUS_KM), np.pi / 2))
+
+
+def haversine_km(lat1, lon1, lat2, lon2):
+    """Distance orthodromique (km) entre des coordonnées en degrés (vectorisé)."""
+    lat1, lon1, lat2, lon2 = (np.radians(np.asarray(x, dtype='float64')) for x in (lat1, lon1, lat2, lon2))
+    a = np.sin((lat2 - lat1) / 2) ** 2 + np.cos(lat1) * np.cos(lat2) * np.sin((lon2 - lon1) / 2) ** 2
+    return 2 * EARTH_RADIUS_KM * np.arcsin(np.sqrt(np.clip(a, 0, 1)))
+
+
+# ═══════════════════════════════════════════════════════════════════════
+# INDEX
+# ═══════════════════════════════════════════════════════════════════════
+
+class SpatialIndex:
+    """
+    KD-tree de points géographiques.
+    
+    Les points sans coordonnées sont ignorés ; les résultats sont des
+    positions dans les tableaux d'origine (lignes du DataFrame indexé).
+    
+    Usage:
+        index = SpatialIndex.from_frame(hotels)
+        dist_km, pos = index.nearest(lat, lon, k=10)
+        pos_by_center = index.within(centers['latitude'], centers['longitude'], 5)
+    """
+
+    def __init__(self, latitude, longitude, leafsize=32):
+        latitude = np.asarray(latitude, dtype='float64')
+        longitude = np.asarray(longitude, dtype='float64')
+        
+        valid = np.isfinite(latitude) & np.isfinite(longitude)
+        self.size = len(latitude)
+        self.positions = np.flatnonzero(valid)
+        self.tree = cKDTree(to_unit_vectors(latitude[valid], longitude[valid]), leafsize=leafsize)
+
+    @classmethod
+    def from_frame(cls, df, lat_col='latitude', lon_col='longitude', **options):
+        return cls(df[lat_col].to_numpy(dtype='float64'), df[lon_col].to_numpy(dtype='float64'), **options)
+
+    def __len__(self):
+        return len(self.positions)
+
+    def nearest(self, latitude, longitude, k=1, max_km=None):
+        """
+        k plus proches points de chaque requête, du plus proche au plus loin.
+        
+        Args:
+            latitude, longitude (array-like): Coordonnées des requêtes
+            k (int): Nombre de voisins
+            max_km (float): Distance maximale (au-delà : pas de voisin)
+        
+        Returns:
+            tuple: (distances km, positions), tableaux (n, k) ; sans voisin
+                   (ou requête sans coordonnées) : distance inf, position -1
+        """
+        queries = to_unit_vectors(latitude, longitude)
+        n = len(queries)
+        distances = np.full((n, k), np.inf)
+        positions = np.full((n, k), -1, dtype='int64')
+        
+        valid = np.isfinite(queries).all(axis=1)
+        if not valid.any() or not len(self):
+            return distances, positions
+        
+        bound = km_to_chord(max_km) if max_km is not None else np.inf
+        chord, found = self.tree.query(queries[valid], k=k, distance_upper_bound=bound, workers=QUERY_WORKERS)
+        chord, found = chord.reshape(-1, k), found.reshape(-1, k)
+        
+        hit = found < len(self)
+        rows = np.flatnonzero(valid)
+        distances[rows] = np.where(hit, chord_to_km(np.where(hit, chord, 0)), np.inf)
+        positions[rows] = np.where(hit, self.positions[np.minimum(found, len(self) - 1)], -1)
+        return distances, positions
+
+    def within(self, latitude, longitude, radius_km):
+        """
+        Points à moins de `radius_km` de chaque requête.
+        
+        Returns:
+            list: Pour chaque requête, positions triées par distance croissante
+        """
+        queries = to_unit_vectors(latitude, longitude)
+        radius = np.broadcast_to(km_to_chord(radius_km), len(queries))
+        
+        results = [np.array([], dtype='int64')] * len(queries)
+        valid = np.flatnonzero(np.isfinite(queries).all(axis=1))
+        if not len(valid) or not len(self):
+            return results
+        
+        found = self.tree.query_ball_point(queries[valid], radius[valid], workers=QUERY_WORKERS)
+        for row, points in zip(valid, found):
+            points = np.asarray(points, dtype='int64')
+            order = np.argsort(np.linalg.norm(self.tree.data[points] - queries[row], axis=1), kind='stable')
+            results[row] = self.positions[points[order]]
+        return results
+
+    def within_pairs(self, latitude, longitude, radius_km):
+        """
+        Paires (requête, point, distance) à moins de `radius_km`, à plat.
+        
+        Returns:
+            tuple: (positions des requêtes, positions des points, distances km)
+        """
+        matches = self.within(latitude, longitude, radius_km)
+        counts = np.fromiter((len(m) for m in matches), dtype='int64', count=len(matches))
+        query_pos = np.repeat(np.arange(len(matches)), counts)
+        point_pos = np.concatenate(matches) if len(matches) else np.array([], dtype='int64')
+        
+        lat = np.asarray(latitude, dtype='float64')
+        lon = np.asarray(longitude, dtype='float64')
+        points = self.tree.data[np.searchsorted(self.positions, point_pos)]
+        chord = np.linalg.norm(points - to_unit_vectors(lat[query_pos], lon[query_pos]), axis=1)
+        return query_pos, point_pos, chord_to_km(chord)
+
+
+# ═══════════════════════════════════════════════════════════════════════
+# REQUÊTES SUR DATAFRAMES
+# ═══════════════════════════════════════════════════════════════════════
+
+def nearest_points(df, points, columns, max_km=None, distance_col='distance_km', index=None):
+    """
+    Rattache chaque ligne de `df` au point de `points` le plus proche.
+    
+    Ex. : point météo le plus proche de chaque hôtel, pour fusionner la
+    météo au niveau de l'hôtel plutôt que par nom de ville.
+    
+    Args:
+        df (DataFrame): Lignes à rattacher (latitude, longitude)
+        points (DataFrame): Points de référence (latitude, longitude + `columns`)
+        columns (list): Colonnes de `points` ajoutées à `df`
+        max_km (float): Au-delà, pas de rattachement (valeurs manquantes)
+        distance_col (str): Colonne de distance ajoutée (km)
+        index (SpatialIndex): Index déjà construit sur `points`
+    
+    Returns:
+        DataFrame: Copie de `df` avec `columns` et `distance_col`
+    """
+    index = index or SpatialIndex.from_frame(points)
+    distances, positions = index.nearest(df['latitude'], df['longitude'], k=1, max_km=max_km)
+    distances, positions = distances[:, 0], positions[:, 0]
+    
+    found = positions >= 0
+    result = df.copy()
+    for column in columns:
+        values = points[column].to_numpy()
+        result[column] = pd.Series(values[np.where(found, positions, 0)], index=df.index).where(found)
+    result[distance_col] = np.where(found, distances, np.nan)
+    return result
+
+
+def hotels_within(hotels, latitude, longitude, radius_km, index=None):
+    """Hôtels à moins de `radius_km` d'un lieu, du plus proche au plus loin (colonne distance_km)."""
+    index = index or SpatialIndex.from_frame(hotels)
+    positions = index.within([latitude], [longitude], radius_km)[0]
+    
+    result = hotels.iloc[positions].copy()
+    result['distance_km'] = haversine_km(latitude, longitude, result['latitude'], result['longitude'])
+    return result
+
+
+def nearest_hotels(hotels, latitude, longitude, k=10, max_km=None, index=None):
+    """k hôtels les plus proches d'un lieu, du plus proche au plus loin (colonne distance_km)."""
+    index = index or SpatialIndex.from_frame(hotels)
+    distances, positions = index.nearest([latitude], [longitude], k=k, max_km=max_km)
+    
+    found = positions[0] >= 0
+    result = hotels.iloc[positions[0][found]].copy()
+    result['distance_km'] = distances[0][found]
+    return result
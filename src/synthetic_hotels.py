@@ -0,0 +1,123 @@
+"""
+Génération de snapshots BrightData synthétiques
+Reproduit la structure des hôtels renvoyés par l'API (coordonnées avec la
+faute "lan", pricing/offers imbriqués, équipements, images) pour les
+benchmarks et les tests de montée en charge, sans appel à l'API
+"""
+
+import random
+from datetime import date
+
+
+# ═══════════════════════════════════════════════════════════════════════
+# CONFIGURATION
+# ═══════════════════════════════════════════════════════════════════════
+
+PROPERTY_TYPES = ['HOTEL', 'APARTMENT', 'HOLIDAY_HOME', 'GUEST_HOUSE', 'VILLA', 'BED_AND_BREAKFAST']
+
+FACILITIES = [
+    'Free Wifi', 'Non-smoking rooms', 'Free parking', 'Outdoor swimming pool', 'Terrace',
+    'Garden', 'Bar', 'Family rooms', 'Air conditioning', 'Restaurant', 'Fitness centre',
+]
+
+# Centre approximatif (lat, lon) des villes connues ; les autres sont tirées en France
+CITY_CENTERS = {
+    'Marseille': (43.2965, 5.3698),
+    'Cassis': (43.2148, 5.5396),
+    'Aix en Provence': (43.5297, 5.4474),
+    'Avignon': (43.9493, 4.8055),
+    'Bormes les Mimosas': (43.1507, 6.3419),
+}
+
+
+# ═══════════════════════════════════════════════════════════════════════
+# GÉNÉRATION
+# ═══════════════════════════════════════════════════════════════════════
+
+def stay_nights(search_input):
+    """Nombre de nuits d'un input de recherche (2 si les dates manquent)."""
+    try:
+        check_in = date.fromisoformat(search_input['check_in'][:10])
+        check_out = date.fromisoformat(search_input['check_out'][:10])
+        return max((check_out - check_in).days, 1)
+    except (KeyError, TypeError, ValueError):
+        return 2
+
+
+def make_hotel(rng, city, idx, error_rate=0.0, search_input=None):
+    """Construit un hôtel synthétique (dict au format de l'API)."""
+    lat0, lon0 = CITY_CENTERS.get(city, (43.0 + (sum(map(ord, city)) % 500) / 100, 5.0))
+    price = round(rng.uniform(40, 600))
+    
+    # Occupation et durée du séjour de la recherche (prix du séjour complet)
+    search_input = search_input or {'location': f"{city}, France"}
+    adults = int(search_input.get('adults', 2))
+    nights = stay_nights(search_input)
+    price = round(price * nights / 2 * (1 + 0.25 * (adults - 2)))
+    
+    hotel = {
+        'url': f"https://www.booking.com/hotel/fr/{city.replace(' ', '-').lower()}-{idx}.html",
+        'listing_id': str(100000 + idx),
+        'title': f"Hôtel {city} {idx}",
+        'location': "Provence-Alpes-Côte d'Azur",
+        'country': 'France',
+        'city': city,
+        'input': search_input,
+        'review_score': round(rng.uniform(5, 10), 1),
+        'number_of_reviews': rng.randint(0, 3000),
+        'description': "Établissement situé au cœur de la ville. " * rng.randint(1, 20),
+        'property_type': rng.choice(PROPERTY_TYPES),
+        # L'API renvoie parfois "lan" au lieu de "lat"
+        'coordinates': {
+            ('lan' if rng.random() < 0.5 else 'lat'): lat0 + rng.uniform(-0.05, 0.05),
+            'lon': lon0 + rng.uniform(-0.05, 0.05),
+        },
+        'pricing': [{
+            'room_type': 'Double Room',
+            'offers': [{
+                'occupancy': {'adults': adults, 'children': 0, 'total': adults},
+                'price': {
+                    'initial_price': price,
+                    'final_price': price,
+                    'discount_percent': 0,
+                    'currency': 'EUR',
+                    'nights': nights,
+                },
+            }],
+        }],
+        'most_popular_facilities': rng.sample(FACILITIES, rng.randint(0, 8)),
+        'images': [f"https://cf.bstatic.com/xdata/images/hotel/{idx}_{i}.jpg" for i in range(rng.randint(0, 5))],
+    }
+    
+    # Défauts réalistes : champs manquants ou mal formés
+    if error_rate and rng.random() < error_rate:
+        defect = rng.randrange(4)
+        if defect == 0:
+            hotel['title'] = None
+        elif defect == 1:
+            hotel['coordinates'] = {'lat': 'n/a', 'lon': lon0}
+        elif defect == 2:
+            hotel['pricing'] = []
+        else:
+            hotel['coordinates'] = None
+    
+    return hotel
+
+
+def make_synthetic_hotels(n, city='Marseille', seed=0, error_rate=0.01, search_input=None):
+    """
+    Génère un snapshot synthétique de `n` hôtels pour une ville.
+    
+    Args:
+        n (int): Nombre d'hôtels
+        city (str): Ville
+        seed (int): Graine aléatoire (résultats reproductibles)
+        error_rate (float): Part d'hôtels avec un défaut (titre, GPS, prix)
+        search_input (dict): Input de recherche renvoyé dans le champ `input`
+            (dates et adultes déterminent le prix du séjour)
+    
+    Returns:
+        list: Hôtels au format de l'API
+    """
+    rng = random.Random(seed)
+    return [make_hotel(rng, city, idx, error_rate, search_input) for idx in range(1, n + 1)]
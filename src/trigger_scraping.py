@@ -6,89 +6,71 @@ Lancement des requêtes POST en parallèle pour obtenir les snapshot_id
 import aiohttp
 import asyncio
 import json
-import os
 from datetime import datetime, timedelta
-from dotenv import load_dotenv
+
+from http_client import BrightDataClient, api_base_url
+from incremental import DEFAULT_TTL_HOURS, is_fresh, request_fingerprint
+from metrics import METRICS
+from pipeline_config import load_brightdata_config
+
+from snapshot_registry import (
+    SNAPSHOTS_REGISTRY,
+    export_registry_json,
+    load_snapshots,
+    save_snapshot,
+)
 
 
 # ═══════════════════════════════════════════════════════════════════════
 # CONFIGURATION
 # ═══════════════════════════════════════════════════════════════════════
 
-SNAPSHOTS_REGISTRY = 'data/raw/snapshots/snapshots_registry.json'
-
-
 def load_config():
-    """Charge la configuration API."""
-    from pathlib import Path
-    
-    # Trouver le fichier .env de manière robuste
-    # 1. Essayer depuis le dossier courant (si lancé depuis notebook)
-    env_path = Path('config/.env')
-    
-    # 2. Si pas trouvé, essayer depuis le parent (si lancé depuis notebooks/)
-    if not env_path.exists():
-        env_path = Path('../config/.env')
-    
-    # 3. Si toujours pas trouvé, essayer chemin absolu
-    if not env_path.exists():
-        env_path = Path(__file__).parent.parent / 'config' / '.env'
-    
-    print(f"🔍 Chargement depuis : {env_path.absolute()}")
-    
-    if not env_path.exists():
-        raise FileNotFoundError(f"❌ Fichier .env introuvable : {env_path.absolute()}")
-    
-    load_dotenv(env_path)
-    
-    api_key = os.getenv('BRIGHTDATA_API_KEY')
-    dataset_id = "gd_mdy9ld3p1e0oqlj9g4"
-    
-    if not api_key:
-        raise ValueError(f"❌ BRIGHTDATA_API_KEY non trouvée dans {env_path}")
-    
-    print(f"✅ API Key chargée : {api_key[:20]}...")
-    return api_key, dataset_id
+    """Charge la configuration API : (api_key, dataset_id)."""
+    return load_brightdata_config()
 
 
-def save_snapshot_registry(registry):
-    """Sauvegarde le registre des snapshots."""
-    os.makedirs('data/raw/snapshots', exist_ok=True)
-    with open(SNAPSHOTS_REGISTRY, 'w', encoding='utf-8') as f:
-        json.dump(registry, f, indent=2, ensure_ascii=False)
-    print(f"💾 Registre sauvegardé : {SNAPSHOTS_REGISTRY}")
+# ═══════════════════════════════════════════════════════════════════════
+# FONCTION ASYNCHRONE : POST /trigger
+# ═══════════════════════════════════════════════════════════════════════
 
+def stay_dates():
+    """Dates du séjour recherché : arrivée dans 30 jours, 2 nuits."""
+    checkin = datetime.now() + timedelta(days=30)
+    checkout = checkin + timedelta(days=2)
+    return checkin, checkout
 
-def load_snapshot_registry():
-    """Charge le registre des snapshots."""
-    if os.path.exists(SNAPSHOTS_REGISTRY):
-        with open(SNAPSHOTS_REGISTRY, 'r', encoding='utf-8') as f:
-            return json.load(f)
-    return {"timestamp": datetime.now().isoformat(), "snapshots": {}}
 
+def build_search_input(city_name, checkin, checkout, adults=2, rooms=1):
+    """Construit l'input de recherche Booking pour une ville."""
+    return {
+        "url": "https://www.booking.com",
+        "location": f"{city_name}, France",
+        "check_in": checkin.strftime("%Y-%m-%dT00:00:00.000Z"),
+        "check_out": checkout.strftime("%Y-%m-%dT00:00:00.000Z"),
+        "adults": adults,
+        "rooms": rooms,
+        "currency": "EUR",
+        "country": "FR"
+    }
 
-# ═══════════════════════════════════════════════════════════════════════
-# FONCTION ASYNCHRONE : POST /trigger
-# ═══════════════════════════════════════════════════════════════════════
 
-async def trigger_city_scraping(session, city_name, max_hotels, api_key, dataset_id):
+async def post_trigger(session, search_inputs, max_hotels, api_key, dataset_id, label):
     """
-    Déclenche le scraping pour une ville (POST).
+    Envoie une liste d'inputs de recherche à POST /trigger (un snapshot).
     
     Args:
-        session: Session aiohttp
-        city_name (str): Nom de la ville
-        max_hotels (int): Nombre max d'hôtels
+        session: Session aiohttp ou BrightDataClient (retries et limitation de débit)
+        search_inputs (list): Inputs de recherche (build_search_input)
+        max_hotels (int): Nombre max d'hôtels par input
         api_key (str): Clé API BrightData
         dataset_id (str): ID du dataset
-        
+        label (str): Libellé affiché
+    
     Returns:
-        dict: Informations du snapshot
+        str: ID du snapshot (None si échec)
     """
-    checkin = datetime.now() + timedelta(days=30)
-    checkout = checkin + timedelta(days=2)
-    
-    url = "https://api.brightdata.com/datasets/v3/trigger"
+    url = f"{api_base_url()}/trigger"
     
     headers = {
         "Authorization": f"Bearer {api_key}",
@@ -103,58 +85,116 @@ async def trigger_city_scraping(session, city_name, max_hotels, api_key, dataset
         "limit_per_input": str(max_hotels),
     }
     
-    data = [{
-        "url": "https://www.booking.com",
-        "location": f"{city_name}, France",
-        "check_in": checkin.strftime("%Y-%m-%dT00:00:00.000Z"),
-        "check_out": checkout.strftime("%Y-%m-%dT00:00:00.000Z"),
-        "adults": 2,
-        "rooms": 1,
-        "currency": "EUR",
-        "country": "FR"
-    }]
-    
     try:
-        async with session.post(url, headers=headers, params=params, json=data) as response:
+        async with session.post(url, headers=headers, params=params, json=search_inputs) as response:
             response_text = await response.text()
             
             if response.status == 200:
-                result = json.loads(response_text)
-                snapshot_id = result.get('snapshot_id')
+                snapshot_id = json.loads(response_text).get('snapshot_id')
                 
                 if snapshot_id:
-                    print(f"✅ {city_name:20s} → Snapshot: {snapshot_id}")
-                    return {
-                        "city": city_name,
-                        "snapshot_id": snapshot_id,
-                        "status": "triggered",
-                        "timestamp": datetime.now().isoformat(),
-                        "max_hotels": max_hotels
-                    }
+                    print(f"✅ {label:20s} → Snapshot: {snapshot_id}")
+                    return snapshot_id
                 else:
-                    print(f"❌ {city_name:20s} → Pas de snapshot_id")
+                    print(f"❌ {label:20s} → Pas de snapshot_id")
                     return None
             else:
-                print(f"❌ {city_name:20s} → HTTP {response.status}")
+                print(f"❌ {label:20s} → HTTP {response.status}")
                 return None
     
     except Exception as e:
-        print(f"❌ {city_name:20s} → Erreur: {e}")
+        print(f"❌ {label:20s} → Erreur: {e}")
         return None
 
 
+async def trigger_cities_batch(session, cities, max_hotels, api_key, dataset_id):
+    """
+    Déclenche le scraping d'un lot de villes en une seule requête (POST).
+    
+    L'API accepte une liste d'inputs : toutes les villes du lot partagent
+    le même snapshot, découpé ensuite par ville côté fetch (champ location).
+    
+    Args:
+        session: Session aiohttp ou BrightDataClient (retries et limitation de débit)
+        cities (list): Noms des villes du lot
+        max_hotels (int): Nombre max d'hôtels par ville
+        api_key (str): Clé API BrightData
+        dataset_id (str): ID du dataset
+    
+    Returns:
+        list: Informations du snapshot, une entrée par ville (vide si échec)
+    """
+    checkin, checkout = stay_dates()
+    
+    data = [build_search_input(city_name, checkin, checkout) for city_name in cities]
+    
+    label = cities[0] if len(cities) == 1 else f"Lot de {len(cities)} villes"
+    
+    snapshot_id = await post_trigger(session, data, max_hotels, api_key, dataset_id, label)
+    if not snapshot_id:
+        return []
+    
+    timestamp = datetime.now().isoformat()
+    
+    entries = []
+    for city_name, search_input in zip(cities, data):
+        entry = {
+            "city": city_name,
+            "snapshot_id": snapshot_id,
+            "dataset_id": dataset_id,
+            "status": "triggered",
+            "timestamp": timestamp,
+            "max_hotels": max_hotels,
+            "fingerprint": request_fingerprint(search_input, max_hotels)
+        }
+        if len(cities) > 1:
+            entry["batch_cities"] = list(cities)
+        entries.append(entry)
+    
+    return entries
+
+
+async def trigger_city_scraping(session, city_name, max_hotels, api_key, dataset_id):
+    """
+    Déclenche le scraping pour une ville (POST).
+    
+    Args:
+        session: Session aiohttp ou BrightDataClient (retries et limitation de débit)
+        city_name (str): Nom de la ville
+        max_hotels (int): Nombre max d'hôtels
+        api_key (str): Clé API BrightData
+        dataset_id (str): ID du dataset
+    
+    Returns:
+        dict: Informations du snapshot
+    """
+    entries = await trigger_cities_batch(session, [city_name], max_hotels, api_key, dataset_id)
+    return entries[0] if entries else None
+
+
 # ═══════════════════════════════════════════════════════════════════════
 # FONCTION PRINCIPALE
 # ═══════════════════════════════════════════════════════════════════════
 
-async def trigger_all_cities(cities_list, max_hotels_per_city=15):
+async def trigger_all_cities(cities_list, max_hotels_per_city=15, max_concurrency=10, rate_limit=5.0,
+                             max_retries=4, batch_size=1, incremental=False, ttl_hours=DEFAULT_TTL_HOURS,
+                             run=None, metrics_format='jsonl'):
     """
     Déclenche le scraping pour toutes les villes en parallèle.
     
     Args:
         cities_list (list): Liste des villes
         max_hotels_per_city (int): Nombre d'hôtels par ville
-        
+        max_concurrency (int): Requêtes POST simultanées maximum
+        rate_limit (float): Requêtes par seconde vers l'API
+        max_retries (int): Nouvelles tentatives par requête (429, 5xx, erreurs réseau)
+        batch_size (int): Villes par requête POST (1 = un snapshot par ville)
+        incremental (bool): Ne pas relancer les villes dont le snapshot est encore frais
+        ttl_hours (float): Durée de validité d'un snapshot en mode incrémental
+        run (PipelineRun): Run reprenable (les villes déjà déclenchées sont ignorées)
+        metrics_format (str): Format du fichier de métriques ('jsonl',
+            'prometheus', None = pas de fichier)
+    
     Returns:
         dict: Registre mis à jour
     """
@@ -163,43 +203,88 @@ async def trigger_all_cities(cities_list, max_hotels_per_city=15):
     print(f"{'='*80}")
     print(f"🏙️  Villes : {len(cities_list)}")
     print(f"🏨 Hôtels par ville : {max_hotels_per_city}")
+    print(f"📦 Villes par requête : {batch_size}")
     print(f"⏱️  Démarrage : {datetime.now().strftime('%H:%M:%S')}\n")
     
     # Charger la config
     api_key, dataset_id = load_config()
     
-    # Charger le registre existant
-    registry = load_snapshot_registry()
+    # Run repris : ne pas redéclencher les villes qui ont déjà un snapshot
+    if run is not None:
+        stages = run.cities()
+        done = [city for city in cities_list if run.stage_reached(stages.get(city, {}).get('stage'), 'triggered')]
+        if done:
+            print(f"🔁 Déjà déclenchées dans le run {run.run_id} : {len(done)}\n")
+        cities_list = [city for city in cities_list if city not in done]
+    
+    # Mode incrémental : réutiliser les snapshots frais (même empreinte, < TTL)
+    reused = []
+    if incremental:
+        existing = load_snapshots()
+        checkin, checkout = stay_dates()
+        
+        to_trigger = []
+        for city in cities_list:
+            fingerprint = request_fingerprint(build_search_input(city, checkin, checkout), max_hotels_per_city)
+            if is_fresh(existing.get(city), fingerprint, ttl_hours):
+                reused.append(city)
+            else:
+                to_trigger.append(city)
+        
+        if reused:
+            print(f"♻️  Snapshots réutilisés (< {ttl_hours}h) : {len(reused)}")
+            for city in reused:
+                print(f"   • {city:25s} → {existing[city]['snapshot_id']}")
+                if run is not None:
+                    run.advance(city, 'triggered', snapshot=existing[city])
+            print()
+        
+        cities_list = to_trigger
     
     timeout = aiohttp.ClientTimeout(total=60)
+    client = BrightDataClient(max_concurrency=max_concurrency, rate=rate_limit,
+                              max_retries=max_retries, timeout=timeout)
     
-    async with aiohttp.ClientSession(timeout=timeout) as session:
+    async with client:
         
-        # Créer les tâches pour toutes les villes
+        # Créer les tâches : une requête par lot de villes
+        batches = [cities_list[i:i + batch_size] for i in range(0, len(cities_list), batch_size)]
         tasks = [
-            trigger_city_scraping(session, city, max_hotels_per_city, api_key, dataset_id)
-            for city in cities_list
+            trigger_cities_batch(client, batch, max_hotels_per_city, api_key, dataset_id)
+            for batch in batches
         ]
         
-        # Exécuter en parallèle
-        results = await asyncio.gather(*tasks)
-        
-        # Mettre à jour le registre
-        registry["timestamp"] = datetime.now().isoformat()
-        
+        # Exécuter en parallèle, chaque snapshot est enregistré dès son retour
         success_count = 0
-        for result in results:
-            if result:
-                registry["snapshots"][result["city"]] = result
+        triggered = set()
+        for next_result in asyncio.as_completed(tasks):
+            for result in await next_result:
+                save_snapshot(result)
+                if run is not None:
+                    run.advance(result["city"], 'triggered', snapshot=result)
+                triggered.add(result["city"])
                 success_count += 1
-        
-        # Sauvegarder
-        save_snapshot_registry(registry)
+    
+    client.print_report()
+    
+    failed = [city for city in cities_list if city not in triggered]
+    if failed:
+        print(f"\n⚠️  Villes non déclenchées : {', '.join(failed)}")
+    
+    # Exporter le registre au format JSON
+    registry = export_registry_json()
+    
+    # Métriques de l'étape
+    METRICS.print_report()
+    if metrics_format:
+        METRICS.write('trigger', run.run_id if run is not None else None, metrics_format)
     
     print(f"\n{'='*80}")
     print(f"✅ STEP 1 TERMINÉ")
     print(f"{'='*80}")
     print(f"📊 Snapshots créés : {success_count}/{len(cities_list)}")
+    if reused:
+        print(f"♻️  Snapshots réutilisés : {len(reused)}")
     print(f"📁 Registre : {SNAPSHOTS_REGISTRY}\n")
     
     return registry
@@ -0,0 +1,359 @@
+"""
+Collecte des prévisions météo OpenWeatherMap (5 jours / 3 heures)
+Requêtes asynchrones concurrentes (concurrence bornée, limitation de débit,
+retries), cache disque des réponses par (lat, lon, heure) avec expiration,
+et agrégation journalière vectorisée (pandas) de toutes les villes en une fois
+
+Usage :
+    python src/weather_collector.py
+    python src/weather_collector.py --rate-limit 50 --max-concurrency 50
+"""
+
+import aiohttp
+import argparse
+import asyncio
+import json
+import os
+import sqlite3
+import time
+import zlib
+
+import numpy as np
+import pandas as pd
+
+from http_client import RateLimitedClient
+from pipeline_config import load_env, require_env
+
+
+# ═══════════════════════════════════════════════════════════════════════
+# CONFIGURATION
+# ═══════════════════════════════════════════════════════════════════════
+
+DEFAULT_FORECAST_URL = "https://api.openweathermap.org/data/2.5/forecast"
+
+WEATHER_CACHE_DB = 'data/raw/weather_cache/forecasts.db'
+
+# Une réponse est réutilisée pendant l'heure en cours, puis supprimée après CACHE_TTL
+CACHE_BUCKET_SECONDS = 3600
+CACHE_TTL_SECONDS = 3600
+
+# Précision des coordonnées dans la clé du cache (4 décimales ≈ 11 m)
+COORD_DECIMALS = 4
+
+# API gratuite : 60 appels/minute
+DEFAULT_RATE_LIMIT = 1.0
+
+# Colonnes du CSV météo (notebook 02)
+WEATHER_COLUMNS = [
+    'city_id', 'city', 'latitude', 'longitude',
+    'day', 'date',
+    'temp_min', 'temp_max', 'temp_avg',
+    'humidity', 'pop', 'rain',
+    'wind_speed', 'clouds',
+    'weather_description',
+]
+
+_CACHE_SCHEMA = """
+CREATE TABLE IF NOT EXISTS forecasts (
+    lat        REAL NOT NULL,
+    lon        REAL NOT NULL,
+    bucket     INTEGER NOT NULL,
+    fetched_at REAL NOT NULL,
+    body       BLOB NOT NULL,
+    PRIMARY KEY (lat, lon, bucket)
+);
+CREATE INDEX IF NOT EXISTS idx_forecasts_fetched ON forecasts(fetched_at);
+"""
+
+
+def forecast_url():
+    """URL de l'API de prévisions (surchargeable par OPENWEATHER_API_URL)."""
+    return os.getenv("OPENWEATHER_API_URL", DEFAULT_FORECAST_URL)
+
+
+def load_api_key():
+    """Charge la clé OpenWeatherMap (config/.env ou environnement)."""
+    api_key = require_env('OPENWEATHER_API_KEY', load_env())
+    
+    print(f"✅ Clé API chargée : {api_key[:10]}...")
+    return api_key
+
+
+# ═══════════════════════════════════════════════════════════════════════
+# CACHE DISQUE DES RÉPONSES
+# ═══════════════════════════════════════════════════════════════════════
+
+class ForecastCache:
+    """
+    Réponses brutes de l'API, clé (lat, lon, tranche horaire).
+    
+    Stockage SQLite (JSON compressé) : une lecture groupée pour tous les
+    points d'une collecte, une transaction pour toutes les réponses neuves.
+    Les entrées plus anciennes que `ttl` sont supprimées à l'ouverture.
+    """
+
+    def __init__(self, db_path=WEATHER_CACHE_DB, ttl=CACHE_TTL_SECONDS, bucket_seconds=CACHE_BUCKET_SECONDS):
+        self.db_path = db_path
+        self.ttl = ttl
+        self.bucket_seconds = bucket_seconds
+        
+        os.makedirs(os.path.dirname(db_path) or '.', exist_ok=True)
+        self.conn = sqlite3.connect(db_path, timeout=30, isolation_level=None)
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.executescript(_CACHE_SCHEMA)
+        self.evicted = self.evict()
+
+    def close(self):
+        self.conn.close()
+
+    def bucket(self, now=None):
+        return int((now or time.time()) // self.bucket_seconds)
+
+    @staticmethod
+    def key(lat, lon):
+        return round(float(lat), COORD_DECIMALS), round(float(lon), COORD_DECIMALS)
+
+    def evict(self, now=None):
+        """Supprime les réponses expirées ; renvoie leur nombre."""
+        cursor = self.conn.execute("DELETE FROM forecasts WHERE fetched_at < ?", ((now or time.time()) - self.ttl,))
+        return cursor.rowcount
+
+    def get_many(self, keys, now=None):
+        """Réponses en cache de la tranche horaire courante : {(lat, lon): payload}."""
+        bucket = self.bucket(now)
+        wanted = set(keys)
+        rows = self.conn.execute(
+            "SELECT lat, lon, body FROM forecasts WHERE bucket = ? AND fetched_at >= ?",
+            (bucket, (now or time.time()) - self.ttl),
+        )
+        return {
+            (lat, lon): json.loads(zlib.decompress(body))
+            for lat, lon, body in rows
+            if (lat, lon) in wanted
+        }
+
+    def put_many(self, payloads, now=None):
+        """Enregistre des réponses {(lat, lon): payload} dans une transaction."""
+        now = now or time.time()
+        bucket = self.bucket(now)
+        
+        self.conn.execute("BEGIN IMMEDIATE")
+        try:
+            self.conn.executemany(
+                "INSERT OR REPLACE INTO forecasts (lat, lon, bucket, fetched_at, body) VALUES (?, ?, ?, ?, ?)",
+                [
+                    (lat, lon, bucket, now, zlib.compress(json.dumps(payload).encode('utf-8')))
+                    for (lat, lon), payload in payloads.items()
+                ],
+            )
+            self.conn.execute("COMMIT")
+        except Exception:
+            self.conn.execute("ROLLBACK")
+            raise
+
+
+# ═══════════════════════════════════════════════════════════════════════
+# REQUÊTES ASYNCHRONES
+# ═══════════════════════════════════════════════════════════════════════
+
+async def fetch_forecast(client, lat, lon, api_key, label=''):
+    """
+    Prévisions 5 jours / 3 heures d'un point (GET).
+    
+    Returns:
+        dict: Réponse JSON de l'API (None si échec)
+    """
+    params = {
+        'lat': lat,
+        'lon': lon,
+        'appid': api_key,
+        'units': 'metric',
+        'lang': 'fr'
+    }
+    
+    try:
+        async with client.get(forecast_url(), params=params) as response:
+            if response.status != 200:
+                print(f"❌ Erreur API pour {label}: HTTP {response.status}")
+                return None
+            return await response.json(content_type=None)
+    except Exception as e:
+        print(f"❌ Erreur API pour {label}: {e}")
+        return None
+
+
+async def collect_forecasts(points, api_key=None, max_concurrency=20, rate_limit=DEFAULT_RATE_LIMIT,
+                            cache_path=WEATHER_CACHE_DB, ttl=CACHE_TTL_SECONDS):
+    """
+    Récupère les prévisions brutes de tous les points (cache puis API).
+    
+    Args:
+        points (DataFrame): Colonnes city, latitude, longitude
+        api_key (str): Clé OpenWeatherMap (défaut : config/.env)
+        max_concurrency (int): Requêtes simultanées maximum
+        rate_limit (float): Requêtes par seconde vers l'API
+        cache_path (str): Base du cache (None = pas de cache)
+        ttl (float): Durée de vie des réponses en cache (s)
+    
+    Returns:
+        list: Réponse de chaque point, dans l'ordre de `points` (None si échec)
+    """
+    keys = [ForecastCache.key(lat, lon) for lat, lon in zip(points['latitude'], points['longitude'])]
+    
+    cache = ForecastCache(cache_path, ttl) if cache_path else None
+    try:
+        cached = cache.get_many(keys) if cache else {}
+        missing = list(dict.fromkeys(key for key in keys if key not in cached))
+        
+        print(f"🌦️ Prévisions : {len(keys)} points | {sum(key in cached for key in keys)} en cache | "
+              f"{len(missing)} appel(s) API")
+        
+        fetched = {}
+        if missing:
+            api_key = api_key or load_api_key()
+            labels = dict(zip(keys, points['city']))
+            
+            timeout = aiohttp.ClientTimeout(total=None, connect=30, sock_read=30)
+            client = RateLimitedClient(max_concurrency=max_concurrency, rate=rate_limit, timeout=timeout,
+                                       stage='http_weather')
+            
+            async with client:
+                payloads = await asyncio.gather(*[
+                    fetch_forecast(client, lat, lon, api_key, labels[(lat, lon)]) for lat, lon in missing
+                ])
+            
+            client.print_report()
+            fetched = {key: payload for key, payload in zip(missing, payloads) if payload is not None}
+            
+            if cache and fetched:
+                cache.put_many(fetched)
+    finally:
+        if cache:
+            cache.close()
+    
+    return [cached.get(key) or fetched.get(key) for key in keys]
+
+
+# ═══════════════════════════════════════════════════════════════════════
+# AGRÉGATION JOURNALIÈRE VECTORISÉE
+# ═══════════════════════════════════════════════════════════════════════
+
+def _forecast_rows(point, payload):
+    """Champs des créneaux de 3 heures d'une réponse (une ligne par créneau)."""
+    return [
+        (
+            point, item['dt'], item['main']['temp'], item['main']['humidity'],
+            item.get('pop', 0) * 100, item.get('rain', {}).get('3h', 0),
+            item['wind']['speed'], item['clouds']['all'], item['weather'][0]['description'],
+        )
+        for item in payload.get('list', [])
+    ]
+
+
+def daily_forecasts(points, payloads, max_days=7):
+    """
+    Agrège les créneaux de 3 heures par ville et par jour (UTC).
+    
+    Tous les points sont agrégés ensemble (un seul groupby) : min / max /
+    moyenne des températures, humidité, vent et nuages moyens, probabilité
+    de pluie maximale, pluie totale, description du créneau du milieu de
+    la journée.
+    
+    Args:
+        points (DataFrame): Colonnes city, latitude, longitude (+ city_id)
+        payloads (list): Réponses de l'API, dans l'ordre de `points`
+        max_days (int): Nombre de jours gardés par ville
+    
+    Returns:
+        DataFrame: Une ligne par ville et par jour (colonnes WEATHER_COLUMNS)
+    """
+    cities = points['city'].tolist()
+    
+    rows = []
+    for i, payload in enumerate(payloads):
+        if not payload:
+            continue
+        try:
+            rows.extend(_forecast_rows(i, payload))
+        except (KeyError, IndexError, TypeError) as e:
+            print(f"❌ Erreur de données pour {cities[i]}: {e}")
+    
+    columns = ['point', 'dt', 'temp', 'humidity', 'pop', 'rain', 'wind_speed', 'clouds', 'description']
+    items = pd.DataFrame(rows, columns=columns)
+    if items.empty:
+        return pd.DataFrame(columns=WEATHER_COLUMNS)
+    
+    items['day_number'] = items['dt'].to_numpy() // 86400
+    items = items.sort_values(['point', 'dt'], kind='stable').reset_index(drop=True)
+    
+    groups = items.groupby(['point', 'day_number'], sort=True)
+    daily = groups.agg(
+        temp_min=('temp', 'min'),
+        temp_max=('temp', 'max'),
+        temp_avg=('temp', 'mean'),
+        humidity=('humidity', 'mean'),
+        pop=('pop', 'max'),
+        rain=('rain', 'sum'),
+        wind_speed=('wind_speed', 'mean'),
+        clouds=('clouds', 'mean'),
+        size=('temp', 'size'),
+    ).reset_index()
+    
+    # Description du créneau du milieu de journée (créneaux triés par point puis heure)
+    sizes = daily['size'].to_numpy()
+    starts = np.r_[0, np.cumsum(sizes)[:-1]]
+    daily['weather_description'] = items['description'].to_numpy()[starts + sizes // 2]
+    
+    daily['day'] = daily.groupby('point').cumcount() + 1
+    daily = daily[daily['day'] <= max_days]
+    
+    daily['date'] = pd.to_datetime(daily['day_number'], unit='D').dt.strftime('%Y-%m-%d')
+    
+    point_index = daily['point'].to_numpy()
+    daily['city'] = np.asarray(cities, dtype=object)[point_index]
+    daily['latitude'] = points['latitude'].to_numpy()[point_index]
+    daily['longitude'] = points['longitude'].to_numpy()[point_index]
+    if 'city_id' in points:
+        daily['city_id'] = points['city_id'].to_numpy()[point_index]
+    
+    return daily[[c for c in WEATHER_COLUMNS if c in daily.columns]].reset_index(drop=True)
+
+
+async def collect_weather(points, max_days=7, **options):
+    """Prévisions journalières de tous les points (voir collect_forecasts)."""
+    payloads = await collect_forecasts(points, **options)
+    return daily_forecasts(points, payloads, max_days)
+
+
+# ═══════════════════════════════════════════════════════════════════════
+# POINT D'ENTRÉE
+# ═══════════════════════════════════════════════════════════════════════
+
+def main():
+    """Point d'entrée pour exécution standalone."""
+    parser = argparse.ArgumentParser(description=__doc__.split('\n')[1])
+    parser.add_argument('--cities', default='data/raw/cities_coordinates.csv')
+    parser.add_argument('--output', default='data/raw/weather_forecast_6days.csv')
+    parser.add_argument('--max-concurrency', type=int, default=20)
+    parser.add_argument('--rate-limit', type=float, default=DEFAULT_RATE_LIMIT)
+    parser.add_argument('--ttl', type=float, default=CACHE_TTL_SECONDS, help="Durée de vie du cache (s)")
+    parser.add_argument('--no-cache', action='store_true')
+    args = parser.parse_args()
+    
+    df_cities = pd.read_csv(args.cities)
+    print(f"📍 {len(df_cities)} villes chargées")
+    
+    df_weather = asyncio.run(collect_weather(
+        df_cities,
+        max_concurrency=args.max_concurrency,
+        rate_limit=args.rate_limit,
+        cache_path=None if args.no_cache else WEATHER_CACHE_DB,
+        ttl=args.ttl,
+    ))
+    
+    df_weather.to_csv(args.output, index=False, encoding='utf-8')
+    print(f"\n✅ Données météo sauvegardées : {args.output} ({len(df_weather)} lignes)")
+
+
+if __name__ == "__main__":
+    main()
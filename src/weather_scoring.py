@@ -0,0 +1,207 @@
+"""
+Score météo des destinations (0 à 100)
+Moteur vectorisé (NumPy) du score de "beau temps" du notebook 03 : barèmes
+par critère configurables (seuils, points, pondérations), agrégation par
+ville et sélection des meilleures destinations (argpartition)
+"""
+
+import numpy as np
+
+
+# ═══════════════════════════════════════════════════════════════════════
+# CONFIGURATION
+# ═══════════════════════════════════════════════════════════════════════
+
+# CRITÈRES DE "BEAU TEMPS" 🌤️ : température agréable, faible probabilité
+# et faible volume de pluie, humidité modérée, vent faible, ciel dégagé.
+#
+# Barème de chaque critère : règles évaluées dans l'ordre (la première
+# vérifiée donne les points), sinon `default` points. Une valeur manquante
+# (NaN) ne vérifie aucune règle.
+#   ('between', (bas, haut), points) : bas <= x <= haut
+#   ('lt', seuil, points)            : x < seuil
+#   ('eq', valeur, points)           : x == valeur
+WEATHER_CRITERIA = {
+    # Température idéale : 20-25°C (0-25 points)
+    'temp_avg': {
+        'rules': [('between', (20, 25), 25), ('between', (18, 28), 20),
+                  ('between', (15, 30), 15), ('between', (12, 32), 10)],
+        'default': 0,
+    },
+    # Probabilité de pluie (0-25 points)
+    'pop': {
+        'rules': [('lt', 10, 25), ('lt', 30, 20), ('lt', 50, 10), ('lt', 70, 5)],
+        'default': 0,
+    },
+    # Volume de pluie (0-20 points)
+    'rain': {
+        'rules': [('eq', 0, 20), ('lt', 2, 15), ('lt', 5, 10), ('lt', 10, 5)],
+        'default': 0,
+    },
+    # Humidité (0-10 points)
+    'humidity': {
+        'rules': [('between', (40, 60), 10), ('between', (30, 70), 7), ('between', (20, 80), 5)],
+        'default': 0,
+    },
+    # Vent (0-10 points)
+    'wind_speed': {
+        'rules': [('lt', 3, 10), ('lt', 5, 7), ('lt', 8, 5), ('lt', 12, 3)],
+        'default': 0,
+    },
+    # Couverture nuageuse (2-10 points)
+    'clouds': {
+        'rules': [('lt', 20, 10), ('lt', 40, 8), ('lt', 60, 6), ('lt', 80, 4)],
+        'default': 2,
+    },
+}
+
+# Agrégation des scores journaliers par ville (notebook 03)
+CITY_AGGREGATIONS = {
+    'weather_score': 'mean',
+    'temp_avg': 'mean',
+    'pop': 'mean',
+    'rain': 'sum',  # Total de pluie sur la période
+    'humidity': 'mean',
+    'wind_speed': 'mean',
+    'clouds': 'mean',
+    'city_id': 'first',
+    'latitude': 'first',
+    'longitude': 'first',
+}
+
+
+# ═══════════════════════════════════════════════════════════════════════
+# SCORE VECTORISÉ
+# ═══════════════════════════════════════════════════════════════════════
+
+def max_points(criterion):
+    """Points maximum d'un critère."""
+    return max([points for _, _, points in criterion['rules']] + [criterion['default']])
+
+
+def criterion_points(values, criterion):
+    """
+    Points d'un critère pour un tableau de valeurs.
+    
+    Args:
+        values (array-like): Valeurs météo (une par ville-jour / ville-heure)
+        criterion (dict): Barème {'rules': [...], 'default': points}
+    
+    Returns:
+        ndarray: Points de chaque valeur
+    """
+    x = np.asarray(values, dtype='float64')
+    
+    conditions = []
+    for op, threshold, _ in criterion['rules']:
+        if op == 'between':
+            low, high = threshold
+            conditions.append((x >= low) & (x <= high))
+        elif op == 'lt':
+            conditions.append(x < threshold)
+        elif op == 'eq':
+            conditions.append(x == threshold)
+        else:
+            raise ValueError(f"Règle de barème inconnue : {op}")
+    
+    return np.select(conditions, [points for _, _, points in criterion['rules']], criterion['default'])
+
+
+def weather_scores(data, criteria=WEATHER_CRITERIA, weights=None):
+    """
+    Score météo (0 à 100 avec le barème par défaut) de chaque ligne.
+    
+    Résultat identique à l'ancien `calculate_weather_score` appliqué ligne
+    par ligne (DataFrame.apply), en une passe NumPy par critère.
+    
+    Args:
+        data (DataFrame | dict): Colonnes météo (temp_avg, pop, rain, humidity,
+            wind_speed, clouds)
+        criteria (dict): Barèmes par colonne
+        weights (dict): Points maximum par critère (les points du barème sont
+            mis à l'échelle) ; None = barème tel quel (scores entiers)
+    
+    Returns:
+        ndarray: Scores
+    """
+    score = None
+    for column, criterion in criteria.items():
+        points = criterion_points(data[column], criterion)
+        
+        if weights is not None and column in weights:
+            points = points * (weights[column] / max_points(criterion))
+        
+        score = points if score is None else score + points
+    
+    return score
+
+
+def score_weather(df_weather, criteria=WEATHER_CRITERIA, weights=None):
+    """Ajoute la colonne `weather_score` aux prévisions (copie)."""
+    df = df_weather.copy()
+    df['weather_score'] = weather_scores(df, criteria, weights)
+    return df
+
+
+def city_weather_scores(df_weather):
+    """
+    Score moyen par ville, trié par score décroissant (classement du notebook 03).
+    
+    Args:
+        df_weather (DataFrame): Prévisions avec la colonne `weather_score`
+    
+    Returns:
+        DataFrame: Une ligne par ville (avg_weather_score, moyennes météo, coordonnées)
+    """
+    aggregations = {col: agg for col, agg in CITY_AGGREGATIONS.items() if col in df_weather.columns}
+    city_scores = df_weather.groupby('city').agg(aggregations).reset_index()
+    
+    city_scores.rename(columns={'weather_score': 'avg_weather_score'}, inplace=True)
+    
+    city_scores['avg_weather_score'] = city_scores['avg_weather_score'].round(2)
+    city_scores['temp_avg'] = city_scores['temp_avg'].round(1)
+    city_scores['pop'] = city_scores['pop'].round(1)
+    city_scores['rain'] = city_scores['rain'].round(2)
+    
+    return city_scores.sort_values('avg_weather_score', ascending=False).reset_index(drop=True)
+
+
+# ═══════════════════════════════════════════════════════════════════════
+# MEILLEURES DESTINATIONS
+# ═══════════════════════════════════════════════════════════════════════
+
+def top_k(scores, k):
+    """
+    Indices des `k` meilleurs scores, du meilleur au moins bon.
+    
+    np.argpartition isole le k-ième score en O(n) ; seuls les k meilleurs
+    sont ensuite triés. Les ex-aequo sont départagés par position (même
+    résultat qu'un tri stable complet) et les scores manquants (NaN) sont
+    classés en dernier.
+    
+    Args:
+        scores (array-like): Scores
+        k (int): Nombre de résultats
+    
+    Returns:
+        ndarray: Indices (positions) des k meilleurs scores
+    """
+    scores = np.asarray(scores, dtype='float64')
+    k = min(int(k), len(scores))
+    if k <= 0:
+        return np.array([], dtype='int64')
+    
+    keys = -np.where(np.isnan(scores), -np.inf, scores)
+    if k < len(scores):
+        kth = keys[np.argpartition(keys, k - 1)[k - 1]]
+        better = np.flatnonzero(keys < kth)
+        ties = np.flatnonzero(keys == kth)[:k - len(better)]
+        best = np.concatenate([better, ties])
+    else:
+        best = np.arange(len(scores))
+    return best[np.argsort(keys[best], kind='stable')]
+
+
+def top_destinations(city_scores, k=5, column='avg_weather_score'):
+    """Les `k` meilleures villes du classement (lignes du DataFrame, index réinitialisé)."""
+    return city_scores.iloc[top_k(city_scores[column].to_numpy(), k)].reset_index(drop=True)